@@ -0,0 +1,132 @@
+"""
+Benchmark: order table size vs checkout inserts, before and after archiving
+
+Seeds --orders delivered orders older than a year (--items lines each, one
+status event each) and measures, with the full order tables and again after
+archive.archive_orders() has moved them into compressed segments:
+- checkout insert: one Order (plus its OrderEvent) and --items OrderItems in
+  one transaction, p50/p99 over --samples inserts
+- archived order: load_archived_order(), the slower path of GET /api/orders/{id}/
+
+Also reports the archive run time and the database file size before and after
+VACUUM, i.e. how much space the compressed segments take.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_archive [--orders 200000] [--items 3] [--samples 500]
+"""
+
+import argparse
+import os
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import common
+
+
+def seed_orders(count, items, customers=2000):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from products.models import Order, OrderEvent, OrderItem, Product
+
+    User.objects.bulk_create([User(username=f'bench-{i}') for i in range(customers)], batch_size=1000)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    old = timezone.now() - timedelta(days=400)
+    for start in range(0, count, 5000):
+        size = min(5000, count - start)
+        orders = Order.objects.bulk_create([
+            Order(user_id=user_ids[(start + i) % len(user_ids)], phone_number='1', status='delivered', created_at=old)
+            for i in range(size)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_ids[(order.id * 7 + line) % len(product_ids)], quantity=1 + line, price=Decimal('19.99'))
+            for order in orders for line in range(items)
+        ])
+        OrderEvent.objects.bulk_create([
+            OrderEvent(order=order, user_id=order.user_id, from_status='', to_status='delivered') for order in orders
+        ])
+    Order.objects.update(created_at=old)
+    return user_ids
+
+
+def time_inserts(samples, items, user_id, product_ids):
+    from django.db import transaction
+    from products.models import Order, OrderItem
+
+    timings = []
+    for i in range(samples):
+        start = time.perf_counter()
+        with transaction.atomic():
+            order = Order.objects.create(user_id=user_id, phone_number='1', status='ordered')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_ids[(i + line) % len(product_ids)], quantity=1, price=Decimal('19.99'))
+                for line in range(items)
+            ])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def measure(label, args, user_id, product_ids):
+    from products.models import Order
+
+    inserts = time_inserts(args.samples, args.items, user_id, product_ids)
+    return {
+        'tables': label,
+        'live_orders': Order.objects.count(),
+        'insert_p50_ms': common.percentile(inserts, 50) * 1000,
+        'insert_p99_ms': common.percentile(inserts, 99) * 1000,
+    }
+
+
+def db_size(db_path):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    return os.path.getsize(db_path) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from products.archive import archive_orders, load_archived_order
+    from products.models import ArchivedOrder, Product
+    from products.reports import refresh_rollups
+
+    common.seed_catalog(products=500)
+    user_ids = seed_orders(args.orders, args.items)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    refresh_rollups(lag=0)
+
+    rows = [measure(f'{args.orders} cold orders', args, user_ids[0], product_ids)]
+    size_before = db_size(db_path)
+    with common.timer() as t:
+        result = archive_orders(batch_size=args.batch_size, pause=0)
+    rows.append(measure('after archiving', args, user_ids[0], product_ids))
+    size_after = db_size(db_path)
+
+    archived = []
+    for entry in ArchivedOrder.objects.order_by('?').select_related('user')[:50]:
+        start = time.perf_counter()
+        assert load_archived_order(entry.order_id, entry.user) is not None
+        archived.append(time.perf_counter() - start)
+    os.unlink(db_path)
+
+    common.report(f'Checkout inserts, {args.items} lines per order', rows)
+    common.report('Archive', [{
+        'orders': result.orders, 'segments': result.segments,
+        'seconds': t['elapsed'], 'orders_per_sec': result.orders / t['elapsed'] if t['elapsed'] else 0.0,
+        'db_mb_before': size_before, 'db_mb_after': size_after,
+        'archived_get_p50_ms': common.percentile(archived, 50) * 1000,
+    }])
+
+
+if __name__ == '__main__':
+    main()
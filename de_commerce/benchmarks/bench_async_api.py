@@ -0,0 +1,112 @@
+"""
+Benchmark: WSGI vs ASGI (sync DRF views) vs ASGI (async-native views)
+
+Drives the read endpoints at high concurrency through the application callables
+directly, the way a local server would:
+- wsgi:        de_commerce.wsgi.application on a thread pool (gunicorn --threads style)
+- asgi:        de_commerce.asgi.application with ASYNC_API off (every view goes
+               through sync_to_async, the pre-async deployment)
+- asgi-native: de_commerce.asgi.application with ASYNC_API on (products/async_api.py)
+
+Each mode runs in its own subprocess because the URLconf is chosen at import time.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_async_api [--requests 2000] [--concurrency 200] [--products 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import common
+
+ENDPOINTS = ['/api/products/', '/api/categories/', '/api/me/', '/api/session-cart/']
+MODES = ['wsgi', 'asgi', 'asgi-native']
+
+
+def run_wsgi(path, total, concurrency):
+    from de_commerce.wsgi import application
+
+    def one(_):
+        start = time.perf_counter()
+        status, _, _ = common.wsgi_get(application, path)
+        assert status == 200, status
+        return time.perf_counter() - start
+
+    one(None)  # warm-up
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, common.timer() as t:
+        latencies = list(pool.map(one, range(total)))
+    return common.summarize(latencies, t['elapsed'])
+
+
+def run_asgi(path, total, concurrency):
+    from de_commerce.asgi import application
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                status, _, _ = await common.asgi_get(application, path)
+                assert status == 200, status
+                latencies.append(time.perf_counter() - start)
+
+        await common.asgi_get(application, path)  # warm-up
+        with common.timer() as t:
+            await asyncio.gather(*(one() for _ in range(total)))
+        return common.summarize(latencies, t['elapsed'])
+
+    return asyncio.run(main())
+
+
+def child(mode, total, concurrency):
+    os.environ['DJANGO_ASYNC_API'] = 'True' if mode == 'asgi-native' else 'False'
+    common.setup_django(migrate=False)
+    runner = run_wsgi if mode == 'wsgi' else run_asgi
+    for path in ENDPOINTS:
+        result = runner(path, total, concurrency)
+        print(json.dumps(dict(result, mode=mode, endpoint=path)), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args.mode, args.requests, args.concurrency)
+        return
+
+    db_path = common.setup_django()
+    common.seed_catalog(products=args.products)
+
+    rows = []
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_async_api', '--mode', mode,
+             '--requests', str(args.requests), '--concurrency', str(args.concurrency)],
+            cwd=common.PROJECT_DIR, env=dict(os.environ, BENCH_DB=db_path),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        rows.extend(json.loads(line) for line in output.splitlines() if line.startswith('{'))
+    os.unlink(db_path)
+
+    rows.sort(key=lambda r: (ENDPOINTS.index(r['endpoint']), MODES.index(r['mode'])))
+    common.report(
+        f'Read endpoints, {args.requests} requests at concurrency {args.concurrency} ({args.products} products)',
+        rows, ['endpoint', 'mode', 'req_per_sec', 'p50_ms', 'p99_ms'],
+    )
+
+
+if __name__ == '__main__':
+    main()
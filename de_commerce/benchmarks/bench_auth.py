@@ -0,0 +1,79 @@
+"""
+Benchmark: per-request authentication overhead (session vs token vs basic)
+
+Sends authenticated GET /api/orders/ requests through the WSGI application
+with each credential type and reports latency, throughput and database
+queries per request:
+- session: sessionid cookie (SessionAuthentication)
+- token:   Authorization: Bearer <signed access token> (SignedTokenAuthentication)
+- basic:   Authorization: Basic (BasicAuthentication, enabled only for this run)
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_auth [--requests 2000]
+"""
+
+import argparse
+import base64
+import time
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    common.setup_django()
+    from django.conf import settings
+    settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
+        'products.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ]
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from de_commerce.wsgi import application
+    from products.authentication import issue_tokens
+
+    user = User.objects.create_user(username='bench', password='bench-password')
+    client = Client()
+    client.force_login(user)
+    credentials = {
+        'session': {'Cookie': f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"},
+        'token': {'Authorization': f"Bearer {issue_tokens(user)['access']}"},
+        'basic': {'Authorization': 'Basic ' + base64.b64encode(b'bench:bench-password').decode()},
+    }
+
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    rows = []
+    for name, headers in credentials.items():
+        total = args.requests if name != 'basic' else max(1, args.requests // 20)
+        status, _, _ = common.wsgi_get(application, '/api/orders/', headers=headers)
+        assert status == 200, (name, status)
+        latencies = []
+        queries.clear()
+        with connection.execute_wrapper(count_queries), common.timer() as t:
+            for _ in range(total):
+                start = time.perf_counter()
+                common.wsgi_get(application, '/api/orders/', headers=headers)
+                latencies.append(time.perf_counter() - start)
+        row = dict(common.summarize(latencies, t['elapsed']), auth=name)
+        row['queries_per_request'] = len(queries) / total
+        row['user_or_session_queries'] = sum(1 for q in queries if 'auth_user' in q or 'django_session' in q) / total
+        rows.append(row)
+
+    common.report(
+        'GET /api/orders/ by authentication type (basic runs 1/20 of the requests)',
+        rows, ['auth', 'requests', 'req_per_sec', 'p50_ms', 'p99_ms', 'queries_per_request', 'user_or_session_queries'],
+    )
+
+
+if __name__ == '__main__':
+    main()
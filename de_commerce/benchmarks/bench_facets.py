@@ -0,0 +1,109 @@
+"""
+Benchmark: facet counts for the product list at catalog scale
+
+Seeds --products products (over --categories categories, 4 stock statuses and
+prices spread across every price bucket) and times facet counts for --samples
+random facet selections:
+- grouped queries: one GROUP BY per facet on the Product table, each applying
+  the other facets' selections (what computing facets per request would cost)
+- cold: facets.get_facets() with an empty cache (builds the facet cube)
+- new signature: cube cached, selection not seen before (sums over the cube)
+- cached: the same selection again (per-signature cache hit)
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_facets [--products 100000] [--categories 50] [--samples 200]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks import common
+
+STOCK_STATUSES = ['In Stock', 'Limited Stock', 'Out of Stock', 'Preorder']
+
+
+def random_selection(rng, category_ids):
+    from products.facets import BUCKETS
+
+    params = {}
+    if rng.random() < 0.7:
+        params['category'] = ','.join(map(str, rng.sample(category_ids, rng.randint(1, 3))))
+    if rng.random() < 0.5:
+        params['stock_status'] = rng.choice(STOCK_STATUSES)
+    if rng.random() < 0.5:
+        params['price'] = ','.join(bucket.key for bucket in rng.sample(BUCKETS, rng.randint(1, 2)))
+    return params
+
+
+def grouped_queries(selections):
+    """Facet counts straight from the Product table: one grouped query per facet."""
+    from django.db.models import Count
+    from products.facets import FACETS, _bucket_expression, filter_products
+    from products.models import Product
+
+    columns = {'category': 'category_id', 'stock_status': 'stock_status', 'price': 'bucket'}
+    counts = {}
+    for name in FACETS:
+        others = dict(selections, **{name: frozenset()})
+        queryset = filter_products(Product.objects.order_by(), others).annotate(bucket=_bucket_expression())
+        counts[name] = list(queryset.values_list(columns[name]).annotate(count=Count('id')))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from django.core.cache import cache
+    from django.db.models import Case, CharField, F, IntegerField, Value, When
+    from django.db.models.functions import Mod
+    from products.facets import get_facets, parse_selections
+    from products.models import Category, Product
+
+    common.seed_catalog(products=args.products, categories=args.categories, text_size=50)
+    Product.objects.annotate(slot=Mod(F('id'), len(STOCK_STATUSES), output_field=IntegerField())).update(
+        stock_status=Case(*(When(slot=i, then=Value(s)) for i, s in enumerate(STOCK_STATUSES)), output_field=CharField()),
+        price=Mod(F('id') * 7, 800) + Value(1),
+    )
+    category_ids = list(Category.objects.values_list('id', flat=True))
+    rng = random.Random(7)
+    selections = [parse_selections(random_selection(rng, category_ids)) for _ in range(args.samples)]
+
+    timings = {'grouped queries': [], 'cold': [], 'new signature': [], 'cached': []}
+    for selection in selections:
+        start = time.perf_counter()
+        grouped_queries(selection)
+        timings['grouped queries'].append(time.perf_counter() - start)
+    for selection in selections[:20]:
+        cache.clear()
+        start = time.perf_counter()
+        get_facets(selection)
+        timings['cold'].append(time.perf_counter() - start)
+    cache.clear()
+    get_facets(parse_selections({}))
+    for selection in selections:
+        start = time.perf_counter()
+        get_facets(selection)
+        timings['new signature'].append(time.perf_counter() - start)
+    for selection in selections:
+        start = time.perf_counter()
+        get_facets(selection)
+        timings['cached'].append(time.perf_counter() - start)
+    os.unlink(db_path)
+
+    rows = [
+        {'mode': mode, 'samples': len(samples), 'p50_ms': common.percentile(samples, 50) * 1000,
+         'p99_ms': common.percentile(samples, 99) * 1000}
+        for mode, samples in timings.items()
+    ]
+    common.report(f'Facet counts, {args.products} products, {args.categories} categories', rows)
+
+
+if __name__ == '__main__':
+    main()
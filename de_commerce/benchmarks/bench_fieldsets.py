@@ -0,0 +1,58 @@
+"""
+Benchmark: sparse fieldsets on the product list
+
+Requests /api/products/ through the WSGI application with the full
+serializer, the grid fieldset (?fields=id,name,price,image,stock_status) and
+?omit= of the three long text fields, and reports rows/sec and response bytes.
+Catalog text columns are --text-size characters each, so the cost of fetching
+and rendering them is visible.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_fieldsets [--products 1000] [--text-size 2000] [--repeat 30]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks import common
+
+VARIANTS = [
+    ('full', ''),
+    ('grid fields', '?fields=id,name,price,image,stock_status'),
+    ('omit text', '?omit=description,more_description,specifications'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--text-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(ALLOWED_HOSTS=['*'])
+    from de_commerce.wsgi import application
+
+    common.seed_catalog(products=args.products, text_size=args.text_size)
+
+    rows = []
+    for name, query in VARIANTS:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            status, _, body = common.wsgi_get(application, '/api/products/' + query, {'Accept-Encoding': 'identity'})
+            timings.append(time.perf_counter() - start)
+            assert status == 200, status
+        p50 = common.percentile(timings, 50)
+        rows.append({'variant': name, 'bytes': len(body), 'rows_per_sec': args.products / p50, 'p50_ms': p50 * 1000})
+    os.unlink(db_path)
+
+    common.report(
+        f'GET /api/products/ with {args.products} products, {args.text_size}-char text columns ({args.repeat} requests each)',
+        rows, ['variant', 'bytes', 'rows_per_sec', 'p50_ms'],
+    )
+
+
+if __name__ == '__main__':
+    main()
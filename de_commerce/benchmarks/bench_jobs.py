@@ -0,0 +1,62 @@
+"""
+Benchmark: background job queue throughput (products/jobs.py)
+
+Measures:
+- enqueue: jobs/sec inserted one at a time with enqueue()
+- drain: jobs/sec run by one Worker at several --concurrency levels, for a
+  no-op task and for a task that sleeps --io-ms (simulating an SMTP call)
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_jobs [--jobs 2000] [--io-ms 5] [--concurrency 1 4 8]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--io-ms', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from products.jobs import Worker, enqueue, task
+    from products.models import Job
+
+    @task('bench.noop')
+    def noop(i):
+        pass
+
+    @task('bench.io')
+    def io(i):
+        time.sleep(args.io_ms / 1000)
+
+    with common.timer() as t:
+        for i in range(args.jobs):
+            enqueue('bench.noop', {'i': i})
+    rows = [{'phase': 'enqueue', 'task': 'bench.noop', 'concurrency': '-', 'jobs': args.jobs, 'jobs_per_sec': args.jobs / t['elapsed']}]
+    Job.objects.all().delete()
+
+    for name, count in (('bench.noop', args.jobs), ('bench.io', args.jobs // 4)):
+        for concurrency in args.concurrency:
+            Job.objects.bulk_create([Job(task=name, payload={'i': i}) for i in range(count)], batch_size=500)
+            worker = Worker(concurrency=concurrency, poll_interval=0.01)
+            with common.timer() as t:
+                processed = worker.run(burst=True)
+            rows.append({
+                'phase': 'drain', 'task': name, 'concurrency': concurrency, 'jobs': processed,
+                'jobs_per_sec': processed / t['elapsed'],
+            })
+            Job.objects.all().delete()
+    os.unlink(db_path)
+
+    common.report(f'Job queue throughput ({args.io_ms:g} ms per bench.io job)', rows)
+
+
+if __name__ == '__main__':
+    main()
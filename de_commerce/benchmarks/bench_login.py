@@ -0,0 +1,106 @@
+"""
+Benchmark: login throughput per password hasher
+
+Runs POST /api/login/ through the WSGI application from a thread pool with
+each hasher in HASHERS (tuned argon2, Django's scrypt and pbkdf2) first in
+PASSWORD_HASHERS and reports logins/sec, logins/sec/core and latency
+percentiles. Each hasher runs in its own subprocess because Django caches the
+hasher list once it is loaded.
+
+The stored hash is created with that hasher, so the numbers are steady-state
+logins (no one-off rehash).
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_login [--requests 60] [--concurrency 8] [--profile-calls]
+
+--profile-calls prints the top functions of a single-threaded run under cProfile.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import common
+
+HASHERS = {
+    'argon2': 'products.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+BODY = json.dumps({'username': 'bench', 'password': 'correct horse battery staple'}).encode()
+
+
+def child(hasher, total, concurrency, profile_calls):
+    from django.conf import settings
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'de_commerce.settings')
+    others = [path for path in settings.PASSWORD_HASHERS if path != HASHERS[hasher]]
+    common.setup_django(PASSWORD_HASHERS=[HASHERS[hasher], *others])
+    from django.contrib.auth.models import User
+    from de_commerce.wsgi import application
+
+    User.objects.create_user(username='bench', password='correct horse battery staple')
+
+    def one(_):
+        start = time.perf_counter()
+        status, _, _ = common.wsgi_get(application, '/api/login/', method='POST', body=BODY)
+        assert status == 200, status
+        return time.perf_counter() - start
+
+    one(None)  # warm-up
+    if profile_calls:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for _ in range(5):
+            one(None)
+        profiler.disable()
+        print(f'--- {hasher} ---', file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, common.timer() as t:
+        latencies = list(pool.map(one, range(total)))
+    result = common.summarize(latencies, t['elapsed'])
+    cores = min(concurrency, os.cpu_count() or 1)
+    result.update(
+        hasher=hasher,
+        logins_per_sec_per_core=result['req_per_sec'] / cores,
+    )
+    os.unlink(settings.DATABASES['default']['NAME'])
+    print(json.dumps(result), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--profile-calls', action='store_true')
+    parser.add_argument('--hasher', choices=HASHERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hasher:
+        child(args.hasher, args.requests, args.concurrency, args.profile_calls)
+        return
+
+    rows = []
+    for hasher in HASHERS:
+        command = [sys.executable, '-m', 'benchmarks.bench_login', '--hasher', hasher,
+                   '--requests', str(args.requests), '--concurrency', str(args.concurrency)]
+        if args.profile_calls:
+            command.append('--profile-calls')
+        # cProfile output goes to stderr and is passed through
+        output = subprocess.run(command, cwd=common.PROJECT_DIR, stdout=subprocess.PIPE, text=True, check=True).stdout
+        rows.extend(json.loads(line) for line in output.splitlines() if line.startswith('{'))
+    common.report(
+        f'POST /api/login/, {args.requests} logins at concurrency {args.concurrency} ({os.cpu_count()} CPUs)',
+        rows, ['hasher', 'req_per_sec', 'logins_per_sec_per_core', 'p50_ms', 'p99_ms'],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: reading the order status change feed (GET /api/orders/events/)
+
+Seeds --events OrderEvent rows and measures:
+- full read: walking the whole feed with ?after= cursors through the WSGI
+  app (events/sec and p50/p99 per page)
+- page cost by position: one page near the start, middle and end of the
+  table, with the cursor (id > after) vs OFFSET pagination over the same rows
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_order_events [--events 500000] [--page 1000]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from benchmarks import common
+
+
+def seed_events(count, orders=2000):
+    from django.contrib.auth.models import User
+    from products.models import Order, OrderEvent
+
+    staff = User.objects.create_user(username='bench-ops', password='pass', is_staff=True)
+    Order.objects.bulk_create([Order(user=staff, phone_number='1') for _ in range(orders)], batch_size=1000)
+    order_ids = list(Order.objects.values_list('id', flat=True))
+    statuses = ['ordered', 'pending', 'shipped', 'delivered']
+    batch = []
+    for i in range(count):
+        batch.append(OrderEvent(
+            order_id=order_ids[i % len(order_ids)], user_id=staff.id,
+            from_status=statuses[i % 4 - 1] if i % 4 else '', to_status=statuses[i % 4],
+        ))
+        if len(batch) == 5000:
+            OrderEvent.objects.bulk_create(batch)
+            batch = []
+    OrderEvent.objects.bulk_create(batch)
+    return staff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--page', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(ALLOWED_HOSTS=['*'])
+    from django.core.wsgi import get_wsgi_application
+    from products.authentication import issue_tokens
+    from products.models import OrderEvent
+    from products.order_events import EVENT_FIELDS, events_after
+
+    staff = seed_events(args.events)
+    app = get_wsgi_application()
+    headers = {'Authorization': f"Bearer {issue_tokens(staff)['access']}"}
+
+    after, read, timings = 0, 0, []
+    with common.timer() as t:
+        while True:
+            start = time.perf_counter()
+            status, _, body = common.wsgi_get(app, f'/api/orders/events/?after={after}&limit={args.page}', headers)
+            timings.append(time.perf_counter() - start)
+            assert status == 200, status
+            page = json.loads(body)
+            read += len(page['results'])
+            after = page['after']
+            if not page['has_more']:
+                break
+    rows = [{
+        'read': 'full feed (HTTP)', 'events': read, 'events_per_sec': read / t['elapsed'],
+        'p50_page_ms': common.percentile(timings, 50) * 1000, 'p99_page_ms': common.percentile(timings, 99) * 1000,
+    }]
+
+    ids = list(OrderEvent.objects.order_by('id').values_list('id', flat=True)[::max(1, args.events // 10)])
+    positions = {'start': 0, 'middle': len(ids) // 2, 'end': len(ids) - 1}
+    cost = []
+    for label, index in positions.items():
+        offset = index * max(1, args.events // 10)
+        for mode, fetch in (
+            ('cursor', lambda: events_after(ids[index] - 1, None, args.page)),
+            ('offset', lambda: list(OrderEvent.objects.order_by('id').values_list(*EVENT_FIELDS)[offset:offset + args.page])),
+        ):
+            samples = []
+            for _ in range(20):
+                start = time.perf_counter()
+                fetch()
+                samples.append(time.perf_counter() - start)
+            cost.append({'position': label, 'mode': mode, 'p50_ms': common.percentile(samples, 50) * 1000})
+    os.unlink(db_path)
+
+    common.report(f'Order event feed, {args.events} events, pages of {args.page}', rows)
+    common.report('One page by position in the table', cost)
+
+
+if __name__ == '__main__':
+    main()
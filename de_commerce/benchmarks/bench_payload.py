@@ -0,0 +1,119 @@
+"""
+Benchmark: JSON render time and bytes on the wire for list endpoints
+
+For /api/products/ and /api/orders/ this measures:
+- render: time to turn the serialized data into bytes with DRF's stdlib
+  JSONRenderer vs products.renderers.FastJSONRenderer (orjson)
+- wire: full request latency and response size through the WSGI application
+  for Accept-Encoding identity, gzip and br (br only when `brotli` is installed)
+
+/api/orders/ is requested with a signed Bearer token for a user holding
+--orders orders of --lines lines each.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_payload [--products 500] [--orders 50] [--lines 5] [--repeat 50]
+"""
+
+import argparse
+import os
+import time
+from decimal import Decimal
+
+from benchmarks import common
+
+ENDPOINTS = ['/api/products/', '/api/orders/']
+
+
+def seed_orders(user, products, orders, lines):
+    from products.models import Order, OrderItem
+
+    Order.objects.bulk_create([
+        Order(user=user, shipping_address='1 Benchmark Street', phone_number='0700000000', status='ordered')
+        for _ in range(orders)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=products[(order.id * lines + i) % len(products)], quantity=i + 1, price=Decimal('19.99'))
+        for order in Order.objects.filter(user=user) for i in range(lines)
+    ], batch_size=500)
+
+
+def serialized_data(path, user):
+    from rest_framework.test import APIRequestFactory
+    from products.models import Order, Product
+    from products.serializers import OrderSerializer, ProductSerializer
+
+    request = APIRequestFactory().get(path)
+    if path == '/api/products/':
+        return ProductSerializer(Product.objects.select_related('category'), many=True, context={'request': request}).data
+    orders = Order.objects.filter(user=user).prefetch_related('items__product__category')
+    return OrderSerializer(orders, many=True, context={'request': request}).data
+
+
+def bench_render(data, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from products.renderers import FastJSONRenderer
+
+    rows = []
+    for name, renderer in (('json', JSONRenderer()), ('orjson', FastJSONRenderer())):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = renderer.render(data)
+            timings.append(time.perf_counter() - start)
+        rows.append({'renderer': name, 'bytes': len(body), 'p50_ms': common.percentile(timings, 50) * 1000})
+    return rows
+
+
+def bench_wire(application, path, headers, repeat):
+    from products.middleware import brotli
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    rows = []
+    for encoding in encodings:
+        request_headers = dict(headers, Accept_Encoding=encoding)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            status, response_headers, body = common.wsgi_get(application, path, request_headers)
+            timings.append(time.perf_counter() - start)
+            assert status == 200, status
+        rows.append({
+            'encoding': response_headers.get('Content-Encoding', 'identity'),
+            'bytes': len(body),
+            'p50_ms': common.percentile(timings, 50) * 1000,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--lines', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(ALLOWED_HOSTS=['*'])
+    from django.contrib.auth.models import User
+    from de_commerce.wsgi import application
+    from products.authentication import issue_tokens
+    from products.models import Product
+
+    common.seed_catalog(products=args.products)
+    user = User.objects.create_user(username='bench', password='bench')
+    seed_orders(user, list(Product.objects.all()), args.orders, args.lines)
+    auth = {'Authorization': 'Bearer ' + issue_tokens(user)['access']}
+
+    render_rows, wire_rows = [], []
+    for path in ENDPOINTS:
+        data = serialized_data(path, user)
+        render_rows.extend(dict(row, endpoint=path) for row in bench_render(data, args.repeat))
+        wire_rows.extend(dict(row, endpoint=path) for row in bench_wire(application, path, auth, args.repeat))
+
+    common.report(f'JSON render time ({args.repeat} renders each)', render_rows, ['endpoint', 'renderer', 'bytes', 'p50_ms'])
+    common.report(f'Full request via WSGI ({args.repeat} requests each)', wire_rows, ['endpoint', 'encoding', 'bytes', 'p50_ms'])
+    os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
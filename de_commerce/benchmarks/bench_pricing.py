@@ -0,0 +1,92 @@
+"""
+Benchmark: pricing a 1,000-product page
+
+Resolves customer prices for --products products from a price list holding
+explicit prices for half of them (the rest use the exchange rate):
+- per-product: one PriceListItem query per product (the join-per-product approach)
+- price book (cold): pricing.PriceBook with an empty cache (one query)
+- price book (warm): pricing.PriceBook with the list cached (no query)
+
+It then requests /api/products/ through the WSGI application anonymously
+(base prices) and as a price-list customer, to show the end-to-end overhead.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_pricing [--products 1000] [--repeat 30]
+"""
+
+import argparse
+import os
+import time
+from decimal import Decimal
+
+from benchmarks import common
+
+
+def per_product(price_list, products):
+    from products.models import PriceListItem
+
+    prices = {}
+    for product in products:
+        item = PriceListItem.objects.filter(price_list=price_list, product=product).first()
+        prices[product.id] = item.price if item else (product.price * price_list.exchange_rate).quantize(Decimal('0.01'))
+    return prices
+
+
+def measure(fn, repeat, before=None):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {'p50_ms': common.percentile(timings, 50) * 1000, 'queries': len(queries.captured_queries)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(ALLOWED_HOSTS=['*'])
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from de_commerce.wsgi import application
+    from products.authentication import issue_tokens
+    from products.models import PriceList, PriceListItem, Product
+    from products.pricing import PriceBook
+
+    common.seed_catalog(products=args.products)
+    products = list(Product.objects.all())
+    user = User.objects.create_user(username='b2b', password='bench')
+    price_list = PriceList.objects.create(name='Wholesale EUR', currency='EUR', exchange_rate=Decimal('0.92'))
+    price_list.customers.add(user)
+    PriceListItem.objects.bulk_create([
+        PriceListItem(price_list=price_list, product=product, price=product.price * Decimal('0.8'))
+        for product in products[::2]
+    ])
+
+    rows = [
+        dict(measure(lambda: per_product(price_list, products), max(1, args.repeat // 10)), mode='per-product'),
+        dict(measure(lambda: PriceBook(price_list).prices(products), args.repeat, before=cache.clear), mode='price book (cold)'),
+        dict(measure(lambda: PriceBook(price_list).prices(products), args.repeat), mode='price book (warm)'),
+    ]
+    common.report(f'Resolving {len(products)} prices ({args.repeat} runs)', rows, ['mode', 'p50_ms', 'queries'])
+
+    request_rows = []
+    for name, headers in (('anonymous', {}), ('price-list customer', {'Authorization': 'Bearer ' + issue_tokens(user)['access']})):
+        def get():
+            status, _, _ = common.wsgi_get(application, '/api/products/', dict(headers, Accept_Encoding='identity'))
+            assert status == 200, status
+        request_rows.append(dict(measure(get, args.repeat), client=name))
+    os.unlink(db_path)
+    common.report(f'GET /api/products/ ({len(products)} products)', request_rows, ['client', 'p50_ms', 'queries'])
+
+
+if __name__ == '__main__':
+    main()
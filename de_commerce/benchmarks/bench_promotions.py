@@ -0,0 +1,113 @@
+"""
+Benchmark: evaluating 1,000 active promotions against 50-line carts
+
+Creates --promotions promotions (product-specific, category-wide, a few
+sitewide and some behind coupon codes) and evaluates random --lines-line carts:
+- linear scan: every rule checked against every line (no index)
+- compiled index: promotions.PromotionEngine (rules looked up by product/category)
+
+Also reports the time to compile the index from the database.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_promotions [--promotions 1000] [--lines 50] [--carts 200]
+"""
+
+import argparse
+import os
+import random
+import time
+from decimal import Decimal
+
+from benchmarks import common
+
+
+def seed_promotions(count, products, categories):
+    from products.models import Promotion
+
+    kinds = ['percentage', 'fixed', 'bogo']
+    Promotion.objects.bulk_create([
+        Promotion(
+            name=f'Promotion {i}', kind=kinds[i % 3], value=Decimal(5 + i % 20), buy_quantity=2, free_quantity=1,
+            coupon_code=f'CODE{i}' if i % 10 == 0 else '',
+        )
+        for i in range(count)
+    ])
+    promotions = list(Promotion.objects.order_by('id'))
+    product_links, category_links = [], []
+    for i, promotion in enumerate(promotions):
+        if i % 50 == 1:
+            continue  # sitewide
+        if i % 3 == 0:
+            category_links.append(Promotion.categories.through(promotion_id=promotion.id, category_id=categories[i % len(categories)].id))
+        else:
+            for product in random.sample(products, 3):
+                product_links.append(Promotion.products.through(promotion_id=promotion.id, product_id=product.id))
+    Promotion.products.through.objects.bulk_create(product_links)
+    Promotion.categories.through.objects.bulk_create(category_links)
+
+
+def linear_scan(engine, lines):
+    """Reference evaluation without the index: check every rule for every line."""
+    from products.promotions import rule_discount
+
+    rules = []
+    for index in [engine.public]:
+        for product_id, product_rules in index.by_product.items():
+            rules.extend((rule, 'product', product_id) for rule in product_rules)
+        for category_id, category_rules in index.by_category.items():
+            rules.extend((rule, 'category', category_id) for rule in category_rules)
+        rules.extend((rule, 'all', None) for rule in index.sitewide)
+    total = Decimal('0')
+    for line in lines:
+        best = Decimal('0')
+        for rule, scope, target in rules:
+            if scope == 'all' or (scope == 'product' and target == line.product_id) or (scope == 'category' and target == line.category_id):
+                best = max(best, rule_discount(rule, line.quantity, line.unit_price))
+        total += best
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--promotions', type=int, default=1000)
+    parser.add_argument('--lines', type=int, default=50)
+    parser.add_argument('--carts', type=int, default=200)
+    parser.add_argument('--products', type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from products.models import Product
+    from products.promotions import Line, PromotionEngine
+
+    random.seed(42)
+    categories = common.seed_catalog(products=args.products, categories=50)
+    products = list(Product.objects.all())
+    seed_promotions(args.promotions, products, categories)
+
+    with common.timer() as t:
+        engine = PromotionEngine.from_database()
+    compile_ms = t['elapsed'] * 1000
+
+    carts = [
+        [Line(i, p.id, p.category_id, random.randint(1, 4), p.price) for i, p in enumerate(random.sample(products, args.lines))]
+        for _ in range(args.carts)
+    ]
+    rows = []
+    for name, evaluate in (
+        ('linear scan', lambda lines: linear_scan(engine, lines)),
+        ('compiled index', lambda lines: engine.evaluate(lines).discount),
+    ):
+        timings = []
+        for lines in carts:
+            start = time.perf_counter()
+            evaluate(lines)
+            timings.append(time.perf_counter() - start)
+        rows.append({'mode': name, 'p50_ms': common.percentile(timings, 50) * 1000, 'p99_ms': common.percentile(timings, 99) * 1000})
+    os.unlink(db_path)
+
+    print(f'\nCompiled {engine.size} promotions in {compile_ms:.1f} ms')
+    common.report(f'Evaluating {args.carts} carts of {args.lines} lines against {args.promotions} promotions', rows)
+
+
+if __name__ == '__main__':
+    main()
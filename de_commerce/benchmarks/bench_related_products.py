@@ -0,0 +1,92 @@
+"""
+Benchmark: building "frequently bought together" recommendations vs order volume
+
+Seeds orders of 1-6 lines over a --products catalog (popular products are
+bought more often) up to each volume in --lines, and after each step times
+build_related_products():
+- NumPy/SciPy sparse counting, at every volume
+- the pure Python fallback, up to --python-max lines
+and reports seconds, order lines/sec, peak traced memory of the build and
+the number of RelatedProduct rows written. Memory should stay roughly flat as
+the volume grows (it depends on --chunk-size and the catalog, not on orders).
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_related_products [--lines 100000,1000000,5000000] [--products 5000]
+"""
+
+import argparse
+import os
+import random
+import tracemalloc
+from unittest import mock
+
+from benchmarks import common
+
+
+def seed_orders(target, seeded, products, rng, batch_orders=20000):
+    """Add orders until `target` order lines exist (`seeded` already do). Returns the new line count."""
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from products.models import Order, OrderItem
+
+    user = User.objects.get_or_create(username='bench-customer')[0]
+    weights = [1.0 / (rank + 1) for rank in range(len(products))]
+    while seeded < target:
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(
+                [Order(user=user, phone_number='1') for _ in range(batch_orders)], batch_size=5000,
+            )
+            items = []
+            for order in orders:
+                for product in rng.choices(products, weights, k=rng.randint(1, 6)):
+                    items.append(OrderItem(order_id=order.id, product=product, quantity=1, price=product.price))
+                if seeded + len(items) >= target:
+                    break
+            OrderItem.objects.bulk_create(items, batch_size=5000)
+        seeded += len(items)
+    return seeded
+
+
+def measure(build, chunk_size):
+    tracemalloc.start()
+    try:
+        result = build(chunk_size=chunk_size)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', default='100000,1000000,5000000', help='comma-separated order line volumes')
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=200000)
+    parser.add_argument('--python-max', type=int, default=1000000)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from products import recommendations
+    from products.models import Product
+
+    common.seed_catalog(products=args.products, categories=20, text_size=50)
+    products = list(Product.objects.all())
+    rng = random.Random(42)
+    seeded, rows = 0, []
+    for target in sorted(int(volume) for volume in args.lines.split(',')):
+        seeded = seed_orders(target, seeded, products, rng)
+        backends = ['numpy'] + (['python'] if seeded <= args.python_max else [])
+        for backend in backends:
+            with mock.patch.object(recommendations, 'np', recommendations.np if backend == 'numpy' else None):
+                result, peak = measure(recommendations.build_related_products, args.chunk_size)
+            rows.append({
+                'lines': result.lines, 'backend': result.backend, 'seconds': result.seconds,
+                'lines_per_sec': result.lines / result.seconds, 'peak_mb': peak / 2 ** 20, 'rows': result.rows,
+            })
+    os.unlink(db_path)
+
+    common.report(f'Related products build, {args.products} products, chunks of {args.chunk_size} lines', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: sales reports from the rollup tables vs raw OrderItem/Order scans
+
+Seeds --lines order lines (--lines-per-order per order, spread over --days
+days, one creation OrderEvent per order), then measures:
+- refresh: folding the whole event log into SalesRollup (refresh_sales_rollups
+  from an empty watermark), in events/sec and lines/sec
+- queries: "revenue per category per day" and "top 20 products this week",
+  answered by aggregating OrderItem joined to Order vs by sales_report() over
+  the rollups (p50/p99 of --repeat runs each)
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_sales_rollups [--lines 10000000] [--lines-per-order 4] [--days 90]
+"""
+
+import argparse
+import os
+import time
+from datetime import timedelta
+
+from benchmarks import common
+
+
+def seed_orders(lines, lines_per_order, days, products):
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from django.utils import timezone
+    from products.models import Order, OrderEvent, OrderItem
+
+    user = User.objects.create_user(username='bench-customer', password='pass')
+    orders = lines // lines_per_order
+    per_day = max(1, orders // days)
+    now = timezone.now()
+    methods = ['Credit Card', 'PayPal']
+    for day in range(0, orders, per_day):
+        count = min(per_day, orders - day)
+        with transaction.atomic():
+            created = Order.objects.bulk_create([
+                Order(user=user, phone_number='1', payment_method=methods[i % 2]) for i in range(count)
+            ], batch_size=2000)
+            ids = [order.id for order in created]
+            # auto_now_add ignores the value given to bulk_create
+            Order.objects.filter(id__range=(ids[0], ids[-1])).update(created_at=now - timedelta(days=day // per_day))
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order_id=order_id, product=products[(order_id * 7 + n) % len(products)],
+                    quantity=1 + n % 3, price=products[(order_id * 7 + n) % len(products)].price, discount=0,
+                )
+                for order_id in ids for n in range(lines_per_order)
+            ], batch_size=5000)
+            OrderEvent.objects.bulk_create([
+                OrderEvent(order_id=order_id, user_id=user.id, from_status='', to_status='ordered') for order_id in ids
+            ], batch_size=5000)
+    return orders
+
+
+def sample(fetch, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch()
+        samples.append(time.perf_counter() - start)
+    return {'p50_ms': common.percentile(samples, 50) * 1000, 'p99_ms': common.percentile(samples, 99) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=10000000)
+    parser.add_argument('--lines-per-order', type=int, default=4)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from django.db.models import F, Sum
+    from django.db.models.functions import TruncDate
+    from django.utils import timezone
+    from products.models import OrderItem, Product
+    from products.reports import refresh_rollups, sales_report
+
+    common.seed_catalog(products=args.products, categories=20, text_size=50)
+    products = list(Product.objects.all())
+    with common.timer() as t:
+        orders = seed_orders(args.lines, args.lines_per_order, args.days, products)
+    print(f'Seeded {orders * args.lines_per_order} order lines in {orders} orders ({t["elapsed"]:.1f}s)')
+
+    with common.timer() as t:
+        events = refresh_rollups(batch_size=5000, lag=0)
+    refresh = [{
+        'events': events, 'seconds': t['elapsed'], 'events_per_sec': events / t['elapsed'],
+        'lines_per_sec': events * args.lines_per_order / t['elapsed'],
+    }]
+
+    revenue = Sum(F('price') * F('quantity') - F('discount'))
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
+    queries = {
+        'revenue per category per day': (
+            lambda: list(
+                OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+                .values('day', 'product__category_id').annotate(revenue=revenue).order_by('day')
+            ),
+            lambda: sales_report({'group_by': 'period,category', 'limit': '1000'}),
+        ),
+        'top 20 products this week': (
+            lambda: list(
+                OrderItem.objects.filter(order__created_at__gte=week_start)
+                .values('product_id').annotate(revenue=revenue).order_by('-revenue')[:20]
+            ),
+            lambda: sales_report({'group_by': 'product', 'start': week_start.isoformat(), 'order': '-revenue', 'limit': '20'}),
+        ),
+    }
+    rows = []
+    for name, (raw, rollup) in queries.items():
+        rows.append({'query': name, 'source': 'raw OrderItem scan', **sample(raw, args.repeat)})
+        rows.append({'query': name, 'source': 'rollups', **sample(rollup, args.repeat)})
+    os.unlink(db_path)
+
+    common.report('Rollup refresh (full event log)', refresh)
+    common.report(f'Report queries over {orders * args.lines_per_order} order lines', rows)
+
+
+if __name__ == '__main__':
+    main()
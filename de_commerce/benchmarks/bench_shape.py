@@ -0,0 +1,87 @@
+"""
+Benchmark: nested vs ?shape=normalized payloads
+
+Measures response size (raw and gzip) and request latency for the cart,
+order and /api/me/ endpoints with the default nested shape and with
+?shape=normalized (products/normalization.py).
+
+The benchmark user has a cart of --lines lines and --orders orders of --lines
+lines each, drawn from a small pool of products so the same products repeat
+across orders, like a returning customer's history.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_shape [--lines 20] [--orders 20] [--repeat 50]
+"""
+
+import argparse
+import os
+import time
+from decimal import Decimal
+
+from benchmarks import common
+
+ENDPOINTS = ['/api/carts/', '/api/orders/', '/api/me/']
+SHAPES = ['nested', 'normalized']
+
+
+def seed_user(lines, orders):
+    from django.contrib.auth.models import User
+    from products.models import Cart, CartItem, Order, OrderItem, Product
+
+    user = User.objects.create_user(username='bench', password='bench')
+    products = list(Product.objects.all()[:lines * 2])
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=products[i], quantity=1) for i in range(lines)])
+    Order.objects.bulk_create([
+        Order(user=user, shipping_address='1 Benchmark Street', phone_number='0700000000', status='ordered')
+        for _ in range(orders)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=products[(n + i) % len(products)], quantity=1, price=Decimal('19.99'))
+        for n, order in enumerate(Order.objects.filter(user=user)) for i in range(lines)
+    ])
+    return user
+
+
+def measure(application, path, headers, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status, response_headers, body = common.wsgi_get(application, path, headers)
+        timings.append(time.perf_counter() - start)
+        assert status == 200, status
+    return len(body), common.percentile(timings, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(ALLOWED_HOSTS=['*'])
+    from de_commerce.wsgi import application
+    from products.authentication import issue_tokens
+
+    common.seed_catalog(products=max(100, args.lines * 2))
+    user = seed_user(args.lines, args.orders)
+    auth = {'Authorization': 'Bearer ' + issue_tokens(user)['access']}
+
+    rows = []
+    for path in ENDPOINTS:
+        for shape in SHAPES:
+            url = path + ('?shape=normalized' if shape == 'normalized' else '')
+            raw_bytes, p50_ms = measure(application, url, dict(auth, Accept_Encoding='identity'), args.repeat)
+            gzip_bytes, _ = measure(application, url, dict(auth, Accept_Encoding='gzip'), 1)
+            rows.append({'endpoint': path, 'shape': shape, 'bytes': raw_bytes, 'gzip_bytes': gzip_bytes, 'p50_ms': p50_ms})
+    os.unlink(db_path)
+
+    common.report(
+        f'Payload shape, cart of {args.lines} lines, {args.orders} orders x {args.lines} lines ({args.repeat} requests each)',
+        rows, ['endpoint', 'shape', 'bytes', 'gzip_bytes', 'p50_ms'],
+    )
+
+
+if __name__ == '__main__':
+    main()
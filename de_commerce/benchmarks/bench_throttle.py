@@ -0,0 +1,81 @@
+"""
+Benchmark: per-request throttle overhead and state size
+
+Compares DRF's history-list AnonRateThrottle with the sliding-window
+AnonSlidingWindowThrottle (products/throttling.py) for one busy client.
+The history throttle stores one timestamp per request inside the window,
+so its cost and cache entry grow with the rate; the sliding window keeps
+three integers.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_throttle [--checks 20000] [--rates 100/hour 1000/hour 10000/hour]
+"""
+
+import argparse
+import pickle
+import time
+
+from benchmarks import common
+
+
+def measure(throttle_class, rate, checks, request):
+    from django.core.cache import caches
+
+    class Throttle(throttle_class):
+        pass
+
+    Throttle.rate = rate
+    # Stay under the limit so every check does the full read/modify/write cycle
+    num_requests, _ = Throttle().parse_rate(rate)
+    clock = [0.0]
+    Throttle.timer = lambda self: clock[0]
+    Throttle.cache = caches['default']
+    caches['default'].clear()
+
+    timings = []
+    peak_state = 0
+    throttle = None
+    for i in range(checks):
+        if i and i % (num_requests - 1) == 0:
+            peak_state = max(peak_state, len(pickle.dumps(caches['default'].get(throttle.key))))
+            caches['default'].clear()
+        throttle = Throttle()
+        throttle.cache = caches['default']
+        clock[0] += 0.001
+        start = time.perf_counter()
+        throttle.allow_request(request, None)
+        timings.append(time.perf_counter() - start)
+    peak_state = max(peak_state, len(pickle.dumps(caches['default'].get(throttle.key))))
+    return {
+        'throttle': throttle_class.__name__,
+        'rate': rate,
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'p99_us': common.percentile(timings, 99) * 1e6,
+        'peak_state_bytes': peak_state,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--rates', nargs='+', default=['100/hour', '1000/hour', '10000/hour'])
+    args = parser.parse_args()
+
+    common.setup_django(migrate=False)
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from rest_framework.throttling import AnonRateThrottle
+    from products.throttling import AnonSlidingWindowThrottle
+
+    request = RequestFactory().get('/api/products/')
+    request.user = AnonymousUser()
+
+    rows = []
+    for rate in args.rates:
+        for throttle_class in (AnonRateThrottle, AnonSlidingWindowThrottle):
+            rows.append(measure(throttle_class, rate, args.checks, request))
+    common.report(f'Throttle check cost, {args.checks} checks per row', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: price range and stock flag of a product list page with many variants
+
+Seeds --products products with --variants ProductVariants each and times
+loading --page products with their min/max price and in-stock flag, three ways:
+- per product: one aggregate query per product (what a serializer method
+  field would do)
+- prefetch: prefetch_related('variants') and aggregate in Python (query count
+  is flat, rows fetched grow with the number of variants)
+- annotated: variants.annotate_availability(), one query (what the API does)
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_variants [--products 2000] [--variants 100] [--page 48] [--samples 50]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks import common
+
+
+def per_product(page):
+    from django.db.models import Max, Min
+    from products.models import Product, ProductVariant
+
+    rows = []
+    for product in Product.objects.order_by('id')[:page]:
+        variants = ProductVariant.objects.filter(product=product, is_active=True)
+        prices = variants.aggregate(low=Min('price'), high=Max('price'))
+        rows.append((product.id, prices['low'], prices['high'], variants.filter(stock__gt=0).exists()))
+    return rows
+
+
+def prefetched(page):
+    from products.models import Product
+
+    rows = []
+    for product in Product.objects.order_by('id').prefetch_related('variants')[:page]:
+        variants = [variant for variant in product.variants.all() if variant.is_active]
+        prices = [variant.get_price() for variant in variants]
+        rows.append((product.id, min(prices), max(prices), any(variant.stock > 0 for variant in variants)))
+    return rows
+
+
+def annotated(page):
+    from products.models import Product
+    from products.variants import annotate_availability, price_range
+
+    return [
+        (product.id, *price_range(product), product.in_stock)
+        for product in annotate_availability(Product.objects.order_by('id'))[:page]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--variants', type=int, default=100)
+    parser.add_argument('--page', type=int, default=48)
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = common.setup_django()
+    from decimal import Decimal
+    from django.db import connection, reset_queries
+    from django.conf import settings
+    from products.models import Product, ProductVariant
+
+    common.seed_catalog(products=args.products, text_size=50)
+    for product_id in Product.objects.values_list('id', flat=True):
+        ProductVariant.objects.bulk_create(
+            ProductVariant(
+                product_id=product_id, sku=f'{product_id}-{index}', options={'size': index},
+                price=Decimal(100 + index), stock=index % 3,
+            )
+            for index in range(args.variants)
+        )
+
+    settings.DEBUG = True  # count queries
+    rows = []
+    for name, load in (('per product', per_product), ('prefetch', prefetched), ('annotated', annotated)):
+        samples = []
+        for _ in range(args.samples):
+            reset_queries()
+            start = time.perf_counter()
+            load(args.page)
+            samples.append(time.perf_counter() - start)
+        rows.append({
+            'mode': name, 'queries': len(connection.queries), 'p50_ms': common.percentile(samples, 50) * 1000,
+            'p99_ms': common.percentile(samples, 99) * 1000,
+        })
+    os.unlink(db_path)
+    common.report(f'Availability of {args.page} products, {args.variants} variants each', rows)
+
+
+if __name__ == '__main__':
+    main()
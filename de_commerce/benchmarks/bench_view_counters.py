@@ -0,0 +1,94 @@
+"""
+Benchmark: product page throughput with buffered vs per-view counter writes
+
+Sends --requests GET /api/products/{id}/page/ requests (cached pages, ids
+spread over --products products) from --concurrency threads through
+de_commerce.wsgi.application, with the view counter (products/popularity.py):
+- per-view: VIEW_FLUSH_INTERVAL 0, one UPDATE per request, as a plain
+  counter column would do
+- buffered: VIEW_FLUSH_INTERVAL 10, views written in one UPDATE per flush
+
+Reports throughput, latency percentiles and the number of UPDATE statements.
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_view_counters [--requests 10000] [--concurrency 8] [--products 200]
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import common
+
+MODES = {'per-view': 0, 'buffered': 10}
+
+
+def run(application, product_ids, total, concurrency):
+    from django.db import connections
+
+    def one(index):
+        start = time.perf_counter()
+        status, _, _ = common.wsgi_get(application, f'/api/products/{product_ids[index % len(product_ids)]}/page/')
+        assert status == 200, status
+        return time.perf_counter() - start
+
+    def close(_):
+        connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        with common.timer() as t:
+            latencies = list(pool.map(one, range(total)))
+        list(pool.map(close, range(concurrency)))
+    return common.summarize(latencies, t['elapsed'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--products', type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = common.setup_django(WARMUP='off')
+    from de_commerce.wsgi import application
+    from products import popularity
+    from products.models import Product
+
+    common.seed_catalog(products=args.products)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    for product_id in product_ids:  # cache every page
+        common.wsgi_get(application, f'/api/products/{product_id}/page/')
+
+    statements = []
+    lock = threading.Lock()
+    write_views = popularity.write_views
+
+    def counting_write_views(counts, now=None):
+        with lock:
+            statements.append(math.ceil(len(counts) / popularity.VIEW_FLUSH_BATCH))
+        return write_views(counts, now)
+
+    popularity.write_views = counting_write_views
+    rows = []
+    for mode, interval in MODES.items():
+        popularity.view_counter.flush()
+        popularity.view_counter.interval = interval
+        Product.objects.update(view_count=0, popularity=0.0)
+        statements.clear()
+        result = run(application, product_ids, args.requests, args.concurrency)
+        popularity.view_counter.flush()
+        views = sum(Product.objects.values_list('view_count', flat=True))
+        rows.append(dict(result, mode=mode, updates=sum(statements), views_written=views))
+    os.unlink(db_path)
+
+    common.report(
+        f'GET /api/products/{{id}}/page/, {args.requests} requests at concurrency {args.concurrency}',
+        rows, ['mode', 'req_per_sec', 'p50_ms', 'p99_ms', 'updates', 'views_written'],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: worker start-up, cold vs warmed up (products/warmup.py)
+
+Starts a fresh worker process per mode and run, loads de_commerce.wsgi the way
+gunicorn does, then sends rounds of sequential requests (one per endpoint
+below) until --rounds rounds are done:
+- off:  DJANGO_WARMUP=off, the first requests import, compile and connect
+- full: DJANGO_WARMUP=full, the warm-up runs before the application is returned
+
+Reported per mode (median over --runs processes):
+- ready_ms: process start until the application is loaded (warm-up included),
+  i.e. until the worker accepts traffic
+- first_round_ms: the first round of requests
+- steady_round_ms: the median round
+- slow_rounds: rounds slower than 1.5x the steady round, as seen by clients
+- ttffr_ms: time to first fast response, from accepting traffic to the end of
+  the first round no slower than 1.5x the steady round
+
+Usage (from the directory containing manage.py):
+    python -m benchmarks.bench_warmup [--products 200] [--rounds 50] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import common
+
+ENDPOINTS = ['/api/products/', '/api/categories/', '/api/categories/tree/', '/api/products/facets/']
+MODES = ['off', 'full']
+FAST = 1.5
+
+
+def child(mode, rounds):
+    process_start = time.perf_counter()
+    os.environ['DJANGO_WARMUP'] = mode
+    common.setup_django(migrate=False)
+    from de_commerce.wsgi import application
+    ready = time.perf_counter()
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in ENDPOINTS:
+            status, _, _ = common.wsgi_get(application, path)
+            assert status == 200, (path, status)
+        timings.append((time.perf_counter() - start, time.perf_counter() - ready))
+
+    steady = statistics.median(elapsed for elapsed, _ in timings)
+    ttffr = next(at for elapsed, at in timings if elapsed <= steady * FAST)
+    print(json.dumps({
+        'mode': mode, 'ready_ms': (ready - process_start) * 1000, 'first_round_ms': timings[0][0] * 1000,
+        'steady_round_ms': steady * 1000, 'slow_rounds': sum(elapsed > steady * FAST for elapsed, _ in timings),
+        'ttffr_ms': ttffr * 1000,
+    }), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args.mode, args.rounds)
+        return
+
+    db_path = common.setup_django()
+    common.seed_catalog(products=args.products)
+
+    results = {mode: [] for mode in MODES}
+    for _ in range(args.runs):
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_warmup', '--mode', mode, '--rounds', str(args.rounds)],
+                cwd=common.PROJECT_DIR, env=dict(os.environ, BENCH_DB=db_path),
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results[mode].extend(json.loads(line) for line in output.splitlines() if line.startswith('{'))
+    os.unlink(db_path)
+
+    rows = [
+        dict({'mode': mode}, **{
+            column: statistics.median(run[column] for run in runs)
+            for column in ('ready_ms', 'first_round_ms', 'steady_round_ms', 'slow_rounds', 'ttffr_ms')
+        })
+        for mode, runs in results.items()
+    ]
+    common.report(
+        f'Worker start-up, {len(ENDPOINTS)} endpoints per round ({args.products} products, median of {args.runs} runs)',
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Run benchmarks from the Django project directory (the one containing manage.py):
+
+    python -m benchmarks.bench_async_api
+
+Every benchmark works on its own throwaway SQLite database (or the path given
+in the BENCH_DB environment variable), so the development db.sqlite3 is never
+touched. Throttling is disabled and DEBUG is off so that numbers reflect the
+request path itself rather than 429s or debug query logging.
+"""
+
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(db_path=None, migrate=True, **overrides):
+    """
+    Configure and set up Django for a benchmark run.
+
+    - db_path: SQLite file to use (defaults to BENCH_DB or a new temp file)
+    - migrate: apply migrations before returning
+    - overrides: extra settings applied before django.setup()
+
+    Returns the database path in use.
+    """
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'de_commerce.settings')
+    os.environ.setdefault('DJANGO_DEBUG', 'False')
+
+    import django
+    from django.conf import settings
+
+    db_path = db_path or os.environ.get('BENCH_DB') or tempfile.mkstemp(suffix='.sqlite3')[1]
+    settings.DATABASES['default']['NAME'] = db_path
+    # A None rate disables a throttle, including views that choose their own scope
+    rates = {scope: None for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+    settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return db_path
+
+
+def seed_catalog(products=200, categories=10, text_size=400):
+    """Bulk-create a catalog of `products` products spread over `categories` categories."""
+    from products.category_tree import rebuild_paths
+    from products.models import Category, Product
+
+    Category.objects.bulk_create(
+        [Category(name=f'Category {i}', description=f'Description of category {i}') for i in range(categories)]
+    )
+    rebuild_paths()  # bulk_create() skips Category.save()
+    cats = list(Category.objects.all())
+    blob = ('Lorem ipsum dolor sit amet. ' * (text_size // 28 + 1))[:text_size]
+    Product.objects.bulk_create([
+        Product(
+            name=f'Product {i}',
+            description=blob,
+            more_description=blob,
+            specifications=blob,
+            price=Decimal('10.00') + i,
+            category=cats[i % len(cats)],
+            stock_status='In Stock',
+        )
+        for i in range(products)
+    ], batch_size=500)
+    return cats
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile (0-100) of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Return a dict of throughput and latency statistics (latencies in seconds)."""
+    return {
+        'requests': len(latencies),
+        'req_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def report(title, rows, columns=None):
+    """Print a list of dict rows as an aligned text table."""
+    print(f'\n{title}')
+    if not rows:
+        print('  (no results)')
+        return
+    columns = columns or list(rows[0].keys())
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    print('  ' + '  '.join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print('  ' + '  '.join(_fmt(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        return f'{value:,.2f}'
+    return str(value)
+
+
+@contextmanager
+def timer():
+    """Context manager yielding a dict whose 'elapsed' key is set on exit."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['elapsed'] = time.perf_counter() - start
+
+
+# ============================================================================
+# IN-PROCESS HTTP DRIVERS
+# ============================================================================
+
+def wsgi_get(app, path, headers=None, method='GET', body=b''):
+    """Call a WSGI application directly. Returns (status_code, headers, body)."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'localhost',
+        'CONTENT_LENGTH': str(len(body)),
+        'CONTENT_TYPE': 'application/json',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    status = {}
+
+    def start_response(status_line, response_headers, exc_info=None):
+        status['code'] = int(status_line.split(' ', 1)[0])
+        status['headers'] = response_headers
+
+    chunks = app(environ, start_response)
+    try:
+        content = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return status['code'], dict(status['headers']), content
+
+
+async def asgi_get(app, path, headers=None, method='GET', body=b''):
+    """Call an ASGI application directly, the way uvicorn would. Returns (status_code, headers, body)."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json')]
+        + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    request_sent = False
+    response = {'body': []}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Client stays connected until the application finishes
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode(): v.decode() for k, v in message.get('headers', [])}
+        elif message['type'] == 'http.response.body':
+            response['body'].append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], b''.join(response['body'])
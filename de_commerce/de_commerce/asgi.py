@@ -12,5 +12,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'de_commerce.settings')
+# Route read endpoints to the async-native views (see settings.ASYNC_API)
+os.environ.setdefault('DJANGO_ASYNC_API', 'True')
+# Async requests run the ORM in worker threads; persistent connections are not reused across them
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# Warm the worker up before it takes traffic (products/warmup.py, settings.WARMUP).
+# The ORM's connections belong to its worker threads, so the warm-up's are closed.
+from products.warmup import warm_up  # noqa: E402
+warm_up(keep_connections=False)
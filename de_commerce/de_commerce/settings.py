@@ -12,8 +12,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,7 +26,6 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 # SECRET_KEY should be set via environment variable in production
-import os
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-te6chur#*!rr9us@)68kbji1jullim7%#xueu@wm^!74hjp-4s')
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -51,33 +53,82 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # Clients can opt in to signed Bearer tokens from POST /api/token/ (no
+    # database hit per request); the SPA's session cookies keep working.
+    # Listed first so unauthenticated requests get 401 + WWW-Authenticate.
+    # BasicAuthentication is not enabled: it re-hashes the password on every call.
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'products.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
     ],
     # Throttling to mitigate brute-force and abusive requests
+    # Sliding-window counters with fixed-size state per client (products/throttling.py).
+    # Views pick their own scope; 'anon'/'user' apply everywhere else.
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'products.throttling.AnonSlidingWindowThrottle',
+        'products.throttling.UserSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
+        'catalog': '300/minute',
+        'cart': '60/minute',
+        'checkout': '10/minute',
         'login': '5/minute',
+        'password_reset': '5/hour',
+    },
+    # orjson-backed JSON (products/renderers.py, products/parsers.py); the
+    # browsable API stays available for development.
+    'DEFAULT_RENDERER_CLASSES': [
+        'products.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'products.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Signed token lifetimes in seconds (products/authentication.py)
+TOKEN_ACCESS_TTL = int(os.environ.get('DJANGO_TOKEN_ACCESS_TTL', '300'))
+TOKEN_REFRESH_TTL = int(os.environ.get('DJANGO_TOKEN_REFRESH_TTL', str(7 * 24 * 3600)))
+
+# Caches
+# 'throttle' holds rate-limit counters; point it at a shared backend (e.g. Redis)
+# when running several processes so limits apply across workers. 'default' holds
+# a page and a version key per viewed product (products/product_page.py), more
+# than LocMemCache's default of 300 entries.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
     },
 }
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'products.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'products.replicas.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Response compression (products/middleware.py): bodies smaller than this are
+# sent uncompressed; brotli is used when the `brotli` package is installed.
+COMPRESSION_MIN_SIZE = int(os.environ.get('DJANGO_COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_BROTLI_QUALITY = 5
+
 # CORS settings for development
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = False
@@ -85,6 +136,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
 ]
+# Checkout retries send an Idempotency-Key header (products/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Add CSRF trusted origins for development
 default_csrf_origins = [
@@ -122,17 +175,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'de_commerce.wsgi.application'
 
+# Serve the high fan-out read endpoints (products, categories, me, session cart)
+# and password reset from async-native views (products/async_api.py).
+# asgi.py turns this on by default; under WSGI async views would only add
+# an async_to_sync hop per request, so it stays off there.
+ASYNC_API = os.environ.get('DJANGO_ASYNC_API', 'False') == 'True'
+
+# Worker warm-up before the first request (products/warmup.py), run by wsgi.py
+# and asgi.py: 'full' (imports, URL patterns, serializers, DB connections,
+# catalog caches), 'preload' (fork-safe part only; gunicorn.conf.py warms each
+# worker after forking) or 'off'
+WARMUP = os.environ.get('DJANGO_WARMUP', 'full')
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connections are kept for CONN_MAX_AGE seconds (health-checked before reuse),
+# so workers do not reconnect per request; asgi.py defaults it to 0
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', '60'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas (products/replicas.py): catalog and order history GETs read
+# from one of DATABASE_REPLICAS; a user's reads stay on the primary for
+# REPLICA_LAG seconds after their own writes. For local testing,
+# DJANGO_DB_REPLICAS=db.replica.sqlite3 adds a copy of the SQLite file as a
+# replica (comma-separate several); production settings configure real ones.
+DATABASE_REPLICAS = []
+for _index, _name in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / _name.strip(),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['products.replicas.ReplicaRouter']
+REPLICA_LAG = int(os.environ.get('DJANGO_REPLICA_LAG', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -153,6 +242,81 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# New and upgraded hashes use the first hasher, tuned Argon2id (products/hashers.py;
+# PASSWORD_ARGON2_* settings tune it). Hashes made by any other listed hasher
+# still verify and are transparently re-hashed with the first one on the
+# user's next successful login. List one hasher per algorithm name: Django
+# keeps only the last entry of each.
+PASSWORD_HASHERS = [
+    'products.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Pricing (products/pricing.py): currency of Product.price, and how long
+# resolved price lists stay cached (saving a list invalidates it immediately)
+DEFAULT_CURRENCY = 'USD'
+PRICING_CACHE_TIMEOUT = 3600
+
+# Promotions (products/promotions.py): seconds after which a worker recompiles
+# its promotion index even without a change (changes recompile it at once)
+PROMOTIONS_MAX_AGE = 30
+
+# Checkout Idempotency-Key handling (products/idempotency.py): how long a key
+# and its stored response are kept, how long a duplicate waits for the first
+# request before getting 409, and how old an unfinished claim must be before
+# it is taken over (keep it well above the gunicorn worker timeout)
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+IDEMPOTENCY_CLAIM_TIMEOUT = 600
+
+# Background job queue (products/jobs.py, run with 'manage.py run_jobs'):
+# seconds before a claimed job is considered abandoned, and retry backoff
+JOB_LOCK_TIMEOUT = 300
+JOB_RETRY_BACKOFF = 10
+JOB_MAX_BACKOFF = 3600
+
+# Stale data purged by 'manage.py purge_stale_data' (products/maintenance.py)
+CART_EMPTY_TTL = 24 * 3600      # seconds an empty cart is kept
+CART_ABANDON_DAYS = 90          # carts of users who have not logged in for this long
+JOB_RETENTION_DAYS = 7          # finished jobs
+JOB_FAILED_RETENTION_DAYS = 30  # failed jobs
+
+# Cold order archival ('manage.py archive_orders', products/archive.py): final
+# orders placed more than this many days ago move to compressed archive segments
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+# Order status streams (products/streams.py, GET /api/orders/stream/ under ASGI)
+SSE_HEARTBEAT = 15     # seconds between keep-alive comments on idle streams
+SSE_RETRY_MS = 5000    # client reconnect delay sent in the 'retry:' field
+SSE_QUEUE_SIZE = 100   # events buffered per stream before it is closed
+
+# Sales rollups (products/reports.py): order events younger than this many
+# seconds are left for the next 'manage.py refresh_sales_rollups' run
+ROLLUP_LAG = 60
+
+# "Frequently bought together" (products/recommendations.py): neighbours kept per
+# product and the number of orders two products must share to be related
+RELATED_TOP_K = 10
+RELATED_MIN_ORDERS = 2
+# Related products shown on GET /api/products/{id}/page/ (products/product_page.py)
+PRODUCT_PAGE_RELATED = 4
+
+# Product view counters (products/popularity.py): buffered views are written
+# every VIEW_FLUSH_INTERVAL seconds (sooner once VIEW_FLUSH_MAX_PRODUCTS
+# products are pending); a view's weight in ?sort=trending halves every
+# POPULARITY_HALF_LIFE seconds
+VIEW_FLUSH_INTERVAL = 10
+VIEW_FLUSH_MAX_PRODUCTS = 5000
+POPULARITY_HALF_LIFE = 24 * 3600
+
+# Catalog facets (products/facets.py): upper bounds of the price buckets; the
+# last bucket is open-ended (here 0-25, 25-50, 50-100, 100-250, 250-500, 500+)
+FACET_PRICE_BUCKETS = (25, 50, 100, 250, 500)
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'de_commerce.settings')
 
 application = get_wsgi_application()
+
+# Warm the worker up before it takes traffic (products/warmup.py, settings.WARMUP);
+# gunicorn.conf.py preloads here and warms each worker after the fork
+from products.warmup import warm_up  # noqa: E402
+warm_up()
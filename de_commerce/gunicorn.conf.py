@@ -0,0 +1,36 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory:
+
+    gunicorn de_commerce.wsgi
+    gunicorn de_commerce.asgi:application -k uvicorn.workers.UvicornWorker
+
+The application is loaded once in the master (preload_app) with the fork-safe
+part of the warm-up, then every worker opens its own database connections and
+primes its caches right after the fork, before it accepts requests
+(products/warmup.py). Workers write their buffered product views when they
+exit (products/popularity.py).
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_WARMUP', 'preload')
+
+preload_app = True
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+
+def post_fork(server, worker):
+    if os.environ['DJANGO_WARMUP'] == 'preload':
+        from products.warmup import warm_worker
+
+        seconds = warm_worker(keep_connections=worker.__class__.__name__ != 'UvicornWorker')
+        server.log.info('Worker %s warmed up in %.3fs', worker.pid, seconds)
+
+
+def worker_exit(server, worker):
+    # Write the product views buffered since the last flush (products/popularity.py)
+    from products.popularity import view_counter
+
+    view_counter.flush()
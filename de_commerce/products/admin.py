@@ -1,12 +1,34 @@
 
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from django.db.models import Sum
+from django.utils import timezone
+from .category_tree import move_categories
+from .models import Category, Product, ProductVariant, Cart, CartItem, Order, OrderItem, PriceList, PriceListItem, Promotion, Job, OrderEvent, SalesRollup
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-	list_display = ('name', 'description')
+	# Listed in tree order; changing a parent moves the whole subtree (category_tree.py)
+	list_display = ('indented_name', 'parent', 'description')
+	list_select_related = ('parent',)
 	search_fields = ('name',)
+	ordering = ('path',)
+	actions = ['move_to_top_level']
+
+	@admin.display(description='Name', ordering='path')
+	def indented_name(self, obj):
+		return '\u2003' * obj.depth + obj.name
+
+	@admin.action(description='Move selected categories to the top level')
+	def move_to_top_level(self, request, queryset):
+		moved = move_categories(list(queryset.order_by('path')), None)
+		self.message_user(request, f'{moved} categories moved (including subcategories).')
+
+class ProductVariantInline(admin.TabularInline):
+	# SKUs of the product; options as JSON, e.g. {"colour": "Black", "ram": "16GB"}
+	model = ProductVariant
+	fields = ('sku', 'options', 'price', 'stock', 'is_active')
+	extra = 0
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -14,6 +36,7 @@ class ProductAdmin(admin.ModelAdmin):
 	list_filter = ('category',)
 	search_fields = ('name',)
 	fields = ('name', 'description', 'price', 'category', 'image', 'more_description', 'specifications', 'stock_status')
+	inlines = [ProductVariantInline]
 
 	def admin_image(self, obj):
 		if obj.image:
@@ -29,18 +52,92 @@ class CartAdmin(admin.ModelAdmin):
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-	list_display = ('cart', 'product', 'quantity')
+	list_display = ('cart', 'product', 'variant', 'quantity')
 	search_fields = ('cart__user__username', 'product__name')
 
+class OrderEventInline(admin.TabularInline):
+	# Status history of the order (append-only, written by Order.save())
+	model = OrderEvent
+	fields = ('created_at', 'from_status', 'to_status')
+	readonly_fields = fields
+	extra = 0
+	can_delete = False
+
+	def has_add_permission(self, request, obj=None):
+		return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-	list_display = ('id', 'user', 'created_at', 'status', 'payment_method')
-	list_filter = ('status', 'payment_method')
+	list_display = ('id', 'user', 'created_at', 'status', 'payment_method', 'currency')
+	list_filter = ('status', 'payment_method', 'currency')
 	search_fields = ('user__username', 'id')
+	inlines = [OrderEventInline]
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
 	# Display product details and order quantity/price for each item
 	# Note: OrderItems typically viewed through their parent Order
-	list_display = ('product', 'quantity', 'price')
-	search_fields = ('product__name',)
+	list_display = ('product', 'sku', 'quantity', 'price', 'discount')
+	search_fields = ('product__name', 'sku')
+
+class PriceListItemInline(admin.TabularInline):
+	model = PriceListItem
+	autocomplete_fields = ('product',)
+	extra = 0
+
+@admin.register(PriceList)
+class PriceListAdmin(admin.ModelAdmin):
+	# Customer-specific prices; saving here invalidates cached prices (pricing.py)
+	list_display = ('name', 'currency', 'exchange_rate', 'priority', 'is_active')
+	list_filter = ('currency', 'is_active')
+	search_fields = ('name',)
+	filter_horizontal = ('customers',)
+	inlines = [PriceListItemInline]
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+	# Saving here recompiles the in-memory promotion index (promotions.py)
+	list_display = ('name', 'kind', 'value', 'coupon_code', 'starts_at', 'ends_at', 'is_active')
+	list_filter = ('kind', 'is_active')
+	search_fields = ('name', 'coupon_code')
+	autocomplete_fields = ('products',)
+	filter_horizontal = ('categories',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+	# Rows of the background job queue (jobs.py), run by 'manage.py run_jobs'
+	list_display = ('id', 'task', 'queue', 'status', 'attempts', 'run_at', 'finished_at')
+	list_filter = ('status', 'queue', 'task')
+	readonly_fields = ('locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error')
+	actions = ['retry_jobs']
+
+	@admin.action(description='Retry selected jobs now')
+	def retry_jobs(self, request, queryset):
+		updated = queryset.exclude(status=Job.RUNNING).update(status=Job.PENDING, run_at=timezone.now(), attempts=0, finished_at=None)
+		self.message_user(request, f'{updated} jobs queued for retry.')
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+	# Read-only view of the sales rollups (reports.py); totals for the current filters go in the title
+	list_display = ('period_start', 'granularity', 'product', 'category', 'status', 'payment_method', 'currency', 'lines', 'quantity', 'gross', 'discount')
+	list_filter = ('granularity', 'status', 'payment_method', 'currency', 'category')
+	date_hierarchy = 'period_start'
+	list_select_related = ('product', 'category')
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
+
+	def changelist_view(self, request, extra_context=None):
+		response = super().changelist_view(request, extra_context)
+		changelist = getattr(response, 'context_data', {}).get('cl')
+		if changelist is not None:
+			totals = changelist.queryset.aggregate(quantity=Sum('quantity'), gross=Sum('gross'), discount=Sum('discount'))
+			revenue = (totals['gross'] or 0) - (totals['discount'] or 0)
+			response.context_data['title'] = f"Sales rollups - {totals['quantity'] or 0} units, revenue {revenue}"
+		return response
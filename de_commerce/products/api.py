@@ -17,24 +17,44 @@ Permission system:
 """
 
 from rest_framework import viewsets, permissions, status
-from .models import Category, Product, Cart, Order, OrderItem
-from .serializers import CategorySerializer, ProductSerializer, CartSerializer, OrderSerializer
+from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .serializers import CategorySerializer, ProductSerializer, ProductDetailSerializer, CartSerializer, OrderSerializer, NormalizedCartSerializer, NormalizedOrderSerializer
+from .normalization import NormalizedShapeMixin
+from .fieldsets import SparseFieldsetViewMixin
+from .pricing import PriceBookContextMixin, get_price_book
+from .promotions import get_promotion_engine, cart_lines, normalize_coupon_codes
+from .idempotency import idempotent
+from .tasks import enqueue_order_placed
+from .order_events import feed_page
+from .reports import ReportError, sales_report
+from .recommendations import RELATED_TOP_K, related_products
+from .facets import FacetError, filter_products, get_facets, parse_selections
+from .category_tree import breadcrumb, tree
+from .variants import StockError, active_variants_prefetch, annotate_availability, reserve_stock
+from .replicas import ReplicaReadMixin
+from .archive import load_archived_order
+from .product_page import get_product_page
+from .popularity import SortError, sort_products, view_counter
+from django.http import Http404
 from django.core.mail import send_mail
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import api_view, action, throttle_classes, permission_classes
 from rest_framework.response import Response
 from django.db import transaction
+from .throttling import AnonSlidingWindowThrottle, UserSlidingWindowThrottle, CatalogThrottle, CartWriteThrottle, CheckoutThrottle
 
 # ============================================================================
 # PUBLIC VIEWSETS (NO LOGIN REQUIRED - AllowAny)
 # ============================================================================
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
 	"""
 	ViewSet for Category model - Read-Only endpoint
 	
 	Endpoints:
 	- GET /api/categories/: List all categories
 	- GET /api/categories/{id}/: Retrieve single category details
+	- GET /api/categories/tree/: Nested department tree
+	- GET /api/categories/{id}/breadcrumb/: Path from the top-level department to the category
 	
 	Allowed Methods: GET only (read-only)
 	- No POST, PUT, PATCH, DELETE (cannot create/edit categories from API)
@@ -45,9 +65,11 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 	
 	Serializer: CategorySerializer
 	- Returns: id, name, description
+	- ?fields= / ?omit= select a subset (see fieldsets.py)
 	
 	QuerySet: All Category objects
 	- No filtering, all categories visible to all users
+	- Read from a database replica when one is configured (see replicas.py)
 	
 	Frontend Usage:
 	- ProductList.vue: Fetches categories for filter dropdown
@@ -56,14 +78,40 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 	queryset = Category.objects.all()
 	serializer_class = CategorySerializer
 	permission_classes = [permissions.AllowAny]
+	throttle_classes = [CatalogThrottle]
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+	@action(detail=False, methods=['get'])
+	def tree(self, request):
+		"""
+		GET /api/categories/tree/ - every category nested under its parent
+
+		Returns [{'id', 'name', 'depth', 'children': [...]}, ...], siblings by name.
+		Built from the cached category index (category_tree.py): no query
+		while the catalog is unchanged.
+		"""
+		return Response(tree())
+
+	@action(detail=True, methods=['get'])
+	def breadcrumb(self, request, pk=None):
+		"""
+		GET /api/categories/{id}/breadcrumb/ - [{'id', 'name'}, ...] from the
+		top-level department down to the category (cached category index).
+		"""
+		trail = breadcrumb(int(pk)) if str(pk).isdigit() else None
+		if trail is None:
+			return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+		return Response(trail)
+
+class ProductViewSet(ReplicaReadMixin, PriceBookContextMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
 	"""
 	ViewSet for Product model - Read-Only endpoint
 	
 	Endpoints:
 	- GET /api/products/: List all products (paginated if configured)
 	- GET /api/products/{id}/: Retrieve single product details
+	- GET /api/products/{id}/related/: Products frequently bought together with it
+	- GET /api/products/{id}/page/: Everything a product page shows, in one response
+	- GET /api/products/facets/: Facet counts only (see below)
 	
 	Allowed Methods: GET only (read-only)
 	- No POST, PUT, PATCH, DELETE (cannot manage products from API)
@@ -76,10 +124,26 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 	Serializer: ProductSerializer
 	- Returns: id, name, description, price, category (nested), image
 	- Category field is nested (full object, not just ID)
+	- ?fields= / ?omit= select a subset; omitted text columns are not
+	  fetched from the database (see fieldsets.py)
+	- Customers on a price list get their list price plus 'currency' (pricing.py)
+	- List and detail add 'min_price', 'max_price', 'in_stock' and
+	  'variant_count', annotated in the product query (see variants.py);
+	  detail also returns 'options' and the active 'variants'
 	
 	QuerySet: All Product objects
-	- No filtering, all products visible to all users
+	- All products visible to all users
 	- Includes related category data
+	- Read from a database replica when one is configured; users who have
+	  just written (cart, checkout) read from the primary (see replicas.py)
+	- The list accepts facet selections (?category=1,2&stock_status=In Stock&price=25-50)
+	  and ?department=<category id> (that category and its descendants)
+	  and with ?facets=1 returns {'count', 'results', 'facets'} instead of a plain
+	  list, facet counts being cached per filter signature (see facets.py)
+	- ?sort=most_viewed (all-time views) or ?sort=trending (time-decayed views)
+	  orders the list by the indexed popularity columns; views of the detail
+	  and page endpoints are counted in process and written in batches
+	  (see popularity.py)
 	
 	Frontend Usage:
 	- ProductList.vue: Fetches all products for grid display
@@ -87,15 +151,92 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 	- ProductCard.vue: Displays product data
 	- Uses fetchProducts() and fetchProduct() from products.js service
 	"""
-	queryset = Product.objects.all()
+	queryset = Product.objects.select_related('category')
 	serializer_class = ProductSerializer
 	permission_classes = [permissions.AllowAny]
+	throttle_classes = [CatalogThrottle]
+
+	def get_queryset(self):
+		queryset = super().get_queryset()
+		if self.action == 'retrieve':
+			return annotate_availability(queryset).prefetch_related(active_variants_prefetch())
+		if self.action == 'list':
+			return annotate_availability(queryset)
+		return queryset
+
+	def get_serializer_class(self):
+		return ProductDetailSerializer if self.action == 'retrieve' else ProductSerializer
+
+	def retrieve(self, request, *args, **kwargs):
+		response = super().retrieve(request, *args, **kwargs)
+		view_counter.record(response.data['id'])
+		return response
+
+	@action(detail=True, methods=['get'])
+	def related(self, request, pk=None):
+		"""
+		GET /api/products/{id}/related/?limit=<n> - "frequently bought together"
+
+		Returns up to `limit` (default and max RELATED_TOP_K) products, strongest
+		first, serialized like the product list. Read from the precomputed
+		RelatedProduct table in one indexed query (see recommendations.py);
+		products without recommendations return [].
+		"""
+		try:
+			product_id = int(pk)
+			limit = min(int(request.query_params.get('limit', RELATED_TOP_K)), RELATED_TOP_K)
+		except ValueError:
+			return Response({'error': "Product id and 'limit' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+		products = related_products(product_id, max(limit, 0))
+		return Response(self.get_serializer(products, many=True).data)
+
+	@action(detail=True, methods=['get'])
+	def page(self, request, pk=None):
+		"""
+		GET /api/products/{id}/page/ - composite product page
+
+		Returns {'product', 'category_path', 'related', 'availability', 'images'}
+		built with a fixed number of queries and cached per product until the
+		catalog or the product's variants change (see product_page.py).
+		"""
+		page = get_product_page(int(pk), request, self.get_serializer_context().get('price_book')) if str(pk).isdigit() else None
+		if page is None:
+			return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+		view_counter.record(int(pk))
+		return Response(page)
+
+	def list(self, request, *args, **kwargs):
+		try:
+			selections = parse_selections(request.query_params)
+			queryset = sort_products(self.filter_queryset(self.get_queryset()), request.query_params.get('sort'))
+		except (FacetError, SortError) as error:
+			return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+		queryset = filter_products(queryset, selections)
+		results = self.get_serializer(queryset, many=True).data
+		if request.query_params.get('facets') in (None, '', '0', 'false'):
+			return Response(results)
+		data = get_facets(selections)
+		return Response({'count': data['count'], 'results': results, 'facets': data['facets']})
+
+	@action(detail=False, methods=['get'])
+	def facets(self, request):
+		"""
+		GET /api/products/facets/?category=..&stock_status=..&price=.. - facet counts only
+
+		Returns {'count': <matching products>, 'facets': {'category': [...],
+		'stock_status': [...], 'price': [...]}} without serializing any product.
+		"""
+		try:
+			selections = parse_selections(request.query_params)
+		except FacetError as error:
+			return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(get_facets(selections))
 
 # ============================================================================
 # PROTECTED VIEWSETS (REQUIRES LOGIN - IsAuthenticated)
 # ============================================================================
 
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(PriceBookContextMixin, SparseFieldsetViewMixin, NormalizedShapeMixin, viewsets.ModelViewSet):
 	"""
 	ViewSet for Cart model - Full CRUD operations (for authenticated users only)
 	
@@ -114,6 +255,12 @@ class CartViewSet(viewsets.ModelViewSet):
 	
 	Serializer: CartSerializer
 	- Returns: id, user, created_at, items (nested CartItem objects)
+	- GET ?shape=normalized: NormalizedCartSerializer + products/categories
+	  side tables (see normalization.py)
+	- GET ?fields= / ?omit= select a subset of cart fields (see fieldsets.py)
+	- Lines carry 'discount'/'promotion' and the cart a 'summary' (subtotal,
+	  discount, total) from the promotion engine; GET ?coupon=CODE previews
+	  a coupon (see promotions.py)
 	
 	Key Security Feature - get_queryset() method:
 	- CRITICAL FOR SECURITY: Filters Cart.objects.filter(user=self.request.user)
@@ -138,7 +285,15 @@ class CartViewSet(viewsets.ModelViewSet):
 	- Uses select_related('product') for efficient database queries
 	"""
 	serializer_class = CartSerializer
+	normalized_serializer_class = NormalizedCartSerializer
+	line_item_model = CartItem
 	permission_classes = [permissions.IsAuthenticated]
+	throttle_classes = [UserSlidingWindowThrottle, CartWriteThrottle]
+
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['coupon_codes'] = normalize_coupon_codes(self.request.query_params.get('coupon', ''))
+		return context
 	
 	def get_queryset(self):
 		"""
@@ -170,15 +325,98 @@ class CartViewSet(viewsets.ModelViewSet):
 		This ensures users cannot access other users' shopping carts
 		even if they know the cart ID.
 		"""
-		return Cart.objects.filter(user=self.request.user)
+		return Cart.objects.filter(user=self.request.user).prefetch_related('items__product__category', 'items__variant')
+
+
+# ============================================================================
+# CHECKOUT (shared by OrderViewSet.create and create_order)
+# ============================================================================
+
+def checkout_cart_items(user):
+	"""Return (cart items with product and variant, None), or (None, 400 Response) when the cart is missing or empty."""
+	try:
+		cart = Cart.objects.get(user=user)
+	except Cart.DoesNotExist:
+		return None, Response({'error': 'No cart found. Add items to cart before checkout.'}, status=status.HTTP_400_BAD_REQUEST)
+	cart_items = cart.items.select_related('product', 'variant').all()
+	if not cart_items:
+		return None, Response({'error': 'Cart is empty. Add items before checkout.'}, status=status.HTTP_400_BAD_REQUEST)
+	return cart_items, None
 
-class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+
+def place_order(user, cart_items, serializer, request_data):
+	"""
+	Place an order for `user` from `cart_items` and return the Response.
+
+	`serializer` is an OrderSerializer bound to the validated order data
+	(shipping_address, phone_number, payment_method; user and status set by
+	the caller). In one transaction:
+	1. reject products marked 'Out of Stock'
+	2. snapshot the customer's resolved prices (price list + currency, see
+	   pricing.py) and apply promotions plus request_data['coupon_code']
+	   (promotions.py); 400 for an unknown or expired coupon
+	3. take variant lines out of stock, all or nothing (variants.py)
+	4. create the Order and its OrderItems, then clear the cart
+	5. enqueue the confirmation email and inventory events (tasks.py)
+
+	Returns 201 with the order serialized like `serializer`, or 400.
+	"""
+	with transaction.atomic():
+		# basic stock/status check: prevent ordering products marked 'Out of Stock'
+		for cart_item in cart_items:
+			if cart_item.variant_id is None and getattr(cart_item.product, 'stock_status', '').lower() == 'out of stock':
+				return Response({'error': f"Product {cart_item.product.name} is out of stock."}, status=status.HTTP_400_BAD_REQUEST)
+
+		# Snapshot the customer's resolved prices (price list + currency) and
+		# apply promotions (plus an optional coupon code) in one pass
+		price_book = get_price_book(user)
+		coupon_codes = normalize_coupon_codes(request_data.get('coupon_code', ''))
+		evaluation = get_promotion_engine().evaluate(cart_lines(cart_items, price_book), coupon_codes)
+		invalid = [code for code, valid in evaluation.coupons.items() if not valid]
+		if invalid:
+			return Response({'error': f"Invalid coupon code: {invalid[0]}"}, status=status.HTTP_400_BAD_REQUEST)
+		# Variant lines take their units out of stock (all or nothing)
+		try:
+			reserve_stock(cart_items)
+		except StockError as error:
+			return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+		order = serializer.save(
+			currency=price_book.currency, price_list=price_book.price_list, coupon_code=' '.join(sorted(coupon_codes)),
+		)
+
+		# Create order items from cart items
+		for cart_item in cart_items:
+			line = evaluation.by_key[cart_item.id]
+			OrderItem.objects.create(
+				order=order,
+				product=cart_item.product,
+				variant=cart_item.variant,
+				sku=cart_item.variant.sku if cart_item.variant else '',
+				quantity=cart_item.quantity,
+				price=line.unit_price,  # Store resolved price at time of order
+				discount=line.discount,
+				promotion_id=line.promotion.id if line.promotion else None,
+			)
+
+		# Clear the cart
+		cart_items.delete()
+
+		# Confirmation email and inventory events run in the job worker once this commits
+		enqueue_order_placed(order)
+
+		# Return the order with items populated
+		return Response(type(serializer)(order, context=serializer.context).data, status=status.HTTP_201_CREATED)
+
+
+class OrderViewSet(ReplicaReadMixin, PriceBookContextMixin, SparseFieldsetViewMixin, NormalizedShapeMixin, viewsets.ReadOnlyModelViewSet):
 	"""
 	ViewSet for Order model - Read-Only operations for customers
 	
 	Endpoints:
 	- GET /api/orders/: List all orders (user sees only their own orders)
-	- GET /api/orders/{id}/: Retrieve specific order details
+	- GET /api/orders/{id}/: Retrieve specific order details (archived orders
+	  too, through a slower path, see archive.py)
+	- GET /api/orders/events/?after=<id>: Status change feed (see order_events.py)
 	
 	RESTRICTED METHODS: No POST, PUT, PATCH, DELETE for customers
 	- Orders can only be created via checkout process
@@ -192,11 +430,17 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
 	Serializer: OrderSerializer
 	- Returns: id, user, created_at, updated_at, shipping_address, phone_number, 
 	           payment_method, status, items (nested OrderItem objects)
+	- GET ?shape=normalized: NormalizedOrderSerializer + products/categories
+	  side tables (see normalization.py)
+	- GET ?fields= / ?omit= select a subset of order fields (see fieldsets.py)
 	
 	Key Security Feature - get_queryset() method:
 	- Filters Order.objects.filter(user=self.request.user)
 	- Users can ONLY see their own orders
 	- Prevents unauthorized access to other users' order information
+	- Reads come from a database replica, except for REPLICA_LAG seconds
+	  after the user's own writes (checkout), so a new order is always listed;
+	  checkout itself writes to the primary (see replicas.py)
 	
 	Frontend Usage:
 	- OrderHistory.vue: Fetches all user orders for display list
@@ -224,7 +468,10 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
 	- Payment method and shipping address captured at order time
 	"""
 	serializer_class = OrderSerializer
+	normalized_serializer_class = NormalizedOrderSerializer
+	line_item_model = OrderItem
 	permission_classes = [permissions.IsAuthenticated]
+	throttle_classes = [UserSlidingWindowThrottle, CheckoutThrottle]
 
 	def get_queryset(self):
 		"""
@@ -233,78 +480,77 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
 		Returns only the authenticated user's own order objects.
 		This protects sensitive order information from unauthorized access.
 		"""
-		return Order.objects.filter(user=self.request.user).prefetch_related('items__product')
+		return Order.objects.filter(user=self.request.user).prefetch_related('items__product__category')
 
+	def get_object(self):
+		"""
+		The user's order, or their archived order when it has been moved out of
+		the order table (archive.py). Archived orders are read-only snapshots.
+		"""
+		try:
+			return super().get_object()
+		except Http404:
+			order = load_archived_order(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field), self.request.user)
+			if order is None:
+				raise
+			return order
+
+	@action(detail=False, methods=['get'], url_path='events')
+	def events(self, request):
+		"""
+		GET /api/orders/events/?after=<id>&limit=<n> - order status change feed
+
+		Returns status transitions with id > after, oldest first, plus the
+		cursor for the next call: {'results': [...], 'after': <id>, 'has_more': bool}.
+		Customers get their own orders' events, staff users every order's
+		(see order_events.py).
+		"""
+		body, error = feed_page(request)
+		if error:
+			return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(body)
+
+	@idempotent
 	def create(self, request, *args, **kwargs):
 		"""
 		Custom create method for order placement
 		
 		Creates an order from the user's current cart items.
-		Process:
+		Process (checkout_cart_items() and place_order(), shared with create_order):
 		1. Get user's cart and cart items
 		2. Validate cart is not empty
 		3. Create Order with provided data
-		4. Create OrderItem records for each cart item (with current prices)
+		4. Take variant lines out of stock (variants.py), then create OrderItem
+		   records for each cart item (with the customer's resolved prices and
+		   promotion discounts, see pricing.py/promotions.py)
 		5. Clear the cart
-		6. Return the created order
+		6. Enqueue the confirmation email and inventory events (tasks.py)
+		7. Return the created order
 		
 		Expected request data:
 		- shipping_address: string
 		- phone_number: string  
 		- payment_method: 'Credit Card' or 'PayPal'
+		- coupon_code: optional coupon code (400 if unknown or expired)
+
+		Optional 'Idempotency-Key' header: retries with the same key replay the
+		first response instead of placing another order (see idempotency.py).
 		"""
 		user = request.user
-		
-		# Get user's cart
-		try:
-			cart = Cart.objects.get(user=user)
-			cart_items = cart.items.select_related('product').all()
-		except Cart.DoesNotExist:
-			return Response(
-				{'error': 'No cart found. Add items to cart before checkout.'}, 
-				status=status.HTTP_400_BAD_REQUEST
-			)
-		
-		if not cart_items:
-			return Response(
-				{'error': 'Cart is empty. Add items before checkout.'}, 
-				status=status.HTTP_400_BAD_REQUEST
-			)
-		
-		# Create the order atomically and validate stock
+		cart_items, error = checkout_cart_items(user)
+		if error:
+			return error
+
 		order_data = request.data.copy()
 		order_data['user'] = user.id
 		order_data['status'] = 'ordered'  # Default status
-
-		with transaction.atomic():
-			# basic stock/status check: prevent ordering products marked 'Out of Stock'
-			for cart_item in cart_items:
-				if getattr(cart_item.product, 'stock_status', '').lower() == 'out of stock':
-					return Response({'error': f"Product {cart_item.product.name} is out of stock."}, status=status.HTTP_400_BAD_REQUEST)
-
-			serializer = self.get_serializer(data=order_data)
-			serializer.is_valid(raise_exception=True)
-			order = serializer.save()
-
-			# Create order items from cart items
-			order_items = []
-			for cart_item in cart_items:
-				order_item = OrderItem.objects.create(
-					order=order,
-					product=cart_item.product,
-					quantity=cart_item.quantity,
-					price=cart_item.product.price  # Store current price at time of order
-				)
-				order_items.append(order_item)
-
-			# Clear the cart
-			cart_items.delete()
-
-			# Return the order with items populated
-			order_serializer = self.get_serializer(order)
-			return Response(order_serializer.data, status=status.HTTP_201_CREATED)
+		serializer = self.get_serializer(data=order_data)
+		serializer.is_valid(raise_exception=True)
+		return place_order(user, cart_items, serializer, request.data)
 
 @api_view(['POST'])
+@throttle_classes([AnonSlidingWindowThrottle, UserSlidingWindowThrottle, CheckoutThrottle])
+@idempotent
 def create_order(request):
 	"""
 	API View for order creation (checkout process)
@@ -315,9 +561,15 @@ def create_order(request):
 	
 	HTTP Methods:
 	- POST: Create new order from user's cart
-	  - Request body: {shipping_address, phone_number, payment_method}
-	  - Creates Order and OrderItem records from cart
+	  - Request body: {shipping_address, phone_number, payment_method, coupon_code (optional)}
+	  - Creates Order and OrderItem records from cart, priced from the
+	    customer's price list snapshot (pricing.py) with promotion discounts
+	    applied (promotions.py)
+	  - Takes variant lines out of stock; 400 when a variant is sold out or
+	    a product sold as variants has none chosen (variants.py)
 	  - Clears cart after successful order creation
+	  - Enqueues the confirmation email and inventory events, run by
+	    'python manage.py run_jobs' after the order commits (jobs.py)
 	  - Returns: Created order with all details
 	
 	Status Codes:
@@ -335,61 +587,59 @@ def create_order(request):
 	- User can only create orders from their own cart
 	- Order automatically assigned to authenticated user
 	- Cart cleared only after successful order creation
+
+	Retries:
+	- Send an 'Idempotency-Key' header (one per checkout attempt); repeats
+	  with the same key replay the stored response (see idempotency.py)
 	"""
 	if not request.user.is_authenticated:
 		return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
 	
 	user = request.user
-	
-	# Get user's cart
-	try:
-		cart = Cart.objects.get(user=user)
-		cart_items = cart.items.select_related('product').all()
-	except Cart.DoesNotExist:
-		return Response(
-			{'error': 'No cart found. Add items to cart before checkout.'}, 
-			status=status.HTTP_400_BAD_REQUEST
-		)
-	
-	if not cart_items:
-		return Response(
-			{'error': 'Cart is empty. Add items before checkout.'}, 
-			status=status.HTTP_400_BAD_REQUEST
-		)
-	
-	# Create the order
+	cart_items, error = checkout_cart_items(user)
+	if error:
+		return error
+
 	order_data = request.data.copy()
 	order_data['user'] = user.id
 	order_data['status'] = 'ordered'  # Default status
-	
 	serializer = OrderSerializer(data=order_data)
-	if serializer.is_valid():
-		with transaction.atomic():
-			for cart_item in cart_items:
-				if getattr(cart_item.product, 'stock_status', '').lower() == 'out of stock':
-					return Response({'error': f"Product {cart_item.product.name} is out of stock."}, status=status.HTTP_400_BAD_REQUEST)
-
-			order = serializer.save()
-
-			# Create order items from cart items
-			order_items = []
-			for cart_item in cart_items:
-				order_item = OrderItem.objects.create(
-					order=order,
-					product=cart_item.product,
-					quantity=cart_item.quantity,
-					price=cart_item.product.price  # Store current price at time of order
-				)
-				order_items.append(order_item)
-
-			# Clear the cart
-			cart_items.delete()
-
-			# Return the order with items populated
-			order_serializer = OrderSerializer(order)
-			return Response(order_serializer.data, status=status.HTTP_201_CREATED)
-
-	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+	if not serializer.is_valid():
+		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+	return place_order(user, cart_items, serializer, request.data)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sales_report_view(request):
+	"""
+	API View for sales reporting (staff only)
+
+	Endpoint: GET /api/reports/sales/
+
+	Reads only the pre-aggregated SalesRollup table (see reports.py), never
+	the live order tables, so reports do not compete with checkout.
+
+	Query parameters:
+	- granularity: 'day' (default) or 'hour'
+	- start / end: ISO date or datetime range of order periods (end exclusive)
+	- group_by: comma-separated period, product, category, status, payment_method, currency
+	- product, category, status, payment_method, currency: filters
+	- order: metric (lines, quantity, gross, discount, revenue) or dimension, '-' for descending
+	- limit: max rows (default 100, max 1000)
+
+	Examples:
+	- Revenue per category per day: ?group_by=period,category&start=2025-01-01
+	- Top 20 products this week: ?group_by=product&start=<monday>&order=-revenue&limit=20
+
+	Status Codes:
+	- 200 OK: {'granularity', 'group_by', 'results': [...], 'as_of_event'}
+	- 400 Bad Request: Invalid parameter
+	- 403 Forbidden: Not a staff user
+	"""
+	try:
+		return Response(sales_report(request.query_params))
+	except ReportError as error:
+		return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 def logout_view(request):
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        # Register signal receivers (catalog, pricing and promotion cache invalidation)
+        from . import signals  # noqa: F401
+        # Register background tasks with the job queue (jobs.py)
+        from . import tasks  # noqa: F401
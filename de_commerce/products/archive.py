@@ -0,0 +1,173 @@
+"""
+Archive Module - Cold Order Archival to Compressed Segments
+
+Order, OrderItem and OrderEvent only ever grow, and every index on them grows
+with them: checkout inserts and order history reads get slower although
+customers rarely look at orders older than a year.
+
+archive_orders() moves cold orders out of those tables, in batches. Each batch
+becomes one OrderArchiveSegment: zlib-compressed JSON Lines, one order per
+line with its items and status events. One ArchivedOrder row per order indexes
+it (segment and line number). The batch is archived and deleted from the order
+tables in one short transaction, then the run pauses so checkout gets the
+database between batches (like maintenance.py). Segments are append-only.
+
+An order is cold when (settings, with defaults):
+- it was placed more than ORDER_ARCHIVE_AFTER_DAYS ago (365)
+- its status is final ('delivered' or 'cancelled'), so it can no longer change
+- all its status events are already folded into the sales rollups (reports.py),
+  so reports keep counting it. 'refresh_sales_rollups --rebuild' only sees
+  the live tables.
+
+Reading archived orders:
+GET /api/orders/{id}/ falls back to load_archived_order() when the id is not
+in the order table. That is one indexed lookup, decompressing one segment and
+one query for the products. The order and its items come back as unsaved model
+instances, so the usual serializers (and ?shape=normalized / ?fields=) apply.
+Lines of products deleted since are dropped, as the live table's cascade would.
+Archived orders are not listed by GET /api/orders/ and are not part of the
+order event feed or of "frequently bought together" rebuilds.
+
+Usage:
+    python manage.py archive_orders [--days 365] [--batch-size 1000] [--sleep 0.05] [--max-seconds 300] [--dry-run]
+or
+    result = archive_orders(batch_size=500)
+    order = load_archived_order(order_id, request.user)
+"""
+
+import json
+import time
+import zlib
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedOrder, Order, OrderArchiveSegment, OrderEvent, OrderItem, Product, RollupWatermark
+from .reports import WATERMARK
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+FINAL_STATUSES = ('delivered', 'cancelled')
+
+ORDER_FIELDS = (
+    'id', 'user_id', 'created_at', 'updated_at', 'shipping_address', 'phone_number',
+    'payment_method', 'status', 'currency', 'price_list_id', 'coupon_code',
+)
+ITEM_FIELDS = ('id', 'product_id', 'variant_id', 'sku', 'quantity', 'price', 'discount', 'promotion_id')
+EVENT_FIELDS = ('id', 'from_status', 'to_status', 'created_at')
+
+# complete: False when the time budget ran out before every cold order was archived
+ArchiveResult = namedtuple('ArchiveResult', 'orders segments seconds complete')
+
+
+def archivable_orders(now=None, days=None):
+    """Orders cold enough to archive (see module docstring), oldest id first."""
+    cutoff = (now or timezone.now()) - timedelta(days=ARCHIVE_AFTER_DAYS if days is None else days)
+    rolled_up = RollupWatermark.objects.filter(name=WATERMARK).values_list('last_event_id', flat=True).first() or 0
+    return (
+        Order.objects.filter(created_at__lt=cutoff, status__in=FINAL_STATUSES)
+        .exclude(events__id__gt=rolled_up).order_by('id')
+    )
+
+
+def order_records(order_ids):
+    """{order_id: JSON-ready dict of the order, its 'items' and its 'events'} for `order_ids`."""
+    children = {'items': defaultdict(list), 'events': defaultdict(list)}
+    for name, model, fields in (('items', OrderItem, ITEM_FIELDS), ('events', OrderEvent, EVENT_FIELDS)):
+        for row in model.objects.filter(order_id__in=order_ids).order_by('id').values('order_id', *fields):
+            children[name][row.pop('order_id')].append(row)
+    return {
+        row['id']: dict(row, items=children['items'][row['id']], events=children['events'][row['id']])
+        for row in Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS)
+    }
+
+
+def archive_batch(queryset, order_ids):
+    """Move the orders of `order_ids` still matching `queryset` into a new segment. Returns the number moved."""
+    with transaction.atomic():
+        # Re-apply the filter so orders that changed meanwhile stay live
+        order_ids = list(queryset.filter(pk__in=order_ids).select_for_update().values_list('pk', flat=True))
+        if not order_ids:
+            return 0
+        records = order_records(order_ids)
+        # default=str keeps datetimes (microseconds, offset) and decimals exact
+        lines = [json.dumps(records[order_id], default=str, separators=(',', ':')) for order_id in order_ids]
+        segment = OrderArchiveSegment.objects.create(
+            data=zlib.compress('\n'.join(lines).encode()), order_count=len(order_ids),
+            first_order_id=order_ids[0], last_order_id=order_ids[-1],
+        )
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                order_id=order_id, user_id=records[order_id]['user_id'], segment=segment, position=position,
+                status=records[order_id]['status'], created_at=records[order_id]['created_at'],
+            )
+            for position, order_id in enumerate(order_ids)
+        ])
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(order_ids)
+
+
+def archive_orders(batch_size=1000, pause=0.05, max_seconds=None, days=None, now=None):
+    """Archive every cold order in segments of up to `batch_size` orders. Returns an ArchiveResult."""
+    start = time.monotonic()
+    deadline = start + max_seconds if max_seconds else None
+    queryset = archivable_orders(now, days)
+    archived = segments = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return ArchiveResult(archived, segments, time.monotonic() - start, False)
+        order_ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not order_ids:
+            return ArchiveResult(archived, segments, time.monotonic() - start, True)
+        moved = archive_batch(queryset, order_ids)
+        archived += moved
+        segments += 1 if moved else 0
+        if len(order_ids) < batch_size:
+            return ArchiveResult(archived, segments, time.monotonic() - start, True)
+        if pause:
+            time.sleep(pause)
+
+
+def archived_record(order_id, user):
+    """The archived order dict of `order_id` placed by `user`, or None."""
+    entry = ArchivedOrder.objects.select_related('segment').filter(pk=order_id, user=user).first()
+    if entry is None:
+        return None
+    lines = zlib.decompress(bytes(entry.segment.data)).split(b'\n')
+    return json.loads(lines[entry.position])
+
+
+def load_archived_order(order_id, user):
+    """
+    Rebuild an archived order of `user` as an unsaved Order whose items are
+    already loaded (order.items.all() does not query). None when not archived.
+    """
+    try:
+        record = archived_record(int(order_id), user)
+    except (TypeError, ValueError):
+        return None
+    if record is None:
+        return None
+    record.pop('events')
+    items = record.pop('items')
+    for name in ('created_at', 'updated_at'):
+        record[name] = parse_datetime(record[name])
+    order = Order(**record)
+    order._state.adding = False
+
+    products = Product.objects.select_related('category').in_bulk({item['product_id'] for item in items})
+    lines = []
+    for item in items:
+        product = products.get(item.pop('product_id'))
+        if product is None:
+            continue
+        item['price'], item['discount'] = Decimal(item['price']), Decimal(item['discount'])
+        line = OrderItem(order=order, product=product, **item)
+        line._state.adding = False
+        lines.append(line)
+    order._prefetched_objects_cache = {'items': lines}
+    return order
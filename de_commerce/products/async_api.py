@@ -0,0 +1,310 @@
+"""
+Async-Native API Views Module
+
+This module provides ASGI-native (``async def``) versions of the high fan-out
+read endpoints and the email-sending endpoint. Under ASGI, every synchronous
+DRF view is run through ``sync_to_async`` in a worker thread; the views here
+run directly on the event loop and use Django's async ORM instead.
+
+Endpoints served (only when settings.ASYNC_API is True, see urls.py):
+- GET /api/products/: List all products (AllowAny)
+- GET /api/categories/: List all categories (AllowAny)
+- GET /api/me/: Authenticated profile + cart, or anonymous session cart (AllowAny)
+- GET /api/session-cart/: Anonymous session cart items (AllowAny)
+- POST /api/password-reset/: Password reset email, sent off the event loop (AllowAny)
+
+Any other HTTP method on these paths is delegated to the existing synchronous
+DRF view, so POST/DELETE behaviour (and 405 responses) stay identical.
+
+Response bodies are produced by the same serializers and JSON renderer as the
+synchronous views, so the JSON shape does not change between WSGI and ASGI deployments.
+
+Notes:
+- The user is resolved like the synchronous views: a Bearer access token
+  (SignedTokenAuthentication, no database query) first, then the session
+  (request.auser()). An invalid or expired token gets 401, as from DRF.
+  HTTP Basic credentials are only honoured by the synchronous DRF views.
+- Throttling uses the same sliding-window throttles (and scopes) as the
+  synchronous views; their cache calls are in-memory and do not block.
+- The product and category lists read from a database replica, like their
+  synchronous viewsets (see replicas.py).
+- Serializers never touch the database here: every relation they read is
+  loaded up front with select_related()/aprefetch_related_objects(), and
+  price lists (pricing.py) and promotions (promotions.py) are resolved
+  before serializing.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.mail import send_mail
+from django.db.models import Prefetch, aprefetch_related_objects
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+
+from .authentication import SignedTokenAuthentication
+from .models import Category, Product, Cart, CartItem
+from .renderers import FastJSONRenderer
+from .fieldsets import sparse_queryset
+from .facets import FacetError, filter_products, get_facets, parse_selections
+from .popularity import SortError, sort_products
+from .pricing import get_price_book
+from .promotions import get_promotion_engine, normalize_coupon_codes
+from .normalization import is_normalized, normalized, product_queryset, line_items_prefetch
+from .serializers import CategorySerializer, ProductSerializer, CartSerializer, UserSerializer, NormalizedCartSerializer
+from .throttling import AnonSlidingWindowThrottle, UserSlidingWindowThrottle, PasswordResetThrottle
+from .variants import annotate_availability, parse_session_cart_key
+from .replicas import replica_reads
+from .views import PasswordResetAPIView
+
+DEFAULT_THROTTLES = (AnonSlidingWindowThrottle, UserSlidingWindowThrottle)
+_renderer = FastJSONRenderer()
+
+
+def json_response(data):
+    """Render serializer data with the same JSON renderer the DRF views use."""
+    return HttpResponse(_renderer.render(data), content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Set request.user from a Bearer access token, else from the session.
+
+    Returns None, or a 401 JsonResponse (as DRF sends it) when the token is
+    invalid or expired.
+    """
+    authenticator = SignedTokenAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse(
+            {'detail': exc.detail}, status=exc.status_code,
+            headers={'WWW-Authenticate': authenticator.authenticate_header(request)},
+        )
+    request.user = result[0] if result is not None else await request.auser()
+    return None
+
+
+async def check_throttles(request, throttle_classes):
+    """
+    Authenticate (see authenticate()) and run DRF throttles for an async view.
+
+    Returns None when the request is allowed, otherwise the 401 response or a
+    429 JsonResponse with the same body and Retry-After header DRF would send.
+    """
+    failed = await authenticate(request)
+    if failed is not None:
+        return failed
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            exc = Throttled(throttle.wait())
+            headers = {'Retry-After': '%d' % exc.wait} if exc.wait is not None else None
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code, headers=headers)
+    return None
+
+
+def async_read_view(handler, fallback, throttle_classes=DEFAULT_THROTTLES):
+    """
+    Build a view that serves GET/HEAD with an async handler and delegates every
+    other method to the synchronous DRF view ``fallback``.
+
+    DRF views are already CSRF exempt (SessionAuthentication enforces CSRF for
+    authenticated users itself), so the combined view is exempted as well.
+    """
+    sync_fallback = sync_to_async(fallback)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            throttled = await check_throttles(request, throttle_classes)
+            return throttled or await handler(request, *args, **kwargs)
+        return await sync_fallback(request, *args, **kwargs)
+
+    return view
+
+
+async def pricing_context(request, user):
+    """
+    Serializer context for an async view: the request, the compiled promotion
+    engine and ?coupon= codes, plus the customer's PriceBook when they have a
+    price list. Everything that may query is loaded up front, off the event loop.
+    """
+    price_book = await sync_to_async(lambda: get_price_book(user).load())()
+    context = {
+        'request': request,
+        'promotions': await sync_to_async(get_promotion_engine)(),
+        'coupon_codes': normalize_coupon_codes(request.GET.get('coupon', '')),
+    }
+    if price_book.price_list is not None:
+        context['price_book'] = price_book
+    return context
+
+
+async def session_cart_payload(request, payload, key=None):
+    """
+    Async equivalent of views.session_cart_payload(): add the anonymous
+    session cart to `payload` as {'items': [...]} (under payload[key] when key
+    is given), honouring ?shape=normalized.
+
+    Session cart format: { '<product_id>' or '<product_id>:<variant_id>': quantity, ... }
+    Invalid product ids are ignored, matching MeAPIView.
+    """
+    session_cart = await request.session.aget('cart', {})
+    shape_normalized = is_normalized(request)
+    lines = [(parse_session_cart_key(key), qty) for key, qty in session_cart.items()]
+    lines = [(line, qty) for line, qty in lines if line is not None]
+    product_ids = [product_id for (product_id, _), _ in lines]
+    products = product_queryset() if shape_normalized else Product.objects.select_related('category')
+    prod_map = {p.id: p async for p in products.filter(id__in=product_ids)} if product_ids else {}
+    context = {'request': request}
+    items = []
+    for (product_id, variant_id), qty in lines:
+        product = prod_map.get(product_id)
+        if product:
+            data = product.id if shape_normalized else ProductSerializer(product, context=context).data
+            items.append({'product': data, 'variant': variant_id, 'quantity': qty})
+    if key:
+        payload[key] = {'items': items}
+    else:
+        payload['items'] = items
+    if shape_normalized:
+        normalized(payload, prod_map.values(), context)
+    return payload
+
+
+# ============================================================================
+# PUBLIC READ ENDPOINTS (NO LOGIN REQUIRED)
+# ============================================================================
+
+async def product_list(request):
+    """GET /api/products/ - async equivalent of ProductViewSet.list() (facet selections, ?sort=, ?facets=1)"""
+    try:
+        selections = parse_selections(request.GET)
+        queryset = sort_products(Product.objects.select_related('category'), request.GET.get('sort'))
+    except (FacetError, SortError) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    queryset = sparse_queryset(annotate_availability(queryset), ProductSerializer, request)
+    with replica_reads(request):
+        products = [p async for p in filter_products(queryset, selections)]
+    context = await pricing_context(request, request.user)
+    data = ProductSerializer(products, many=True, context=context).data
+    if request.GET.get('facets') in (None, '', '0', 'false'):
+        return json_response(data)
+    facets = await sync_to_async(get_facets)(selections)
+    return json_response({'count': facets['count'], 'results': data, 'facets': facets['facets']})
+
+
+async def category_list(request):
+    """GET /api/categories/ - async equivalent of CategoryViewSet.list()"""
+    with replica_reads(request):
+        categories = [c async for c in sparse_queryset(Category.objects.all(), CategorySerializer, request)]
+    data = CategorySerializer(categories, many=True, context={'request': request}).data
+    return json_response(data)
+
+
+async def session_cart(request):
+    """GET /api/session-cart/ - async equivalent of SessionCartAPIView.get()"""
+    return json_response(await session_cart_payload(request, {}))
+
+
+async def me(request):
+    """
+    GET /api/me/ - async equivalent of MeAPIView.get()
+
+    Anonymous: {'authenticated': False, 'cart': {'items': [...session cart...]}}
+    Authenticated: {'authenticated': True, 'user': {...}, 'cart': {...}}
+    ?shape=normalized adds products/categories side tables (normalization.py).
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return json_response(await session_cart_payload(request, {'authenticated': False}, key='cart'))
+    if getattr(user, '_from_access_token', False):
+        user = await User.objects.aget(pk=user.pk)  # full profile, like views.get_full_user()
+
+    cart, _ = await Cart.objects.aget_or_create(user=user)
+    context = await pricing_context(request, user)
+    if is_normalized(request):
+        await aprefetch_related_objects([cart], line_items_prefetch(CartItem))
+        payload = {
+            'authenticated': True,
+            'user': UserSerializer(user, context=context).data,
+            'cart': NormalizedCartSerializer(cart, context=context).data,
+        }
+        return json_response(normalized(payload, [item.product for item in cart.items.all()], context))
+
+    await aprefetch_related_objects(
+        [cart], Prefetch('items', queryset=CartItem.objects.select_related('product__category', 'variant'))
+    )
+    return json_response({
+        'authenticated': True,
+        'user': UserSerializer(user, context=context).data,
+        'cart': CartSerializer(cart, context=context).data,
+    })
+
+
+# ============================================================================
+# EMAIL ENDPOINTS (NO LOGIN REQUIRED)
+# ============================================================================
+
+def _request_data(request):
+    """Parse a JSON or form-encoded request body into a dict."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+@csrf_exempt
+async def password_reset(request):
+    """
+    POST /api/password-reset/ - async equivalent of PasswordResetAPIView.post()
+
+    The user lookup uses the async ORM and send_mail() runs in a thread outside
+    the event loop (thread_sensitive=False), so a slow SMTP server only delays
+    this request instead of every request sharing the loop.
+    Responses (and the no-enumeration behaviour) match the synchronous view.
+    """
+    if request.method != 'POST':
+        return await sync_to_async(PasswordResetAPIView.as_view())(request)
+
+    throttled = await check_throttles(request, (PasswordResetThrottle,))
+    if throttled:
+        return throttled
+
+    email = str(_request_data(request).get('email', '')).strip()
+    if not email:
+        return JsonResponse({'success': False, 'message': 'Email is required'}, status=400)
+
+    user = await User.objects.filter(email=email).afirst()
+    if user is None:
+        return JsonResponse(
+            {'success': True, 'message': 'If an account exists with this email, a reset link will be sent.'}
+        )
+
+    try:
+        await sync_to_async(send_mail, thread_sensitive=False)(
+            'Password Reset Request - De-Commerce',
+            f'Hello {user.username},\n\n'
+            f'You have requested to reset your password. '
+            f'Click the link below to reset your password:\n\n'
+            f'http://localhost:5173/reset-password\n\n'
+            f'If you did not request this, please ignore this email.\n\n'
+            f'Best regards,\nDe-Commerce Team',
+            'noreply@de-commerce.com',
+            [email],
+            fail_silently=False,
+        )
+    except Exception as mail_error:
+        # Email sending failed, but still return success to user for security
+        print(f'Email sending error: {mail_error}')
+
+    return JsonResponse(
+        {'success': True, 'message': 'Password reset link sent to your email. Please check your inbox.'}
+    )
+
@@ -0,0 +1,113 @@
+"""
+Authentication Module - Signed Stateless Access Tokens
+
+SessionAuthentication reads the django_session row and the auth_user row on
+every authenticated API call. The tokens here are validated with an HMAC
+check only (django.core.signing, keyed by SECRET_KEY), so authenticating a
+request never touches the database.
+
+Token types (both produced by django.core.signing.dumps):
+- access: short-lived (TOKEN_ACCESS_TTL seconds, default 5 minutes).
+  Payload: {'uid': user id, 'usr': username, 'eml': email, 'stf': is_staff}
+  Sent as 'Authorization: Bearer <access>'.
+- refresh: long-lived (TOKEN_REFRESH_TTL seconds, default 7 days).
+  Payload: {'uid': user id, 'fp': session auth hash fingerprint}
+  Exchanged at POST /api/token/refresh/ for a new pair. This is the only
+  step that reads the database: it re-checks that the user is still active
+  and that the password has not changed since the token was issued.
+
+Because access tokens are not stored, they cannot be revoked individually;
+the short TTL bounds how long a deactivated user or changed password keeps
+working (including a revoked staff flag).
+
+The authenticated request.user is an unsaved User instance carrying only
+id, username, email and is_staff (so IsAdminUser and staff-only views work). Code that needs the full row (e.g. date_joined)
+should call get_full_user(request).
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+ACCESS_TOKEN_SALT = 'products.authentication.access'
+REFRESH_TOKEN_SALT = 'products.authentication.refresh'
+TOKEN_ACCESS_TTL = getattr(settings, 'TOKEN_ACCESS_TTL', 300)
+TOKEN_REFRESH_TTL = getattr(settings, 'TOKEN_REFRESH_TTL', 7 * 24 * 3600)
+
+
+def _fingerprint(user):
+    # Changes whenever the password changes, like session verification does
+    return user.get_session_auth_hash()[:20]
+
+
+def issue_tokens(user):
+    """Return a new {'access', 'refresh', 'token_type', 'expires_in'} dict for user."""
+    access = signing.dumps(
+        {'uid': user.pk, 'usr': user.get_username(), 'eml': user.email, 'stf': user.is_staff}, salt=ACCESS_TOKEN_SALT,
+    )
+    refresh = signing.dumps({'uid': user.pk, 'fp': _fingerprint(user)}, salt=REFRESH_TOKEN_SALT)
+    return {'access': access, 'refresh': refresh, 'token_type': 'Bearer', 'expires_in': TOKEN_ACCESS_TTL}
+
+
+def refresh_tokens(refresh_token):
+    """
+    Validate a refresh token and return a new token pair.
+
+    Raises rest_framework.exceptions.AuthenticationFailed when the token is
+    invalid or expired, the user is gone or inactive, or the password changed.
+    """
+    try:
+        payload = signing.loads(refresh_token, salt=REFRESH_TOKEN_SALT, max_age=TOKEN_REFRESH_TTL)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Refresh token expired.')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid refresh token.')
+
+    user = User.objects.filter(pk=payload.get('uid'), is_active=True).first()
+    if user is None or payload.get('fp') != _fingerprint(user):
+        raise exceptions.AuthenticationFailed('Invalid refresh token.')
+    return issue_tokens(user)
+
+
+def get_full_user(request):
+    """Return request.user as a fully loaded User (one query for token-authenticated requests)."""
+    user = request.user
+    if getattr(user, '_from_access_token', False):
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    DRF authentication class for 'Authorization: Bearer <access token>'.
+
+    Returns (user, payload) without any database query, or None when no
+    Bearer header is present so other authentication classes can run.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        try:
+            payload = signing.loads(auth[1].decode(), salt=ACCESS_TOKEN_SALT, max_age=TOKEN_ACCESS_TTL)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Access token expired.')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Invalid access token.')
+
+        user = User(
+            pk=payload['uid'], username=payload.get('usr', ''), email=payload.get('eml', ''),
+            is_staff=bool(payload.get('stf', False)), is_active=True,
+        )
+        user._from_access_token = True
+        return user, payload
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,118 @@
+"""
+Catalog Cache Module
+
+Versioned cache keys for public catalog data (categories and products).
+
+Every cached catalog entry embeds the current catalog version in its key.
+Saving or deleting a Product or Category bumps the version (see signals.py),
+so all catalog entries are invalidated at once without having to track or
+delete individual keys; stale entries simply expire.
+
+Usage:
+    key = catalog_cache_key('bootstrap', request.get_host())
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+
+Note: QuerySet.update()/bulk_create() do not send model signals; call
+bump_catalog_version() after bulk catalog changes.
+
+The same scheme is available for other namespaces through get_version(),
+bump_version() and versioned_cache_key().
+
+Versions live in the default cache, which is per process: a bump reaches the
+other processes only as their entries expire (CATALOG_CACHE_TIMEOUT). A
+version evicted from the cache restarts from the current time in
+milliseconds, above any version handed out before, so eviction never brings
+back entries cached under an older version. Data that must change everywhere
+at once (prices, promotions) uses get_shared_version()/bump_shared_version()
+instead: the version is a CacheVersion row on the primary database, bumped in
+the same transaction as the change and read once per use.
+
+Data about a single product (the product page, see product_page.py) is keyed
+with product_cache_key(): it also changes when only that product's variants
+or stock do (bump_product_version), without invalidating the whole catalog.
+That per-product version is shared (CacheVersion), so every process stops
+serving a page as soon as the change commits; the catalog version in the
+same key is per process, like every catalog entry.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import CacheVersion
+
+CATALOG_NAMESPACE = 'catalog'
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _initial_version():
+    # Above any version of the namespace handed out before it was evicted
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Return the current version of a cache namespace, initialising it on first use."""
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every cached entry of a namespace."""
+    key = f'{namespace}:version'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def versioned_cache_key(namespace, name, *parts, version=None):
+    """Build a cache key that changes whenever the namespace version (default: get_version()) does."""
+    if version is None:
+        version = get_version(namespace)
+    return ':'.join([namespace, str(version), name, *map(str, parts)])
+
+
+def get_shared_version(namespace):
+    """Return the version of a namespace every process shares (CacheVersion, one query on the primary; 0 before the first bump)."""
+    return CacheVersion.objects.filter(namespace=namespace).values_list('version', flat=True).first() or 0
+
+
+def bump_shared_version(namespace):
+    """Invalidate every cached entry of a shared namespace, in every process (part of the current transaction)."""
+    CacheVersion.objects.get_or_create(namespace=namespace, defaults={'version': _initial_version()})
+    CacheVersion.objects.filter(namespace=namespace).update(version=F('version') + 1)
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it on first use."""
+    return get_version(CATALOG_NAMESPACE)
+
+
+def bump_catalog_version(**kwargs):
+    """Invalidate every cached catalog entry (usable directly as a signal receiver)."""
+    bump_version(CATALOG_NAMESPACE)
+
+
+def catalog_cache_key(name, *parts):
+    """Build a cache key for catalog data that changes whenever the catalog does."""
+    return versioned_cache_key(CATALOG_NAMESPACE, name, *parts)
+
+
+def bump_product_version(product_id):
+    """Invalidate the cached entries of one product in every process (see product_cache_key)."""
+    bump_shared_version(f'product:{product_id}')
+
+
+def product_cache_key(product_id, name, *parts):
+    """Build a cache key for data of one product that changes with the catalog and with that product (one query)."""
+    namespace = f'product:{product_id}'
+    return versioned_cache_key(namespace, name, get_catalog_version(), *parts, version=get_shared_version(namespace))
@@ -0,0 +1,206 @@
+"""
+Category Tree Module - Materialized-Path Departments
+
+Categories nest (Electronics > Laptops > Business). Each Category stores its
+materialized path: the zero-padded ids of its ancestors and itself, each
+followed by '/':
+
+    Electronics   00000001/
+    Laptops       00000001/00000004/
+    Business      00000001/00000004/00000009/
+
+Queries:
+- A department and all its descendants are the categories whose path starts
+  with the department's path: a path__startswith (LIKE 'prefix%') lookup, no
+  recursion. It does not depend on the column's collation, unlike a range
+  [path, path[:-1] + '0') whose bounds only hold under byte-wise ordering.
+  On PostgreSQL the path index Django creates for db_index CharFields
+  includes a varchar_pattern_ops index, so the prefix match stays one index
+  range scan under any collation. subtree_filter() builds it, also across
+  relations: Product.objects.filter(subtree_filter(dept, 'category__'))
+- Ancestors are the ids in the path; breadcrumb() and tree() read them from
+  category_index(), a {id: CategoryNode} map built with one query and cached
+  under the catalog version (catalog_cache.py).
+
+Moves (all set-based, one UPDATE per moved subtree):
+- move_subtree(category, new_parent): called by Category.save() when parent
+  changes; rewrites path and depth of the whole subtree
+- move_categories(categories, new_parent): several subtrees at once
+- reparent_children(old_parent, new_parent): move every child (and its
+  subtree) of one department under another, e.g. when merging departments
+- rebuild_paths(): recompute every path level by level (after bulk_create()
+  or raw SQL, which bypass Category.save())
+
+QuerySet.update() sends no signals, so these functions invalidate cached
+catalog data themselves.
+
+Usage:
+    GET /api/categories/tree/               # nested departments
+    GET /api/categories/{id}/breadcrumb/    # root ... category
+    GET /api/products/?department={id}      # products of a department and its descendants
+    python manage.py move_categories 7 9 --to 3
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad, Substr
+
+from .catalog_cache import CATALOG_CACHE_TIMEOUT, bump_catalog_version, catalog_cache_key
+from .models import Category
+from .replicas import primary_reads
+
+SEGMENT_WIDTH = 8
+SEPARATOR = '/'
+
+CategoryNode = namedtuple('CategoryNode', 'id name parent_id path depth')
+
+
+def segment(pk):
+    return f'{pk:0{SEGMENT_WIDTH}d}{SEPARATOR}'
+
+
+def path_for(pk, parent):
+    return (parent.path if parent is not None else '') + segment(pk)
+
+
+def subtree_q(path, prefix=''):
+    """Q matching the category with materialized path `path` and its descendants (prefix as in subtree_filter)."""
+    return Q(**{f'{prefix}path__startswith': path})
+
+
+def subtree_filter(category, prefix=''):
+    """Q matching `category` and its descendants (prefix: lookup path to Category, e.g. 'category__')."""
+    return subtree_q(category.path, prefix)
+
+
+def is_in_subtree(category, root):
+    """True when `category` is `root` or one of its descendants."""
+    return category.path.startswith(root.path) if category.path and root.path else category.pk == root.pk
+
+
+def set_path(category):
+    """Store the path and depth of a newly created category (its id is only known after the insert)."""
+    parent = category.parent
+    category.path = path_for(category.pk, parent)
+    category.depth = parent.depth + 1 if parent is not None else 0
+    Category.objects.filter(pk=category.pk).update(path=category.path, depth=category.depth)
+
+
+def _rewrite_paths(old_path, new_path, depth_delta, exclude_root=False):
+    """One UPDATE replacing the `old_path` prefix with `new_path` in a subtree."""
+    queryset = Category.objects.filter(subtree_q(old_path))
+    if exclude_root:
+        queryset = queryset.exclude(path=old_path)
+    return queryset.update(
+        path=Concat(Value(new_path), Substr('path', len(old_path) + 1), output_field=CharField()),
+        depth=F('depth') + depth_delta,
+    )
+
+
+def move_subtree(category, new_parent):
+    """Move `category` and its descendants under `new_parent` (None: top level). Returns rows updated."""
+    if new_parent is not None and is_in_subtree(new_parent, category):
+        raise ValueError(f'Cannot move {category} under itself or one of its descendants.')
+    old_path = Category.objects.values_list('path', flat=True).get(pk=category.pk)
+    if not old_path:
+        # Created with bulk_create(): no path to rewrite yet
+        Category.objects.filter(pk=category.pk).update(parent=new_parent)
+        rebuild_paths()
+        category.refresh_from_db(fields=['parent', 'path', 'depth'])
+        return 0
+    new_path = path_for(category.pk, new_parent)
+    new_depth = new_parent.depth + 1 if new_parent is not None else 0
+    with transaction.atomic():
+        Category.objects.filter(pk=category.pk).update(parent=new_parent)
+        updated = _rewrite_paths(old_path, new_path, new_depth - category.depth) if old_path != new_path else 0
+    category.parent, category.path, category.depth = new_parent, new_path, new_depth
+    bump_catalog_version()
+    return updated
+
+
+def move_categories(categories, new_parent):
+    """Move several categories (with their subtrees) under `new_parent`. Returns rows updated."""
+    updated = 0
+    with transaction.atomic():
+        for category in categories:
+            category.refresh_from_db(fields=['parent', 'path', 'depth'])
+            if new_parent is not None:
+                new_parent.refresh_from_db(fields=['path', 'depth'])
+            updated += move_subtree(category, new_parent)
+    return updated
+
+
+def reparent_children(old_parent, new_parent):
+    """
+    Move every child subtree of `old_parent` under `new_parent` (None: top level)
+    with two UPDATEs. Returns rows updated.
+    """
+    if new_parent is not None and is_in_subtree(new_parent, old_parent):
+        raise ValueError(f'Cannot move the children of {old_parent} under {new_parent}.')
+    new_prefix = new_parent.path if new_parent is not None else ''
+    new_depth = new_parent.depth + 1 if new_parent is not None else 0
+    with transaction.atomic():
+        Category.objects.filter(parent=old_parent).update(parent=new_parent)
+        updated = _rewrite_paths(old_parent.path, new_prefix, new_depth - (old_parent.depth + 1), exclude_root=True)
+    bump_catalog_version()
+    return updated
+
+
+def rebuild_paths():
+    """
+    Recompute path and depth of every category, one set-based UPDATE per tree
+    level. Returns the number of categories left without a path (parent cycles).
+    """
+    own = Concat(LPad(Cast('id', CharField()), SEGMENT_WIDTH, Value('0')), Value(SEPARATOR), output_field=CharField())
+    parents = Category.objects.filter(pk=OuterRef('parent_id'))
+    with transaction.atomic():
+        Category.objects.filter(parent__isnull=False).update(path='', depth=0)
+        Category.objects.filter(parent__isnull=True).update(path=own, depth=0)
+        # Each pass gives a path to the children of the categories that got one in the previous pass
+        while Category.objects.filter(path='', parent__path__gt='').update(
+            path=Concat(Subquery(parents.values('path')), own, output_field=CharField()),
+            depth=Subquery(parents.values('depth')) + 1,
+        ):
+            pass
+    bump_catalog_version()
+    return Category.objects.filter(path='').count()
+
+
+def category_index():
+    """{id: CategoryNode} of every category, ordered by path. Cached until the catalog changes."""
+    key = catalog_cache_key('category_index')
+    index = cache.get(key)
+    if index is None:
+        # Built from the primary, like facets.facet_cube()
+        with primary_reads():
+            rows = Category.objects.order_by('path').values_list('id', 'name', 'parent_id', 'path', 'depth')
+            index = {row[0]: CategoryNode(*row) for row in rows}
+        cache.set(key, index, CATALOG_CACHE_TIMEOUT)
+    return index
+
+
+def breadcrumb(category_id, index=None):
+    """[{'id', 'name'}, ...] from the top-level department down to `category_id`; None if unknown."""
+    index = category_index() if index is None else index
+    node = index.get(category_id)
+    if node is None:
+        return None
+    ids = [int(part) for part in node.path.split(SEPARATOR) if part]
+    return [{'id': pk, 'name': index[pk].name} for pk in ids if pk in index]
+
+
+def tree(index=None):
+    """Nested [{'id', 'name', 'depth', 'children': [...]}, ...], siblings by name."""
+    index = category_index() if index is None else index
+    nodes = {pk: {'id': pk, 'name': node.name, 'depth': node.depth, 'children': []} for pk, node in index.items()}
+    roots = []
+    for pk, node in index.items():
+        parent = nodes.get(node.parent_id)
+        (parent['children'] if parent is not None else roots).append(nodes[pk])
+    for node in nodes.values():
+        node['children'].sort(key=lambda child: child['name'])
+    roots.sort(key=lambda root: root['name'])
+    return roots
@@ -0,0 +1,224 @@
+"""
+Facets Module - Faceted Catalog Navigation With Cached Facet Counts
+
+The product list accepts facet selections and can return, next to the
+products, how many products each facet value would match:
+
+    GET /api/products/?category=3,5&stock_status=In Stock&price=25-50&facets=1
+    -> {"count": 42, "results": [...],
+        "facets": {"category": [{"value": 3, "label": "Books", "count": 30, "selected": true}, ...],
+                   "stock_status": [{"value": "In Stock", "label": "In Stock", "count": 40, ...}, ...],
+                   "price": [{"value": "25-50", "label": "25 - 50", "min": "25", "max": "50", "count": 42, ...}, ...]}}
+    GET /api/products/facets/?category=3      # facets only, without the product list
+    GET /api/products/?department=1&facets=1  # a department and its subcategories
+
+Selections:
+- category: category ids, stock_status: stock status strings, price: bucket
+  keys ('0-25', ..., '500-' for the last, open-ended bucket)
+- department: one category id; limits everything (products and counts) to
+  that category and its descendants (category_tree.py)
+- several values of one facet are OR-ed (comma-separated or repeated
+  parameters); different facets are AND-ed
+- a facet's counts apply the selections of the *other* facets only, so the
+  alternatives within a facet stay visible with the count they would give
+
+How counts stay cheap:
+- One grouped query counts products per (category, stock status, price
+  bucket). That "cube" has at most categories x statuses x buckets rows,
+  whatever the number of products, and is cached under the catalog version
+  (catalog_cache.py), so any Product/Category change rebuilds it.
+- The counts for a given selection are sums over the cube, done in Python,
+  and are cached per filter signature (the canonical, sorted selection).
+A cold request costs one grouped query plus one for the category index
+(category_tree.category_index, itself cached); a warm one costs no query.
+
+Price buckets are FACET_PRICE_BUCKETS boundaries over Product.price (base
+prices; customers on a price list are still bucketed by base price).
+"""
+
+import hashlib
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .catalog_cache import CATALOG_CACHE_TIMEOUT, catalog_cache_key
+from .category_tree import category_index, subtree_q
+from .models import Product
+from .replicas import primary_reads
+
+FACET_PRICE_BUCKETS = tuple(Decimal(str(edge)) for edge in getattr(settings, 'FACET_PRICE_BUCKETS', (25, 50, 100, 250, 500)))
+FACETS = ('category', 'stock_status', 'price')
+
+# One bucket of FACET_PRICE_BUCKETS: [low, high), high None for the last one
+PriceBucket = namedtuple('PriceBucket', 'key low high')
+
+
+class FacetError(ValueError):
+    """Invalid facet selection (returned to API clients as 400)."""
+
+
+def _edge(value):
+    return f'{value.normalize():f}'
+
+
+def price_buckets():
+    """Return the PriceBuckets defined by FACET_PRICE_BUCKETS, lowest first."""
+    edges = (Decimal('0'),) + FACET_PRICE_BUCKETS
+    buckets = []
+    for index, low in enumerate(edges):
+        high = edges[index + 1] if index + 1 < len(edges) else None
+        buckets.append(PriceBucket(f"{_edge(low)}-{_edge(high) if high is not None else ''}", low, high))
+    return buckets
+
+
+BUCKETS = price_buckets()
+BUCKET_INDEX = {bucket.key: index for index, bucket in enumerate(BUCKETS)}
+
+
+def _values(params, name):
+    values = []
+    for raw in params.getlist(name) if hasattr(params, 'getlist') else [params.get(name) or '']:
+        values.extend(value.strip() for value in raw.split(',') if value.strip())
+    return values
+
+
+def parse_selections(params):
+    """
+    Read facet selections from query parameters.
+    Returns {'category': frozenset of ids, 'stock_status': frozenset of str,
+    'price': frozenset of bucket indexes, 'department': path or ''}. Raises FacetError.
+    """
+    try:
+        categories = frozenset(int(value) for value in _values(params, 'category'))
+    except ValueError:
+        raise FacetError("'category' must be a list of category ids.")
+    department = ''
+    if params.get('department'):
+        node = category_index().get(int(params['department'])) if params['department'].isdigit() else None
+        if node is None:
+            raise FacetError("'department' must be the id of a category.")
+        department = node.path
+    prices = _values(params, 'price')
+    unknown = [value for value in prices if value not in BUCKET_INDEX]
+    if unknown:
+        raise FacetError(f"Unknown price bucket: {', '.join(unknown)}. Choose from {', '.join(BUCKET_INDEX)}.")
+    return {
+        'category': categories,
+        'stock_status': frozenset(_values(params, 'stock_status')),
+        'price': frozenset(BUCKET_INDEX[value] for value in prices),
+        'department': department,
+    }
+
+
+def selection_signature(selections):
+    """Canonical string for a selection (order of values and parameters does not matter)."""
+    facets = [f"{name}={','.join(map(str, sorted(selections[name])))}" for name in FACETS if selections[name]]
+    return '&'.join([f"department={selections['department']}"] * bool(selections['department']) + facets)
+
+
+def filter_products(queryset, selections):
+    """Restrict a Product queryset to the selected department and facet values."""
+    if selections['department']:
+        queryset = queryset.filter(subtree_q(selections['department'], 'category__'))
+    if selections['category']:
+        queryset = queryset.filter(category_id__in=selections['category'])
+    if selections['stock_status']:
+        queryset = queryset.filter(stock_status__in=selections['stock_status'])
+    if selections['price']:
+        ranges = Q()
+        for index in selections['price']:
+            bucket = BUCKETS[index]
+            ranges |= Q(price__gte=bucket.low, price__lt=bucket.high) if bucket.high is not None else Q(price__gte=bucket.low)
+        queryset = queryset.filter(ranges)
+    return queryset
+
+
+def _bucket_expression():
+    whens = [When(price__lt=bucket.high, then=Value(index)) for index, bucket in enumerate(BUCKETS) if bucket.high is not None]
+    return Case(*whens, default=Value(len(BUCKETS) - 1), output_field=IntegerField())
+
+
+def facet_cube():
+    """
+    Return [(category_id, stock_status, bucket_index, count)] for every
+    combination present in the catalog. Cached until the catalog changes.
+    """
+    key = catalog_cache_key('facet_cube')
+    cube = cache.get(key)
+    if cube is None:
+        # Built from the primary: a lagging replica would cache stale counts for the whole version
+        with primary_reads():
+            cube = list(
+                Product.objects.order_by().annotate(bucket=_bucket_expression())
+                .values_list('category_id', 'stock_status', 'bucket').annotate(count=Count('id'))
+            )
+        cache.set(key, cube, CATALOG_CACHE_TIMEOUT)
+    return cube
+
+
+def _matches(selections, category_id, stock_status, bucket, skip=None):
+    return (
+        (skip == 'category' or not selections['category'] or category_id in selections['category'])
+        and (skip == 'stock_status' or not selections['stock_status'] or stock_status in selections['stock_status'])
+        and (skip == 'price' or not selections['price'] or bucket in selections['price'])
+    )
+
+
+def compute_facets(selections, cube, index):
+    """
+    Facet counts for `selections` from a facet cube (see facet_cube) and the
+    category index. Returns (count, facets).
+    """
+    department = selections['department']
+    counts = {name: {} for name in FACETS}
+    total = 0
+    for category_id, stock_status, bucket, count in cube:
+        node = index.get(category_id)
+        if department and (node is None or not node.path.startswith(department)):
+            continue
+        values = {'category': category_id, 'stock_status': stock_status, 'price': bucket}
+        if _matches(selections, category_id, stock_status, bucket):
+            total += count
+        for name in FACETS:
+            if _matches(selections, category_id, stock_status, bucket, skip=name):
+                counts[name][values[name]] = counts[name].get(values[name], 0) + count
+
+    categories = sorted(
+        (
+            {
+                'value': node.id, 'label': node.name, 'parent': node.parent_id,
+                'count': counts['category'].get(node.id, 0), 'selected': node.id in selections['category'],
+            }
+            for node in index.values() if node.path.startswith(department)
+        ),
+        key=lambda item: item['label'],
+    )
+    statuses = [
+        {'value': value, 'label': value or 'Unknown', 'count': count, 'selected': value in selections['stock_status']}
+        for value, count in sorted(counts['stock_status'].items())
+    ]
+    prices = [
+        {
+            'value': bucket.key,
+            'label': f'{_edge(bucket.low)} - {_edge(bucket.high)}' if bucket.high is not None else f'{_edge(bucket.low)}+',
+            'min': _edge(bucket.low), 'max': _edge(bucket.high) if bucket.high is not None else None,
+            'count': counts['price'].get(position, 0), 'selected': position in selections['price'],
+        }
+        for position, bucket in enumerate(BUCKETS)
+    ]
+    return total, {'category': categories, 'stock_status': statuses, 'price': prices}
+
+
+def get_facets(selections):
+    """Return {'count': matching products, 'facets': {...}} for `selections`, cached per filter signature."""
+    signature = hashlib.sha1(selection_signature(selections).encode()).hexdigest()
+    key = catalog_cache_key('facets', signature)
+    data = cache.get(key)
+    if data is None:
+        count, facets = compute_facets(selections, facet_cube(), category_index())
+        data = {'count': count, 'facets': facets}
+        cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,85 @@
+"""
+Fieldsets Module - Sparse Fieldsets (?fields= / ?omit=)
+
+List and detail reads can ask for a subset of a serializer's fields:
+
+    GET /api/products/?fields=id,name,price,image,stock_status
+    GET /api/products/?omit=description,more_description,specifications
+
+- fields: comma-separated names to return (unknown names are ignored)
+- omit: comma-separated names to leave out (applied after fields)
+- 'id' is always returned so clients can key rows
+- only the top-level serializer is filtered; nested serializers (e.g. the
+  product inside a cart line) keep their full shape
+
+Supported by ProductSerializer, CategorySerializer, CartSerializer and
+OrderSerializer (and their ?shape=normalized variants).
+
+Omitted columns are pushed down into the queryset with .defer(), so the
+long TextFields are not even fetched from the database (the same effect as
+.only() on the requested columns). Relations are never deferred: a nested
+or related field that is left out is still joined/prefetched.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+ALWAYS_INCLUDED = ('id',)
+
+
+def _split(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def get_sparse_fieldset(request, field_names):
+    """Return the names from `field_names` selected by the request's ?fields= / ?omit= (order kept)."""
+    if request is None:
+        return list(field_names)
+    fields = _split(request.GET.get('fields'))
+    omit = _split(request.GET.get('omit'))
+    if not fields and not omit:
+        return list(field_names)
+    return [
+        name for name in field_names
+        if name in ALWAYS_INCLUDED or ((not fields or name in fields) and name not in omit)
+    ]
+
+
+def sparse_queryset(queryset, serializer_class, request):
+    """Defer the model columns behind serializer fields the request left out."""
+    field_names = list(serializer_class.Meta.fields)
+    selected = set(get_sparse_fieldset(request, field_names))
+    deferred = []
+    for name in field_names:
+        if name in selected:
+            continue
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.is_relation and not field.primary_key:
+            deferred.append(name)
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class SparseFieldsetMixin:
+    """ModelSerializer mixin honouring ?fields= / ?omit= when used as the top-level serializer."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        is_root = parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+        if not is_root:
+            return fields
+        return {name: fields[name] for name in get_sparse_fieldset(self.context.get('request'), fields)}
+
+
+class SparseFieldsetViewMixin:
+    """GenericAPIView mixin deferring the columns of fields left out by ?fields= / ?omit=."""
+
+    def filter_queryset(self, queryset):
+        # Not get_queryset(): viewsets override that to scope rows to the user
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == 'GET':
+            queryset = sparse_queryset(queryset, self.get_serializer_class(), self.request)
+        return queryset
@@ -0,0 +1,34 @@
+"""
+Password Hashers Module
+
+Tuned Argon2id hasher, first in settings.PASSWORD_HASHERS so every new hash
+uses it (argon2-cffi is in requirements.txt).
+
+Django's default PBKDF2 hasher runs over a million SHA-256 iterations per
+check, which makes LoginAPIView and RegisterAPIView CPU-bound at a handful of
+requests per second per core. Argon2id costs a fraction of that CPU time
+while being memory-hard, so harder to attack on GPUs.
+
+Only the Argon2id parameters are tunable (settings, read at import):
+- PASSWORD_ARGON2_TIME_COST (2), PASSWORD_ARGON2_MEMORY_COST (19456 KiB,
+  19 MiB), PASSWORD_ARGON2_PARALLELISM (1): the OWASP minimum
+  recommendation; Django's default uses 100 MiB and 8 lanes
+The other listed hashers are Django's own, kept so existing hashes verify.
+
+The hasher keeps Django's algorithm name ('argon2'), so it is the only
+'argon2' entry in PASSWORD_HASHERS and verifies hashes made with Django's
+parameters too. Whenever a stored hash uses another hasher or different
+parameters, Django re-hashes it with TunedArgon2PasswordHasher on the next
+successful login (User.check_password -> setter), so re-tuning needs no
+migration.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with parameters from PASSWORD_ARGON2_* settings."""
+    time_cost = getattr(settings, 'PASSWORD_ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', 19456)
+    parallelism = getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', 1)
@@ -0,0 +1,176 @@
+"""
+Idempotency Module - Idempotency-Key Support for Checkout
+
+Clients retry checkout on network errors. Without protection every retry
+re-runs the order transaction and either creates a duplicate order or fails
+because the first attempt already emptied the cart.
+
+Views decorated with @idempotent honour an 'Idempotency-Key' request header
+(authenticated users only; requests without the header behave as before):
+
+1. The first request with a key claims it by inserting an IdempotencyKey row
+   (unique per user + key), runs the view and stores the status code and the
+   zlib-compressed JSON body on the row.
+2. Later requests with the same key get the stored response replayed (with an
+   'Idempotent-Replayed: true' header) without touching carts or orders.
+3. Duplicates that arrive while the first request is still running wait for
+   it instead of racing: they poll the row until the response is stored and
+   get 409 Conflict after IDEMPOTENCY_LOCK_TIMEOUT seconds. An in-process
+   lock serialises the claim itself (insert or lookup), never the view, so
+   it does not hold up other keys sharing its stripe.
+4. An unfinished claim is taken over only once it is IDEMPOTENCY_CLAIM_TIMEOUT
+   seconds old (default 10 minutes). That must stay well above the longest a
+   request can run (gunicorn's worker timeout, 30s by default): only then is
+   the first request known to be dead rather than slow, so a takeover cannot
+   place a second order.
+
+Other rules:
+- reusing a key with a different request body returns 422
+- responses with status >= 500 (and exceptions) are not stored: the claim is
+  released so the client can retry with the same key
+- keys expire after IDEMPOTENCY_KEY_TTL seconds (default 24h); expired rows
+  are ignored and can be purged
+"""
+
+import functools
+import hashlib
+import json
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .renderers import FastJSONRenderer
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600)
+IDEMPOTENCY_LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 30)
+IDEMPOTENCY_CLAIM_TIMEOUT = getattr(settings, 'IDEMPOTENCY_CLAIM_TIMEOUT', 600)
+POLL_INTERVAL = 0.05
+MAX_KEY_LENGTH = 255
+
+# Striped in-process locks around claims: duplicates of one key always map to the same lock
+_LOCKS = [threading.Lock() for _ in range(64)]
+_renderer = FastJSONRenderer()
+
+
+def request_fingerprint(request):
+    """SHA-256 of the method, path and parsed body of a DRF request."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def encode_response(data):
+    """Compact storage for a response body: zlib-compressed JSON."""
+    return zlib.compress(_renderer.render(data))
+
+
+def decode_response(blob):
+    return json.loads(zlib.decompress(bytes(blob))) if blob else None
+
+
+def _claim(user_id, key, fingerprint):
+    """
+    Try to claim `key`. Returns (record, True) when this request owns it,
+    or (existing record, False) when another request does.
+    Expired keys and abandoned claims (IDEMPOTENCY_CLAIM_TIMEOUT) are removed
+    first; a live claim is returned without writing.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=IDEMPOTENCY_CLAIM_TIMEOUT)
+    existing = IdempotencyKey.objects.filter(user_id=user_id, key=key)
+    record = existing.first()
+    if record is not None:
+        if record.expires_at > now and (record.status_code is not None or record.created_at >= stale):
+            return record, False
+        existing.filter(Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lt=stale)).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user_id=user_id, key=key, fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+            )
+        return record, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user_id=user_id, key=key).first(), False
+
+
+def _replay(record):
+    response = Response(decode_response(record.response), status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run_idempotent(request, handler):
+    """Run handler() (returning a DRF Response) at most once per Idempotency-Key."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    user = request.user
+    if not key or not (user and user.is_authenticated):
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    fingerprint = request_fingerprint(request)
+    deadline = time.monotonic() + IDEMPOTENCY_LOCK_TIMEOUT
+    lock = _LOCKS[hash((user.pk, key)) % len(_LOCKS)]
+    record = None
+    while True:
+        if record is None:
+            with lock:
+                record, owner = _claim(user.pk, key, fingerprint)
+            if owner:
+                break
+            if record is None:
+                continue  # released between our insert and lookup; claim again
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is not None:
+            return _replay(record)
+        if time.monotonic() >= deadline:
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still in progress.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        time.sleep(POLL_INTERVAL)
+        # Wait for the owner with reads only; claim again if it released the key
+        record = IdempotencyKey.objects.filter(user_id=user.pk, key=key).first()
+
+    try:
+        response = handler()
+    except BaseException:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+        return response
+    record.status_code = response.status_code
+    record.response = encode_response(response.data)
+    record.save(update_fields=['status_code', 'response'])
+    return response
+
+
+def idempotent(view):
+    """Decorator for a checkout view function or viewset method (see module docstring)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        return run_idempotent(request, lambda: view(*args, **kwargs))
+    return wrapper
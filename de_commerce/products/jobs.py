@@ -0,0 +1,304 @@
+"""
+Jobs Module - Database-Backed Background Job Queue
+
+Side effects that must not slow down checkout (confirmation emails, inventory
+events, ...) are enqueued as Job rows and run by a worker process:
+
+    python manage.py run_jobs [--queue default] [--concurrency 4] [--burst]
+
+No broker is needed: the jobs table is the queue.
+
+Tasks:
+    @task('orders.send_confirmation', max_attempts=5)
+    def send_order_confirmation(order_id):
+        ...
+
+Tasks are plain functions registered by name and called with the job payload
+as keyword arguments. They live in tasks.py, which ProductsConfig.ready()
+imports so every process (web and worker) knows them.
+
+Enqueueing:
+    enqueue('orders.send_confirmation', {'order_id': order.id})
+    enqueue('reports.nightly', run_at=midnight)        # scheduled
+    enqueue('cache.warm', delay=60, queue='low')        # in a minute
+
+Inside a transaction the row is only inserted once the transaction commits
+(transaction.on_commit), so a worker never picks up a job for an order that
+was rolled back or is not visible yet. Pass on_commit=False to insert at once.
+
+Workers:
+- claim due jobs (status 'pending', run_at <= now) in priority order. With
+  SELECT ... FOR UPDATE SKIP LOCKED where the database supports it, otherwise
+  with a conditional UPDATE per job, so any number of workers can share a
+  queue without running a job twice
+- run up to `concurrency` jobs at a time in a thread pool
+- retry failed jobs with exponential backoff (JOB_RETRY_BACKOFF * 2**attempt,
+  at most JOB_MAX_BACKOFF seconds) until max_attempts, then mark them 'failed'
+- every JOB_LOCK_TIMEOUT / 2 seconds, requeue jobs left 'running' for more
+  than JOB_LOCK_TIMEOUT seconds by a worker that died; such a job that has
+  used up its max_attempts is marked 'failed' instead, so a job that kills
+  its worker is not retried forever
+
+Tests and scripts can run the queue in-process: run_pending() executes every
+due job in the current thread and returns how many ran.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_LOCK_TIMEOUT = getattr(settings, 'JOB_LOCK_TIMEOUT', 300)
+JOB_RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 10)
+JOB_MAX_BACKOFF = getattr(settings, 'JOB_MAX_BACKOFF', 3600)
+DEFAULT_QUEUE = 'default'
+
+# name -> Task
+_TASKS = {}
+
+
+class Task:
+    """A registered task: the function plus its queue and retry limit."""
+
+    def __init__(self, name, func, queue=DEFAULT_QUEUE, max_attempts=5):
+        self.name = name
+        self.func = func
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, payload=None, **options):
+        return enqueue(self.name, payload, **options)
+
+
+def task(name, queue=DEFAULT_QUEUE, max_attempts=5):
+    """Decorator registering a function as the task `name`."""
+    def register(func):
+        _TASKS[name] = Task(name, func, queue=queue, max_attempts=max_attempts)
+        return _TASKS[name]
+    return register
+
+
+def get_task(name):
+    return _TASKS.get(name)
+
+
+def enqueue(name, payload=None, *, run_at=None, delay=None, queue=None, priority=0, on_commit=True):
+    """
+    Enqueue task `name` with `payload` (JSON-serializable kwargs).
+
+    run_at/delay (seconds) schedule the job for later. Inside a transaction the
+    insert waits for the commit unless on_commit=False. Returns the Job when it
+    was inserted immediately, otherwise None.
+    """
+    registered = get_task(name)
+    if registered is None:
+        raise KeyError(f'Unknown task: {name}')
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    job = Job(
+        task=name, payload=payload or {}, queue=queue or registered.queue, priority=priority,
+        run_at=run_at, max_attempts=registered.max_attempts,
+    )
+    if on_commit and connection.in_atomic_block:
+        transaction.on_commit(job.save)
+        return None
+    job.save()
+    return job
+
+
+def retry_delay(attempts):
+    """Backoff in seconds before retry number `attempts` (1-based)."""
+    return min(JOB_MAX_BACKOFF, JOB_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def requeue_stale(timeout=None):
+    """
+    Put jobs claimed more than `timeout` seconds ago back to 'pending', or
+    mark them 'failed' when they have used up their attempts. Returns the
+    number of jobs requeued or failed.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=JOB_LOCK_TIMEOUT if timeout is None else timeout),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, finished_at=now,
+        last_error='Abandoned by its worker on the last attempt',
+    )
+    return failed + stale.update(status=Job.PENDING, locked_by='', locked_at=None)
+
+
+def claim(worker_id, queues=None, limit=1):
+    """Claim up to `limit` due jobs for `worker_id` and return them (status 'running')."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.PENDING, run_at__lte=now)
+    if queues:
+        due = due.filter(queue__in=list(queues))
+    due = due.order_by('-priority', 'run_at', 'id')
+    claimed = dict(status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+        return list(Job.objects.filter(id__in=ids).order_by('-priority', 'run_at', 'id'))
+
+    # Conditional UPDATE: a job another worker claimed first is no longer
+    # 'pending' and is skipped; this call's rows are identified by locked_at
+    ids = list(due.values_list('id', flat=True)[:limit])
+    Job.objects.filter(id__in=ids, status=Job.PENDING).update(**claimed)
+    return list(
+        Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker_id, locked_at=now)
+        .order_by('-priority', 'run_at', 'id')
+    )
+
+
+def _finish(job, retries=5, **fields):
+    """Record a job's outcome, retrying briefly when the database is busy (e.g. SQLite write locks)."""
+    for attempt in range(retries):
+        try:
+            return Job.objects.filter(id=job.id).update(**fields)
+        except OperationalError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    registered = get_task(job.task)
+    try:
+        if registered is None:
+            raise LookupError(f'Unknown task: {job.task}')
+        registered(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts)
+        update = dict(locked_by='', locked_at=None, last_error=error)
+        if job.attempts >= job.max_attempts:
+            update.update(status=Job.FAILED, finished_at=timezone.now())
+        else:
+            update.update(status=Job.PENDING, run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+        _finish(job, **update)
+        return False
+    _finish(job, status=Job.DONE, finished_at=timezone.now(), locked_by='', locked_at=None)
+    return True
+
+
+class Worker:
+    """
+    Polls the jobs table and runs due jobs.
+
+    queues: queue names to serve (None = all)
+    concurrency: jobs run at the same time (1 = in the calling thread)
+    poll_interval: seconds to sleep when no job is due
+    requeue_interval: seconds between requeue_stale() runs (JOB_LOCK_TIMEOUT / 2)
+    """
+
+    def __init__(self, queues=None, concurrency=1, poll_interval=1.0, worker_id=None, requeue_interval=None):
+        self.queues = queues
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.requeue_interval = JOB_LOCK_TIMEOUT / 2 if requeue_interval is None else requeue_interval
+        self._next_requeue = 0.0
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _record(self, ok):
+        self.processed += 1
+        if not ok:
+            self.failed += 1
+
+    def _claim(self, limit):
+        """claim() that returns None instead of raising when the database is busy."""
+        try:
+            return claim(self.worker_id, self.queues, limit)
+        except OperationalError:
+            logger.warning('Worker %s could not claim jobs, retrying', self.worker_id, exc_info=True)
+            return None
+
+    def _requeue_stale(self):
+        """requeue_stale() once every requeue_interval seconds (the first call runs it)."""
+        if time.monotonic() < self._next_requeue:
+            return
+        self._next_requeue = time.monotonic() + self.requeue_interval
+        try:
+            requeue_stale()
+        except OperationalError:
+            logger.warning('Worker %s could not requeue stale jobs', self.worker_id, exc_info=True)
+
+    def _run_in_thread(self, job):
+        try:
+            return run_job(job)
+        finally:
+            close_old_connections()
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Process jobs until stop() is called. burst=True returns as soon as no
+        job is due; max_jobs stops after that many jobs. Returns jobs processed.
+        """
+        if self.concurrency == 1:
+            return self._run_inline(burst, max_jobs)
+
+        # Claim in batches: refill once at least half of the slots are free
+        refill_at = max(1, self.concurrency // 2)
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job-worker') as pool:
+            while not self.stop_event.is_set():
+                self._requeue_stale()
+                free = self.concurrency - len(running)
+                budget = free if max_jobs is None else min(free, max_jobs - self.processed - len(running))
+                polled = budget > 0 and (free >= refill_at or not running)
+                jobs = self._claim(budget) if polled else []
+                running.update(pool.submit(self._run_in_thread, job) for job in jobs or ())
+                if not running:
+                    if jobs is not None and (burst or (max_jobs is not None and self.processed >= max_jobs)):
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                # Nothing was due: check the queue again after poll_interval at the latest
+                timeout = self.poll_interval if polled and not jobs else None
+                done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                running = set(running)
+                for future in done:
+                    self._record(future.result())
+        return self.processed
+
+    def _run_inline(self, burst, max_jobs):
+        while not self.stop_event.is_set() and (max_jobs is None or self.processed < max_jobs):
+            self._requeue_stale()
+            jobs = self._claim(1)
+            if not jobs:
+                if burst and jobs is not None:
+                    break
+                self.stop_event.wait(self.poll_interval)
+                continue
+            self._record(run_job(jobs[0]))
+        return self.processed
+
+
+def run_pending(queues=None):
+    """Run every due job in the current thread (tests, scripts). Returns jobs processed."""
+    return Worker(queues=queues).run(burst=True)
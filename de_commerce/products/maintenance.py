@@ -0,0 +1,158 @@
+"""
+Maintenance Module - Batched Purge of Stale Rows
+
+Several tables only ever grow:
+- django_session: anonymous session carts leave a row per visitor, and
+  Django never deletes expired sessions by itself
+- products_cart: MeAPIView creates a cart for every user who logs in, and
+  carts of customers who never come back keep their items forever
+- products_idempotencykey: one row per checkout retried with a key
+- products_job: finished background jobs (the post-checkout outbox)
+- database cache tables, when a DatabaseCache backend is configured (login
+  lockout counters and throttles only expire through cache TTLs)
+
+purge_stale_data() removes these in bounded batches: each batch selects at
+most `batch_size` primary keys through an index and deletes them in its own
+short transaction, then sleeps `pause` seconds. Locks are never held for long
+and the database gets room for checkout traffic between batches, so the purge
+can run during peak hours. A `max_seconds` budget stops the run early; the
+next run picks up where it left off.
+
+What counts as stale (settings, with defaults):
+- sessions: expire_date in the past
+- empty carts: no items and created more than CART_EMPTY_TTL seconds ago (1 day)
+- abandoned carts: owner has not logged in for CART_ABANDON_DAYS (90)
+- idempotency keys: expires_at in the past
+- jobs: 'done' for JOB_RETENTION_DAYS (7), 'failed' for JOB_FAILED_RETENTION_DAYS (30)
+
+Usage:
+    python manage.py purge_stale_data [--batch-size 1000] [--sleep 0.05] [--max-seconds 300] [--dry-run]
+or
+    for result in purge_stale_data(batch_size=500):
+        print(result.name, result.deleted, result.seconds)
+"""
+
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Cart, IdempotencyKey, Job
+
+CART_EMPTY_TTL = getattr(settings, 'CART_EMPTY_TTL', 24 * 3600)
+CART_ABANDON_DAYS = getattr(settings, 'CART_ABANDON_DAYS', 90)
+JOB_RETENTION_DAYS = getattr(settings, 'JOB_RETENTION_DAYS', 7)
+JOB_FAILED_RETENTION_DAYS = getattr(settings, 'JOB_FAILED_RETENTION_DAYS', 30)
+
+DB_SESSION_ENGINES = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+# deleted: rows of the target table (cascaded rows are not counted)
+# complete: False when the time budget ran out before the target was empty
+PurgeResult = namedtuple('PurgeResult', 'name deleted batches seconds complete')
+
+
+def stale_querysets(now=None):
+    """Return [(name, queryset)] of rows to purge, in purge order."""
+    now = now or timezone.now()
+    targets = []
+    if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+        from django.contrib.sessions.models import Session
+        targets.append(('sessions', Session.objects.filter(expire_date__lt=now)))
+
+    abandoned = now - timedelta(days=CART_ABANDON_DAYS)
+    inactive_users = get_user_model().objects.filter(
+        Q(last_login__lt=abandoned) | Q(last_login__isnull=True, date_joined__lt=abandoned)
+    )
+    targets += [
+        ('empty carts', Cart.objects.filter(items__isnull=True, created_at__lt=now - timedelta(seconds=CART_EMPTY_TTL))),
+        ('abandoned carts', Cart.objects.filter(user__in=inactive_users)),
+        ('idempotency keys', IdempotencyKey.objects.filter(expires_at__lt=now)),
+        ('jobs', Job.objects.filter(
+            Q(status=Job.DONE, finished_at__lt=now - timedelta(days=JOB_RETENTION_DAYS))
+            | Q(status=Job.FAILED, finished_at__lt=now - timedelta(days=JOB_FAILED_RETENTION_DAYS))
+        )),
+    ]
+    return targets
+
+
+def purge_queryset(queryset, batch_size=1000, pause=0.05, deadline=None):
+    """
+    Delete `queryset` in batches of primary keys. Returns (deleted, batches, complete).
+    deadline: time.monotonic() value after which no new batch is started.
+    """
+    model = queryset.model
+    label = model._meta.label
+    deleted = batches = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted, batches, False
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted, batches, True
+        # Re-apply the filter so rows that became active meanwhile are kept
+        with transaction.atomic(using=queryset.db):
+            _, per_model = queryset.filter(pk__in=ids).delete()
+        deleted += per_model.get(label, 0)
+        batches += 1
+        if len(ids) < batch_size:
+            return deleted, batches, True
+        if pause:
+            time.sleep(pause)
+
+
+def purge_cache_table(cache, batch_size=1000, pause=0.05, deadline=None):
+    """Batched delete of expired rows from a DatabaseCache table. Returns (deleted, batches, complete)."""
+    connection = connections[router.db_for_write(cache.cache_model_class)]
+    table = connection.ops.quote_name(cache._table)
+    deleted = batches = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted, batches, False
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE cache_key IN '
+                f'(SELECT cache_key FROM {table} WHERE expires < %s LIMIT %s)',
+                [connection.ops.adapt_datetimefield_value(timezone.now()), batch_size],
+            )
+            count = cursor.rowcount
+        deleted += count
+        batches += 1 if count else 0
+        if count < batch_size:
+            return deleted, batches, True
+        if pause:
+            time.sleep(pause)
+
+
+def purge_stale_data(batch_size=1000, pause=0.05, max_seconds=None, only=None, now=None):
+    """
+    Purge every stale target (see module docstring), yielding a PurgeResult per
+    target as it finishes. only: optional iterable of target names.
+    """
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    for name, queryset in stale_querysets(now):
+        if only and name not in only:
+            continue
+        start = time.monotonic()
+        deleted, batches, complete = purge_queryset(queryset, batch_size, pause, deadline)
+        yield PurgeResult(name, deleted, batches, time.monotonic() - start, complete)
+
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        name = f'cache:{alias}'
+        if not isinstance(cache, DatabaseCache) or (only and name not in only):
+            continue
+        start = time.monotonic()
+        deleted, batches, complete = purge_cache_table(cache, batch_size, pause, deadline)
+        yield PurgeResult(name, deleted, batches, time.monotonic() - start, complete)
+
+
+def count_stale_data(now=None):
+    """Return {name: rows that purge_stale_data() would delete} (database tables only)."""
+    return {name: queryset.count() for name, queryset in stale_querysets(now)}
@@ -0,0 +1,37 @@
+"""
+Management command: move cold orders into compressed archive segments in
+throttled batches (products/archive.py)
+
+    python manage.py archive_orders
+    python manage.py archive_orders --days 730 --batch-size 500 --max-seconds 600
+    python manage.py archive_orders --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.archive import ARCHIVE_AFTER_DAYS, archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Archive delivered/cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS into compressed segments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help=f'Archive orders placed more than this many days ago (default: {ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders per archive segment and transaction (default: 1000)')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between batches (default: 0.05)')
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop starting new batches after this long')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the orders that would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f"{archivable_orders(days=options['days']).count()} orders would be archived")
+            return
+
+        result = archive_orders(
+            batch_size=options['batch_size'], pause=options['sleep'],
+            max_seconds=options['max_seconds'], days=options['days'],
+        )
+        note = '' if result.complete else ' (time budget reached, run again to continue)'
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {result.orders} orders in {result.segments} segments, {result.seconds:.2f}s{note}'
+        ))
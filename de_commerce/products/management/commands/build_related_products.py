@@ -0,0 +1,25 @@
+"""
+Management command: rebuild "frequently bought together" recommendations (products/recommendations.py)
+
+    python manage.py build_related_products [--chunk-size 200000] [--top-k 10] [--min-orders 2]
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.recommendations import build_related_products
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related products of every product from order line co-occurrence.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200000, help='Order lines read per chunk (default: 200000)')
+        parser.add_argument('--top-k', type=int, default=None, help='Neighbours kept per product (default: RELATED_TOP_K)')
+        parser.add_argument('--min-orders', type=int, default=None, help='Orders two products must share (default: RELATED_MIN_ORDERS)')
+
+    def handle(self, *args, **options):
+        result = build_related_products(options['chunk_size'], options['top_k'], options['min_orders'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.rows} related products for {result.products} products from {result.lines} order lines '
+            f'in {result.seconds:.2f}s ({result.backend})'
+        ))
@@ -0,0 +1,49 @@
+"""
+Management command: move category subtrees in the department tree (products/category_tree.py)
+
+    python manage.py move_categories 7 9 --to 3        # categories 7 and 9 (with subcategories) under 3
+    python manage.py move_categories 7                 # category 7 to the top level
+    python manage.py move_categories --children-of 5 --to 3   # merge department 5's children into 3
+    python manage.py move_categories --rebuild         # recompute every path (after bulk imports)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.category_tree import move_categories, rebuild_paths, reparent_children
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Move categories and their subcategories under another category with set-based path updates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Categories to move')
+        parser.add_argument('--to', type=int, default=None, help='New parent category id (default: top level)')
+        parser.add_argument('--children-of', type=int, default=None, help='Move every child of this category instead')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute all paths from the parent links')
+
+    def get_category(self, pk):
+        try:
+            return Category.objects.get(pk=pk)
+        except Category.DoesNotExist:
+            raise CommandError(f'Category {pk} does not exist.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            orphans = rebuild_paths()
+            if orphans:
+                raise CommandError(f'{orphans} categories are part of a parent cycle and have no path.')
+            self.stdout.write(self.style.SUCCESS('Category paths rebuilt.'))
+            return
+
+        new_parent = self.get_category(options['to']) if options['to'] is not None else None
+        try:
+            if options['children_of'] is not None:
+                moved = reparent_children(self.get_category(options['children_of']), new_parent)
+            elif options['ids']:
+                moved = move_categories([self.get_category(pk) for pk in options['ids']], new_parent)
+            else:
+                raise CommandError('Give category ids, --children-of or --rebuild.')
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f'{moved} categories moved (including subcategories).'))
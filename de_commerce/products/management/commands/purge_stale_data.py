@@ -0,0 +1,45 @@
+"""
+Management command: purge expired sessions, empty/abandoned carts, expired
+idempotency keys and finished jobs in throttled batches (products/maintenance.py)
+
+    python manage.py purge_stale_data
+    python manage.py purge_stale_data --batch-size 500 --sleep 0.1 --max-seconds 120
+    python manage.py purge_stale_data --dry-run
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.maintenance import count_stale_data, purge_stale_data
+
+
+class Command(BaseCommand):
+    help = 'Delete stale sessions, carts, idempotency keys and finished jobs in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction (default: 1000)')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between batches (default: 0.05)')
+        parser.add_argument('--max-seconds', type=float, default=None, help='Stop starting new batches after this long')
+        parser.add_argument('--only', action='append', help="Purge only this target (repeatable), e.g. --only sessions")
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for name, count in count_stale_data().items():
+                if not options['only'] or name in options['only']:
+                    self.stdout.write(f'{name}: {count} rows would be deleted')
+            return
+
+        start = time.monotonic()
+        total = 0
+        for result in purge_stale_data(
+            batch_size=options['batch_size'], pause=options['sleep'],
+            max_seconds=options['max_seconds'], only=options['only'],
+        ):
+            total += result.deleted
+            note = '' if result.complete else ' (time budget reached, run again to continue)'
+            self.stdout.write(
+                f'{result.name}: {result.deleted} rows in {result.batches} batches, {result.seconds:.2f}s{note}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Removed {total} rows in {time.monotonic() - start:.2f}s'))
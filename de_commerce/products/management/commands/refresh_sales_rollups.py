@@ -0,0 +1,27 @@
+"""
+Management command: fold new order events into the sales rollup tables (products/reports.py)
+
+    python manage.py refresh_sales_rollups            # incremental, from the watermark
+    python manage.py refresh_sales_rollups --rebuild  # drop the rollups and start over
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.reports import rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the hourly/daily sales rollups from order events since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Order events per transaction (default: 5000)')
+        parser.add_argument('--lag', type=float, default=None, help='Skip events younger than this many seconds (default: ROLLUP_LAG)')
+        parser.add_argument('--rebuild', action='store_true', help='Delete the rollups and fold the whole event log again')
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        refresh = rebuild_rollups if options['rebuild'] else refresh_rollups
+        processed = refresh(batch_size=options['batch_size'], lag=options['lag'])
+        self.stdout.write(self.style.SUCCESS(f'Folded {processed} order events in {time.monotonic() - start:.2f}s'))
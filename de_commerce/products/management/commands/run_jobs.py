@@ -0,0 +1,36 @@
+"""
+Management command: run the background job worker (products/jobs.py)
+
+    python manage.py run_jobs                      # all queues, one job at a time
+    python manage.py run_jobs --queue default --concurrency 8
+    python manage.py run_jobs --burst              # exit once no job is due
+
+Stops after the running jobs finish on SIGINT/SIGTERM.
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from products.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (order confirmation emails, inventory events, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', help='Queue to serve (repeatable; default: all)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at the same time (default: 4)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle')
+        parser.add_argument('--burst', action='store_true', help='Exit when no job is due')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after this many jobs')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            queues=options['queues'], concurrency=options['concurrency'], poll_interval=options['poll_interval'],
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write(f'Worker {worker.worker_id} started (concurrency {worker.concurrency})')
+        worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {worker.processed} jobs ({worker.failed} failed)'))
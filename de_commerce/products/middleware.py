@@ -0,0 +1,98 @@
+"""
+Middleware Module
+
+CompressionMiddleware: content-negotiated response compression (brotli/gzip)
+
+API payloads (product lists, order histories) are large, repetitive JSON that
+compresses 5-10x. This middleware compresses non-streaming responses when:
+- the client accepts 'br' (and the optional `brotli` package is installed)
+  or 'gzip' in Accept-Encoding (q=0 entries are honoured as refusals)
+- the body is at least COMPRESSION_MIN_SIZE bytes (default 1024)
+- the Content-Type is textual (JSON, HTML, JS, CSS, plain text, SVG, XML)
+- the response has no Content-Encoding yet and compressing makes it smaller
+
+Streaming responses (file downloads, event streams) are passed through
+untouched so chunks are never buffered. Like Django's GZipMiddleware, gzip
+output carries random filename padding against BREACH-style length probes,
+and strong ETags are weakened.
+
+Settings:
+- COMPRESSION_MIN_SIZE: smallest body worth compressing (bytes)
+- COMPRESSION_BROTLI_QUALITY: brotli quality 0-11 (default 5, fast enough per request)
+"""
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml', 'text/',
+)
+
+
+def parse_accept_encoding(header):
+    """Return {coding: q} for an Accept-Encoding header value."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware(GZipMiddleware):
+    min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+    brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+    def choose_encoding(self, request):
+        """Pick 'br', 'gzip' or None from the request's Accept-Encoding."""
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = accepted.get('*', 0.0)
+        if brotli is not None and accepted.get('br', wildcard) > 0:
+            return 'br'
+        if accepted.get('gzip', wildcard) > 0:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+        else:
+            compressed_content = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        # Return the compressed content only if it's actually shorter.
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(compressed_content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.3 on 2026-10-19 07:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_alter_order_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.CreateModel(
+            name='PriceList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('exchange_rate', models.DecimalField(decimal_places=6, default=1, max_digits=12)),
+                ('priority', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('customers', models.ManyToManyField(blank=True, related_name='price_lists', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='price_list',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='products.pricelist'),
+        ),
+        migrations.CreateModel(
+            name='PriceListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='products.pricelist')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='list_prices', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('price_list', 'product'), name='unique_price_list_product')],
+            },
+        ),
+    ]
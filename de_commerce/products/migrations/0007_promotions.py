@@ -0,0 +1,46 @@
+# Generated by Django 6.0.3 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_price_lists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='coupon_code',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('percentage', 'Percentage off'), ('fixed', 'Fixed amount off per unit'), ('bogo', 'Buy X get Y free')], default='percentage', max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Percent (percentage) or amount per unit (fixed)', max_digits=10)),
+                ('buy_quantity', models.PositiveIntegerField(default=1, help_text='BOGO: units to buy')),
+                ('free_quantity', models.PositiveIntegerField(default=1, help_text='BOGO: units given free')),
+                ('coupon_code', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('categories', models.ManyToManyField(blank=True, related_name='promotions', to='products.category')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='products.product')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='products.promotion'),
+        ),
+    ]
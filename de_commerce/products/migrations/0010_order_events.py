@@ -0,0 +1,42 @@
+# Generated by Django 6.0.3 on 2026-10-19 07:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_events(apps, schema_editor):
+    """One event per existing order with its current status, so the feed starts complete."""
+    Order = apps.get_model('products', 'Order')
+    OrderEvent = apps.get_model('products', 'OrderEvent')
+    orders = Order.objects.order_by('id').values_list('id', 'user_id', 'status')
+    OrderEvent.objects.bulk_create(
+        [OrderEvent(order_id=pk, user_id=user_id, to_status=status) for pk, user_id, status in orders],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='products.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='orderevent_user_cursor_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_order_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.3 on 2026-10-19 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    """Existing categories are all top-level: their path is their own segment."""
+    Category = apps.get_model('products', 'Category')
+    for pk in Category.objects.values_list('id', flat=True):
+        Category.objects.filter(pk=pk).update(path=f'{pk:08d}/', depth=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_related_products'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'verbose_name_plural': 'categories'},
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='products.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('parent', 'name'), name='unique_category_name_per_parent'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('parent__isnull', True)), fields=('name',), name='unique_root_category_name'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.3 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-view_count', 'id'], name='product_most_viewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-popularity', 'id'], name='product_trending_idx'),
+        ),
+    ]
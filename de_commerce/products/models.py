@@ -4,39 +4,105 @@ Product Models Module
 This module defines database models for the e-commerce application including:
 - Category: Product categories for organization
 - Product: Individual products for sale
+- ProductVariant: Sellable SKU of a product (size/colour/... options, own price and stock)
 - Cart: Shopping cart per user (one-to-one relationship)
 - CartItem: Individual items in a cart
 - Order: Customer orders with status tracking
 - OrderItem: Individual items in an order
+- PriceList: Customer-specific price list in its own currency (B2B segments)
+- PriceListItem: Explicit price of one product in a price list
+- Promotion: Discount rule (percentage, fixed, BOGO), optionally behind a coupon code
+- IdempotencyKey: Stored checkout response for an Idempotency-Key header
+- OrderEvent: Append-only log of order status transitions (change feed)
+- SalesRollup: Pre-aggregated hourly/daily sales totals for reporting
+- RollupWatermark: Last OrderEvent folded into the sales rollups
+- CacheVersion: Version of a cache namespace shared by every process (prices, promotions)
+- RelatedProduct: Precomputed "frequently bought together" neighbours of a product
+- Job: Background job (post-checkout emails, inventory events) run by the job worker
+- OrderArchiveSegment: Compressed batch of archived (cold) orders, append-only
+- ArchivedOrder: Index entry locating one archived order in its segment
 
 All models use Django ORM and are used by Django Rest Framework serializers
 to create API endpoints for both authenticated and unauthenticated users.
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+
+# Currency of Product.price and of orders placed without a price list
+DEFAULT_CURRENCY = getattr(settings, 'DEFAULT_CURRENCY', 'USD')
 
 
 class Category(models.Model):
     """
-    Category Model: Represents product categories
+    Category Model: Represents product categories, nested into a tree of departments
+    (e.g. Electronics > Laptops > Business)
     
     Fields:
-    - name: Unique category name (max 100 chars)
+    - name: Category name (max 100 chars), unique among its siblings
     - description: Optional category description (TextField)
+    - parent: Parent category (null for top-level departments)
+    - path: Materialized path, the zero-padded ids of the ancestors and of the
+      category itself, e.g. '00000001/00000004/' (see category_tree.py)
+    - depth: Number of ancestors (0 for top-level departments)
     
     Methods:
     - __str__: Returns the category name for admin display and string representation
+    - clean(): Rejects a parent that is the category itself or one of its descendants
+    - save(): Maintains path/depth; changing parent moves the whole subtree with one
+      set-based UPDATE (category_tree.move_subtree)
+    
+    A category and all its descendants are the rows whose path starts with its
+    path: one prefix match on the path index (category_tree.subtree_filter).
     
     Usage: Categories are used to organize products. Retrieved via GET /api/categories/
     which is accessible without authentication (AllowAny permission).
     """
-    name = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
+
+    class Meta:
+        verbose_name_plural = 'categories'
+        constraints = [
+            models.UniqueConstraint(fields=['parent', 'name'], name='unique_category_name_per_parent'),
+            models.UniqueConstraint(fields=['name'], condition=models.Q(parent__isnull=True), name='unique_root_category_name'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'parent_id' in instance.__dict__:  # not deferred
+            instance._saved_parent_id = instance.parent_id
+        return instance
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            from django.core.exceptions import ValidationError
+            from .category_tree import is_in_subtree
+            if is_in_subtree(self.parent, self):
+                raise ValidationError({'parent': 'A category cannot be moved under itself or one of its descendants.'})
+
+    def save(self, *args, **kwargs):
+        from .category_tree import move_subtree, set_path
+        moved = self.pk is not None and self.parent_id != getattr(self, '_saved_parent_id', self.parent_id)
+        if moved:
+            with transaction.atomic(using=kwargs.get('using')):
+                super().save(*args, **kwargs)
+                move_subtree(self, self.parent)
+        else:
+            super().save(*args, **kwargs)
+            if not self.path:
+                set_path(self)
+        self._saved_parent_id = self.parent_id
+
 
 
 class Product(models.Model):
@@ -49,6 +115,8 @@ class Product(models.Model):
     - price: Product price as decimal (max 10 digits, 2 decimal places)
     - category: ForeignKey reference to Category model (creates many-to-one relationship)
     - image: Optional image file uploaded to 'product_images/' directory
+    - view_count: All-time detail page views (buffered, see popularity.py)
+    - popularity: Time-decayed views in log space, for ?sort=trending (popularity.py)
     
     Methods:
     - __str__: Returns the product name for admin display
@@ -70,6 +138,15 @@ class Product(models.Model):
     more_description = models.TextField(blank=True, help_text="Additional detailed description for the product")
     specifications = models.TextField(blank=True, help_text="Product specifications and technical details")
     stock_status = models.CharField(max_length=100, blank=True, help_text="Current stock availability status (e.g., 'In Stock', 'Out of Stock', 'Limited Stock')")
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+    popularity = models.FloatField(default=0.0, editable=False)
+
+    class Meta:
+        indexes = [
+            # ?sort=most_viewed and ?sort=trending of the product list (popularity.py)
+            models.Index(fields=['-view_count', 'id'], name='product_most_viewed_idx'),
+            models.Index(fields=['-popularity', 'id'], name='product_trending_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,6 +161,57 @@ class Product(models.Model):
 
 
 
+class ProductVariant(models.Model):
+    """
+    ProductVariant Model: One sellable SKU of a product (e.g. "Black / 16GB")
+
+    A product with active variants is sold through them: cart and order lines
+    reference the variant, and its own stock replaces Product.stock_status.
+    Products without variants are sold as before.
+
+    Fields:
+    - product: ForeignKey to Product (related_name='variants')
+    - sku: Unique stock keeping unit code
+    - options: Option axes of this variant, e.g. {"colour": "Black", "ram": "16GB"}
+    - price: Price in DEFAULT_CURRENCY; null to sell at the product's price
+    - stock: Units available, decremented at checkout
+    - is_active: Inactive variants are hidden and cannot be ordered
+
+    API Access (NO LOGIN REQUIRED):
+    - GET /api/products/{id}/: 'options' axes and active 'variants'
+    - GET /api/products/: 'min_price', 'max_price' and 'in_stock' per product,
+      annotated in the list query (see variants.py)
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
+    sku = models.CharField(max_length=64, unique=True)
+    options = models.JSONField(default=dict, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Leave empty to use the product's price")
+    stock = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Per-product availability subqueries of the product list (variants.py)
+            models.Index(fields=['product', 'is_active'], name='variant_product_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} ({self.option_label()})" if self.options else self.sku
+
+    def option_label(self):
+        """Return the options as "Black / 16GB" (axis order as stored)."""
+        return ' / '.join(str(value) for value in self.options.values())
+
+    def get_price(self):
+        """Return the variant's price, falling back to the product's."""
+        return self.price if self.price is not None else self.product.price
+
+    @property
+    def in_stock(self):
+        return self.is_active and self.stock > 0
+
+
+
 class Cart(models.Model):
     """
     Cart Model: Represents a shopping cart (one per authenticated user)
@@ -98,7 +226,8 @@ class Cart(models.Model):
     Methods:
     - __str__: Returns cart owner's username
     - total_items(): Calculates sum of all item quantities in the cart (int)
-    - total_price(): Calculates total monetary value of all items in cart (Decimal)
+    - total_price(price_book=None): Calculates total monetary value of all items in cart (Decimal),
+      in the customer's price list when a pricing.PriceBook is given
     
     API Access (REQUIRES LOGIN - IsAuthenticated):
     - GET /api/carts/: Retrieve current user's cart only (filtered by user in viewset)
@@ -118,9 +247,12 @@ class Cart(models.Model):
         """Return the total number of items in the cart."""
         return sum(item.quantity for item in self.items.all())
 
-    def total_price(self):
-        """Return the total price of all items in the cart."""
-        return sum(item.product.price * item.quantity for item in self.items.select_related('product').all())
+    def total_price(self, price_book=None):
+        """Return the total price of all items in the cart (base prices unless a PriceBook is given)."""
+        items = self.items.select_related('product', 'variant').all()
+        if price_book is None:
+            return sum(item.get_total_price() for item in items)
+        return sum(price_book.price(item.product, item.variant) * item.quantity for item in items)
 
 
 class CartItem(models.Model):
@@ -130,11 +262,13 @@ class CartItem(models.Model):
     Fields:
     - cart: ForeignKey to Cart (many-to-one, allows multiple items per cart)
     - product: ForeignKey to Product (the product being added)
+    - variant: ProductVariant chosen (null for products sold without variants)
     - quantity: Positive integer representing how many units of this product (default=1)
     
     Methods:
     - __str__: Returns formatted string "X x ProductName"
-    - get_total_price(): Calculates line total for this item (product.price * quantity)
+    - get_unit_price(): Base unit price (variant price, else product price)
+    - get_total_price(): Calculates line total for this item (unit price * quantity)
     
     API Access (REQUIRES LOGIN - IsAuthenticated):
     - Items accessed through /api/carts/ endpoint
@@ -147,6 +281,7 @@ class CartItem(models.Model):
     """
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
     quantity = models.PositiveIntegerField(default=1)
 
     def __str__(self):
@@ -154,7 +289,11 @@ class CartItem(models.Model):
 
     def get_total_price(self):
         """Return the total price for this cart item."""
-        return self.product.price * self.quantity
+        return self.get_unit_price() * self.quantity
+
+    def get_unit_price(self):
+        """Return the base price of one unit (the variant's when the line has one)."""
+        return self.variant.get_price() if self.variant_id else self.product.price
 
 
 class Order(models.Model):
@@ -175,6 +314,9 @@ class Order(models.Model):
     - shipping_address: Text field for delivery address
     - phone_number: Contact phone number (max 15 chars)
     - payment_method: Choice field for payment type (Credit Card or PayPal)
+    - currency: Currency of the item prices (ISO 4217 code)
+    - price_list: PriceList the item prices were resolved from (null = base prices)
+    - coupon_code: Coupon code redeemed at checkout (blank = none)
     
     Related Items:
     - items: Reverse relation to OrderItem via ForeignKey
@@ -182,7 +324,9 @@ class Order(models.Model):
     Methods:
     - __str__: Returns formatted string "Order {id} by {username}"
     - total_items(): Calculates total quantity of items ordered (int)
-    - total_price(): Calculates total order amount (Decimal)
+    - total_price(): Calculates total order amount after discounts (Decimal)
+    - save(): Also records an OrderEvent for every status transition
+      (queryset.update(status=...) bypasses this and must not be used for status changes)
     
     API Access (REQUIRES LOGIN - IsAuthenticated):
     - GET /api/orders/: List all orders for authenticated user only (filtered in viewset)
@@ -214,17 +358,39 @@ class Order(models.Model):
         choices=[('Credit Card', 'Credit Card'), ('PayPal', 'PayPal')],
         default='Credit Card'  # Default value for existing rows
     )  # New field for payment method
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+    price_list = models.ForeignKey('PriceList', on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    coupon_code = models.CharField(max_length=50, blank=True)
 
     def __str__(self):
         return f"Order {self.id} by {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save the order and append an OrderEvent when the status changed (or the order is new)."""
+        previous = getattr(self, '_saved_status', None)
+        update_fields = kwargs.get('update_fields')
+        if self.status == previous or (update_fields is not None and 'status' not in update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            OrderEvent.objects.using(self._state.db).create(
+                order=self, user_id=self.user_id, from_status=previous or '', to_status=self.status,
+            )
+        self._saved_status = self.status
+
     def total_items(self):
         """Return the total number of items in the order."""
         return sum(item.quantity for item in self.items.all())
 
     def total_price(self):
-        """Return the total price of the order."""
-        return sum(item.price * item.quantity for item in self.items.all())
+        """Return the total price of the order (after line discounts)."""
+        return sum(item.get_total_price() for item in self.items.all())
 
 class OrderItem(models.Model):
     """
@@ -236,12 +402,16 @@ class OrderItem(models.Model):
     Fields:
     - order: ForeignKey to Order (many-to-one, allows multiple items per order)
     - product: ForeignKey to Product (stores which product was ordered)
+    - variant: ProductVariant ordered (null without variants or once the variant is deleted)
+    - sku: Variant SKU at the time of order (kept when the variant is deleted)
     - quantity: Positive integer of units ordered
     - price: Decimal field storing the PRICE AT TIME OF ORDER (crucial for historical accuracy)
+    - discount: Total discount on the line from a promotion (0 when none applied)
+    - promotion: Promotion that produced the discount (null when none or since deleted)
     
     Methods:
     - __str__: Returns formatted string "{quantity} x {product_name} (Order {order_id})"
-    - get_total_price(): Calculates line total (price * quantity), uses stored price not current price
+    - get_total_price(): Calculates line total (price * quantity - discount), uses stored price not current price
     
     Important Note:
     The 'price' field stores the product price AT THE TIME THE ORDER WAS PLACED.
@@ -255,14 +425,416 @@ class OrderItem(models.Model):
     """
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
+    sku = models.CharField(max_length=64, blank=True)  # variant SKU at time of order
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)  # price at time of order
-
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    promotion = models.ForeignKey('Promotion', on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Order {self.order.id})"
 
     def get_total_price(self):
-        """Return the total price for this order item."""
-        return self.price * self.quantity
+        """Return the total price for this order item (after discount)."""
+        return self.price * self.quantity - self.discount
+
+
+class PriceList(models.Model):
+    """
+    PriceList Model: Customer-specific prices in a given currency (B2B segments)
+
+    Customers without a price list pay Product.price in DEFAULT_CURRENCY.
+    Customers assigned to one or more active price lists pay the prices of the
+    list with the highest priority.
+
+    Fields:
+    - name: Unique price list name (max 100 chars)
+    - currency: ISO 4217 currency code of every price in the list
+    - exchange_rate: Multiplier applied to Product.price for products without
+      an explicit PriceListItem (e.g. 0.92 for a EUR list over USD base prices)
+    - priority: Higher wins when a customer belongs to several lists
+    - is_active: Inactive lists are ignored
+    - customers: Users who buy at this list's prices
+
+    Related Items:
+    - items: Reverse relation to PriceListItem (explicit per-product prices)
+
+    Prices are resolved in bulk and cached by pricing.PriceBook; saving a
+    list, its items or its customers invalidates the cache (see signals.py).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+    exchange_rate = models.DecimalField(max_digits=12, decimal_places=6, default=1)
+    priority = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    customers = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=True, related_name='price_lists')
+
+    def __str__(self):
+        return f"{self.name} ({self.currency})"
+
+
+class PriceListItem(models.Model):
+    """
+    PriceListItem Model: Explicit price of one product in a price list
+
+    Fields:
+    - price_list: ForeignKey to PriceList
+    - product: ForeignKey to Product
+    - price: Price in the list's currency (overrides Product.price * exchange_rate)
+
+    One row per (price_list, product).
+    """
+    price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='list_prices')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['price_list', 'product'], name='unique_price_list_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.price} {self.price_list.currency}"
+
+
+class Promotion(models.Model):
+    """
+    Promotion Model: A discount rule applied to cart lines
+
+    KIND_CHOICES:
+    - 'percentage': value percent off the line
+    - 'fixed': value off each unit (capped at the unit price), in the
+      customer's currency
+    - 'bogo': buy buy_quantity, get free_quantity free (cheapest units are
+      the free ones; units of the same line)
+
+    Fields:
+    - name: Display name shown with the discount
+    - kind / value / buy_quantity / free_quantity: see KIND_CHOICES
+    - products / categories: Lines the promotion applies to. A category
+      promotion covers every product in the category. With neither set,
+      the promotion applies to every product (sitewide).
+    - coupon_code: When set, the promotion only applies if the customer
+      enters this code (case-insensitive)
+    - starts_at / ends_at: Optional validity window
+    - is_active: Inactive promotions are ignored
+
+    Each line gets the single best promotion available to it (no stacking).
+    Active promotions are compiled into an in-memory index by promotions.py;
+    saving a promotion refreshes it (see signals.py).
+    """
+    KIND_CHOICES = [
+        ('percentage', 'Percentage off'),
+        ('fixed', 'Fixed amount off per unit'),
+        ('bogo', 'Buy X get Y free'),
+    ]
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='percentage')
+    value = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Percent (percentage) or amount per unit (fixed)')
+    buy_quantity = models.PositiveIntegerField(default=1, help_text='BOGO: units to buy')
+    free_quantity = models.PositiveIntegerField(default=1, help_text='BOGO: units given free')
+    products = models.ManyToManyField(Product, blank=True, related_name='promotions')
+    categories = models.ManyToManyField(Category, blank=True, related_name='promotions')
+    coupon_code = models.CharField(max_length=50, blank=True, db_index=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.coupon_code = self.coupon_code.strip().upper()
+        super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """
+    IdempotencyKey Model: One checkout request identified by an Idempotency-Key header
+
+    Fields:
+    - user: The customer who sent the key (keys are scoped per user)
+    - key: Client-chosen key (max 255 chars)
+    - fingerprint: SHA-256 of the request method, path and body; a reused key
+      with a different body is rejected
+    - status_code: Stored response status (null while the first request is running)
+    - response: Stored response body, zlib-compressed JSON
+    - created_at: When the first request claimed the key
+    - expires_at: After this the key may be reused (IDEMPOTENCY_KEY_TTL)
+
+    See idempotency.py.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
+
+
+class OrderEvent(models.Model):
+    """
+    OrderEvent Model: One order status transition (append-only)
+
+    Written by Order.save() in the same transaction as the status change,
+    including the creation of the order (from_status ''). Rows are never
+    updated; the auto-increment id is the change-feed cursor.
+
+    Fields:
+    - order: The order whose status changed
+    - user: The order's customer (denormalized so per-user feeds need no join)
+    - from_status / to_status: Status before and after the transition
+    - created_at: When the transition was saved
 
+    API Access (REQUIRES LOGIN - IsAuthenticated):
+    - GET /api/orders/events/?after=<id>: Events after the cursor, oldest
+      first (own orders; staff users see every order)
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Per-customer feed: WHERE user_id = ? AND id > ? ORDER BY id
+            models.Index(fields=['user', 'id'], name='orderevent_user_cursor_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class SalesRollup(models.Model):
+    """
+    SalesRollup Model: Sales totals for one period and one combination of dimensions
+
+    Maintained incrementally from the order event log by reports.refresh_rollups();
+    reporting reads only this table, never OrderItem/Order.
+
+    Dimensions (unique together):
+    - granularity: 'hour' or 'day'
+    - period_start: Start of the hour/day (in TIME_ZONE) the order was placed in
+    - product / category: What was sold (category at the time it was rolled up)
+    - status: Current status of the orders counted here
+    - payment_method / currency: From the order
+
+    Measures:
+    - lines: Number of order lines
+    - quantity: Units sold
+    - gross: Sum of price * quantity
+    - discount: Sum of line discounts (revenue = gross - discount)
+    """
+    HOUR, DAY = 'hour', 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    period_start = models.DateTimeField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    payment_method = models.CharField(max_length=50)
+    currency = models.CharField(max_length=3)
+    lines = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'period_start', 'product', 'category', 'status', 'payment_method', 'currency'],
+                name='unique_sales_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            # Reports filter by granularity and a period range
+            models.Index(fields=['granularity', 'period_start'], name='salesrollup_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.period_start:%Y-%m-%d %H:00} product {self.product_id} ({self.status})"
+
+    @property
+    def revenue(self):
+        return self.gross - self.discount
+
+
+class RollupWatermark(models.Model):
+    """
+    RollupWatermark Model: Progress of an incremental rollup
+
+    Fields:
+    - name: Rollup name (e.g. 'sales')
+    - last_event_id: Highest OrderEvent id already folded into the rollup
+    - updated_at: Time of the last refresh
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ event {self.last_event_id}"
+
+
+class CacheVersion(models.Model):
+    """
+    CacheVersion Model: Version of a cache namespace kept in the database
+
+    The default cache is per process, so a version bumped there is only seen
+    by the process that bumped it. Namespaces every process must see change
+    at once (prices, promotions) keep their version here instead; see
+    catalog_cache.get_shared_version().
+
+    Fields:
+    - namespace: Cache namespace (e.g. 'pricing')
+    - version: Incremented on every change to the namespace's data
+    """
+    namespace = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
+
+
+class RelatedProduct(models.Model):
+    """
+    RelatedProduct Model: One "frequently bought together" neighbour of a product
+
+    Rebuilt offline by recommendations.build_related_products() from OrderItem
+    co-occurrence (python manage.py build_related_products); never written by requests.
+
+    Fields:
+    - product: Product the recommendation is shown on
+    - related: Product bought together with it
+    - rank: 0 for the strongest neighbour, then 1, 2, ... (top-K per product)
+    - score: Number of orders containing both products
+
+    API Access (NO LOGIN REQUIRED):
+    - GET /api/products/{id}/related/: neighbours in rank order, one indexed lookup
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index /api/products/{id}/related/ reads through
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_related_product_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank}, {self.score} orders)"
+
+
+class Job(models.Model):
+    """
+    Job Model: One unit of background work, run by the job worker (jobs.py)
+
+    STATUS_CHOICES:
+    - 'pending': Waiting to run (at or after run_at)
+    - 'running': Claimed by a worker
+    - 'done': Finished successfully
+    - 'failed': Raised on its last allowed attempt
+
+    Fields:
+    - task: Registered task name (e.g. 'orders.send_confirmation')
+    - payload: JSON keyword arguments for the task
+    - queue: Queue name; workers can be limited to some queues
+    - priority: Higher runs first among jobs that are due
+    - run_at: Earliest time the job may run (scheduled jobs, retry backoff)
+    - attempts / max_attempts: Runs so far and the retry limit
+    - locked_by / locked_at: Worker that claimed the job and when
+    - last_error: Traceback of the most recent failure
+    - created_at / finished_at: Enqueue and completion timestamps
+
+    Managed with: python manage.py run_jobs
+    """
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due jobs of their queues in this order
+            models.Index(fields=['status', 'queue', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class OrderArchiveSegment(models.Model):
+    """
+    OrderArchiveSegment Model: One batch of cold orders moved out of the order tables
+
+    Written once by archive.archive_orders() and never updated.
+
+    Fields:
+    - data: zlib-compressed JSON Lines, one order (with its items and status
+      events) per line, in order id order
+    - order_count: Orders in the segment
+    - first_order_id / last_order_id: Range of archived order ids
+    - created_at: When the batch was archived
+    """
+    data = models.BinaryField()
+    order_count = models.PositiveIntegerField()
+    first_order_id = models.BigIntegerField()
+    last_order_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Segment {self.id}: orders {self.first_order_id}-{self.last_order_id} ({self.order_count})"
+
+
+class ArchivedOrder(models.Model):
+    """
+    ArchivedOrder Model: Where an archived order lives (index into OrderArchiveSegment)
+
+    Fields:
+    - order_id: Id the order had in the order table (primary key)
+    - user: The order's customer
+    - segment / position: Segment holding the order and its line number there
+    - status / created_at: Copied from the order for listing without decompressing
+
+    API Access (REQUIRES LOGIN - IsAuthenticated):
+    - GET /api/orders/{id}/ falls back to the archive when the order is not
+      in the order table (own orders only, see archive.py)
+    """
+    order_id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    segment = models.ForeignKey(OrderArchiveSegment, on_delete=models.PROTECT, related_name='orders')
+    position = models.PositiveIntegerField()
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived order {self.order_id} (segment {self.segment_id})"
@@ -0,0 +1,112 @@
+"""
+Normalization Module - ?shape=normalized Response Mode
+
+By default every cart/order line embeds a full ProductSerializer (with
+description, more_description, specifications and a nested category), so a
+20-line cart repeats 20 product bodies the cart page never shows.
+
+With ?shape=normalized the same endpoints return lines that reference
+products by id, plus side tables holding each entity once:
+
+    {
+        ...payload...,                      # lines: {'product': 5, 'quantity': 2, ...}
+        'products': {5: {'id': 5, 'name': ..., 'price': ..., 'image': ...,
+                         'stock_status': ..., 'category': 2}, ...},
+        'categories': {2: {'id': 2, 'name': ...}, ...},
+    }
+
+List endpoints wrap their results: {'results': [...], 'products': ..., 'categories': ...}.
+Product rows carry only the fields a cart/order row displays
+(NormalizedProductSerializer) and the long text columns are not even
+loaded from the database.
+
+Supported on:
+- GET /api/carts/, /api/carts/{id}/ (CartViewSet)
+- GET /api/orders/, /api/orders/{id}/ (OrderViewSet)
+- GET /api/me/ and GET /api/session-cart/ (sync and async views)
+
+Any other value of ?shape (or none) returns the default nested shape.
+"""
+
+from django.db.models import Prefetch
+from rest_framework.response import Response
+
+from .models import Product
+from .serializers import CategorySummarySerializer, NormalizedProductSerializer
+
+SHAPE_NORMALIZED = 'normalized'
+
+# Columns NormalizedProductSerializer never reads
+DEFERRED_PRODUCT_FIELDS = ('description', 'more_description', 'specifications')
+
+
+def is_normalized(request):
+    """True when the request asked for ?shape=normalized (DRF or plain Django request)."""
+    return request.GET.get('shape') == SHAPE_NORMALIZED
+
+
+def product_queryset():
+    """Products with their category, without the long text columns."""
+    return Product.objects.select_related('category').defer(*DEFERRED_PRODUCT_FIELDS)
+
+
+def line_items_prefetch(item_model):
+    """Prefetch for a Cart/Order 'items' relation that loads only what the side tables need."""
+    deferred = ['product__' + name for name in DEFERRED_PRODUCT_FIELDS]
+    return Prefetch('items', queryset=item_model.objects.select_related('product__category', 'variant').defer(*deferred))
+
+
+def side_tables(products, context=None):
+    """Return {'products': {id: row}, 'categories': {id: row}} for the distinct `products`."""
+    unique = list({product.id: product for product in products}.values())
+    categories = list({product.category_id: product.category for product in unique}.values())
+    return {
+        'products': {row['id']: row for row in NormalizedProductSerializer(unique, many=True, context=context).data},
+        'categories': {row['id']: row for row in CategorySummarySerializer(categories, many=True, context=context).data},
+    }
+
+
+def normalized(payload, products, context=None):
+    """Add side tables for `products` to the dict `payload` and return it."""
+    payload.update(side_tables(products, context))
+    return payload
+
+
+class NormalizedShapeMixin:
+    """
+    ViewSet mixin adding ?shape=normalized to list() and retrieve().
+
+    Set `normalized_serializer_class` (lines reference products by id) and
+    `line_item_model` (the model behind the instance's 'items' relation).
+    """
+    normalized_serializer_class = None
+    line_item_model = None
+
+    def filter_queryset(self, queryset):
+        # Not get_queryset(): viewsets override that to scope rows to the user
+        queryset = super().filter_queryset(queryset)
+        if is_normalized(self.request):
+            queryset = queryset.prefetch_related(None).prefetch_related(line_items_prefetch(self.line_item_model))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and is_normalized(self.request):
+            return self.normalized_serializer_class
+        return super().get_serializer_class()
+
+    def line_products(self, instances):
+        return [item.product for instance in instances for item in instance.items.all()]
+
+    def list(self, request, *args, **kwargs):
+        if not is_normalized(request):
+            return super().list(request, *args, **kwargs)
+        instances = list(self.filter_queryset(self.get_queryset()))
+        data = {'results': self.get_serializer(instances, many=True).data}
+        return Response(normalized(data, self.line_products(instances), self.get_serializer_context()))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not is_normalized(request):
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        data = dict(self.get_serializer(instance).data)
+        return Response(normalized(data, self.line_products([instance]), self.get_serializer_context()))
@@ -0,0 +1,155 @@
+"""
+Popularity Module - Buffered Product View Counters and Trending Scores
+
+GET /api/products/?sort=most_viewed and ?sort=trending order the catalog by
+product views. Writing a row on every GET /api/products/{id}/ (and
+/api/products/{id}/page/) would turn the busiest read endpoints into a write
+hotspot, so views are buffered in process:
+
+- view_counter.record(product_id) adds to an in-memory {product_id: views}
+  counter (a lock and a dict update, no query)
+- once VIEW_FLUSH_INTERVAL seconds (10) have passed since the last flush, or
+  VIEW_FLUSH_MAX_PRODUCTS (5000) distinct products are pending, the request
+  that notices it flushes the buffer: one UPDATE ... CASE per
+  VIEW_FLUSH_BATCH (500) products, whatever the number of views
+- a failed flush keeps its views for the next one
+
+Each process (gunicorn worker) has its own buffer; gunicorn.conf.py flushes it
+when a worker exits. Views recorded since the last flush are lost when a
+process is killed, so counts are approximate by design.
+
+Columns (Product, both indexed for sorting):
+- view_count: all-time views ('most_viewed')
+- popularity: time-decayed views ('trending'). A view counts for half as
+  much after POPULARITY_HALF_LIFE seconds (one day), a quarter after two...
+  The score is stored in log space relative to a fixed epoch,
+
+      popularity = ln(sum of 2 ** ((viewed_at - POPULARITY_EPOCH) / half-life))
+
+  so adding views is a log-add-exp in the UPDATE and every row stays
+  comparable without re-decaying products nobody views any more. Changing
+  POPULARITY_HALF_LIFE rescales new views only; reset the column after.
+
+The writes use QuerySet.update(), so they send no signals and do not
+invalidate cached catalog data (catalog_cache.py).
+
+Usage:
+    view_counter.record(product.id)
+    view_counter.flush()                            # e.g. at shutdown
+    products = sort_products(Product.objects.all(), 'trending')
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import BigIntegerField, Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VIEW_FLUSH_INTERVAL = getattr(settings, 'VIEW_FLUSH_INTERVAL', 10)
+VIEW_FLUSH_MAX_PRODUCTS = getattr(settings, 'VIEW_FLUSH_MAX_PRODUCTS', 5000)
+VIEW_FLUSH_BATCH = getattr(settings, 'VIEW_FLUSH_BATCH', 500)
+POPULARITY_HALF_LIFE = getattr(settings, 'POPULARITY_HALF_LIFE', 24 * 3600)
+POPULARITY_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+# ?sort= values of the product list: ordering (ties by id)
+SORTS = {
+    'most_viewed': ('-view_count', 'id'),
+    'trending': ('-popularity', 'id'),
+}
+
+
+class SortError(ValueError):
+    """Unknown ?sort= value (returned to API clients as 400)."""
+
+
+def sort_products(queryset, sort):
+    """Order a Product queryset by a SORTS key (unchanged for an empty one). Raises SortError."""
+    if not sort:
+        return queryset
+    if sort not in SORTS:
+        raise SortError(f"Unknown sort: {sort}. Choose from {', '.join(SORTS)}.")
+    return queryset.order_by(*SORTS[sort])
+
+
+def popularity_boost(views, at):
+    """Log-space popularity of `views` views at time `at` (see module docstring)."""
+    return math.log(views) + (at - POPULARITY_EPOCH).total_seconds() / POPULARITY_HALF_LIFE * math.log(2)
+
+
+def _logaddexp(a, b):
+    # ln(e**a + e**b) without overflow
+    return Greatest(a, b) + Ln(Value(1.0) + Exp(-Abs(a - b)))
+
+
+def write_views(counts, now=None):
+    """Add {product_id: views} to view_count and popularity, one UPDATE per VIEW_FLUSH_BATCH products. Returns rows updated."""
+    now = now or timezone.now()
+    product_ids = sorted(counts)
+    updated = 0
+    for start in range(0, len(product_ids), VIEW_FLUSH_BATCH):
+        batch = product_ids[start:start + VIEW_FLUSH_BATCH]
+        views = Case(*(When(pk=pk, then=Value(counts[pk])) for pk in batch), output_field=BigIntegerField())
+        boost = Case(*(When(pk=pk, then=Value(popularity_boost(counts[pk], now))) for pk in batch), output_field=FloatField())
+        updated += Product.objects.filter(pk__in=batch).update(
+            view_count=F('view_count') + views, popularity=_logaddexp(F('popularity'), boost),
+        )
+    return updated
+
+
+class ViewCounter:
+    """In-process buffer of product views, written in batches (see module docstring). Thread-safe."""
+
+    def __init__(self, interval=None, max_products=None):
+        self.interval = VIEW_FLUSH_INTERVAL if interval is None else interval
+        self.max_products = VIEW_FLUSH_MAX_PRODUCTS if max_products is None else max_products
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._last_flush = time.monotonic()
+
+    def record(self, product_id, views=1):
+        """Count `views` views of a product; flushes the buffer when it is due."""
+        with self._lock:
+            self._counts[product_id] += views
+            due = len(self._counts) >= self.max_products or time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def pending(self):
+        """Views recorded and not written yet."""
+        with self._lock:
+            return sum(self._counts.values())
+
+    def clear(self):
+        """Drop the pending views and restart the flush interval."""
+        with self._lock:
+            self._counts = Counter()
+            self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write the pending views. Returns the number of products updated."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return 0
+        try:
+            return write_views(counts)
+        except DatabaseError:
+            logger.warning('Writing %d product views failed; kept for the next flush', sum(counts.values()), exc_info=True)
+            with self._lock:
+                self._counts.update(counts)
+            return 0
+
+
+view_counter = ViewCounter()
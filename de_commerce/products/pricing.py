@@ -0,0 +1,151 @@
+"""
+Pricing Module - Price Lists and Multi-Currency Price Resolution
+
+Product.price is the base price in DEFAULT_CURRENCY. B2B customers can be
+assigned to a PriceList (its own currency, explicit per-product prices and an
+exchange rate for everything else). Resolution never joins per product:
+
+- get_price_list(user): the customer's active list with the highest priority
+  (None for anonymous users and customers without a list). Cached per user.
+- PriceBook(price_list): resolves prices for any number of products. The
+  list's explicit prices are loaded as one {product_id: price} map (a single
+  query) and cached per price list; every lookup after that is a dict access.
+
+      book = get_price_book(request.user)
+      prices = book.prices(products)        # {product_id: Decimal}
+
+A product without an explicit price costs Product.price * exchange_rate,
+rounded half-up to cents. A ProductVariant with its own price costs that
+price * exchange_rate; one without costs what its product costs.
+
+Invalidation: the 'pricing' cache namespace is versioned with a shared
+version (catalog_cache.get_shared_version(), a CacheVersion row on the
+primary), read once per get_price_book(), so a price change reaches every
+process on its next request rather than when its cache entries expire.
+Saving or deleting a PriceList or PriceListItem, or changing a list's
+customers, bumps the version in the same transaction (signals.py).
+Product.price is read from the product instance itself, so base price changes
+never need invalidation. QuerySet.update()/bulk_create() send no signals;
+call bump_pricing_version() after bulk price imports.
+
+Checkout stores the resolved snapshot: OrderItem.price holds the customer's
+price and Order.currency/Order.price_list record where it came from.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog_cache import bump_shared_version, get_shared_version, versioned_cache_key
+from .models import DEFAULT_CURRENCY, PriceList, PriceListItem
+
+PRICING_NAMESPACE = 'pricing'
+PRICING_CACHE_TIMEOUT = getattr(settings, 'PRICING_CACHE_TIMEOUT', 3600)
+CENT = Decimal('0.01')
+NO_PRICE_LIST = 0  # cached marker for "customer has no price list"
+
+
+def bump_pricing_version(**kwargs):
+    """Invalidate every cached price list and assignment in every process (usable directly as a signal receiver)."""
+    bump_shared_version(PRICING_NAMESPACE)
+
+
+def get_pricing_version():
+    """Return the current shared pricing version (one query)."""
+    return get_shared_version(PRICING_NAMESPACE)
+
+
+def get_price_list(user, version=None):
+    """Return the active PriceList with the highest priority assigned to user, or None."""
+    if not user or not user.is_authenticated:
+        return None
+    if version is None:
+        version = get_pricing_version()
+    key = versioned_cache_key(PRICING_NAMESPACE, 'user', user.pk, version=version)
+    price_list = cache.get(key)
+    if price_list is None:
+        price_list = (
+            PriceList.objects.filter(customers=user.pk, is_active=True).order_by('-priority', 'id').first()
+            or NO_PRICE_LIST
+        )
+        cache.set(key, price_list, PRICING_CACHE_TIMEOUT)
+    return price_list or None
+
+
+def get_price_book(user):
+    """Return the PriceBook for user's prices (base prices when they have no price list)."""
+    if not user or not user.is_authenticated:
+        return PriceBook()
+    version = get_pricing_version()
+    return PriceBook(get_price_list(user, version), version)
+
+
+class PriceBook:
+    """
+    Resolved prices for one price list, or base prices when price_list is None.
+
+    Instances are cheap; the explicit prices are loaded lazily on first use
+    (or eagerly with load(), e.g. before use in async code). version is the
+    pricing version they are cached under (read on load when not given).
+    """
+
+    def __init__(self, price_list=None, version=None):
+        self.price_list = price_list
+        self.version = version
+        self.currency = price_list.currency if price_list else DEFAULT_CURRENCY
+        self._prices = None
+
+    def load(self):
+        """Load the explicit prices of the list (cache, else one query). Returns self."""
+        if self._prices is None and self.price_list is not None:
+            if self.version is None:
+                self.version = get_pricing_version()
+            key = versioned_cache_key(PRICING_NAMESPACE, 'list', self.price_list.pk, version=self.version)
+            prices = cache.get(key)
+            if prices is None:
+                prices = dict(PriceListItem.objects.filter(price_list=self.price_list).values_list('product_id', 'price'))
+                cache.set(key, prices, PRICING_CACHE_TIMEOUT)
+            self._prices = prices
+        return self
+
+    def convert(self, base_price):
+        """Return a DEFAULT_CURRENCY amount in the list's currency (unchanged without a list)."""
+        if self.price_list is None:
+            return base_price
+        return (Decimal(base_price) * self.price_list.exchange_rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def amount(self, product_id, base_price):
+        """Return the price of a product given its id and base price (Product.price)."""
+        if self.price_list is None:
+            return base_price
+        self.load()
+        price = self._prices.get(product_id)
+        if price is None:
+            price = self.convert(base_price)
+        return price
+
+    def price(self, product, variant=None):
+        """Return the price of a Product instance, or of one of its ProductVariants when given."""
+        if variant is not None and variant.price is not None:
+            return self.convert(variant.price)
+        return self.amount(product.id, product.price)
+
+    def prices(self, products):
+        """Return {product_id: price} for an iterable of Product instances."""
+        return {product.id: self.amount(product.id, product.price) for product in products}
+
+
+class PriceBookContextMixin:
+    """
+    GenericAPIView mixin adding the customer's PriceBook to the serializer
+    context as 'price_book' when they have a price list, so product
+    serializers render list prices (see serializers.PriceListMixin).
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        price_book = get_price_book(self.request.user)
+        if price_book.price_list is not None:
+            context['price_book'] = price_book
+        return context
@@ -0,0 +1,126 @@
+"""
+Product Page Module - Composite Product Detail in a Fixed Number of Queries
+
+ProductDetail.vue needs more than GET /api/products/{id}/ returns: the
+department path of the product, its "frequently bought together" products,
+which options are still available and the images to show. Fetching each
+separately costs a round trip (and queries) per part, so
+GET /api/products/{id}/page/ returns all of it in one response:
+
+    {
+      "product": {...},            # as GET /api/products/{id}/ (ProductDetailSerializer)
+      "category_path": [{"id", "name"}, ...],      # top-level department first
+      "related": [{...}, ...],     # up to PRODUCT_PAGE_RELATED products (ProductSummarySerializer)
+      "availability": {"in_stock", "stock", "options": {axis: {value: in_stock}}},
+      "images": [{"url", "alt", "width", "height"}, ...]
+    }
+
+Queries, whatever the number of variants, related products or departments:
+1. the product with its category and availability annotations (variants.py)
+2. its active variants (prefetch), also used for the availability summary
+3. the related products with their categories (recommendations.py)
+The category path comes from the cached category index (category_tree.py),
+one more query only when that is cold.
+
+Products have a single image and there is no thumbnail pipeline, so the
+image set holds that image with its pixel size (read from storage once per
+cache entry); per-size renditions would be added to the same list.
+
+Caching: the page is cached per product (and host, image URLs being
+absolute) under catalog_cache.product_cache_key(). Changes to the product's
+own variants - ProductVariant saves (signals.py) and stock taken at checkout
+(variants.reserve_stock) - bump the product's shared version in the same
+transaction, so every process rebuilds the page once the change commits
+(reading that version is one indexed query per request). Catalog changes
+(product or category saved/deleted, related products rebuilt) bump the
+per-process catalog version: the process that made the change rebuilds at
+once, the others within CATALOG_CACHE_TIMEOUT, like every cached catalog
+entry. Pages are built from the primary database, so a lagging replica
+cannot cache stale data under a fresh version (replicas.py). Customers on a
+price list get their prices in a page built for them, not cached.
+
+Usage:
+    page = get_product_page(product_id, request, price_book)
+    GET /api/products/{id}/page/
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog_cache import CATALOG_CACHE_TIMEOUT, product_cache_key
+from .category_tree import breadcrumb
+from .models import Product
+from .recommendations import related_products
+from .replicas import primary_reads
+from .serializers import ProductDetailSerializer, ProductSummarySerializer
+from .variants import active_variants_prefetch, annotate_availability
+
+# Number of "frequently bought together" products on the page
+PRODUCT_PAGE_RELATED = getattr(settings, 'PRODUCT_PAGE_RELATED', 4)
+
+
+def availability_summary(product):
+    """
+    Availability of a product with its active variants loaded:
+    in_stock, stock (units over the active variants, None without variants)
+    and, per option axis, whether each value is in stock in some variant.
+    """
+    variants = product.active_variants
+    options = {}
+    for variant in variants:
+        for axis, value in variant.options.items():
+            values = options.setdefault(axis, {})
+            values[str(value)] = values.get(str(value), False) or variant.stock > 0
+    return {
+        'in_stock': product.in_stock,
+        'stock': sum(variant.stock for variant in variants) if variants else None,
+        'options': options,
+    }
+
+
+def image_set(product, request=None):
+    """[{'url', 'alt', 'width', 'height'}] of the product's images ([] without image)."""
+    if not product.image:
+        return []
+    url = product.image.url
+    image = {'url': request.build_absolute_uri(url) if request is not None else url, 'alt': product.name, 'width': None, 'height': None}
+    try:
+        image['width'], image['height'] = product.image.width, product.image.height
+    except (OSError, ValueError):
+        pass  # missing or unreadable file: the URL is still served
+    return [image]
+
+
+def build_product_page(product_id, request=None, price_book=None):
+    """Assemble the product page of `product_id` (see module docstring), or None when there is no such product."""
+    queryset = annotate_availability(Product.objects.select_related('category')).prefetch_related(active_variants_prefetch())
+    product = queryset.filter(pk=product_id).first()
+    if product is None:
+        return None
+    context = {'request': request}
+    if price_book is not None and price_book.price_list is not None:
+        context['price_book'] = price_book
+    return {
+        'product': ProductDetailSerializer(product, context=context).data,
+        'category_path': breadcrumb(product.category_id) or [],
+        'related': ProductSummarySerializer(related_products(product.id, PRODUCT_PAGE_RELATED), many=True, context=context).data,
+        'availability': availability_summary(product),
+        'images': image_set(product, request),
+    }
+
+
+def get_product_page(product_id, request, price_book=None):
+    """The cached product page of `product_id` for `request`, or None when there is no such product."""
+    if price_book is not None and price_book.price_list is not None:
+        return build_product_page(product_id, request, price_book)
+    # ?fields= / ?omit= shape the 'product' part, like GET /api/products/{id}/
+    key = product_cache_key(
+        product_id, 'page', request.scheme, request.get_host(), request.GET.get('fields', ''), request.GET.get('omit', ''),
+    )
+    page = cache.get(key)
+    if page is None:
+        with primary_reads():
+            page = build_product_page(product_id, request)
+        if page is not None:
+            cache.set(key, page, CATALOG_CACHE_TIMEOUT)
+    return page
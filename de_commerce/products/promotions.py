@@ -0,0 +1,237 @@
+"""
+Promotions Module - Compiled Promotion Index and Cart Evaluation
+
+Active Promotion rows are compiled once per process into an in-memory index:
+
+- by_product:  {product_id: [rule, ...]}
+- by_category: {category_id: [rule, ...]}
+- sitewide:    [rule, ...]            (promotions without products/categories)
+
+with one such index for public promotions and one per coupon code. Compiling
+takes three queries (promotions plus the two M2M through tables). Evaluating a
+cart then touches only the rules indexed under each line's product and
+category, in a single pass over the lines, without any database access.
+
+Refreshing: the index is tagged with the shared 'promotions' version
+(catalog_cache.get_shared_version(), a CacheVersion row on the primary that
+every process reads). Saving/deleting a Promotion or changing its products or
+categories bumps it in the same transaction (signals.py), and
+get_promotion_engine() reads it on every call (one indexed query), so each
+process recompiles on its next call after a change. An index is also
+recompiled once it is PROMOTIONS_MAX_AGE seconds (30) old, which bounds how
+long changes made without signals (QuerySet.update()) go unseen. Validity
+windows (starts_at/ends_at) are checked at evaluation time, so promotions
+start and end on time without a recompile.
+
+Rules (see models.Promotion):
+- each line gets the single best promotion available to it (no stacking)
+- coupon promotions only apply when their code is entered
+- discounts never exceed the line subtotal
+
+Usage:
+    engine = get_promotion_engine()
+    evaluation = engine.evaluate(lines, coupon_codes=['SPRING10'])
+    evaluation.summary()   # {'subtotal', 'discount', 'total', 'coupons'}
+
+or, for a Cart with its items prefetched:
+    evaluation = evaluate_cart(cart, price_book=price_book, coupon_codes=codes)
+"""
+
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.utils import timezone
+
+from .catalog_cache import bump_shared_version, get_shared_version
+from .models import Promotion
+
+PROMOTIONS_NAMESPACE = 'promotions'
+# Seconds after which a compiled index is rebuilt even without a version bump
+PROMOTIONS_MAX_AGE = getattr(settings, 'PROMOTIONS_MAX_AGE', 30)
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+# One cart/order line to evaluate; `key` identifies the line in the results
+Line = namedtuple('Line', 'key product_id category_id quantity unit_price')
+
+# Evaluated line: discount is the line total discount, promotion the Rule applied (or None)
+LineResult = namedtuple('LineResult', 'key quantity unit_price subtotal discount promotion')
+
+Rule = namedtuple('Rule', 'id name kind value buy_quantity free_quantity coupon_code starts_at ends_at')
+
+
+def bump_promotions_version(**kwargs):
+    """Make every process recompile its promotion index (usable directly as a signal receiver)."""
+    bump_shared_version(PROMOTIONS_NAMESPACE)
+
+
+def normalize_coupon_codes(codes):
+    """Return the set of non-empty, upper-cased coupon codes from a string or iterable."""
+    if isinstance(codes, str):
+        codes = [codes]
+    return {str(code).strip().upper() for code in codes or () if code and str(code).strip()}
+
+
+def rule_discount(rule, quantity, unit_price):
+    """Return the discount `rule` gives a line of `quantity` units at `unit_price`."""
+    subtotal = unit_price * quantity
+    if rule.kind == 'percentage':
+        discount = (subtotal * rule.value / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    elif rule.kind == 'fixed':
+        discount = min(rule.value, unit_price) * quantity
+    elif rule.kind == 'bogo':
+        group = rule.buy_quantity + rule.free_quantity
+        discount = (quantity // group) * rule.free_quantity * unit_price if group else ZERO
+    else:
+        discount = ZERO
+    return max(ZERO, min(discount, subtotal))
+
+
+class RuleIndex:
+    """Rules indexed by product id and category id, plus sitewide rules."""
+
+    def __init__(self):
+        self.by_product = defaultdict(list)
+        self.by_category = defaultdict(list)
+        self.sitewide = []
+
+    def candidates(self, line):
+        return self.by_product.get(line.product_id, []) + self.by_category.get(line.category_id, []) + self.sitewide
+
+
+class CartEvaluation:
+    """Result of PromotionEngine.evaluate(): per-line results and totals."""
+
+    def __init__(self, lines, coupons):
+        self.lines = lines
+        self.by_key = {line.key: line for line in lines}
+        self.subtotal = sum((line.subtotal for line in lines), ZERO)
+        self.discount = sum((line.discount for line in lines), ZERO)
+        self.total = self.subtotal - self.discount
+        self.coupons = coupons  # {code: valid}
+
+    def summary(self):
+        """JSON-ready totals: {'subtotal', 'discount', 'total', 'coupons': [{code, valid}]}"""
+        return {
+            'subtotal': str(self.subtotal),
+            'discount': str(self.discount),
+            'total': str(self.total),
+            'coupons': [{'code': code, 'valid': valid} for code, valid in sorted(self.coupons.items())],
+        }
+
+
+class PromotionEngine:
+    """Compiled, read-only view of the active promotions."""
+
+    def __init__(self, rules, product_ids=None, category_ids=None, version=None):
+        """
+        rules: iterable of Rule
+        product_ids / category_ids: {promotion_id: [ids]} the promotions are limited to
+        """
+        product_ids = product_ids or {}
+        category_ids = category_ids or {}
+        self.version = version
+        self.compiled_at = time.monotonic()
+        self.public = RuleIndex()
+        self.coupons = defaultdict(RuleIndex)
+        self.size = 0
+        for rule in rules:
+            index = self.coupons[rule.coupon_code] if rule.coupon_code else self.public
+            products = product_ids.get(rule.id, ())
+            categories = category_ids.get(rule.id, ())
+            for product_id in products:
+                index.by_product[product_id].append(rule)
+            for category_id in categories:
+                index.by_category[category_id].append(rule)
+            if not products and not categories:
+                index.sitewide.append(rule)
+            self.size += 1
+        self.coupons = dict(self.coupons)
+
+    @classmethod
+    def from_database(cls, version=None):
+        """Compile the active promotions (three queries)."""
+        now = timezone.now()
+        rules = [
+            Rule(*row) for row in Promotion.objects.filter(is_active=True).exclude(ends_at__lt=now).values_list(
+                'id', 'name', 'kind', 'value', 'buy_quantity', 'free_quantity', 'coupon_code', 'starts_at', 'ends_at'
+            )
+        ]
+        ids = [rule.id for rule in rules]
+        product_ids, category_ids = defaultdict(list), defaultdict(list)
+        if ids:
+            for promotion_id, product_id in Promotion.products.through.objects.filter(promotion_id__in=ids).values_list('promotion_id', 'product_id'):
+                product_ids[promotion_id].append(product_id)
+            for promotion_id, category_id in Promotion.categories.through.objects.filter(promotion_id__in=ids).values_list('promotion_id', 'category_id'):
+                category_ids[promotion_id].append(category_id)
+        return cls(rules, product_ids, category_ids, version=version)
+
+    def is_valid_coupon(self, code, now=None):
+        """True when `code` unlocks at least one promotion that is currently running."""
+        index = self.coupons.get(code)
+        if index is None:
+            return False
+        now = now or timezone.now()
+        rules = [rule for rules in index.by_product.values() for rule in rules]
+        rules += [rule for rules in index.by_category.values() for rule in rules] + index.sitewide
+        return any(_is_running(rule, now) for rule in rules)
+
+    def evaluate(self, lines, coupon_codes=(), now=None):
+        """
+        Evaluate cart lines in a single pass. Returns a CartEvaluation.
+
+        lines: iterable of Line(key, product_id, category_id, quantity, unit_price)
+        coupon_codes: codes entered by the customer (case-insensitive)
+        """
+        now = now or timezone.now()
+        codes = normalize_coupon_codes(coupon_codes)
+        coupons = {code: self.is_valid_coupon(code, now) for code in codes}
+        indexes = [self.public] + [self.coupons[code] for code in codes if coupons[code]]
+        results = []
+        for line in lines:
+            best, best_discount = None, ZERO
+            for index in indexes:
+                for rule in index.candidates(line):
+                    if not _is_running(rule, now):
+                        continue
+                    discount = rule_discount(rule, line.quantity, line.unit_price)
+                    if discount > best_discount:
+                        best, best_discount = rule, discount
+            results.append(LineResult(
+                line.key, line.quantity, line.unit_price, line.unit_price * line.quantity, best_discount, best,
+            ))
+        return CartEvaluation(results, coupons)
+
+
+def _is_running(rule, now):
+    return (rule.starts_at is None or rule.starts_at <= now) and (rule.ends_at is None or rule.ends_at > now)
+
+
+_engine = None
+
+
+def get_promotion_engine():
+    """Return this process's compiled PromotionEngine, recompiling it after promotion changes or PROMOTIONS_MAX_AGE."""
+    global _engine
+    version = get_shared_version(PROMOTIONS_NAMESPACE)
+    engine = _engine
+    if engine is None or engine.version != version or time.monotonic() - engine.compiled_at >= PROMOTIONS_MAX_AGE:
+        engine = _engine = PromotionEngine.from_database(version)
+    return engine
+
+
+def cart_lines(items, price_book=None):
+    """Build Lines from CartItems (product and variant loaded), keyed by item id."""
+    lines = []
+    for item in items:
+        price = price_book.price(item.product, item.variant) if price_book is not None else item.get_unit_price()
+        lines.append(Line(item.id, item.product_id, item.product.category_id, item.quantity, price))
+    return lines
+
+
+def evaluate_cart(cart, price_book=None, coupon_codes=(), engine=None):
+    """Evaluate a Cart's items (use a prefetched cart to avoid a query)."""
+    engine = engine or get_promotion_engine()
+    return engine.evaluate(cart_lines(cart.items.all(), price_book), coupon_codes)
@@ -0,0 +1,184 @@
+"""
+Recommendations Module - "Frequently Bought Together" From Order Co-occurrence
+
+ProductDetail.vue shows, next to a product, the products most often bought in
+the same order. Counting that per request would mean a self-join of
+OrderItem, so it is computed offline and stored top-K per product in
+RelatedProduct:
+
+    python manage.py build_related_products     # cron, e.g. nightly
+    GET /api/products/{id}/related/             # one indexed lookup
+
+How the build works (build_related_products):
+- Order lines are read as (order_id, product_id) tuples in chunks of about
+  `chunk_size` lines, walking order ids with a keyset cursor, so memory is
+  bounded by the chunk size whatever the order volume. A chunk always ends
+  on an order boundary. Cancelled orders are skipped.
+- Each chunk becomes a sparse order x product incidence matrix B (1 when the
+  order contains the product, however many lines it has), and B.T @ B gives
+  the product x product co-occurrence counts of the chunk. Chunk counts are
+  summed into one sparse matrix, whose size depends on the catalog and on
+  how products are combined, not on the number of orders.
+- For each product, the top RELATED_TOP_K other products bought together in
+  at least RELATED_MIN_ORDERS orders are kept (ties broken by product id).
+- RelatedProduct is replaced in one transaction, so readers see either the
+  previous or the new recommendations. Cached catalog data (product pages,
+  see product_page.py) is invalidated once it commits.
+
+NumPy/SciPy do the counting when installed; otherwise an equivalent pure
+Python counter is used (same results, much slower on large order volumes).
+"""
+
+import time
+from collections import defaultdict, namedtuple
+from heapq import nsmallest
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+
+from .catalog_cache import bump_catalog_version
+from .models import OrderItem, Product, RelatedProduct
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional dependency
+    np = sparse = None
+
+RELATED_TOP_K = getattr(settings, 'RELATED_TOP_K', 10)
+RELATED_MIN_ORDERS = getattr(settings, 'RELATED_MIN_ORDERS', 2)
+EXCLUDED_STATUSES = ('cancelled',)
+
+BuildResult = namedtuple('BuildResult', 'lines products rows seconds backend')
+
+
+def order_line_chunks(chunk_size=200000):
+    """
+    Yield lists of (order_id, product_id) for consecutive ranges of orders,
+    each about `chunk_size` lines (more only when one order alone is larger).
+    """
+    lines = OrderItem.objects.exclude(order__status__in=EXCLUDED_STATUSES).order_by('order_id')
+    after = 0
+    while True:
+        chunk = list(lines.filter(order_id__gt=after).values_list('order_id', 'product_id')[:chunk_size])
+        if len(chunk) < chunk_size:
+            if chunk:
+                yield chunk
+            return
+        last = chunk[-1][0]
+        complete = [line for line in chunk if line[0] != last]
+        if not complete:
+            # A single order of chunk_size lines or more: take it whole
+            complete = list(lines.filter(order_id=last).values_list('order_id', 'product_id'))
+        else:
+            last = complete[-1][0]
+        yield complete
+        after = last
+
+
+def count_cooccurrences(chunks, product_ids):
+    """
+    Sum the co-occurrence counts of `chunks` with NumPy/SciPy.
+    Returns a CSR matrix indexed like the sorted array `product_ids` (diagonal zeroed).
+    """
+    size = len(product_ids)
+    total = sparse.csr_matrix((size, size), dtype=np.int64)
+    lines = 0
+    for chunk in chunks:
+        lines += len(chunk)
+        pairs = np.array(chunk, dtype=np.int64)
+        orders, rows = np.unique(pairs[:, 0], return_inverse=True)
+        columns = np.searchsorted(product_ids, pairs[:, 1])
+        # Products created after product_ids was read are left out of this build
+        known = (columns < size) & (product_ids[np.minimum(columns, size - 1)] == pairs[:, 1])
+        incidence = sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.int64), (rows[known], columns[known])), shape=(len(orders), size),
+        )
+        incidence.data[:] = 1  # several lines of one product in an order count once
+        total = total + (incidence.T @ incidence).tocsr()
+    total.setdiag(0)
+    total.eliminate_zeros()
+    return total, lines
+
+
+def top_neighbours(matrix, product_ids, top_k, min_orders):
+    """Yield (product_id, [(related_id, score), ...]) from a co-occurrence matrix, strongest first."""
+    indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+    for row in np.flatnonzero(np.diff(indptr)):
+        start, end = indptr[row], indptr[row + 1]
+        scores, columns = data[start:end], indices[start:end]
+        keep = scores >= min_orders
+        if not keep.any():
+            continue
+        scores, related = scores[keep], product_ids[columns[keep]]
+        best = np.lexsort((related, -scores))[:top_k]
+        yield int(product_ids[row]), list(zip(related[best].tolist(), scores[best].tolist()))
+
+
+def python_neighbours(chunks, top_k, min_orders):
+    """Pure Python counterpart of count_cooccurrences() + top_neighbours(). Returns (neighbours, lines)."""
+    counts = defaultdict(int)
+    lines = 0
+    for chunk in chunks:
+        lines += len(chunk)
+        baskets = defaultdict(set)
+        for order_id, product_id in chunk:
+            baskets[order_id].add(product_id)
+        for basket in baskets.values():
+            for pair in combinations(sorted(basket), 2):
+                counts[pair] += 1
+
+    candidates = defaultdict(list)
+    for (first, second), score in counts.items():
+        if score >= min_orders:
+            candidates[first].append((second, score))
+            candidates[second].append((first, score))
+    neighbours = (
+        (product_id, nsmallest(top_k, related, key=lambda item: (-item[1], item[0])))
+        for product_id, related in sorted(candidates.items())
+    )
+    return neighbours, lines
+
+
+def build_related_products(chunk_size=200000, top_k=None, min_orders=None, batch_size=5000):
+    """Recompute RelatedProduct from all order lines (see module docstring). Returns a BuildResult."""
+    start = time.monotonic()
+    top_k = RELATED_TOP_K if top_k is None else top_k
+    min_orders = RELATED_MIN_ORDERS if min_orders is None else min_orders
+    chunks = order_line_chunks(chunk_size)
+    if np is not None:
+        product_ids = np.fromiter(Product.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+        matrix, lines = count_cooccurrences(chunks, product_ids)
+        neighbours, backend = top_neighbours(matrix, product_ids, top_k, min_orders), 'numpy'
+    else:
+        neighbours, lines = python_neighbours(chunks, top_k, min_orders)
+        backend = 'python'
+
+    products = rows = 0
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        batch = []
+        for product_id, related in neighbours:
+            products += 1
+            batch.extend(
+                RelatedProduct(product_id=product_id, related_id=related_id, rank=rank, score=score)
+                for rank, (related_id, score) in enumerate(related)
+            )
+            if len(batch) >= batch_size:
+                RelatedProduct.objects.bulk_create(batch)
+                rows += len(batch)
+                batch = []
+        RelatedProduct.objects.bulk_create(batch)
+        rows += len(batch)
+    bump_catalog_version()
+    return BuildResult(lines, products, rows, time.monotonic() - start, backend)
+
+
+def related_products(product_id, limit=RELATED_TOP_K):
+    """Return the products bought together with `product_id`, strongest first (one query)."""
+    entries = (
+        RelatedProduct.objects.filter(product_id=product_id)
+        .select_related('related__category').order_by('rank')[:limit]
+    )
+    return [entry.related for entry in entries]
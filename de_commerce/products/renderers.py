@@ -0,0 +1,45 @@
+"""
+Renderers Module - Fast JSON Rendering for the API
+
+FastJSONRenderer serializes API responses with orjson when it is installed
+(several times faster than the stdlib json module DRF uses) and falls back to
+DRF's JSONRenderer otherwise.
+
+Type handling matches DRF's JSONRenderer:
+- Decimal values are already strings when they come from DecimalField
+  (COERCE_DECIMAL_TO_STRING); bare Decimals, UUIDs, lazy translation strings,
+  querysets and other extra types go through DRF's JSONEncoder.default()
+- datetimes from DateTimeField are already ISO 8601 strings; bare datetime,
+  date and time objects are passed through to DRF's encoder so UTC is still
+  written as 'Z' and microseconds are truncated the same way
+- non-ASCII text is emitted as UTF-8 (UNICODE_JSON), not \\u escapes
+- integer dictionary keys are allowed and become strings
+
+Requests for indented output (browsable API, '; indent=N' in Accept) use
+DRF's renderer so pretty-printing behaves exactly as before.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def _default(obj):
+    return _fallback_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
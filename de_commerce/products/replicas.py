@@ -0,0 +1,172 @@
+"""
+Replicas Module - Read-Replica Routing with Read-Your-Writes Stickiness
+
+Catalog browsing (CategoryViewSet, ProductViewSet and the async catalog
+views) and order history (OrderViewSet) are read far more often than they
+change. Their GET requests read from one of settings.DATABASE_REPLICAS, so
+they no longer compete with checkout writes on the primary ('default').
+
+Routing (ReplicaRouter, installed through settings.DATABASE_ROUTERS):
+- only reads inside replica_reads() are candidates, and only of the catalog
+  and order history models (REPLICA_MODELS); sessions, users, carts, prices,
+  promotions, idempotency keys and jobs always read from the primary
+- reads inside a transaction on the primary stay on the primary, so checkout
+  sees what it has just written
+- related objects are read from the database their instance came from
+- every write goes to the primary; replicas are never migrated
+
+Read-your-writes: replicas lag behind the primary. After a successful
+POST/PUT/PATCH/DELETE (checkout, cart changes, login) ReplicaStickinessMiddleware
+pins the client to the primary for REPLICA_LAG seconds, so a customer who has
+just ordered sees the order in their history. The pin travels with the client
+as a signed 'replica_pin_until' cookie holding its expiry time, so whichever
+process serves the next request honours it; nothing is kept server-side.
+Clients that drop cookies are not pinned and may briefly read stale data.
+
+One replica is chosen per request, so a request never mixes two replicas.
+Without replicas configured every read goes to the primary as before.
+
+Usage:
+    class ProductViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet): ...
+
+    with replica_reads(request):     # plain or async views
+        products = list(Product.objects.all())
+
+    with primary_reads():            # e.g. data cached under a fresh version
+        ...
+"""
+
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+# Models whose reads may be served by a replica
+REPLICA_MODELS = frozenset({
+    'products.Category', 'products.Product', 'products.ProductVariant', 'products.RelatedProduct',
+    'products.Order', 'products.OrderItem', 'products.OrderEvent',
+    'products.ArchivedOrder', 'products.OrderArchiveSegment',
+})
+
+# Replica alias serving the current request's reads (None: the primary)
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+# Signed cookie holding the time (epoch seconds) until which a client reads from the primary
+PIN_COOKIE = 'replica_pin_until'
+PIN_COOKIE_SALT = 'products.replicas.pin'
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def replica_lag():
+    """Seconds a user's reads stay on the primary after they write."""
+    return getattr(settings, 'REPLICA_LAG', 5)
+
+
+def pin_to_primary(response):
+    """Send the client's reads to the primary until the replicas have caught up (sets the pin cookie on `response`)."""
+    lag = replica_lag()
+    if replica_aliases() and lag > 0:
+        response.set_signed_cookie(
+            PIN_COOKIE, repr(time.time() + lag), salt=PIN_COOKIE_SALT, max_age=math.ceil(lag),
+            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+        )
+
+
+def is_pinned(request):
+    """True while the request carries a valid, unexpired pin cookie."""
+    pinned_until = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_COOKIE_SALT)
+    try:
+        return pinned_until is not None and float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_replica(request=None):
+    """Alias of the replica to read from for `request`, or None for the primary."""
+    aliases = replica_aliases()
+    if not aliases or (request is not None and is_pinned(request)):
+        return None
+    return random.choice(aliases)
+
+
+@contextmanager
+def _reading_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_reads(request=None):
+    """Context manager: read catalog and order history models from a replica (unless `request` is pinned)."""
+    return _reading_from(choose_replica(request))
+
+
+def primary_reads():
+    """Context manager: read from the primary even inside replica_reads()."""
+    return _reading_from(None)
+
+
+class ReplicaRouter:
+    """Database router sending replica_reads() of REPLICA_MODELS to a replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        alias = _read_alias.get()
+        if alias is None or model._meta.label not in REPLICA_MODELS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin: GET/HEAD/OPTIONS read from a replica unless the user is
+    pinned to the primary. Chosen after authentication, so token users are
+    recognised too.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._replica_token = _read_alias.set(choose_replica(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                _read_alias.reset(self._replica_token)
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """Pin the requester to the primary after a successful write (see pin_to_primary)."""
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(response)
+        return response
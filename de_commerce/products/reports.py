@@ -0,0 +1,266 @@
+"""
+Reports Module - Incremental Sales Rollups and Sales Reporting
+
+Sales questions ("revenue per category per day", "top 20 products this
+week") used to mean scanning OrderItem joined to Order, on the same tables
+checkout writes to. Instead, SalesRollup keeps hourly and daily totals per
+(product, category, status, payment method, currency), and reports read only
+that table (plus product/category names for the rows returned).
+
+Incremental refresh:
+The rollup is folded from the order event log (OrderEvent, order_events.py)
+rather than from Order rows, so status changes are picked up too:
+- an order's creation event adds its lines to the bucket of its status
+- a status transition moves its lines from the old status to the new one
+RollupWatermark('sales') remembers the last event folded in. Each batch of
+events is applied and the watermark advanced in one transaction, so a
+refresh can be interrupted and re-run without double counting. Events newer
+than ROLLUP_LAG seconds are left for the next run: ids are assigned before
+commit, so a younger event with a lower id may still be in flight.
+
+Orders are bucketed by the hour/day they were placed (TIME_ZONE); a product's
+category is the one it has when the order is rolled up.
+
+Usage:
+    python manage.py refresh_sales_rollups      # cron, every few minutes
+    GET /api/reports/sales/?granularity=day&group_by=category&start=2025-01-01
+    GET /api/reports/sales/?group_by=product&start=2025-01-06&order=-revenue&limit=20
+"""
+
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Category, Order, OrderEvent, OrderItem, Product, RollupWatermark, SalesRollup
+
+ROLLUP_LAG = getattr(settings, 'ROLLUP_LAG', 60)
+WATERMARK = 'sales'
+ZERO = Decimal('0.00')
+
+# group_by / filter name -> SalesRollup column
+DIMENSIONS = {
+    'period': 'period_start',
+    'product': 'product_id',
+    'category': 'category_id',
+    'status': 'status',
+    'payment_method': 'payment_method',
+    'currency': 'currency',
+}
+METRICS = ('lines', 'quantity', 'gross', 'discount', 'revenue')
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class ReportError(ValueError):
+    """Invalid report parameters (returned to API clients as 400)."""
+
+
+def period_starts(created_at):
+    """Return {'hour': start of hour, 'day': start of day} of `created_at` in the current time zone."""
+    hour = timezone.localtime(created_at).replace(minute=0, second=0, microsecond=0)
+    return {SalesRollup.HOUR: hour, SalesRollup.DAY: hour.replace(hour=0)}
+
+
+def fold_events(events):
+    """
+    Turn (event_id, order_id, from_status, to_status) rows into rollup deltas:
+    {(granularity, period_start, product_id, category_id, status, payment_method, currency):
+     [lines, quantity, gross, discount]}
+    """
+    order_ids = {order_id for _, order_id, _, _ in events}
+    orders = {
+        pk: (period_starts(created_at), payment_method, currency)
+        for pk, created_at, payment_method, currency in Order.objects.filter(id__in=order_ids).values_list(
+            'id', 'created_at', 'payment_method', 'currency'
+        )
+    }
+    lines = defaultdict(list)
+    for order_id, product_id, category_id, quantity, price, discount in OrderItem.objects.filter(
+        order_id__in=order_ids
+    ).values_list('order_id', 'product_id', 'product__category_id', 'quantity', 'price', 'discount'):
+        lines[order_id].append((product_id, category_id, quantity, price * quantity, discount))
+
+    deltas = defaultdict(lambda: [0, 0, ZERO, ZERO])
+    for _, order_id, from_status, to_status in events:
+        if order_id not in orders:
+            continue  # order deleted since
+        periods, payment_method, currency = orders[order_id]
+        for sign, status in ((-1, from_status), (1, to_status)):
+            if not status:
+                continue
+            for product_id, category_id, quantity, gross, discount in lines[order_id]:
+                for granularity, period_start in periods.items():
+                    delta = deltas[(granularity, period_start, product_id, category_id, status, payment_method, currency)]
+                    delta[0] += sign
+                    delta[1] += sign * quantity
+                    delta[2] += sign * gross
+                    delta[3] += sign * discount
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def apply_deltas(deltas):
+    """Add deltas to SalesRollup rows (creating, updating or deleting emptied rows)."""
+    if not deltas:
+        return
+    existing = {}
+    periods = {key[1] for key in deltas}
+    products = {key[2] for key in deltas}
+    for row in SalesRollup.objects.filter(period_start__in=periods, product_id__in=products):
+        existing[(row.granularity, row.period_start, row.product_id, row.category_id, row.status, row.payment_method, row.currency)] = row
+
+    created, updated, emptied = [], [], []
+    for key, (lines, quantity, gross, discount) in deltas.items():
+        row = existing.get(key)
+        if row is None and lines <= 0:
+            continue  # nothing to subtract from (rolled up before a rebuild)
+        if row is None:
+            granularity, period_start, product_id, category_id, status, payment_method, currency = key
+            row = SalesRollup(
+                granularity=granularity, period_start=period_start, product_id=product_id, category_id=category_id,
+                status=status, payment_method=payment_method, currency=currency,
+            )
+            created.append(row)
+        elif row.lines + lines <= 0:
+            emptied.append(row.pk)
+            continue
+        else:
+            updated.append(row)
+        row.lines += lines
+        row.quantity += quantity
+        row.gross += gross
+        row.discount += discount
+    SalesRollup.objects.bulk_create(created, batch_size=1000)
+    SalesRollup.objects.bulk_update(updated, ['lines', 'quantity', 'gross', 'discount'], batch_size=1000)
+    SalesRollup.objects.filter(pk__in=emptied).delete()
+
+
+def refresh_rollups(batch_size=5000, lag=None, now=None):
+    """Fold new order events into SalesRollup. Returns the number of events processed."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=ROLLUP_LAG if lag is None else lag)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+            events = []
+            for event_id, order_id, from_status, to_status, created_at in (
+                OrderEvent.objects.filter(id__gt=watermark.last_event_id).order_by('id')
+                .values_list('id', 'order_id', 'from_status', 'to_status', 'created_at')[:batch_size]
+            ):
+                if created_at > cutoff:
+                    break  # too recent: stop here so no older id is skipped
+                events.append((event_id, order_id, from_status, to_status))
+            if not events:
+                return processed
+            apply_deltas(fold_events(events))
+            watermark.last_event_id = events[-1][0]
+            watermark.save(update_fields=['last_event_id', 'updated_at'])
+        processed += len(events)
+
+
+def rebuild_rollups(batch_size=5000, lag=None):
+    """Drop the rollups and fold the whole event log again."""
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+    return refresh_rollups(batch_size, lag)
+
+
+def _parse_bound(value, name):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ReportError(f"'{name}' must be an ISO date or datetime.")
+        moment = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _money(value):
+    # SUM() over DecimalFields comes back unscaled on some backends (SQLite)
+    return str(Decimal(value or 0).quantize(ZERO))
+
+
+def sales_report(params):
+    """
+    Aggregate SalesRollup rows. `params` is a dict-like of query parameters:
+
+    - granularity: 'day' (default) or 'hour'
+    - start / end: period range, ISO date or datetime (end exclusive)
+    - group_by: comma-separated DIMENSIONS (default: period)
+    - product, category, status, payment_method, currency: exact filters
+    - order: a metric or dimension, '-' for descending (default: -revenue,
+      or period when grouping by period)
+    - limit: rows to return (default 100, max 1000)
+
+    Returns {'granularity', 'group_by', 'results': [...], 'as_of_event': <watermark>}.
+    Raises ReportError for invalid parameters.
+    """
+    granularity = params.get('granularity') or SalesRollup.DAY
+    if granularity not in (SalesRollup.HOUR, SalesRollup.DAY):
+        raise ReportError("'granularity' must be 'hour' or 'day'.")
+    group_by = [name.strip() for name in (params.get('group_by') or 'period').split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise ReportError(f"Unknown group_by: {', '.join(unknown)}. Choose from {', '.join(DIMENSIONS)}.")
+
+    queryset = SalesRollup.objects.filter(granularity=granularity)
+    start, end = _parse_bound(params.get('start'), 'start'), _parse_bound(params.get('end'), 'end')
+    if start:
+        queryset = queryset.filter(period_start__gte=start)
+    if end:
+        queryset = queryset.filter(period_start__lt=end)
+    for name in ('product', 'category', 'status', 'payment_method', 'currency'):
+        if params.get(name):
+            queryset = queryset.filter(**{DIMENSIONS[name]: params.get(name)})
+
+    order = params.get('order') or ('period' if 'period' in group_by else '-revenue')
+    order_name = order.lstrip('-')
+    if order_name not in METRICS and order_name not in group_by:
+        raise ReportError(f"'order' must be a metric ({', '.join(METRICS)}) or a group_by dimension.")
+    if order_name in METRICS:
+        sort = order_name if order_name == 'revenue' else f'{order_name}_total'
+    else:
+        sort = DIMENSIONS[order_name]
+    try:
+        limit = min(int(params.get('limit') or DEFAULT_LIMIT), MAX_LIMIT)
+    except ValueError:
+        raise ReportError("'limit' must be an integer.")
+
+    columns = [DIMENSIONS[name] for name in group_by]
+    rows = list(
+        queryset.values(*columns).annotate(
+            lines_total=Sum('lines'), quantity_total=Sum('quantity'), gross_total=Sum('gross'),
+            discount_total=Sum('discount'), revenue=Sum(F('gross') - F('discount')),
+        ).order_by(('-' if order.startswith('-') else '') + sort)[:limit]
+    )
+
+    names = {}
+    if 'product' in group_by:
+        names['product'] = dict(Product.objects.filter(id__in={r['product_id'] for r in rows}).values_list('id', 'name'))
+    if 'category' in group_by:
+        names['category'] = dict(Category.objects.filter(id__in={r['category_id'] for r in rows}).values_list('id', 'name'))
+
+    results = []
+    for row in rows:
+        result = {}
+        for name, column in zip(group_by, columns):
+            result[name] = row[column]
+            if name in names:
+                result[f'{name}_name'] = names[name].get(row[column])
+        result.update(
+            lines=row['lines_total'], quantity=row['quantity_total'], gross=_money(row['gross_total']),
+            discount=_money(row['discount_total']), revenue=_money(row['revenue']),
+        )
+        results.append(result)
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).values_list('last_event_id', flat=True).first()
+    return {'granularity': granularity, 'group_by': group_by, 'results': results, 'as_of_event': watermark or 0}
@@ -17,7 +17,10 @@ All serializers support the API endpoints defined in api.py
 
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .models import Category, Product, ProductVariant, Cart, CartItem, Order, OrderItem
+from .fieldsets import SparseFieldsetMixin, get_sparse_fieldset
+from .promotions import evaluate_cart
+from .variants import option_axes, price_range
 from django.contrib.auth.models import User
 
 # ============================================================================
@@ -67,19 +70,55 @@ class LoginSerializer(serializers.Serializer):
 # PRODUCT BROWSING SERIALIZERS (NO LOGIN REQUIRED - Public Read)
 # ============================================================================
 
-class CategorySerializer(serializers.ModelSerializer):
+class PriceListMixin:
+    # Product serializer mixin: when the context carries a 'price_book'
+    # (customers on a B2B price list, see pricing.py) 'price' is the customer's
+    # list price and a 'currency' field is added. Otherwise output is unchanged.
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        price_book = self.context.get('price_book')
+        if price_book is not None and 'price' in data:
+            data['price'] = self.fields['price'].to_representation(price_book.price(instance))
+            data['currency'] = price_book.currency
+        return data
+
+class AvailabilityMixin:
+    # Product serializer mixin: when the product carries the availability
+    # annotations of variants.annotate_availability() (product list and detail),
+    # adds 'min_price'/'max_price' (customer's prices, see PriceListMixin),
+    # 'in_stock' and 'variant_count'. Honours ?fields= / ?omit= like declared fields.
+    availability_fields = ('min_price', 'max_price', 'in_stock', 'variant_count')
+    availability_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not hasattr(instance, 'variant_count'):
+            return data
+        low, high = price_range(instance, self.context.get('price_book'))
+        values = {
+            'min_price': self.availability_price.to_representation(low),
+            'max_price': self.availability_price.to_representation(high),
+            'in_stock': instance.in_stock,
+            'variant_count': instance.variant_count,
+        }
+        data.update((name, values[name]) for name in get_sparse_fieldset(self.context.get('request'), self.availability_fields))
+        return data
+
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Serializer for Category model
     # Fields: id, name, description
+    # Supports ?fields= / ?omit= as the top-level serializer (fieldsets.py)
     # API Endpoint: GET /api/categories/ (NO LOGIN REQUIRED - AllowAny)
     # ViewSet: CategoryViewSet (read-only, uses ReadOnlyModelViewSet)
     class Meta:
         model = Category
         fields = ['id', 'name', 'description']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(AvailabilityMixin, PriceListMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     # Serializer for Product model
     # Fields: id, name, description, price, category (nested), image, more_description, specifications, stock_status
     # Key Feature: Nested 'category' field includes full category data
+    # Supports ?fields= / ?omit= as the top-level serializer (fieldsets.py)
     # API Endpoints: GET /api/products/, GET /api/products/{id}/ (NO LOGIN - AllowAny)
     # ViewSet: ProductViewSet (read-only, uses ReadOnlyModelViewSet)
     # Frontend: ProductList.vue, ProductDetail.vue, ProductCard.vue
@@ -88,32 +127,136 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['id', 'name', 'description', 'price', 'category', 'image', 'more_description', 'specifications', 'stock_status']
 
+class ProductVariantSerializer(serializers.ModelSerializer):
+    # One SKU of a product, nested in ProductDetailSerializer
+    # Fields: id, sku, options ({axis: value}), price (own price, else the
+    # product's; the customer's list price with a price book), stock, in_stock
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, source='get_price', read_only=True)
+    in_stock = serializers.BooleanField(read_only=True)
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'sku', 'options', 'price', 'stock', 'in_stock']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        price_book = self.context.get('price_book')
+        if price_book is not None:
+            data['price'] = self.fields['price'].to_representation(price_book.price(instance.product, instance))
+        return data
+
+class ProductDetailSerializer(ProductSerializer):
+    # ProductSerializer plus the option pickers of a product page
+    # Fields: ProductSerializer fields, options ({axis: [values]}), variants (active SKUs)
+    # Expects the active variants prefetched into 'active_variants' (variants.active_variants_prefetch)
+    # API Endpoint: GET /api/products/{id}/ (NO LOGIN - AllowAny)
+    options = serializers.SerializerMethodField()
+    variants = ProductVariantSerializer(many=True, read_only=True, source='active_variants')
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['options', 'variants']
+
+    def get_options(self, product):
+        return option_axes(product.active_variants)
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    # Minimal category reference (id, name) nested in ProductSummarySerializer
+    class Meta:
+        model = Category
+        fields = ['id', 'name']
+
+class ProductSummarySerializer(PriceListMixin, serializers.ModelSerializer):
+    # Serializer for product grid/cart rows - only the fields a card displays
+    # Fields: id, name, price, image, stock_status, category (id, name)
+    # Leaves out description, more_description and specifications (unbounded text)
+    # API Endpoint: GET /api/bootstrap/ (first product page and cart items)
+    category = CategorySummarySerializer(read_only=True)
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'image', 'stock_status', 'category']
+
+class NormalizedProductSerializer(PriceListMixin, serializers.ModelSerializer):
+    # Product row for the 'products' side table of ?shape=normalized responses
+    # Fields: id, name, price, image, stock_status, category (id into the 'categories' side table)
+    # See products/normalization.py
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'image', 'stock_status', 'category']
+
 # ============================================================================
 # CART SERIALIZERS (REQUIRES LOGIN - IsAuthenticated)
 # ============================================================================
 
-class CartItemSerializer(serializers.ModelSerializer):
+def get_cart_evaluation(context, cart):
+    # Promotions are evaluated once per cart per response (promotions.py) and
+    # shared by the cart 'summary' and each line's 'discount'/'promotion'.
+    # Context keys used: 'price_book', 'coupon_codes', 'promotions' (engine)
+    evaluations = context.setdefault('cart_evaluations', {})
+    if cart.pk not in evaluations:
+        evaluations[cart.pk] = evaluate_cart(
+            cart, context.get('price_book'), context.get('coupon_codes', ()), context.get('promotions'),
+        )
+    return evaluations[cart.pk]
+
+class CartLineDiscountMixin(serializers.Serializer):
+    # Adds 'discount' (line total discount) and 'promotion' ({id, name} or null) to cart lines
+    discount = serializers.SerializerMethodField()
+    promotion = serializers.SerializerMethodField()
+
+    def _line(self, item):
+        return get_cart_evaluation(self.context, item.cart).by_key.get(item.id)
+
+    def get_discount(self, item):
+        line = self._line(item)
+        return str(line.discount) if line else '0.00'
+
+    def get_promotion(self, item):
+        line = self._line(item)
+        if line is None or line.promotion is None:
+            return None
+        return {'id': line.promotion.id, 'name': line.promotion.name}
+
+class CartSummaryMixin(serializers.Serializer):
+    # Adds 'summary': {subtotal, discount, total, coupons: [{code, valid}]} after promotions
+    summary = serializers.SerializerMethodField()
+
+    def get_summary(self, cart):
+        return get_cart_evaluation(self.context, cart).summary()
+
+class CartItemSerializer(CartLineDiscountMixin, serializers.ModelSerializer):
     # Serializer for CartItem model - nested within CartSerializer
-    # Fields: id, product (nested ProductSerializer), quantity
+    # Fields: id, product (nested ProductSerializer), variant (id or null), quantity, discount, promotion
     # Key Feature: Nested 'product' shows full product details with each item
     # API Access: Only through /api/carts/ endpoint (REQUIRES LOGIN)
     # Frontend: Cart.vue displays each item with product details and quantity
     product = ProductSerializer(read_only=True)
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'quantity']
+        fields = ['id', 'product', 'variant', 'quantity', 'discount', 'promotion']
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(CartSummaryMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     # Serializer for Cart model
-    # Fields: id, user, created_at, items (nested CartItemSerializer array)
+    # Fields: id, user, created_at, items (nested CartItemSerializer array), summary (totals after promotions)
     # Key Feature: Nested 'items' shows full product details for each cart item
+    # Supports ?fields= / ?omit= as the top-level serializer (fieldsets.py)
     # API Endpoint: GET /api/carts/ (REQUIRES LOGIN - IsAuthenticated)
     # ViewSet: CartViewSet filters to current user only
     # Frontend: Cart.vue, Checkout.vue uses useCartStore for state management
     items = CartItemSerializer(many=True, read_only=True)
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'created_at', 'items']
+        fields = ['id', 'user', 'created_at', 'items', 'summary']
+
+class NormalizedCartItemSerializer(CartLineDiscountMixin, serializers.ModelSerializer):
+    # CartItem with 'product' as an id into the 'products' side table (?shape=normalized)
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product', 'variant', 'quantity', 'discount', 'promotion']
+
+class NormalizedCartSerializer(CartSummaryMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    # CartSerializer for ?shape=normalized - same fields, items reference products by id
+    items = NormalizedCartItemSerializer(many=True, read_only=True)
+    class Meta:
+        model = Cart
+        fields = ['id', 'user', 'created_at', 'items', 'summary']
 
 # ============================================================================
 # ORDER SERIALIZERS (REQUIRES LOGIN - IsAuthenticated)
@@ -121,20 +264,21 @@ class CartSerializer(serializers.ModelSerializer):
 
 class OrderItemSerializer(serializers.ModelSerializer):
     # Serializer for OrderItem model - nested within OrderSerializer
-    # Fields: id, product (nested ProductSerializer), quantity, price
+    # Fields: id, product (nested ProductSerializer), variant (id or null), sku, quantity, price, discount (line total)
     # Key Feature: Stores price at time of order (historical accuracy)
     # API Access: Only through /api/orders/ endpoint (REQUIRES LOGIN)
     # Frontend: OrderHistory.vue, OrderDetail.vue, Profile.vue display order items
     product = ProductSerializer(read_only=True)
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity', 'price']
+        fields = ['id', 'product', 'variant', 'sku', 'quantity', 'price', 'discount']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Serializer for Order model
     # Fields: id, user, created_at, updated_at, shipping_address, phone_number
-    #         payment_method, status, items (nested OrderItemSerializer array)
+    #         payment_method, status, currency, coupon_code, items (nested OrderItemSerializer array)
     # Key Feature: Nested 'items' shows full product details with prices at order time
+    # Supports ?fields= / ?omit= as the top-level serializer (fieldsets.py)
     # API Endpoints (REQUIRES LOGIN - IsAuthenticated):
     #   - GET /api/orders/: List all orders for logged-in user
     #   - GET /api/orders/{id}/: Retrieve specific order details
@@ -144,7 +288,22 @@ class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     class Meta:
         model = Order
-        fields = ['id', 'user', 'created_at', 'updated_at', 'shipping_address', 'phone_number', 'payment_method', 'status', 'items']
+        fields = ['id', 'user', 'created_at', 'updated_at', 'shipping_address', 'phone_number', 'payment_method', 'status', 'currency', 'coupon_code', 'items']
+        read_only_fields = ['currency', 'coupon_code']
+
+class NormalizedOrderItemSerializer(serializers.ModelSerializer):
+    # OrderItem with 'product' as an id into the 'products' side table (?shape=normalized)
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'variant', 'sku', 'quantity', 'price', 'discount']
+
+class NormalizedOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # OrderSerializer for ?shape=normalized - same fields, items reference products by id
+    items = NormalizedOrderItemSerializer(many=True, read_only=True)
+    class Meta:
+        model = Order
+        fields = ['id', 'user', 'created_at', 'updated_at', 'shipping_address', 'phone_number', 'payment_method', 'status', 'currency', 'coupon_code', 'items']
+        read_only_fields = ['currency', 'coupon_code']
 
 
 class UserSerializer(serializers.ModelSerializer):
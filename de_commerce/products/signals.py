@@ -0,0 +1,59 @@
+"""
+Signal Receivers Module
+
+Connected in ProductsConfig.ready():
+- Category/Product post_save and post_delete: invalidate cached catalog data
+- ProductVariant post_save and post_delete: invalidate the cached data of
+  its product (product page, see product_page.py)
+- PriceList/PriceListItem post_save and post_delete, PriceList.customers
+  changes: invalidate cached price lists and customer assignments
+- Promotion post_save and post_delete, products/categories changes:
+  recompile the in-memory promotion index
+- OrderEvent post_save: push the status change to open order streams
+  (streams.py) once the transaction commits
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from .catalog_cache import bump_catalog_version, bump_product_version
+from .models import Category, Product, ProductVariant, PriceList, PriceListItem, Promotion, OrderEvent
+from .order_events import event_dict
+from .pricing import bump_pricing_version
+from .promotions import bump_promotions_version
+from .streams import broker
+
+
+@receiver([post_save, post_delete], sender=Category, dispatch_uid='catalog_category_changed')
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='catalog_product_changed')
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=ProductVariant, dispatch_uid='product_variant_changed')
+def product_variant_changed(sender, instance, **kwargs):
+    bump_product_version(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=PriceList, dispatch_uid='pricing_price_list_changed')
+@receiver([post_save, post_delete], sender=PriceListItem, dispatch_uid='pricing_price_list_item_changed')
+@receiver(m2m_changed, sender=PriceList.customers.through, dispatch_uid='pricing_customers_changed')
+def pricing_changed(sender, **kwargs):
+    bump_pricing_version()
+
+
+@receiver([post_save, post_delete], sender=Promotion, dispatch_uid='promotion_changed')
+@receiver(m2m_changed, sender=Promotion.products.through, dispatch_uid='promotion_products_changed')
+@receiver(m2m_changed, sender=Promotion.categories.through, dispatch_uid='promotion_categories_changed')
+def promotions_changed(sender, **kwargs):
+    bump_promotions_version()
+
+
+@receiver(post_save, sender=OrderEvent, dispatch_uid='order_event_stream')
+def order_event_created(sender, instance, created, **kwargs):
+    if created:
+        event = event_dict((
+            instance.id, instance.order_id, instance.user_id, instance.from_status, instance.to_status, instance.created_at,
+        ))
+        transaction.on_commit(lambda: broker.publish(event), using=kwargs.get('using'))
@@ -0,0 +1,185 @@
+"""
+Streams Module - Server-Sent Events for Order Status Updates
+
+GET /api/orders/stream/ (ASGI only) keeps a text/event-stream response open
+and pushes the authenticated user's order status changes as they happen, so
+OrderDetail.vue and OrderHistory.vue do not have to poll /api/orders/:
+
+    retry: 5000
+
+    id: 42
+    event: order_status
+    data: {"id": 42, "order": 7, "user": 3, "from_status": "ordered", "to_status": "shipped", "created_at": "..."}
+
+    : heartbeat
+
+How it works:
+- Order.save() appends an OrderEvent (models.py). Once that transaction
+  commits, signals.py hands the event to the process-global broker below.
+- The broker keeps, per user id, the open streams of this process. publish()
+  may be called from any thread; it hands the event to each stream's queue
+  on the event loop with call_soon_threadsafe().
+- An idle stream is one coroutine waiting on its queue: no thread, no
+  database connection, no polling. A comment line is sent every
+  SSE_HEARTBEAT seconds so proxies and browsers keep the connection open.
+- Event ids are OrderEvent ids. On reconnect, browsers send the last id they
+  saw as Last-Event-ID (or pass ?last_event_id=); events missed meanwhile are
+  replayed from the database (order_events.events_after) before going live.
+- A stream that falls more than SSE_QUEUE_SIZE events behind is closed; the
+  client reconnects and catches up through the replay.
+
+The broker is in-process: with several ASGI worker processes, a stream only
+sees changes saved by its own process until it reconnects. Run status
+updates and streams in the same process, or accept that delay.
+
+Authentication: session cookie (EventSource sends cookies) or an
+'Authorization: Bearer <access token>' header (authentication.py).
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+
+from .authentication import SignedTokenAuthentication
+from .order_events import MAX_PAGE_SIZE, events_after, parse_cursor
+from .renderers import FastJSONRenderer
+
+SSE_HEARTBEAT = getattr(settings, 'SSE_HEARTBEAT', 15)
+SSE_RETRY_MS = getattr(settings, 'SSE_RETRY_MS', 5000)
+SSE_QUEUE_SIZE = getattr(settings, 'SSE_QUEUE_SIZE', 100)
+
+_renderer = FastJSONRenderer()
+
+
+class Subscription:
+    """One open stream: its event loop and a bounded queue of events."""
+
+    def __init__(self, user_id, loop, maxsize=SSE_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _put(self, event):
+        # Runs on the subscription's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)  # wake the stream so it closes
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop closed: the stream is gone
+
+
+class EventBroker:
+    """In-process publish/subscribe of order events, keyed by user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, event):
+        """Send an event dict (order_events.event_dict) to the streams of event['user']."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event['user'], ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+        return len(subscriptions)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+broker = EventBroker()
+
+
+def format_event(event):
+    """Encode an order event as an SSE message."""
+    return b'id: %d\nevent: order_status\ndata: %s\n\n' % (event['id'], _renderer.render(event))
+
+
+async def event_stream(user, last_event_id):
+    """Yield the SSE body: replay after last_event_id, then live events and heartbeats."""
+    # Subscribing when iteration starts pairs it with the finally below, even
+    # if the client disconnects before the first chunk
+    subscription = broker.subscribe(user.pk)
+    try:
+        yield b'retry: %d\n\n' % SSE_RETRY_MS
+        if last_event_id is not None:
+            # Subscribed first, so nothing published during the replay is lost
+            while True:
+                events, has_more = await sync_to_async(events_after)(last_event_id, user, MAX_PAGE_SIZE)
+                for event in events:
+                    last_event_id = event['id']
+                    yield format_event(event)
+                if not has_more:
+                    break
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b': heartbeat\n\n'
+                continue
+            if event is None or subscription.overflowed:
+                return  # too far behind: the client reconnects and replays
+            if last_event_id is not None and event['id'] <= last_event_id:
+                continue  # already sent by the replay
+            last_event_id = event['id']
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def authenticate(request):
+    """Return the request's user from a Bearer access token or the session (None if anonymous)."""
+    try:
+        result = SignedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    if result is not None:
+        return result[0]
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def order_stream(request):
+    """GET /api/orders/stream/ - SSE stream of the user's order status changes."""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Order event streams are only served by the ASGI application.'}, status=501)
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = parse_cursor(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'), None)
+    response = StreamingHttpResponse(event_stream(user, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: do not buffer the stream
+    return response
@@ -0,0 +1,69 @@
+"""
+Background Tasks Module
+
+Tasks run by the job worker (jobs.py), registered when ProductsConfig.ready()
+imports this module. Checkout enqueues them after the order commits:
+
+- orders.send_confirmation(order_id): order confirmation email to the customer
+- inventory.order_placed(order_id): one inventory_event per order line
+
+There is no stock count on Product yet, so inventory.order_placed only
+publishes events: stock sync or analytics code connects to the
+inventory_event signal and receives
+    event='reserved', product_id, quantity, order_id
+for each line of the order.
+
+Tasks may run more than once (retries after a crash), so receivers should be
+idempotent per (order_id, product_id).
+"""
+
+import logging
+
+from django.core.mail import send_mail
+from django.dispatch import Signal
+
+from .jobs import task
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+inventory_event = Signal()
+
+
+def enqueue_order_placed(order):
+    """Enqueue the post-checkout jobs for `order` (inserted when the transaction commits)."""
+    send_order_confirmation.enqueue({'order_id': order.id})
+    publish_inventory_events.enqueue({'order_id': order.id})
+
+
+@task('orders.send_confirmation', max_attempts=5)
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').filter(pk=order_id).first()
+    if order is None or not order.user.email:
+        return
+    items = list(order.items.select_related('product'))
+    lines = '\n'.join(
+        f'- {item.quantity} x {item.product.name}: {item.get_total_price()} {order.currency}' for item in items
+    )
+    total = sum((item.get_total_price() for item in items), 0)
+    send_mail(
+        f'Order #{order.id} confirmed - De-Commerce',
+        f'Hello {order.user.username},\n\n'
+        f'Thank you for your order. We have received it and will let you know when it ships.\n\n'
+        f'{lines}\n\n'
+        f'Total: {total} {order.currency}\n'
+        f'Shipping to: {order.shipping_address}\n\n'
+        f'Best regards,\nDe-Commerce Team',
+        'noreply@de-commerce.com',
+        [order.user.email],
+        fail_silently=False,
+    )
+
+
+@task('inventory.order_placed', max_attempts=10)
+def publish_inventory_events(order_id):
+    for product_id, quantity in OrderItem.objects.filter(order_id=order_id).values_list('product_id', 'quantity'):
+        inventory_event.send(
+            sender=Order, event='reserved', product_id=product_id, quantity=quantity, order_id=order_id,
+        )
+    logger.info('Published inventory events for order %s', order_id)
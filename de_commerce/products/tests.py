@@ -1,4 +1,5 @@
 from rest_framework.test import APIClient
+from asgiref.sync import sync_to_async
 from django.test import TestCase
 class OrderStatusTest(TestCase):
 	def setUp(self):
@@ -22,6 +23,8 @@ class OrderStatusTest(TestCase):
 		self.assertIn('status', response.data)
 
 from django.contrib.auth import get_user_model
+import time
+from django.contrib.auth.models import AnonymousUser
 from .models import Category, Product, Cart, CartItem, Order, OrderItem
 from .forms import CartAddProductForm, OrderForm
 from django.urls import reverse
@@ -102,3 +105,1706 @@ class SessionCartMergeTest(TestCase):
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0]['product']['id'], self.product.id)
 		self.assertEqual(items[0]['quantity'], 2)
+
+
+from decimal import Decimal
+from unittest import mock
+from django.core import mail
+from django.test import AsyncClient, override_settings
+from django.urls import include, path
+from . import urls as products_urls
+from .authentication import issue_tokens
+from .models import PriceList
+from .throttling import UserSlidingWindowThrottle
+
+# URLconf with the async-native read path mounted, as under ASGI (settings.ASYNC_API)
+urlpatterns = [
+	path('', include((products_urls.async_urlpatterns + products_urls.urlpatterns, 'products'))),
+]
+
+
+@override_settings(ROOT_URLCONF='products.tests')
+class AsyncNativeAPITest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='asyncuser', email='async@example.com', password='pass')
+		self.category = Category.objects.create(name='AsyncCat')
+		self.product = Product.objects.create(name='AsyncProd', description='desc', price=4.25, category=self.category)
+		self.async_client = AsyncClient()
+
+	async def test_product_list_matches_sync_view(self):
+		response = await self.async_client.get('/api/products/')
+		self.assertEqual(response.status_code, 200)
+		sync_response = await sync_to_async(APIClient().get)('/api/products/')
+		self.assertEqual(response.json(), sync_response.json())
+
+	async def test_category_list(self):
+		response = await self.async_client.get('/api/categories/')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([c['name'] for c in response.json()], ['AsyncCat'])
+
+	async def test_non_get_falls_back_to_drf_view(self):
+		response = await self.async_client.post('/api/products/', {})
+		self.assertEqual(response.status_code, 405)
+
+	async def test_me_anonymous_returns_session_cart(self):
+		response = await self.async_client.post('/api/session-cart/', {'product_id': self.product.id, 'quantity': 3}, content_type='application/json')
+		self.assertEqual(response.status_code, 200)
+		me = (await self.async_client.get('/api/me/')).json()
+		self.assertFalse(me['authenticated'])
+		self.assertEqual(me['cart']['items'][0]['quantity'], 3)
+		cart = (await self.async_client.get('/api/session-cart/')).json()
+		self.assertEqual(cart['items'][0]['product']['id'], self.product.id)
+
+	async def test_me_authenticated_returns_profile_and_cart(self):
+		cart = await Cart.objects.acreate(user=self.user)
+		await CartItem.objects.acreate(cart=cart, product=self.product, quantity=2)
+		await self.async_client.aforce_login(self.user)
+		me = (await self.async_client.get('/api/me/')).json()
+		self.assertTrue(me['authenticated'])
+		self.assertEqual(me['user']['username'], 'asyncuser')
+		self.assertEqual(me['cart']['items'][0]['product']['name'], 'AsyncProd')
+
+	async def test_bearer_token_authenticates_async_views(self):
+		cart = await Cart.objects.acreate(user=self.user)
+		await CartItem.objects.acreate(cart=cart, product=self.product, quantity=2)
+		price_list = await PriceList.objects.acreate(name='Async list', currency='EUR', exchange_rate=Decimal('2'))
+		await price_list.customers.aadd(self.user)
+		token = issue_tokens(self.user)['access']
+		me = (await self.async_client.get('/api/me/', headers={'Authorization': f'Bearer {token}'})).json()
+		self.assertTrue(me['authenticated'])
+		self.assertEqual((me['user']['username'], me['cart']['items'][0]['quantity']), ('asyncuser', 2))
+		products = (await self.async_client.get('/api/products/', headers={'Authorization': f'Bearer {token}'})).json()
+		self.assertEqual((products[0]['price'], products[0]['currency']), ('8.50', 'EUR'))
+		# Throttled as the user, not as an anonymous client
+		throttled_as = []
+		with mock.patch.object(UserSlidingWindowThrottle, 'get_cache_key', autospec=True, side_effect=lambda throttle, request, view: throttled_as.append(request.user.pk)):
+			await self.async_client.get('/api/me/', headers={'Authorization': f'Bearer {token}'})
+		self.assertEqual(throttled_as, [self.user.pk])
+		response = await self.async_client.get('/api/me/', headers={'Authorization': 'Bearer not-a-token'})
+		self.assertEqual(response.status_code, 401)
+
+	async def test_password_reset_sends_mail(self):
+		response = await self.async_client.post('/api/password-reset/', {'email': 'async@example.com'}, content_type='application/json')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(mail.outbox), 1)
+		missing = await self.async_client.post('/api/password-reset/', {}, content_type='application/json')
+		self.assertEqual(missing.status_code, 400)
+
+
+from .throttling import SlidingWindowRateThrottle, get_throttle_cache
+
+
+class FakeTimerThrottle(SlidingWindowRateThrottle):
+	scope = 'test'
+	rate = '3/minute'
+	now_value = 1200.0
+
+	def timer(self):
+		return FakeTimerThrottle.now_value
+
+
+class SlidingWindowThrottleTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		FakeTimerThrottle.now_value = 1200.0
+		self.request = APIClient().get('/api/categories/').wsgi_request
+		self.request.user = AnonymousUser()
+
+	def allow(self):
+		return FakeTimerThrottle().allow_request(self.request, None)
+
+	def test_blocks_after_rate_and_recovers(self):
+		self.assertEqual([self.allow() for _ in range(4)], [True, True, True, False])
+		# Half way into the next window, half of the previous window still counts
+		FakeTimerThrottle.now_value = 1200.0 + 90
+		self.assertTrue(self.allow())
+		self.assertTrue(self.allow())
+		self.assertFalse(self.allow())
+		# Two windows later the client starts fresh
+		FakeTimerThrottle.now_value = 1200.0 + 240
+		self.assertTrue(self.allow())
+
+	def test_state_is_fixed_size(self):
+		throttle = FakeTimerThrottle()
+		throttle.rate = '1000/minute'
+		throttle.num_requests, throttle.duration = throttle.parse_rate(throttle.rate)
+		for _ in range(500):
+			throttle.allow_request(self.request, None)
+		self.assertEqual(get_throttle_cache().get(throttle.key), (20, 500, 0))
+
+	def test_catalog_reads_do_not_use_anon_bucket(self):
+		client = APIClient()
+		for _ in range(5):
+			self.assertEqual(client.get('/api/categories/').status_code, 200)
+		self.assertIsNone(get_throttle_cache().get(f'throttle_anon_{self.request.META["REMOTE_ADDR"]}'))
+		self.assertIsNotNone(get_throttle_cache().get(f'throttle_catalog_{self.request.META["REMOTE_ADDR"]}'))
+
+	def test_login_scope_returns_429(self):
+		client = APIClient()
+		statuses = [client.post('/api/login/', {'username': 'nobody', 'password': 'x'}, format='json').status_code for _ in range(7)]
+		self.assertEqual(statuses[-1], 429)
+		self.assertIsNotNone(get_throttle_cache().get(f'throttle_login_{self.request.META["REMOTE_ADDR"]}'))
+
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class BootstrapAPITest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(username='bootuser', email='boot@example.com', password='pass')
+		self.category = Category.objects.create(name='BootCat', description='cat')
+		self.products = [
+			Product.objects.create(name=f'Boot {i}', description='d' * 500, more_description='m' * 500, specifications='s' * 500, price=2.5, category=self.category)
+			for i in range(5)
+		]
+
+	def test_cold_start_needs_fewer_requests_and_bytes(self):
+		self.client.force_authenticate(user=self.user)
+		waterfall = [self.client.get(url) for url in ('/api/me/', '/api/products/', '/api/categories/')]
+		Cart.objects.all().delete()
+		bootstrap = self.client.get('/api/bootstrap/')
+		self.assertEqual(bootstrap.status_code, 200)
+		# One request instead of three, and less than half the bytes
+		self.assertEqual(len(waterfall) - 1, 2)
+		self.assertLess(len(bootstrap.content), sum(len(r.content) for r in waterfall) / 2)
+		self.assertEqual(bootstrap.data['products']['count'], 5)
+		self.assertEqual(len(bootstrap.data['categories']), 1)
+		self.assertTrue(bootstrap.data['authenticated'])
+
+	def test_is_read_only(self):
+		self.client.force_authenticate(user=self.user)
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/api/bootstrap/')
+		self.assertEqual(response.status_code, 200)
+		self.assertFalse(Cart.objects.filter(user=self.user).exists())
+		self.assertFalse([q for q in queries.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+		self.assertEqual(response.data['cart'], {'items': [], 'total_items': 0, 'subtotal': '0.00', 'discount': '0.00', 'total_price': '0.00'})
+		self.assertIn('private', response['Cache-Control'])
+
+	def test_cart_summary_and_public_cache_invalidation(self):
+		cart = Cart.objects.create(user=self.user)
+		CartItem.objects.create(cart=cart, product=self.products[0], quantity=3)
+		self.client.force_authenticate(user=self.user)
+		data = self.client.get('/api/bootstrap/').data
+		self.assertEqual(data['cart']['total_items'], 3)
+		self.assertEqual(data['cart']['total_price'], '7.50')
+		self.assertEqual(data['cart']['items'][0]['product']['name'], 'Boot 0')
+		# Public part is served from cache until the catalog changes: only the
+		# cart query and the shared pricing and promotions versions remain
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get('/api/bootstrap/')
+		self.assertEqual(len(queries), 3)
+		Category.objects.create(name='NewCat')
+		self.assertEqual(len(self.client.get('/api/bootstrap/').data['categories']), 2)
+
+	def test_anonymous_session_cart(self):
+		session = self.client.session
+		session['cart'] = {str(self.products[1].id): 2}
+		session.save()
+		data = self.client.get('/api/bootstrap/').data
+		self.assertFalse(data['authenticated'])
+		self.assertIsNone(data['user'])
+		self.assertEqual(data['cart']['items'][0]['product']['id'], self.products[1].id)
+
+	def test_response_varies_on_cookie_and_authorization(self):
+		vary = {value.strip() for value in self.client.get('/api/bootstrap/')['Vary'].split(',')}
+		self.assertLessEqual({'Cookie', 'Authorization'}, vary)
+
+
+from django.contrib.auth.hashers import make_password, get_hasher
+from .hashers import TunedArgon2PasswordHasher
+from django.core.cache import cache
+from unittest import mock
+from rest_framework.test import APIRequestFactory
+from .views import authenticate_with_lockout
+
+
+class PasswordHasherTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		self.client = APIClient()
+
+	def test_new_passwords_use_tuned_hasher(self):
+		user = User.objects.create_user(username='hashuser', password='pass')
+		self.assertEqual(user.password.split('$', 1)[0], get_hasher('default').algorithm)
+		self.assertEqual(get_hasher('default').algorithm, 'argon2')
+		# The tuned hasher also verifies every 'argon2' hash (one entry per algorithm)
+		self.assertIsInstance(get_hasher('argon2'), TunedArgon2PasswordHasher)
+
+	def test_legacy_hash_is_upgraded_on_login(self):
+		user = User.objects.create(username='legacyuser')
+		user.password = make_password('pass', hasher='pbkdf2_sha256')
+		user.save()
+		response = self.client.post('/api/login/', {'username': 'legacyuser', 'password': 'pass'}, format='json')
+		self.assertEqual(response.status_code, 200)
+		user.refresh_from_db()
+		self.assertEqual(user.password.split('$', 1)[0], get_hasher('default').algorithm)
+
+	def test_lockout_after_repeated_failures(self):
+		User.objects.create_user(username='lockuser', password='pass')
+		for _ in range(5):
+			response = self.client.post('/api/login/', {'username': 'lockuser', 'password': 'wrong'}, format='json')
+			self.assertEqual(response.status_code, 401)
+		self.assertEqual(cache.get_many(['login_fail:lockuser:127.0.0.1', 'login_fail_ip:127.0.0.1']),
+			{'login_fail:lockuser:127.0.0.1': 5, 'login_fail_ip:127.0.0.1': 5})
+		get_throttle_cache().clear()
+		response = self.client.post('/api/login/', {'username': 'lockuser', 'password': 'pass'}, format='json')
+		self.assertEqual(response.status_code, 429)
+
+	def test_concurrent_failures_all_count(self):
+		key = 'login_fail:racer:127.0.0.1'
+		cache.set(key, 3, 600)
+
+		def concurrent_failure(**credentials):
+			cache.incr(key)  # another request fails while this one checks the password
+			return None
+
+		request = APIRequestFactory().post('/api/login/')
+		with mock.patch('products.views.authenticate', concurrent_failure):
+			user, response = authenticate_with_lockout(request, 'racer', 'wrong')
+		self.assertEqual((user, response.status_code), (None, 401))
+		self.assertEqual(cache.get(key), 5)
+
+
+from unittest import mock
+from . import authentication
+
+
+class SignedTokenAuthenticationTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(username='tokenuser', email='token@example.com', password='pass')
+		self.order = Order.objects.create(user=self.user, shipping_address='addr', phone_number='1234567')
+
+	def obtain(self):
+		response = self.client.post('/api/token/', {'username': 'tokenuser', 'password': 'pass'}, format='json')
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def test_token_requests_do_not_query_users_or_sessions(self):
+		tokens = self.obtain()
+		self.assertNotIn('sessionid', self.client.cookies)
+		self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/api/orders/')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([o['id'] for o in response.data], [self.order.id])
+		sql = ' '.join(q['sql'] for q in queries.captured_queries)
+		self.assertNotIn('auth_user', sql)
+		self.assertNotIn('django_session', sql)
+
+	def test_invalid_and_expired_tokens_are_rejected(self):
+		tokens = self.obtain()
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+		self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+		with mock.patch.object(authentication, 'TOKEN_ACCESS_TTL', -1):
+			self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+			self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+		# A refresh token is not accepted as an access token
+		self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['refresh']}")
+		self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+
+	def test_refresh_rotates_and_checks_password(self):
+		tokens = self.obtain()
+		response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+		self.assertEqual(response.status_code, 200)
+		self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+		self.assertEqual(self.client.get('/api/me/').data['user']['username'], 'tokenuser')
+		self.user.set_password('changed')
+		self.user.save()
+		self.client.credentials()
+		response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+		self.assertEqual(response.status_code, 401)
+
+
+import datetime
+import gzip
+import json
+from decimal import Decimal
+from rest_framework.renderers import JSONRenderer
+from .renderers import FastJSONRenderer
+
+
+class CompressionAndRenderingTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		category = Category.objects.create(name='Bulk')
+		for i in range(20):
+			Product.objects.create(name=f'Bulk product {i}', description='x' * 200, price=Decimal('9.99'), category=category)
+		self.client = APIClient()
+
+	def test_large_json_is_gzipped(self):
+		response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+		self.assertEqual(response['Content-Encoding'], 'gzip')
+		self.assertIn('Accept-Encoding', response['Vary'])
+		data = json.loads(gzip.decompress(response.content))
+		self.assertEqual(len(data), 20)
+		self.assertEqual(data[0]['price'], '9.99')
+
+	def test_small_or_refused_responses_are_not_compressed(self):
+		self.assertFalse(self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip;q=0').has_header('Content-Encoding'))
+		self.assertFalse(self.client.get('/api/session-cart/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+	def test_renderer_matches_drf_output(self):
+		data = {
+			'price': Decimal('12.50'),
+			'created': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+			'day': datetime.date(2024, 1, 2),
+			'name': 'Café',
+			1: [None, True, 1.5],
+		}
+		self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+	def test_malformed_json_body_is_rejected(self):
+		response = self.client.post('/api/login/', '{"username": ', content_type='application/json')
+		self.assertEqual(response.status_code, 400)
+
+
+class NormalizedShapeTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.user = User.objects.create_user(username='shapeuser', password='pass')
+		self.category = Category.objects.create(name='Shape')
+		self.products = [
+			Product.objects.create(name=f'Shape {i}', description='d' * 500, specifications='s' * 500, price=Decimal('3.00'), category=self.category)
+			for i in range(3)
+		]
+		self.cart = Cart.objects.create(user=self.user)
+		for product in self.products:
+			CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+		self.order = Order.objects.create(user=self.user, shipping_address='addr', phone_number='1234567')
+		for product in self.products + self.products[:1]:
+			OrderItem.objects.create(order=self.order, product=product, quantity=1, price=Decimal('3.00'))
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_cart_list_uses_side_tables(self):
+		data = self.client.get('/api/carts/?shape=normalized').data
+		self.assertEqual([item['product'] for item in data['results'][0]['items']], [p.id for p in self.products])
+		self.assertEqual(set(data['products']), {p.id for p in self.products})
+		self.assertEqual(data['products'][self.products[0].id]['category'], self.category.id)
+		self.assertNotIn('description', data['products'][self.products[0].id])
+		self.assertEqual(data['categories'], {self.category.id: {'id': self.category.id, 'name': 'Shape'}})
+
+	def test_order_detail_references_each_product_once(self):
+		nested = self.client.get(f'/api/orders/{self.order.id}/')
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(f'/api/orders/{self.order.id}/?shape=normalized')
+		self.assertEqual(len(response.data['items']), 4)
+		self.assertEqual(len(response.data['products']), 3)
+		self.assertLess(len(response.content), len(nested.content) / 2)
+		self.assertNotIn('specifications', ' '.join(q['sql'] for q in queries.captured_queries))
+
+	def test_me_authenticated_and_anonymous(self):
+		me = self.client.get('/api/me/?shape=normalized').data
+		self.assertEqual(me['cart']['items'][0]['product'], self.products[0].id)
+		self.assertIn(self.products[0].id, me['products'])
+		anon = APIClient()
+		anon.post('/api/session-cart/', {'product_id': self.products[1].id, 'quantity': 1}, format='json')
+		me = anon.get('/api/me/?shape=normalized').data
+		self.assertEqual(me['cart']['items'], [{'product': self.products[1].id, 'variant': None, 'quantity': 1}])
+		self.assertEqual(list(me['products']), [self.products[1].id])
+		self.assertEqual(anon.get('/api/session-cart/').data['items'][0]['product']['id'], self.products[1].id)
+
+	@override_settings(ROOT_URLCONF='products.tests')
+	async def test_async_me_matches_sync_view(self):
+		client = AsyncClient()
+		await client.aforce_login(self.user)
+		response = await client.get('/api/me/?shape=normalized')
+		sync_client = APIClient()
+		await sync_to_async(sync_client.force_login)(self.user)
+		sync_response = await sync_to_async(sync_client.get)('/api/me/?shape=normalized')
+		self.assertEqual(response.json(), sync_response.json())
+
+
+class SparseFieldsetTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.category = Category.objects.create(name='Sparse', description='long category text')
+		Product.objects.create(name='Sparse product', description='d' * 500, more_description='m' * 500, price=Decimal('5.00'), category=self.category)
+		self.client = APIClient()
+
+	def test_fields_selects_columns_and_defers_text(self):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/api/products/?fields=name,price,stock_status,unknown')
+		self.assertEqual(list(response.data[0]), ['id', 'name', 'price', 'stock_status'])
+		sql = ' '.join(q['sql'] for q in queries.captured_queries)
+		self.assertNotIn('more_description', sql)
+		self.assertNotIn('specifications', sql)
+
+	def test_omit_and_nested_serializers_keep_full_shape(self):
+		data = self.client.get('/api/products/?omit=description,more_description,specifications').data
+		self.assertEqual(list(data[0]), ['id', 'name', 'price', 'category', 'image', 'stock_status', 'min_price', 'max_price', 'in_stock', 'variant_count'])
+		self.assertEqual(data[0]['category']['description'], 'long category text')
+		self.assertEqual(list(self.client.get('/api/categories/?omit=description').data[0]), ['id', 'name'])
+
+	def test_order_fields(self):
+		user = User.objects.create_user(username='sparseuser', password='pass')
+		order = Order.objects.create(user=user, shipping_address='addr', phone_number='1234567')
+		self.client.force_authenticate(user)
+		data = self.client.get(f'/api/orders/{order.id}/?fields=status,created_at').data
+		self.assertEqual(set(data), {'id', 'status', 'created_at'})
+
+
+import time
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F
+from .catalog_cache import bump_version, get_version
+from .models import CacheVersion, PriceList, PriceListItem
+from .pricing import PriceBook, get_price_book
+
+
+class PriceListTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		self.category = Category.objects.create(name='Priced')
+		self.listed = Product.objects.create(name='Listed', description='d', price=Decimal('10.00'), category=self.category)
+		self.converted = Product.objects.create(name='Converted', description='d', price=Decimal('3.33'), category=self.category)
+		self.user = User.objects.create_user(username='b2b', password='pass')
+		self.price_list = PriceList.objects.create(name='EU wholesale', currency='EUR', exchange_rate=Decimal('0.9'))
+		self.price_list.customers.add(self.user)
+		PriceListItem.objects.create(price_list=self.price_list, product=self.listed, price=Decimal('7.50'))
+		self.client = APIClient()
+
+	def test_bulk_resolution_is_one_query_then_cached(self):
+		products = list(Product.objects.all())
+		# shared version, price list, explicit prices
+		with self.assertNumQueries(3):
+			book = get_price_book(self.user)
+			self.assertEqual(book.prices(products), {self.listed.id: Decimal('7.50'), self.converted.id: Decimal('3.00')})
+		with self.assertNumQueries(1):
+			get_price_book(self.user).prices(products)
+		with self.assertNumQueries(0):
+			get_price_book(AnonymousUser()).prices(products)
+		self.assertEqual(PriceBook().prices(products)[self.listed.id], Decimal('10.00'))
+
+	def test_product_list_shows_customer_prices(self):
+		anonymous = self.client.get('/api/products/').data
+		self.assertEqual(anonymous[0]['price'], '10.00')
+		self.assertNotIn('currency', anonymous[0])
+		self.client.force_authenticate(self.user)
+		data = {p['id']: p for p in self.client.get('/api/products/').data}
+		self.assertEqual((data[self.listed.id]['price'], data[self.listed.id]['currency']), ('7.50', 'EUR'))
+		self.assertEqual(data[self.converted.id]['price'], '3.00')
+
+	def test_saving_prices_invalidates_cache(self):
+		get_price_book(self.user).load()
+		PriceListItem.objects.filter(product=self.listed).get().delete()
+		self.assertEqual(get_price_book(self.user).price(self.listed), Decimal('9.00'))
+		self.price_list.customers.remove(self.user)
+		self.assertIsNone(get_price_book(self.user).price_list)
+
+	def test_change_from_another_process_invalidates_cache(self):
+		get_price_book(self.user).load()
+		# Another worker changes a price: its signals bump the shared version
+		# in the database, never this process's cache
+		PriceListItem.objects.filter(product=self.listed).update(price=Decimal('6.00'))
+		CacheVersion.objects.filter(namespace='pricing').update(version=F('version') + 1)
+		self.assertEqual(get_price_book(self.user).price(self.listed), Decimal('6.00'))
+
+	def test_evicted_version_does_not_resurrect_entries(self):
+		get_version('pricing-test')
+		bump_version('pricing-test')
+		bumped = get_version('pricing-test')
+		cache.delete('pricing-test:version')
+		time.sleep(0.002)
+		self.assertGreater(get_version('pricing-test'), bumped)
+
+	def test_checkout_stores_price_snapshot(self):
+		cart = Cart.objects.create(user=self.user)
+		CartItem.objects.create(cart=cart, product=self.listed, quantity=2)
+		self.assertEqual(cart.total_price(get_price_book(self.user)), Decimal('15.00'))
+		self.client.force_authenticate(self.user)
+		response = self.client.post('/api/orders/', {'shipping_address': 'addr', 'phone_number': '1234567', 'currency': 'USD'}, format='json')
+		self.assertEqual(response.status_code, 201)
+		order = Order.objects.get(pk=response.data['id'])
+		self.assertEqual((order.currency, order.price_list_id), ('EUR', self.price_list.id))
+		self.assertEqual(order.items.get().price, Decimal('7.50'))
+
+
+from django.utils import timezone
+from .models import Promotion
+from .promotions import PROMOTIONS_MAX_AGE, PromotionEngine, Line, Rule, get_promotion_engine
+
+
+class PromotionEngineTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		self.shoes = Category.objects.create(name='Shoes')
+		self.hats = Category.objects.create(name='Hats')
+		self.boot = Product.objects.create(name='Boot', description='d', price=Decimal('50.00'), category=self.shoes)
+		self.cap = Product.objects.create(name='Cap', description='d', price=Decimal('10.00'), category=self.hats)
+		self.user = User.objects.create_user(username='promo', password='pass')
+		self.cart = Cart.objects.create(user=self.user)
+		CartItem.objects.create(cart=self.cart, product=self.boot, quantity=1)
+		CartItem.objects.create(cart=self.cart, product=self.cap, quantity=3)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_rule_kinds_and_best_discount_per_line(self):
+		rules = [
+			Rule(1, '10% shoes', 'percentage', Decimal('10'), 1, 1, '', None, None),
+			Rule(2, '$8 off boots', 'fixed', Decimal('8'), 1, 1, '', None, None),
+			Rule(3, 'Caps 2+1', 'bogo', Decimal('0'), 2, 1, '', None, None),
+			Rule(4, 'Expired', 'percentage', Decimal('90'), 1, 1, '', None, timezone.now() - datetime.timedelta(days=1)),
+		]
+		engine = PromotionEngine(rules, product_ids={2: [self.boot.id], 3: [self.cap.id]}, category_ids={1: [self.shoes.id]})
+		evaluation = engine.evaluate([
+			Line('boot', self.boot.id, self.shoes.id, 1, Decimal('50.00')),
+			Line('cap', self.cap.id, self.hats.id, 3, Decimal('10.00')),
+		])
+		self.assertEqual((evaluation.by_key['boot'].discount, evaluation.by_key['boot'].promotion.id), (Decimal('8.00'), 2))
+		self.assertEqual(evaluation.by_key['cap'].discount, Decimal('10.00'))
+		self.assertEqual(evaluation.summary()['total'], '62.00')
+
+	def test_engine_recompiles_on_change_and_cart_shows_discounts(self):
+		self.assertEqual(get_promotion_engine().size, 0)
+		promotion = Promotion.objects.create(name='Hat sale', kind='percentage', value=Decimal('50'))
+		promotion.categories.add(self.hats)
+		engine = get_promotion_engine()
+		self.assertEqual(engine.size, 1)
+		# Only the shared version is read until promotions change again
+		with self.assertNumQueries(1):
+			self.assertIs(get_promotion_engine(), engine)
+		data = self.client.get('/api/carts/').data[0]
+		self.assertEqual([item['discount'] for item in data['items']], ['0.00', '15.00'])
+		self.assertEqual(data['items'][1]['promotion'], {'id': promotion.id, 'name': 'Hat sale'})
+		self.assertEqual(data['summary']['total'], '65.00')
+
+	@mock.patch('products.promotions._engine', None)
+	def test_change_from_another_process_recompiles(self):
+		engine = get_promotion_engine()
+		# Another worker adds a promotion: its signals bump the shared version
+		# in the database, never this process's cache or engine
+		Promotion.objects.bulk_create([Promotion(name='Elsewhere', kind='percentage', value=Decimal('5'))])
+		self.assertIs(get_promotion_engine(), engine)
+		CacheVersion.objects.update_or_create(namespace='promotions', defaults={'version': engine.version + 1})
+		self.assertEqual(get_promotion_engine().size, engine.size + 1)
+
+	@mock.patch('products.promotions._engine', None)
+	def test_engine_recompiles_after_max_age(self):
+		engine = get_promotion_engine()
+		Promotion.objects.bulk_create([Promotion(name='No signal', kind='percentage', value=Decimal('5'))])
+		self.assertIs(get_promotion_engine(), engine)
+		with mock.patch('products.promotions.time.monotonic', return_value=engine.compiled_at + PROMOTIONS_MAX_AGE):
+			self.assertEqual(get_promotion_engine().size, engine.size + 1)
+
+	def test_checkout_applies_coupon_and_rejects_unknown(self):
+		promotion = Promotion.objects.create(name='Boot coupon', kind='percentage', value=Decimal('20'), coupon_code='boots20')
+		promotion.products.add(self.boot)
+		preview = self.client.get('/api/carts/?coupon=BOOTS20').data[0]['summary']
+		self.assertEqual((preview['discount'], preview['coupons']), ('10.00', [{'code': 'BOOTS20', 'valid': True}]))
+		body = {'shipping_address': 'addr', 'phone_number': '1234567'}
+		response = self.client.post('/api/orders/', dict(body, coupon_code='NOPE'), format='json')
+		self.assertEqual(response.status_code, 400)
+		response = self.client.post('/api/orders/', dict(body, coupon_code='boots20'), format='json')
+		self.assertEqual(response.status_code, 201)
+		order = Order.objects.get(pk=response.data['id'])
+		self.assertEqual(order.coupon_code, 'BOOTS20')
+		self.assertEqual(order.items.get(product=self.boot).discount, Decimal('10.00'))
+		self.assertEqual(order.total_price(), Decimal('70.00'))
+
+
+import threading
+from django.test import TransactionTestCase
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from . import idempotency
+from .models import IdempotencyKey
+
+
+class IdempotentCheckoutTest(TransactionTestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		category = Category.objects.create(name='Idem')
+		self.product = Product.objects.create(name='Idem item', description='d', price=Decimal('5.00'), category=category)
+		self.user = User.objects.create_user(username='idem', password='pass')
+		self.body = {'shipping_address': 'addr', 'phone_number': '1234567'}
+
+	def fill_cart(self):
+		cart, _ = Cart.objects.get_or_create(user=self.user)
+		CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+
+	def post_concurrently(self, path, key, count=4):
+		responses = []
+
+		def worker():
+			client = APIClient()
+			client.force_authenticate(self.user)
+			try:
+				responses.append(client.post(path, self.body, format='json', HTTP_IDEMPOTENCY_KEY=key))
+			finally:
+				connection.close()
+
+		threads = [threading.Thread(target=worker) for _ in range(count)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		return responses
+
+	def test_concurrent_retries_create_one_order(self):
+		for path in ('/api/orders/', '/api/create-order/'):
+			self.fill_cart()
+			responses = self.post_concurrently(path, f'key-{path}')
+			self.assertEqual({r.status_code for r in responses}, {201})
+			self.assertEqual(len({json.dumps(r.data, sort_keys=True, default=str) for r in responses}), 1)
+			self.assertEqual(sum(1 for r in responses if r.get('Idempotent-Replayed') == 'true'), len(responses) - 1)
+		self.assertEqual(Order.objects.filter(user=self.user).count(), 2)
+
+	def test_key_reused_with_different_body_is_rejected(self):
+		self.fill_cart()
+		client = APIClient()
+		client.force_authenticate(self.user)
+		self.assertEqual(client.post('/api/orders/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1').status_code, 201)
+		response = client.post('/api/orders/', dict(self.body, phone_number='7654321'), format='json', HTTP_IDEMPOTENCY_KEY='k1')
+		self.assertEqual(response.status_code, 422)
+
+	def idempotent_request(self, key):
+		request = Request(APIRequestFactory().post('/api/orders/', self.body, format='json', HTTP_IDEMPOTENCY_KEY=key), parsers=[JSONParser()])
+		request.user = self.user
+		return request
+
+	def test_claim_lock_is_released_before_the_view_runs(self):
+		def handler():
+			self.assertFalse(any(lock.locked() for lock in idempotency._LOCKS))
+			return Response({}, status=201)
+		self.assertEqual(idempotency.run_idempotent(self.idempotent_request('k2'), handler).status_code, 201)
+
+	@mock.patch('products.idempotency.IDEMPOTENCY_LOCK_TIMEOUT', 0.2)
+	def test_slow_first_request_is_not_taken_over(self):
+		request = self.idempotent_request('k3')
+		IdempotencyKey.objects.create(
+			user=self.user, key='k3', fingerprint=idempotency.request_fingerprint(request),
+			expires_at=timezone.now() + datetime.timedelta(days=1),
+		)
+		# Older than the wait for a duplicate, younger than IDEMPOTENCY_CLAIM_TIMEOUT
+		IdempotencyKey.objects.update(created_at=timezone.now() - datetime.timedelta(seconds=60))
+		response = idempotency.run_idempotent(request, lambda: self.fail('claim taken over'))
+		self.assertEqual(response.status_code, 409)
+		IdempotencyKey.objects.update(created_at=timezone.now() - datetime.timedelta(seconds=idempotency.IDEMPOTENCY_CLAIM_TIMEOUT + 1))
+		self.assertEqual(idempotency.run_idempotent(request, lambda: Response({}, status=201)).status_code, 201)
+
+
+from .jobs import JOB_LOCK_TIMEOUT, Worker, enqueue, run_pending, task
+from .models import Job
+from .tasks import inventory_event
+
+JOB_CALLS = []
+
+
+@task('tests.record')
+def record_job(value, fail_times=0):
+	JOB_CALLS.append(value)
+	if JOB_CALLS.count(value) <= fail_times:
+		raise RuntimeError('boom')
+
+
+class JobQueueTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		JOB_CALLS.clear()
+
+	def test_checkout_enqueues_jobs_on_commit(self):
+		user = User.objects.create_user(username='jobs', password='pass', email='jobs@example.com')
+		product = Product.objects.create(name='Job item', description='d', price=Decimal('4.00'), category=Category.objects.create(name='Jobs'))
+		CartItem.objects.create(cart=Cart.objects.create(user=user), product=product, quantity=3)
+		client = APIClient()
+		client.force_authenticate(user)
+		events = []
+		inventory_event.connect(lambda **kwargs: events.append((kwargs['product_id'], kwargs['quantity'])), weak=False, dispatch_uid='test_inventory')
+		self.addCleanup(inventory_event.disconnect, dispatch_uid='test_inventory')
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			response = client.post('/api/orders/', {'shipping_address': 'addr', 'phone_number': '1234567'}, format='json')
+			self.assertEqual(Job.objects.count(), 0)
+		for callback in callbacks:
+			callback()
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(sorted(Job.objects.values_list('task', flat=True)), ['inventory.order_placed', 'orders.send_confirmation'])
+		self.assertEqual(run_pending(), 2)
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertIn(f"Order #{response.data['id']}", mail.outbox[0].subject)
+		self.assertEqual(events, [(product.id, 3)])
+		self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
+	def test_retries_with_backoff_then_fails(self):
+		job = enqueue('tests.record', {'value': 'a', 'fail_times': 1}, on_commit=False)
+		flaky_forever = enqueue('tests.record', {'value': 'b', 'fail_times': 99}, on_commit=False)
+		Job.objects.filter(pk=flaky_forever.pk).update(max_attempts=2)
+		with self.assertLogs('products.jobs', 'WARNING'):
+			self.assertEqual(run_pending(), 2)
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+		self.assertIn('RuntimeError', job.last_error)
+		self.assertGreater(job.run_at, timezone.now())
+		self.assertEqual(run_pending(), 0)  # backoff: not due yet
+		Job.objects.update(run_at=timezone.now())
+		with self.assertLogs('products.jobs', 'WARNING'):
+			self.assertEqual(run_pending(), 2)
+		self.assertEqual(dict(Job.objects.values_list('payload__value', 'status')), {'a': Job.DONE, 'b': Job.FAILED})
+
+	def test_worker_requeues_abandoned_jobs_while_polling(self):
+		retried = enqueue('tests.record', {'value': 'retried'}, on_commit=False)
+		exhausted = enqueue('tests.record', {'value': 'exhausted'}, on_commit=False)
+		worker = Worker(requeue_interval=60)
+		with mock.patch('products.jobs.time.monotonic', return_value=1000.0):
+			self.assertEqual(worker.run(burst=True), 2)
+		# Both jobs are then abandoned by a worker that died while running them
+		abandoned = timezone.now() - datetime.timedelta(seconds=JOB_LOCK_TIMEOUT + 1)
+		Job.objects.update(status=Job.RUNNING, locked_by='dead', locked_at=abandoned, finished_at=None)
+		Job.objects.filter(pk=exhausted.pk).update(attempts=F('max_attempts'))
+		with mock.patch('products.jobs.time.monotonic', return_value=1030.0):
+			self.assertEqual(worker.run(burst=True), 2)  # not due yet: nothing requeued
+		with mock.patch('products.jobs.time.monotonic', return_value=1060.0):
+			self.assertEqual(worker.run(burst=True), 3)
+		self.assertEqual(JOB_CALLS, ['retried', 'exhausted', 'retried'])
+		self.assertEqual(Job.objects.get(pk=retried.pk).status, Job.DONE)
+		self.assertEqual(Job.objects.get(pk=exhausted.pk).status, Job.FAILED)
+
+	def test_scheduled_jobs_priority_and_queues(self):
+		enqueue('tests.record', {'value': 'later'}, delay=3600, on_commit=False)
+		enqueue('tests.record', {'value': 'low'}, on_commit=False)
+		enqueue('tests.record', {'value': 'high'}, priority=10, on_commit=False)
+		enqueue('tests.record', {'value': 'other'}, queue='other', on_commit=False)
+		self.assertEqual(Worker(queues=['default']).run(burst=True), 2)
+		self.assertEqual(JOB_CALLS, ['high', 'low'])
+		self.assertEqual(Worker().run(burst=True, max_jobs=5), 1)
+		self.assertEqual(Job.objects.get(payload__value='later').status, Job.PENDING)
+
+
+class ConcurrentJobWorkerTest(TransactionTestCase):
+	def test_concurrent_workers_run_each_job_once(self):
+		JOB_CALLS.clear()
+		for i in range(40):
+			enqueue('tests.record', {'value': i})
+		workers = [Worker(concurrency=4, poll_interval=0.01) for _ in range(3)]
+		threads = [threading.Thread(target=worker.run, kwargs={'burst': True}) for worker in workers]
+		# The shared in-memory test database reports 'table is locked' under write contention
+		with mock.patch('products.jobs.logger'):
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+		self.assertEqual(sorted(JOB_CALLS), list(range(40)))
+		self.assertEqual(sum(worker.processed for worker in workers), 40)
+		self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 40)
+
+
+from io import StringIO
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from .maintenance import purge_stale_data
+from .models import IdempotencyKey
+
+
+class PurgeStaleDataTest(TestCase):
+	def setUp(self):
+		now = timezone.now()
+		old = now - datetime.timedelta(days=200)
+		product = Product.objects.create(name='Purge item', description='d', price=Decimal('1.00'), category=Category.objects.create(name='Purge'))
+		self.active = User.objects.create_user(username='active', password='pass', last_login=now)
+		self.gone = User.objects.create_user(username='gone', password='pass', last_login=old)
+		self.new_empty = User.objects.create_user(username='new', password='pass', last_login=now)
+		self.old_empty = User.objects.create_user(username='oldempty', password='pass', last_login=now)
+		CartItem.objects.create(cart=Cart.objects.create(user=self.active), product=product)
+		CartItem.objects.create(cart=Cart.objects.create(user=self.gone), product=product)
+		Cart.objects.create(user=self.new_empty)
+		Cart.objects.filter(pk=Cart.objects.create(user=self.old_empty).pk).update(created_at=old)
+		for expiry in (-60, 3600, -120):
+			session = SessionStore()
+			session['cart'] = {'1': 1}
+			session.set_expiry(expiry)
+			session.save()
+		IdempotencyKey.objects.create(user=self.active, key='old', fingerprint='x', expires_at=old)
+		IdempotencyKey.objects.create(user=self.active, key='new', fingerprint='x', expires_at=now + datetime.timedelta(hours=1))
+		Job.objects.create(task='tests.record', status=Job.DONE, finished_at=old)
+		Job.objects.create(task='tests.record', status=Job.DONE, finished_at=now)
+		Job.objects.create(task='tests.record', status=Job.PENDING)
+
+	def test_purges_stale_rows_in_batches(self):
+		results = {result.name: result for result in purge_stale_data(batch_size=1, pause=0)}
+		self.assertEqual(
+			{name: result.deleted for name, result in results.items()},
+			{'sessions': 2, 'empty carts': 1, 'abandoned carts': 1, 'idempotency keys': 1, 'jobs': 1},
+		)
+		self.assertEqual(results['sessions'].batches, 2)
+		self.assertTrue(all(result.complete for result in results.values()))
+		self.assertEqual(Session.objects.count(), 1)
+		self.assertEqual(set(Cart.objects.values_list('user__username', flat=True)), {'active', 'new'})
+		self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+		self.assertEqual(Job.objects.count(), 2)
+
+	def test_command_reports_rows_and_dry_run(self):
+		out = StringIO()
+		call_command('purge_stale_data', '--dry-run', stdout=out)
+		self.assertIn('sessions: 2 rows would be deleted', out.getvalue())
+		self.assertEqual(Session.objects.count(), 3)
+		out = StringIO()
+		call_command('purge_stale_data', '--sleep', '0', '--only', 'jobs', stdout=out)
+		self.assertIn('jobs: 1 rows in 1 batches', out.getvalue())
+		self.assertIn('Removed 1 rows', out.getvalue())
+		self.assertEqual(Session.objects.count(), 3)
+
+
+from .models import OrderEvent
+
+
+class OrderEventFeedTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.alice = User.objects.create_user(username='alice', password='pass')
+		self.bob = User.objects.create_user(username='bob', password='pass')
+		self.staff = User.objects.create_user(username='ops', password='pass', is_staff=True)
+		self.client = APIClient()
+
+	def test_status_transitions_are_logged(self):
+		order = Order.objects.create(user=self.alice, phone_number='1')
+		order.shipping_address = 'elsewhere'
+		order.save()
+		order = Order.objects.get(pk=order.pk)
+		order.status = 'shipped'
+		order.save()
+		order.status = 'delivered'
+		order.save(update_fields=['status', 'updated_at'])
+		self.assertEqual(
+			list(order.events.order_by('id').values_list('from_status', 'to_status')),
+			[('', 'ordered'), ('ordered', 'shipped'), ('shipped', 'delivered')],
+		)
+
+	def test_feed_pages_with_cursor_and_scopes_to_user(self):
+		for user in (self.alice, self.bob, self.alice):
+			order = Order.objects.create(user=user, phone_number='1')
+			order.status = 'shipped'
+			order.save()
+		self.client.force_authenticate(self.alice)
+		with self.assertNumQueries(1):
+			page = self.client.get('/api/orders/events/?limit=3').data
+		self.assertEqual([e['to_status'] for e in page['results']], ['ordered', 'shipped', 'ordered'])
+		self.assertTrue(page['has_more'])
+		page = self.client.get(f"/api/orders/events/?after={page['after']}&limit=3").data
+		self.assertEqual(([e['to_status'] for e in page['results']], page['has_more']), (['shipped'], False))
+		self.assertEqual({e['user'] for e in page['results']}, {self.alice.id})
+		self.assertEqual(self.client.get(f"/api/orders/events/?after={page['after']}").data['results'], [])
+		self.assertEqual(self.client.get('/api/orders/events/?after=x').status_code, 400)
+
+		self.client.force_authenticate(self.staff)
+		self.assertEqual(len(self.client.get('/api/orders/events/').data['results']), 6)
+
+
+import asyncio
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_started
+from django.db import close_old_connections
+from . import streams
+
+
+class SSEConnection:
+	"""Drive one request against an ASGI app and keep it open until close()."""
+
+	def __init__(self, app, path, headers):
+		self.chunks = []
+		self.received = asyncio.Event()
+		self.disconnect = asyncio.Event()
+		self.body_sent = False
+		scope = {
+			'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+			'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+			'headers': [(b'host', b'testserver')] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+			'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+		}
+		self.task = asyncio.ensure_future(app(scope, self.receive, self.send))
+
+	async def receive(self):
+		if not self.body_sent:
+			self.body_sent = True
+			return {'type': 'http.request', 'body': b'', 'more_body': False}
+		await self.disconnect.wait()
+		return {'type': 'http.disconnect'}
+
+	async def send(self, message):
+		if message['type'] == 'http.response.start':
+			self.status = message['status']
+		elif message.get('body'):
+			self.chunks.append(message['body'])
+			self.received.set()
+
+	async def wait_for(self, text, timeout=5):
+		while text not in b''.join(self.chunks):
+			self.received.clear()
+			await asyncio.wait_for(self.received.wait(), timeout)
+		return b''.join(self.chunks)
+
+	async def close(self):
+		self.disconnect.set()
+		await asyncio.wait_for(self.task, 5)
+
+
+class OrderStreamTest(TestCase):
+	def setUp(self):
+		self.alice = User.objects.create_user(username='sse-alice', password='pass')
+		self.bob = User.objects.create_user(username='sse-bob', password='pass')
+		self.app = ASGIHandler()
+		# Like django.test.Client: keep the test transaction's connection open
+		request_started.disconnect(close_old_connections)
+		self.addCleanup(request_started.connect, close_old_connections)
+
+	def auth(self, user, **headers):
+		return dict(headers, Authorization=f"Bearer {authentication.issue_tokens(user)['access']}")
+
+	async def test_thousands_of_idle_streams_on_one_loop(self):
+		count = 2000
+		connections = [SSEConnection(self.app, '/api/orders/stream/', self.auth(self.bob)) for _ in range(count - 1)]
+		target = SSEConnection(self.app, '/api/orders/stream/', self.auth(self.alice))
+		connections.append(target)
+		await asyncio.gather(*(conn.wait_for(b'retry:', timeout=60) for conn in connections))
+		self.assertEqual(streams.broker.connection_count(), count)
+		self.assertEqual({conn.status for conn in connections}, {200})
+
+		event = {'id': 7, 'order': 1, 'user': self.alice.id, 'from_status': 'ordered', 'to_status': 'shipped', 'created_at': None}
+		self.assertEqual(await asyncio.to_thread(streams.broker.publish, event), 1)
+		body = await target.wait_for(b'event: order_status')
+		self.assertIn(b'id: 7\nevent: order_status\ndata: {"id":7', body)
+		self.assertTrue(all(len(conn.chunks) == 1 for conn in connections[:-1]))
+
+		await asyncio.gather(*(conn.close() for conn in connections))
+		self.assertEqual(streams.broker.connection_count(), 0)
+
+	async def test_heartbeat_and_resume_from_last_event_id(self):
+		def place_and_ship():
+			with self.captureOnCommitCallbacks(execute=True):
+				order = Order.objects.create(user=self.alice, phone_number='1')
+				order.status = 'shipped'
+				order.save()
+			return list(order.events.order_by('id').values_list('id', flat=True))
+
+		first, second = await sync_to_async(place_and_ship)()
+		with mock.patch.object(streams, 'SSE_HEARTBEAT', 0.05):
+			conn = SSEConnection(self.app, '/api/orders/stream/', self.auth(self.alice, **{'Last-Event-ID': str(first)}))
+			body = await conn.wait_for(b': heartbeat')
+			await conn.close()
+		self.assertIn(f'id: {second}\n'.encode(), body)
+		self.assertNotIn(f'id: {first}\n'.encode(), body)
+
+	async def test_requires_authentication(self):
+		conn = SSEConnection(self.app, '/api/orders/stream/', {})
+		await conn.task
+		self.assertEqual(conn.status, 401)
+
+
+from .models import SalesRollup
+from .reports import rebuild_rollups, refresh_rollups
+
+
+class SalesRollupTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.user = User.objects.create_user(username='alice', password='pass')
+		self.staff = User.objects.create_user(username='ops', password='pass', is_staff=True)
+		self.books = Category.objects.create(name='Books')
+		self.games = Category.objects.create(name='Games')
+		self.book = Product.objects.create(name='Book', description='d', price=10, category=self.books)
+		self.game = Product.objects.create(name='Game', description='d', price=50, category=self.games)
+		self.client = APIClient()
+
+	def place(self, *lines, payment_method='Credit Card'):
+		order = Order.objects.create(user=self.user, phone_number='1', payment_method=payment_method)
+		for product, quantity, discount in lines:
+			OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price, discount=discount)
+		return order
+
+	def daily(self, **filters):
+		return {
+			(row.product_id, row.status): (row.lines, row.quantity, row.gross, row.discount)
+			for row in SalesRollup.objects.filter(granularity=SalesRollup.DAY, **filters)
+		}
+
+	def test_refresh_folds_new_orders_and_status_changes_once(self):
+		self.place((self.book, 2, Decimal('1.00')), (self.game, 1, 0))
+		order = self.place((self.book, 1, 0))
+		self.assertEqual(refresh_rollups(lag=0), 2)
+		self.assertEqual(self.daily(), {
+			(self.book.id, 'ordered'): (2, 3, Decimal('30.00'), Decimal('1.00')),
+			(self.game.id, 'ordered'): (1, 1, Decimal('50.00'), Decimal('0.00')),
+		})
+		self.assertEqual(SalesRollup.objects.filter(granularity=SalesRollup.HOUR).count(), 2)
+
+		order.status = 'cancelled'
+		order.save()
+		self.assertEqual(refresh_rollups(lag=0), 1)
+		self.assertEqual(refresh_rollups(lag=0), 0)
+		self.assertEqual(self.daily(product=self.book), {
+			(self.book.id, 'ordered'): (1, 2, Decimal('20.00'), Decimal('1.00')),
+			(self.book.id, 'cancelled'): (1, 1, Decimal('10.00'), Decimal('0.00')),
+		})
+
+		before = self.daily()
+		self.assertEqual(rebuild_rollups(lag=0), 3)
+		self.assertEqual(self.daily(), before)
+
+	def test_refresh_leaves_recent_events_for_the_next_run(self):
+		self.place((self.book, 1, 0))
+		self.assertEqual(refresh_rollups(), 0)
+		self.assertFalse(SalesRollup.objects.exists())
+		self.assertEqual(refresh_rollups(now=timezone.now() + timezone.timedelta(minutes=5)), 1)
+
+	def test_sales_report_api(self):
+		self.place((self.book, 2, Decimal('1.00')), (self.game, 1, 0))
+		self.place((self.game, 1, 0), payment_method='PayPal')
+		refresh_rollups(lag=0)
+
+		self.client.force_authenticate(self.user)
+		self.assertEqual(self.client.get('/api/reports/sales/').status_code, 403)
+
+		self.client.force_authenticate(self.staff)
+		with self.assertNumQueries(3):
+			response = self.client.get('/api/reports/sales/?group_by=product&order=-revenue')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(
+			[(r['product_name'], r['quantity'], r['revenue']) for r in response.data['results']],
+			[('Game', 2, '100.00'), ('Book', 2, '19.00')],
+		)
+		response = self.client.get(f'/api/reports/sales/?group_by=period,category&payment_method=PayPal&category={self.games.id}')
+		self.assertEqual([(r['category_name'], r['lines']) for r in response.data['results']], [('Games', 1)])
+		self.assertEqual(self.client.get('/api/reports/sales/?group_by=customer').status_code, 400)
+		self.assertEqual(self.client.get('/api/reports/sales/?start=yesterday').status_code, 400)
+
+	def test_sales_report_accepts_staff_access_token(self):
+		client = APIClient()
+		client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.staff)['access']}")
+		self.assertEqual(client.get('/api/reports/sales/').status_code, 200)
+		client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.user)['access']}")
+		self.assertEqual(client.get('/api/reports/sales/').status_code, 403)
+
+
+from . import recommendations
+from .models import RelatedProduct
+from .recommendations import build_related_products
+
+
+class RelatedProductsTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.user = User.objects.create_user(username='alice', password='pass')
+		category = Category.objects.create(name='Kitchen')
+		self.pan, self.lid, self.oil, self.salt = (
+			Product.objects.create(name=name, description='d', price=5, category=category)
+			for name in ('Pan', 'Lid', 'Oil', 'Salt')
+		)
+		baskets = [
+			[self.pan, self.lid, self.oil], [self.pan, self.lid], [self.pan, self.lid, self.lid],
+			[self.pan, self.oil], [self.pan, self.oil, self.salt], [self.salt],
+		]
+		for basket in baskets:
+			order = Order.objects.create(user=self.user, phone_number='1')
+			for product in basket:
+				OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+		cancelled = Order.objects.create(user=self.user, phone_number='1', status='cancelled')
+		for product in (self.lid, self.oil, self.salt):
+			OrderItem.objects.create(order=cancelled, product=product, quantity=1, price=product.price)
+
+	def neighbours(self):
+		return {
+			(entry.product_id, entry.rank): (entry.related_id, entry.score)
+			for entry in RelatedProduct.objects.all()
+		}
+
+	def test_build_counts_orders_containing_both_products(self):
+		result = build_related_products(chunk_size=2)
+		self.assertEqual((result.lines, result.products, result.backend), (14, 3, 'numpy'))
+		self.assertEqual(self.neighbours(), {
+			(self.pan.id, 0): (self.lid.id, 3), (self.pan.id, 1): (self.oil.id, 3),
+			(self.lid.id, 0): (self.pan.id, 3),
+			(self.oil.id, 0): (self.pan.id, 3),
+		})
+		with mock.patch.object(recommendations, 'np', None):
+			result = build_related_products(chunk_size=4, top_k=1, min_orders=1)
+		self.assertEqual((result.products, result.backend), (4, 'python'))
+		self.assertEqual(self.neighbours(), {
+			(self.pan.id, 0): (self.lid.id, 3), (self.lid.id, 0): (self.pan.id, 3),
+			(self.oil.id, 0): (self.pan.id, 3), (self.salt.id, 0): (self.pan.id, 1),
+		})
+
+	def test_related_endpoint(self):
+		build_related_products()
+		client = APIClient()
+		with self.assertNumQueries(1):
+			response = client.get(f'/api/products/{self.pan.id}/related/')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([p['name'] for p in response.data], ['Lid', 'Oil'])
+		self.assertEqual(response.data[0]['category']['name'], 'Kitchen')
+		self.assertEqual([p['name'] for p in client.get(f'/api/products/{self.pan.id}/related/?limit=1').data], ['Lid'])
+		self.assertEqual(client.get(f'/api/products/{self.salt.id}/related/').data, [])
+		self.assertEqual(client.get(f'/api/products/{self.pan.id}/related/?limit=x').status_code, 400)
+
+
+class ProductFacetsTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		get_throttle_cache().clear()
+		self.books = Category.objects.create(name='Books')
+		self.games = Category.objects.create(name='Games')
+		for name, price, category, stock in (
+			('Novel', 12, self.books, 'In Stock'), ('Atlas', 30, self.books, 'Out of Stock'),
+			('Chess', 30, self.games, 'In Stock'), ('Console', 600, self.games, 'In Stock'),
+		):
+			Product.objects.create(name=name, description='d', price=price, category=category, stock_status=stock)
+		self.client = APIClient()
+
+	def counts(self, facets, name):
+		return {item['value']: item['count'] for item in facets[name] if item['count']}
+
+	def test_facet_counts_ignore_their_own_selection(self):
+		data = self.client.get('/api/products/facets/').data
+		self.assertEqual(data['count'], 4)
+		self.assertEqual(self.counts(data['facets'], 'category'), {self.books.id: 2, self.games.id: 2})
+		self.assertEqual(self.counts(data['facets'], 'price'), {'0-25': 1, '25-50': 2, '500-': 1})
+
+		data = self.client.get(f'/api/products/?facets=1&category={self.books.id}&stock_status=In Stock').data
+		self.assertEqual((data['count'], [p['name'] for p in data['results']]), (1, ['Novel']))
+		self.assertEqual(self.counts(data['facets'], 'category'), {self.books.id: 1, self.games.id: 2})
+		self.assertEqual(self.counts(data['facets'], 'stock_status'), {'In Stock': 1, 'Out of Stock': 1})
+		self.assertEqual(self.counts(data['facets'], 'price'), {'0-25': 1})
+		self.assertTrue(next(c for c in data['facets']['category'] if c['value'] == self.books.id)['selected'])
+
+		data = self.client.get('/api/products/?price=0-25,500-').data
+		self.assertEqual(sorted(p['name'] for p in data), ['Console', 'Novel'])
+		self.assertEqual(self.client.get('/api/products/?price=1-2').status_code, 400)
+		self.assertEqual(self.client.get('/api/products/facets/?category=x').status_code, 400)
+
+	def test_facets_are_cached_per_signature_until_the_catalog_changes(self):
+		with self.assertNumQueries(2):
+			self.client.get(f'/api/products/facets/?category={self.games.id},{self.books.id}')
+		with self.assertNumQueries(0):
+			cached = self.client.get(f'/api/products/facets/?category={self.books.id}&category={self.games.id}').data
+		self.assertEqual(cached['count'], 4)
+		with self.assertNumQueries(0):
+			self.client.get('/api/products/facets/?stock_status=In Stock')
+		Product.objects.create(name='Dice', description='d', price=3, category=self.games, stock_status='In Stock')
+		self.assertEqual(self.client.get('/api/products/facets/?stock_status=In Stock').data['count'], 4)
+
+
+@override_settings(ROOT_URLCONF='products.tests')
+class AsyncProductFacetsTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		category = Category.objects.create(name='Books')
+		Product.objects.create(name='Novel', description='d', price=12, category=category, stock_status='In Stock')
+		Product.objects.create(name='Atlas', description='d', price=30, category=category)
+
+	async def test_async_list_matches_sync_view(self):
+		for query in ('?facets=1&price=25-50', '?stock_status=In Stock'):
+			response = await AsyncClient().get('/api/products/' + query)
+			sync_response = await sync_to_async(APIClient().get)('/api/products/' + query)
+			self.assertEqual(response.json(), sync_response.json())
+		self.assertEqual((await AsyncClient().get('/api/products/?price=x')).status_code, 400)
+
+
+from django.core.exceptions import ValidationError
+from .category_tree import rebuild_paths, reparent_children, subtree_filter
+
+
+class CategoryTreeTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		get_throttle_cache().clear()
+		self.electronics = Category.objects.create(name='Electronics')
+		self.laptops = Category.objects.create(name='Laptops', parent=self.electronics)
+		self.business = Category.objects.create(name='Business', parent=self.laptops)
+		self.books = Category.objects.create(name='Books')
+		for name, category in (('ThinkPad', self.business), ('Chromebook', self.laptops), ('Novel', self.books)):
+			Product.objects.create(name=name, description='d', price=10, category=category, stock_status='In Stock')
+		self.client = APIClient()
+
+	def paths(self):
+		return dict(Category.objects.values_list('name', 'path'))
+
+	def test_subtree_is_one_prefix_query(self):
+		self.assertEqual(self.business.path, f'{self.electronics.id:08d}/{self.laptops.id:08d}/{self.business.id:08d}/')
+		self.assertEqual(self.business.depth, 2)
+		products = Product.objects.filter(subtree_filter(self.electronics, 'category__')).order_by('name')
+		# A prefix match, not a [low, high) range that depends on the collation
+		self.assertIn('LIKE', str(products.query))
+		with self.assertNumQueries(1):
+			self.assertEqual([p.name for p in products], ['Chromebook', 'ThinkPad'])
+
+	def test_moves_rewrite_the_whole_subtree(self):
+		self.laptops.parent = self.books
+		self.laptops.save()
+		self.business.refresh_from_db()
+		self.assertTrue(self.business.path.startswith(self.books.path))
+		self.assertEqual(self.business.depth, 2)
+
+		self.books.parent = self.business
+		with self.assertRaises(ValidationError):
+			self.books.full_clean()
+
+		with self.assertNumQueries(4):
+			self.assertEqual(reparent_children(self.books, self.electronics), 2)
+		self.business.refresh_from_db()
+		self.assertEqual((self.business.parent_id, self.business.depth), (self.laptops.id, 2))
+		before = self.paths()
+		Category.objects.update(path='', depth=0)
+		self.assertEqual(rebuild_paths(), 0)
+		self.assertEqual(self.paths(), before)
+
+		call_command('move_categories', str(self.business.id), stdout=StringIO())
+		self.assertEqual(Category.objects.get(pk=self.business.pk).path, f'{self.business.id:08d}/')
+
+	def test_tree_breadcrumb_and_department_endpoints(self):
+		self.client.get('/api/categories/tree/')
+		with self.assertNumQueries(0):
+			tree = self.client.get('/api/categories/tree/').data
+		self.assertEqual([node['name'] for node in tree], ['Books', 'Electronics'])
+		self.assertEqual(tree[1]['children'][0]['children'][0]['name'], 'Business')
+		with self.assertNumQueries(0):
+			trail = self.client.get(f'/api/categories/{self.business.id}/breadcrumb/').data
+		self.assertEqual([c['name'] for c in trail], ['Electronics', 'Laptops', 'Business'])
+		self.assertEqual(self.client.get('/api/categories/999/breadcrumb/').status_code, 404)
+
+		data = self.client.get(f'/api/products/?department={self.laptops.id}&facets=1').data
+		self.assertEqual(sorted(p['name'] for p in data['results']), ['Chromebook', 'ThinkPad'])
+		self.assertEqual(data['count'], 2)
+		self.assertEqual([c['label'] for c in data['facets']['category']], ['Business', 'Laptops'])
+		self.assertEqual(self.client.get('/api/products/?department=999').status_code, 400)
+
+		self.laptops.parent = None
+		self.laptops.save()
+		self.assertEqual(len(self.client.get('/api/categories/tree/').data), 3)
+
+
+from .models import ProductVariant
+from .popularity import view_counter
+from .variants import annotate_availability, price_range
+
+
+class ProductVariantTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		view_counter.clear()  # no flush inside the counted requests
+		self.category = Category.objects.create(name='Laptops')
+		self.plain = Product.objects.create(name='Mouse', description='d', price=Decimal('20.00'), category=self.category, stock_status='In Stock')
+		self.laptop = Product.objects.create(name='ThinkPad', description='d', price=Decimal('900.00'), category=self.category, stock_status='Out of Stock')
+		self.black = ProductVariant.objects.create(product=self.laptop, sku='TP-BLK-16', options={'colour': 'Black', 'ram': '16GB'}, stock=2)
+		self.client = APIClient()
+
+	def add_variants(self, count):
+		ProductVariant.objects.bulk_create(
+			ProductVariant(product=self.laptop, sku=f'TP-{index}', options={'colour': f'C{index % 5}', 'ram': f'{index}GB'}, price=Decimal(1000 + index))
+			for index in range(count)
+		)
+
+	def count_queries(self, path):
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.client.get(path).status_code, 200)
+		return len(queries)
+
+	def test_list_and_detail_queries_stay_flat_with_100_variants(self):
+		list_queries = self.count_queries('/api/products/')
+		detail_queries = self.count_queries(f'/api/products/{self.laptop.id}/')
+		self.add_variants(99)
+		self.assertEqual(self.count_queries('/api/products/'), list_queries)
+		self.assertEqual(self.count_queries(f'/api/products/{self.laptop.id}/'), detail_queries)
+
+		rows = {row['name']: row for row in self.client.get('/api/products/').data}
+		self.assertEqual(
+			[rows['ThinkPad'][name] for name in ('min_price', 'max_price', 'in_stock', 'variant_count')],
+			['900.00', '1098.00', True, 100],
+		)
+		self.assertEqual([rows['Mouse'][name] for name in ('min_price', 'max_price', 'in_stock')], ['20.00', '20.00', True])
+		detail = self.client.get(f'/api/products/{self.laptop.id}/').data
+		self.assertEqual(len(detail['variants']), 100)
+		self.assertEqual(detail['options']['colour'], ['Black', 'C0', 'C1', 'C2', 'C3', 'C4'])
+		self.assertEqual(detail['variants'][0]['price'], '900.00')
+
+	def test_stock_comes_from_variants_and_prices_from_price_book(self):
+		self.black.stock = 0
+		self.black.save()
+		ProductVariant.objects.create(product=self.laptop, sku='TP-OLD', price=Decimal('10.00'), stock=5, is_active=False)
+		rows = {row['name']: row for row in self.client.get('/api/products/?fields=name,in_stock').data}
+		self.assertEqual(rows['ThinkPad'], {'id': self.laptop.id, 'name': 'ThinkPad', 'in_stock': False})
+
+		self.add_variants(2)
+		laptop = annotate_availability(Product.objects.all()).get(pk=self.laptop.pk)
+		book = PriceBook(PriceList.objects.create(name='EUR', currency='EUR', exchange_rate=Decimal('0.5')))
+		self.assertEqual(price_range(laptop, book), (Decimal('450.00'), Decimal('500.50')))
+		self.assertEqual(book.price(self.laptop, ProductVariant.objects.get(sku='TP-1')), Decimal('500.50'))
+
+	def test_checkout_orders_variants_and_takes_them_out_of_stock(self):
+		user = User.objects.create_user(username='variantuser', password='pass')
+		cart = Cart.objects.create(user=user)
+		self.add_variants(1)
+		silver = ProductVariant.objects.get(sku='TP-0')
+		silver.stock = 3
+		silver.save()
+		CartItem.objects.create(cart=cart, product=self.laptop, variant=silver, quantity=2)
+		CartItem.objects.create(cart=cart, product=self.laptop, variant=self.black, quantity=1)
+		self.client.force_authenticate(user)
+		self.assertEqual(self.client.get('/api/carts/').data[0]['summary']['subtotal'], '2900.00')
+
+		order = {'shipping_address': 'addr', 'phone_number': '1234567', 'payment_method': 'Credit Card'}
+		response = self.client.post('/api/create-order/', order, format='json')
+		self.assertEqual(response.status_code, 201)
+		lines = sorted((line['sku'], line['price'], line['variant']) for line in response.data['items'])
+		self.assertEqual(lines, [('TP-0', '1000.00', silver.id), ('TP-BLK-16', '900.00', self.black.id)])
+		self.assertEqual(dict(ProductVariant.objects.values_list('sku', 'stock')), {'TP-BLK-16': 1, 'TP-0': 1})
+
+		CartItem.objects.create(cart=cart, product=self.laptop, variant=silver, quantity=1)
+		CartItem.objects.create(cart=cart, product=self.laptop, variant=self.black, quantity=2)
+		response = self.client.post('/api/create-order/', order, format='json')
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('Black / 16GB', response.data['error'])
+		self.assertEqual(dict(ProductVariant.objects.values_list('sku', 'stock')), {'TP-BLK-16': 1, 'TP-0': 1})
+
+		cart.items.all().delete()
+		Product.objects.filter(pk=self.laptop.pk).update(stock_status='In Stock')
+		CartItem.objects.create(cart=cart, product=self.laptop, quantity=1)
+		response = self.client.post('/api/orders/', order, format='json')
+		self.assertEqual(response.data, {'error': 'Choose an option of ThinkPad.'})
+
+	def test_session_cart_lines_reference_variants(self):
+		self.assertEqual(self.client.post('/api/session-cart/', {'product_id': self.laptop.id}).status_code, 400)
+		self.assertEqual(self.client.post('/api/session-cart/', {'product_id': self.plain.id, 'variant_id': self.black.id}).status_code, 404)
+		self.client.post('/api/session-cart/', {'product_id': self.laptop.id, 'variant_id': self.black.id, 'quantity': 2})
+		self.client.post('/api/session-cart/', {'product_id': self.plain.id})
+		items = self.client.get('/api/session-cart/').data['items']
+		self.assertEqual([(item['product']['id'], item['variant'], item['quantity']) for item in items], [
+			(self.laptop.id, self.black.id, 2), (self.plain.id, None, 1),
+		])
+		self.assertEqual(self.client.get('/api/bootstrap/').data['cart']['total_price'], '1820.00')
+
+
+class ProductPageTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		view_counter.clear()  # no flush inside the counted requests
+		self.department = Category.objects.create(name='Computers')
+		self.category = Category.objects.create(name='Laptops', parent=self.department)
+		self.laptop = Product.objects.create(name='ThinkPad', description='d', price=Decimal('900.00'), category=self.category)
+		self.black = ProductVariant.objects.create(product=self.laptop, sku='TP-BLK', options={'colour': 'Black'}, stock=2)
+		self.client = APIClient()
+		self.path = f'/api/products/{self.laptop.id}/page/'
+
+	def count_queries(self):
+		cache.clear()
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.client.get(self.path).status_code, 200)
+		return len(queries)
+
+	def test_page_is_assembled_in_constant_queries_then_cached(self):
+		queries = self.count_queries()
+		self.assertLessEqual(queries, 5)  # one of them reads the shared product version
+		leaf = self.category
+		for depth in range(3):
+			leaf = Category.objects.create(name=f'Level {depth}', parent=leaf)
+		Product.objects.filter(pk=self.laptop.pk).update(category=leaf)
+		ProductVariant.objects.bulk_create(
+			ProductVariant(product=self.laptop, sku=f'TP-{index}', options={'colour': f'C{index}'}, stock=index % 2)
+			for index in range(99)
+		)
+		for rank in range(4):
+			other = Product.objects.create(name=f'Dock {rank}', description='d', price=Decimal('50.00'), category=leaf)
+			RelatedProduct.objects.create(product=self.laptop, related=other, rank=rank, score=10 - rank)
+		self.assertEqual(self.count_queries(), queries)
+		with CaptureQueriesContext(connection) as cached:
+			data = self.client.get(self.path).data
+		self.assertEqual(len(cached), 1)  # the product's shared version
+
+		self.assertEqual([node['name'] for node in data['category_path']], ['Computers', 'Laptops', 'Level 0', 'Level 1', 'Level 2'])
+		self.assertEqual([item['name'] for item in data['related']], ['Dock 0', 'Dock 1', 'Dock 2', 'Dock 3'])
+		self.assertEqual(len(data['product']['variants']), 100)
+		self.assertEqual(data['availability']['stock'], 2 + 49)
+		self.assertEqual((data['availability']['options']['colour']['C0'], data['availability']['options']['colour']['C1']), (False, True))
+		self.assertEqual(data['images'], [])
+		self.assertEqual(self.client.get('/api/products/999999/page/').status_code, 404)
+
+	def test_saves_and_checkout_invalidate_the_page(self):
+		self.assertEqual(self.client.get(self.path).data['availability']['stock'], 2)
+		self.black.stock = 5
+		self.black.save()
+		self.assertEqual(self.client.get(self.path).data['availability']['stock'], 5)
+		self.category.name = 'Notebooks'
+		self.category.save()
+		self.assertEqual(self.client.get(self.path).data['category_path'][-1]['name'], 'Notebooks')
+
+		user = User.objects.create_user(username='pageuser', password='pass')
+		CartItem.objects.create(cart=Cart.objects.create(user=user), product=self.laptop, variant=self.black, quantity=3)
+		self.client.force_authenticate(user)
+		order = {'shipping_address': 'addr', 'phone_number': '1234567', 'payment_method': 'Credit Card'}
+		with self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(self.client.post('/api/create-order/', order, format='json').status_code, 201)
+		page = self.client.get(self.path).data
+		self.assertEqual((page['availability']['stock'], page['availability']['in_stock']), (2, True))
+
+	def test_stock_change_in_another_process_invalidates_the_page(self):
+		self.assertEqual(self.client.get(self.path).data['availability']['stock'], 2)
+		# Another worker sells the last units: only the shared version in the
+		# database changes, never this process's cache
+		ProductVariant.objects.filter(pk=self.black.pk).update(stock=0)
+		CacheVersion.objects.update_or_create(namespace=f'product:{self.laptop.id}', defaults={'version': 1})
+		page = self.client.get(self.path).data
+		self.assertEqual((page['availability']['stock'], page['availability']['in_stock']), (0, False))
+
+	def test_price_list_customers_get_their_prices_uncached(self):
+		user = User.objects.create_user(username='pageb2b', password='pass')
+		price_list = PriceList.objects.create(name='EUR', currency='EUR', exchange_rate=Decimal('0.5'))
+		price_list.customers.add(user)
+		self.client.get(self.path)
+		self.client.force_authenticate(user)
+		product = self.client.get(self.path).data['product']
+		self.assertEqual((product['price'], product['currency']), ('450.00', 'EUR'))
+		self.client.force_authenticate(None)
+		self.assertEqual(self.client.get(self.path).data['product']['price'], '900.00')
+
+
+from django.db import transaction
+from .replicas import PIN_COOKIE, ReplicaRouter, primary_reads, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG=5)
+class ReplicaRoutingTest(TransactionTestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		self.category = Category.objects.create(name='Replicated')
+		self.product = Product.objects.create(name='Lamp', description='d', price=Decimal('30.00'), category=self.category)
+		self.user = User.objects.create_user(username='replicauser', password='pass')
+		self.client = APIClient()
+		self.router = ReplicaRouter()
+
+	def routed_reads(self, method, path, data=None, client=None):
+		"""Make a request, returning {model: alias the router chose}; every query still runs on 'default'."""
+		seen = {}
+		original = ReplicaRouter.db_for_read
+
+		def spy(router, model, **hints):
+			seen.setdefault(model._meta.model_name, original(router, model, **hints))
+			return None
+
+		with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+			response = getattr(client or self.client, method)(path, data, format='json')
+		self.assertLess(response.status_code, 400)
+		return seen
+
+	def test_router_sends_only_catalog_and_history_reads_to_the_replica(self):
+		self.assertIsNone(self.router.db_for_read(Product))
+		with replica_reads():
+			self.assertEqual(self.router.db_for_read(Product), 'replica')
+			self.assertEqual(self.router.db_for_read(OrderItem), 'replica')
+			self.assertIsNone(self.router.db_for_read(User))
+			self.assertIsNone(self.router.db_for_read(Cart))
+			self.assertEqual(self.router.db_for_write(Product), 'default')
+			self.assertEqual(self.router.db_for_read(Product, instance=self.product), 'default')
+			with transaction.atomic():
+				self.assertIsNone(self.router.db_for_read(Product))
+			with primary_reads():
+				self.assertIsNone(self.router.db_for_read(Product))
+		self.assertFalse(self.router.allow_migrate('replica', 'products'))
+		self.assertTrue(self.router.allow_migrate('default', 'products'))
+
+	def test_user_reads_stay_on_primary_after_their_own_writes(self):
+		self.assertEqual(self.routed_reads('get', '/api/products/')['product'], 'replica')
+		self.assertEqual(self.routed_reads('get', '/api/categories/')['category'], 'replica')
+
+		self.client.force_authenticate(self.user)
+		self.assertEqual(self.routed_reads('get', '/api/orders/')['order'], 'replica')
+		cart = Cart.objects.create(user=self.user)
+		CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+		order = {'shipping_address': 'addr', 'phone_number': '1234567', 'payment_method': 'Credit Card'}
+		checkout = self.routed_reads('post', '/api/create-order/', order)
+		self.assertNotIn('replica', checkout.values())
+		self.assertIsNone(self.routed_reads('get', '/api/orders/')['order'])
+		self.assertIsNone(self.routed_reads('get', '/api/products/')['product'])
+
+		# Other visitors keep reading from the replica, and the pin expires
+		self.assertEqual(self.routed_reads('get', '/api/products/', client=APIClient())['product'], 'replica')
+		with mock.patch('products.replicas.time.time', return_value=time.time() + 6):
+			self.assertEqual(self.routed_reads('get', '/api/orders/')['order'], 'replica')
+
+	def test_pin_is_honoured_by_any_process(self):
+		self.client.force_authenticate(self.user)
+		cart = Cart.objects.create(user=self.user)
+		CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+		order = {'shipping_address': 'addr', 'phone_number': '1234567', 'payment_method': 'Credit Card'}
+		self.routed_reads('post', '/api/create-order/', order)
+		# Another worker, with its own empty cache, sees the pin the client sends back
+		cache.clear()
+		self.assertIsNone(self.routed_reads('get', '/api/orders/')['order'])
+		# A forged or tampered pin is ignored
+		self.client.cookies[PIN_COOKIE] = repr(time.time() + 60)
+		self.assertEqual(self.routed_reads('get', '/api/orders/')['order'], 'replica')
+
+
+from .archive import archivable_orders, archive_orders
+from .models import ArchivedOrder, OrderArchiveSegment
+
+
+class OrderArchiveTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		self.user = User.objects.create_user(username='archiveuser', password='pass')
+		self.category = Category.objects.create(name='Archive')
+		self.product = Product.objects.create(name='Kettle', description='d', price=Decimal('25.00'), category=self.category)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.old = timezone.now() - datetime.timedelta(days=400)
+
+	def place(self, status, created_at=None):
+		order = Order.objects.create(user=self.user, phone_number='1234567', status=status)
+		OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('25.00'), discount=Decimal('5.00'))
+		Order.objects.filter(pk=order.pk).update(created_at=created_at or self.old)
+		return order
+
+	def test_cold_orders_move_to_segments_and_stay_retrievable(self):
+		delivered = [self.place('delivered') for _ in range(3)]
+		pending = self.place('pending')
+		recent = self.place('delivered', timezone.now())
+		before = {order.id: self.client.get(f'/api/orders/{order.id}/').data for order in delivered}
+		self.assertFalse(archivable_orders().exists())  # events not rolled up yet
+		refresh_rollups(lag=0)
+
+		result = archive_orders(batch_size=2, pause=0)
+		self.assertEqual((result.orders, result.segments, result.complete), (3, 2, True))
+		self.assertEqual(OrderArchiveSegment.objects.count(), 2)
+		self.assertEqual(set(Order.objects.values_list('id', flat=True)), {pending.id, recent.id})
+		self.assertFalse(OrderItem.objects.filter(order_id__in=before).exists())
+		self.assertFalse(OrderEvent.objects.filter(order_id__in=before).exists())
+
+		for order_id, data in before.items():
+			self.assertEqual(self.client.get(f'/api/orders/{order_id}/').data, data)
+		normalized_data = self.client.get(f'/api/orders/{delivered[0].id}/?shape=normalized').data
+		self.assertEqual(list(normalized_data['products']), [self.product.id])
+		self.assertEqual([order['id'] for order in self.client.get('/api/orders/').data], [pending.id, recent.id])
+
+		other = APIClient()
+		other.force_authenticate(User.objects.create_user(username='archiveother', password='pass'))
+		self.assertEqual(other.get(f'/api/orders/{delivered[0].id}/').status_code, 404)
+		self.assertEqual(self.client.get('/api/orders/999999/').status_code, 404)
+		self.assertEqual(archive_orders(pause=0).orders, 0)
+
+	def test_archive_command_dry_run_and_time_budget(self):
+		for _ in range(3):
+			self.place('cancelled')
+		refresh_rollups(lag=0)
+		out = StringIO()
+		call_command('archive_orders', '--dry-run', stdout=out)
+		self.assertIn('3 orders would be archived', out.getvalue())
+		self.assertEqual(archive_orders(batch_size=1, pause=0, max_seconds=1e-9).complete, False)
+		call_command('archive_orders', '--batch-size', '2', '--sleep', '0', stdout=out)
+		self.assertIn('Archived 3 orders in 2 segments', out.getvalue())
+		self.assertEqual(ArchivedOrder.objects.filter(user=self.user, status='cancelled').count(), 3)
+
+
+from .category_tree import category_index
+from .facets import get_facets, parse_selections
+from .warmup import preload, warm_up
+
+
+class WarmupTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		category = Category.objects.create(name='Warm')
+		Product.objects.create(name='Toaster', description='d', price=Decimal('30.00'), category=category)
+
+	def test_preload_is_fork_safe(self):
+		with CaptureQueriesContext(connection) as queries:
+			preload()
+		self.assertEqual(len(queries), 0)
+
+	def test_full_warm_up_primes_catalog_caches(self):
+		warm_up('full')
+		with CaptureQueriesContext(connection) as queries:
+			category_index()
+			get_facets(parse_selections({}))
+		self.assertEqual(len(queries), 0)
+		self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+	def test_off_and_failures_leave_the_worker_serving(self):
+		with mock.patch('products.warmup.preload') as preload_mock:
+			warm_up('off')
+		preload_mock.assert_not_called()
+		with mock.patch('products.warmup.warm_worker', side_effect=RuntimeError), self.assertLogs('products.warmup', 'WARNING'):
+			warm_up('full')
+
+
+from .catalog_cache import get_catalog_version
+from .popularity import ViewCounter, write_views
+
+
+class ProductPopularityTest(TestCase):
+	def setUp(self):
+		get_throttle_cache().clear()
+		cache.clear()
+		view_counter.clear()
+		category = Category.objects.create(name='Popular')
+		self.products = [
+			Product.objects.create(name=f'Item {index}', description='d', price=Decimal('5.00'), category=category)
+			for index in range(50)
+		]
+
+	def updates(self, queries):
+		return [query for query in queries if query['sql'].startswith('UPDATE')]
+
+	def test_burst_of_10k_views_is_a_handful_of_writes(self):
+		clock = iter(index * 0.003 for index in range(20000))  # 10,000 views over 30 seconds
+		with mock.patch('products.popularity.time') as fake_time, CaptureQueriesContext(connection) as queries:
+			fake_time.monotonic.side_effect = lambda: next(clock)
+			counter = ViewCounter(interval=10)
+			for index in range(10000):
+				counter.record(self.products[index % 7 * 7].id)
+			counter.flush()
+		self.assertLessEqual(len(self.updates(queries)), 4)
+		self.assertEqual(len(queries), len(self.updates(queries)))
+		counts = dict(Product.objects.filter(view_count__gt=0).values_list('id', 'view_count'))
+		self.assertEqual(sum(counts.values()), 10000)
+		self.assertEqual(len(counts), 7)
+
+	def test_concurrent_views_are_all_counted(self):
+		counter = ViewCounter(interval=3600)
+		threads = [
+			threading.Thread(target=lambda offset=offset: [counter.record(self.products[(offset + i) % 50].id) for i in range(1250)])
+			for offset in range(8)
+		]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(counter.pending(), 10000)
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(counter.flush(), 50)
+		self.assertEqual(len(queries), 1)
+		self.assertEqual(sum(Product.objects.values_list('view_count', flat=True)), 10000)
+
+	def test_api_views_are_buffered_and_sort_the_list(self):
+		old, recent = self.products[0], self.products[1]
+		version = get_catalog_version()
+		with CaptureQueriesContext(connection) as queries:
+			for _ in range(3):
+				self.client.get(f'/api/products/{recent.id}/')
+			self.client.get(f'/api/products/{recent.id}/page/')
+		self.assertEqual(self.updates(queries), [])
+		self.assertEqual(view_counter.pending(), 4)
+		view_counter.flush()
+		write_views({old.id: 10}, now=timezone.now() - datetime.timedelta(days=3))
+		self.assertEqual(get_catalog_version(), version)
+
+		most_viewed = [row['id'] for row in self.client.get('/api/products/?sort=most_viewed&fields=id').data]
+		trending = [row['id'] for row in self.client.get('/api/products/?sort=trending&fields=id').data]
+		self.assertEqual(most_viewed[:3], [old.id, recent.id, self.products[2].id])
+		self.assertEqual(trending[:3], [recent.id, old.id, self.products[2].id])  # 10 views 3 half-lives ago < 4 now
+		self.assertEqual(self.client.get('/api/products/?sort=price').status_code, 400)
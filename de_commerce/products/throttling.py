@@ -0,0 +1,152 @@
+"""
+Throttling Module - Sliding-Window Rate Limits per Endpoint Scope
+
+DRF's built-in throttles (AnonRateThrottle, UserRateThrottle, ScopedRateThrottle)
+keep a list with one timestamp per request for every client in the cache, so a
+'1000/day' rate can mean a 1000-element list that is unpickled, trimmed and
+re-pickled on every request.
+
+The throttles here use a sliding-window counter instead. Each client key
+stores a fixed-size tuple:
+
+    (window_number, count_in_current_window, count_in_previous_window)
+
+and the number of requests in the last `duration` seconds is estimated as
+
+    previous_count * (1 - elapsed_fraction_of_current_window) + current_count
+
+State stays three integers regardless of the rate, and every check is one
+cache get plus (when allowed) one cache set. Nothing touches the database.
+
+Scopes (rates in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']):
+- anon / user: default for every view that does not choose its own throttles
+- catalog: product and category reads (CategoryViewSet, ProductViewSet)
+- cart: cart writes (CartViewSet, SessionCartAPIView POST/DELETE)
+- checkout: order placement (create_order, OrderViewSet.create)
+- login: LoginAPIView
+- password_reset: PasswordResetAPIView
+
+State is kept in the 'throttle' cache alias when configured (falls back to
+'default'), so production can point throttling at a shared cache such as
+Redis while the default LocMemCache stays per-process.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def get_throttle_cache():
+    """Return the cache used for throttle state ('throttle' alias, else 'default')."""
+    return caches['throttle'] if 'throttle' in settings.CACHES else caches['default']
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Base sliding-window counter throttle.
+
+    Subclasses set `scope` (looked up in DEFAULT_THROTTLE_RATES) or `rate`.
+    Clients are identified by user id when authenticated, otherwise by IP.
+    Set `unsafe_methods_only = True` to only count writes (POST, PUT, PATCH, DELETE).
+    """
+    unsafe_methods_only = False
+
+    def __init__(self):
+        super().__init__()
+        self.cache = get_throttle_cache()
+
+    def get_cache_key(self, request, view):
+        if self.unsafe_methods_only and request.method in SAFE_METHODS:
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, offset = divmod(self.now, self.duration)
+        window = int(window)
+
+        state = self.cache.get(self.key)
+        if state is None or state[0] < window - 1:
+            current, previous = 0, 0
+        elif state[0] == window - 1:
+            current, previous = 0, state[1]
+        else:
+            current, previous = state[1], state[2]
+
+        weight = 1.0 - offset / self.duration
+        if previous * weight + current >= self.num_requests:
+            self._wait = self._time_until_allowed(current, previous, offset)
+            return False
+
+        self.cache.set(self.key, (window, current + 1, previous), self.duration * 2)
+        return True
+
+    def _time_until_allowed(self, current, previous, offset):
+        """Approximate seconds until the weighted count drops below the limit."""
+        if current >= self.num_requests or previous == 0:
+            return self.duration - offset
+        # previous * (1 - t / duration) + current < num_requests
+        t = self.duration * (1.0 - (self.num_requests - current) / previous)
+        return max(1.0, t - offset)
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class AnonSlidingWindowThrottle(SlidingWindowRateThrottle):
+    """Default throttle for unauthenticated clients (scope 'anon', keyed by IP)."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UserSlidingWindowThrottle(SlidingWindowRateThrottle):
+    """Default throttle for authenticated clients (scope 'user', keyed by user id)."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class CatalogThrottle(SlidingWindowRateThrottle):
+    """Product/category browsing (scope 'catalog')."""
+    scope = 'catalog'
+
+
+class CartWriteThrottle(SlidingWindowRateThrottle):
+    """Cart modifications; cart reads are not counted (scope 'cart')."""
+    scope = 'cart'
+    unsafe_methods_only = True
+
+
+class CheckoutThrottle(SlidingWindowRateThrottle):
+    """Order placement; order history reads are not counted (scope 'checkout')."""
+    scope = 'checkout'
+    unsafe_methods_only = True
+
+
+class LoginThrottle(SlidingWindowRateThrottle):
+    """Login attempts (scope 'login')."""
+    scope = 'login'
+
+
+class PasswordResetThrottle(SlidingWindowRateThrottle):
+    """Password reset emails (scope 'password_reset')."""
+    scope = 'password_reset'
@@ -20,11 +20,12 @@ ViewSet vs APIView:
 - APIView: Used for custom endpoints like register/login
 """
 
+from django.conf import settings
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from . import views
+from . import views, async_api, streams
 from rest_framework.routers import DefaultRouter
-from .api import CategoryViewSet, ProductViewSet, CartViewSet, OrderViewSet, create_order, logout_view
+from .api import CategoryViewSet, ProductViewSet, CartViewSet, OrderViewSet, create_order, logout_view, sales_report_view
 
 
 app_name = 'products'
@@ -43,7 +44,8 @@ router.register(r'api/products', ProductViewSet, basename='product')
 # CartViewSet: GET/POST /api/carts/, DELETE /api/carts/clear/ (IsAuthenticated - filtered to current user)
 router.register(r'api/carts', CartViewSet, basename='cart')
 
-# OrderViewSet: GET/POST /api/orders/ (IsAuthenticated - filtered to current user only)
+# OrderViewSet: GET/POST /api/orders/, GET /api/orders/events/?after=<id> status change feed
+# (IsAuthenticated - filtered to current user only)
 router.register(r'api/orders', OrderViewSet, basename='order')
 
 urlpatterns = [
@@ -53,18 +55,54 @@ urlpatterns = [
     # POST /api/login/ - Authenticate user and create session (AllowAny - no login required)
     path('api/login/', views.LoginAPIView.as_view(), name='api-login'),
     
+    # POST /api/token/ - Exchange credentials for signed access/refresh tokens (AllowAny - no login required)
+    path('api/token/', views.TokenObtainAPIView.as_view(), name='api-token'),
+
+    # POST /api/token/refresh/ - Exchange a refresh token for a new token pair (AllowAny)
+    path('api/token/refresh/', views.TokenRefreshAPIView.as_view(), name='api-token-refresh'),
+
     # POST /api/password-reset/ - Password reset request (AllowAny - no login required)
     path('api/password-reset/', views.PasswordResetAPIView.as_view(), name='api-password-reset'),
     
+    # POST /api/create-order/ - Place an order from the user's cart (IsAuthenticated, honours Idempotency-Key)
+    path('api/create-order/', create_order, name='api-create-order'),
+
+    # GET /api/reports/sales/ - Sales totals from the rollup tables (IsAdminUser)
+    path('api/reports/sales/', sales_report_view, name='api-sales-report'),
+
     # POST /api/logout/ - Logout user and destroy session (IsAuthenticated)
     path('api/logout/', logout_view, name='api-logout'),
 
     # GET /api/me/ - Return authenticated user profile + canonical cart (or session cart if anonymous)
     path('api/me/', views.MeAPIView.as_view(), name='api-me'),
+
+    # GET /api/bootstrap/ - User, cart summary, categories and first product page in one call (AllowAny)
+    path('api/bootstrap/', views.BootstrapAPIView.as_view(), name='api-bootstrap'),
+
+    # GET/POST/DELETE /api/session-cart/ - Anonymous session cart (AllowAny - no login required)
+    path('api/session-cart/', views.SessionCartAPIView.as_view(), name='api-session-cart'),
     
+    # GET /api/orders/stream/ - Server-Sent Events of the user's order status changes (IsAuthenticated, ASGI only)
+    # Listed before the router so 'stream' is not taken for an order id
+    path('api/orders/stream/', streams.order_stream, name='api-order-stream'),
+
     # Auto-generated routes from DefaultRouter (categories, products, carts, orders)
     path('', include(router.urls)),
     
     # DRF login/logout views (optional, for browser API testing)
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
+
+# Async-native read path (settings.ASYNC_API, enabled by default under ASGI)
+# These patterns are matched before the synchronous ones above; only GET/HEAD
+# run natively, other methods fall through to the same DRF views.
+async_urlpatterns = [
+    path('api/products/', async_api.async_read_view(async_api.product_list, ProductViewSet.as_view({'get': 'list'}), ProductViewSet.throttle_classes), name='api-products-async'),
+    path('api/categories/', async_api.async_read_view(async_api.category_list, CategoryViewSet.as_view({'get': 'list'}), CategoryViewSet.throttle_classes), name='api-categories-async'),
+    path('api/me/', async_api.async_read_view(async_api.me, views.MeAPIView.as_view()), name='api-me-async'),
+    path('api/session-cart/', async_api.async_read_view(async_api.session_cart, views.SessionCartAPIView.as_view()), name='api-session-cart-async'),
+    path('api/password-reset/', async_api.password_reset, name='api-password-reset-async'),
+]
+
+if settings.ASYNC_API:
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -0,0 +1,155 @@
+"""
+Variants Module - Product Variants (SKUs) and Bulk Availability
+
+A Product can be sold as several ProductVariants: one SKU per combination of
+options ({"colour": "Black", "ram": "16GB"}), each with its own stock and,
+optionally, its own price (null: the product's price).
+
+Listing pages need, per product, the price range and whether anything is in
+stock. Loading the variants for that would cost a query per product (or one
+big prefetch whose size grows with the number of variants), so the product
+queryset is annotated instead (annotate_availability):
+
+- min_variant_price / max_variant_price: range of the variants' own prices
+- inherits_price: some active variant sells at the product's price
+- variant_count: active variants
+- in_stock: an active variant has stock, or, for products without active
+  variants, stock_status is not 'Out of Stock'
+
+They are correlated subqueries on the (product, is_active) index, so the
+list stays one query whatever the number of variants. price_range() turns
+the annotations into the customer's min/max price (price lists, pricing.py).
+
+Product detail prefetches the active variants (one more query) for the
+option pickers: option_axes() lists the values of each axis.
+
+Anonymous session carts key lines by '<product_id>' or, for a variant,
+'<product_id>:<variant_id>' (session_cart_key / parse_session_cart_key).
+
+Checkout (reserve_stock) decrements variant stock with one conditional
+UPDATE per variant, so two customers cannot both buy the last unit, and
+rejects lines of products with variants that do not name one. Once the
+checkout commits, the cached pages of those products are invalidated
+(product_page.py).
+
+Usage:
+    products = annotate_availability(Product.objects.all())
+    low, high = price_range(products[0], price_book)
+    GET /api/products/          # ... "min_price", "max_price", "in_stock", "variant_count"
+    GET /api/products/{id}/     # ... "options": {"colour": [...]}, "variants": [...]
+"""
+
+from django.db import transaction
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, F, IntegerField, Max, Min, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .catalog_cache import bump_product_version
+from .models import ProductVariant
+
+OUT_OF_STOCK = 'out of stock'
+
+
+class StockError(ValueError):
+    """A cart line cannot be ordered (returned to API clients as 400)."""
+
+
+def _per_product(aggregate):
+    """Correlated subquery computing `aggregate` over the active variants of the outer product."""
+    variants = ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True).order_by()
+    return Subquery(variants.values('product').annotate(value=aggregate).values('value'))
+
+
+def annotate_availability(queryset):
+    """Annotate a Product queryset with the availability fields described in the module docstring."""
+    active = ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True)
+    return queryset.annotate(
+        min_variant_price=_per_product(Min('price')),
+        max_variant_price=_per_product(Max('price')),
+        inherits_price=Exists(active.filter(price__isnull=True)),
+        variant_count=Coalesce(_per_product(Count('id')), 0, output_field=IntegerField()),
+        in_stock=ExpressionWrapper(
+            Q(Exists(active.filter(stock__gt=0)))
+            | (~Q(Exists(active)) & ~Q(stock_status__iexact=OUT_OF_STOCK)),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def price_range(product, price_book=None):
+    """(min, max) price of an annotated product, in the PriceBook's currency when given."""
+    prices = [
+        price_book.convert(amount) if price_book is not None else amount
+        for amount in (product.min_variant_price, product.max_variant_price) if amount is not None
+    ]
+    if not product.variant_count or product.inherits_price:
+        prices.append(price_book.price(product) if price_book is not None else product.price)
+    return min(prices), max(prices)
+
+
+def active_variants_prefetch():
+    """Prefetch of the active variants into product.active_variants (detail pages)."""
+    return Prefetch(
+        'variants', queryset=ProductVariant.objects.filter(is_active=True).order_by('id'), to_attr='active_variants',
+    )
+
+
+def option_axes(variants):
+    """{axis: [values]} over `variants`, axes and values in first-seen order."""
+    axes = {}
+    for variant in variants:
+        for axis, value in variant.options.items():
+            values = axes.setdefault(axis, [])
+            if value not in values:
+                values.append(value)
+    return axes
+
+
+def session_cart_key(product_id, variant_id=None):
+    """Key of a line in the session cart ({key: quantity})."""
+    return f'{product_id}:{variant_id}' if variant_id else str(product_id)
+
+
+def parse_session_cart_key(key):
+    """(product_id, variant_id or None) of a session cart key; None when the key is invalid."""
+    product_id, _, variant_id = str(key).partition(':')
+    if not product_id.isdigit() or not (variant_id.isdigit() or not variant_id):
+        return None
+    return int(product_id), int(variant_id) if variant_id else None
+
+
+def reserve_stock(cart_items):
+    """
+    Check the variants of CartItems (product and variant loaded) and take
+    their quantities out of stock. All or nothing: raises StockError, with no
+    stock changed, when a line cannot be ordered.
+    """
+    without_variant = {item.product_id: item.product for item in cart_items if item.variant_id is None}
+    if without_variant:
+        product_id = (
+            ProductVariant.objects.filter(product_id__in=without_variant, is_active=True)
+            .values_list('product_id', flat=True).first()
+        )
+        if product_id is not None:
+            raise StockError(f"Choose an option of {without_variant[product_id].name}.")
+
+    quantities, lines = {}, {}
+    for item in cart_items:
+        if item.variant_id is None:
+            continue
+        if item.variant.product_id != item.product_id:
+            raise StockError(f"{item.variant.sku} is not an option of {item.product.name}.")
+        quantities[item.variant_id] = quantities.get(item.variant_id, 0) + item.quantity
+        lines[item.variant_id] = item
+
+    with transaction.atomic():
+        # Ordered by id so concurrent checkouts lock rows in the same order
+        for variant_id, quantity in sorted(quantities.items()):
+            updated = ProductVariant.objects.filter(pk=variant_id, is_active=True, stock__gte=quantity).update(
+                stock=F('stock') - quantity,
+            )
+            if not updated:
+                item = lines[variant_id]
+                raise StockError(f"{item.product.name} ({item.variant.option_label() or item.variant.sku}) is out of stock.")
+        # Shared version, bumped with the stock: undone if the checkout rolls back
+        for product_id in sorted({item.product_id for item in lines.values()}):
+            bump_product_version(product_id)
@@ -19,15 +19,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.throttling import UserRateThrottle
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.core.cache import cache
-
-from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, CartSerializer, UserSerializer
-from .models import Product, Cart, CartItem
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from decimal import Decimal
+
+from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, CartSerializer, UserSerializer, CategorySerializer, ProductSummarySerializer, NormalizedCartSerializer
+from .models import Category, Product, ProductVariant, Cart, CartItem
+from .catalog_cache import catalog_cache_key, CATALOG_CACHE_TIMEOUT
+from .normalization import is_normalized, normalized, product_queryset, line_items_prefetch
+from .authentication import issue_tokens, refresh_tokens, get_full_user
+from .pricing import get_price_book
+from .promotions import get_promotion_engine, Line, normalize_coupon_codes
+from .variants import parse_session_cart_key, session_cart_key
+from .throttling import AnonSlidingWindowThrottle, UserSlidingWindowThrottle, CartWriteThrottle, LoginThrottle, PasswordResetThrottle
 
 # ============================================================================
 # AUTHENTICATION VIEWS (NO LOGIN REQUIRED)
@@ -112,52 +122,143 @@ class LoginAPIView(APIView):
 	"""
 	permission_classes = [AllowAny]
 	# Apply a dedicated login throttle (scope 'login')
-	throttle_scope = 'login'
-    
-	class LoginRateThrottle(UserRateThrottle):
-		scope = 'login'
+	throttle_classes = [LoginThrottle]
+	def post(self, request):
+		serializer = LoginSerializer(data=request.data)
+		if serializer.is_valid():
+			user, error = authenticate_with_lockout(
+				request, serializer.validated_data['username'], serializer.validated_data['password']
+			)
+			if error:
+				return error
+
+			login(request, user)
+			# Merge any anonymous session cart into user's persistent cart
+			try:
+				merge_session_cart(request, user)
+			except Exception as e:
+				# Do not fail login if merge fails; log for server-side debugging
+				print(f"Session cart merge error: {e}")
+
+			return Response({'success': True, 'message': 'Login successful.'}, status=status.HTTP_200_OK)
+		return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def authenticate_with_lockout(request, username, password):
+	"""
+	Verify credentials with a basic brute-force lockout (shared by session login and token login).
+
+	Failed attempts are counted in the cache per username+ip and per ip
+	(MAX_FAIL and MAX_FAIL * 3 within LOCKOUT_TTL seconds of the first failure;
+	the window is fixed, later failures do not extend it).
+
+	Returns (user, None) on success, or (None, Response) with a 429 (locked out)
+	or 401 (invalid credentials) response.
+	"""
+	ip = request.META.get('HTTP_X_FORWARDED_FOR', request.META.get('REMOTE_ADDR', 'unknown')).split(',')[0].strip()
+	user_key = f'login_fail:{username}:{ip}'
+	ip_key = f'login_fail_ip:{ip}'
+	MAX_FAIL = 5
+	LOCKOUT_TTL = 600  # seconds
+
+	# Both counters are read in a single cache round trip
+	fail_counts = cache.get_many([user_key, ip_key])
+	user_fail_count = fail_counts.get(user_key, 0)
+	ip_fail_count = fail_counts.get(ip_key, 0)
+	if user_fail_count >= MAX_FAIL or ip_fail_count >= (MAX_FAIL * 3):
+		return None, Response({'success': False, 'message': 'Too many failed login attempts. Try again later.'}, status=429)
+
+	# Password check; hashes from an older hasher/parameters are upgraded here (see hashers.py)
+	user = authenticate(username=username, password=password)
+	if user:
+		# reset fail counters
+		if fail_counts:
+			cache.delete_many(list(fail_counts))
+		return user, None
+
+	# authentication failed: atomic increments, so concurrent failures all count;
+	# add() only sets the TTL when the window starts
+	for key in (user_key, ip_key):
+		cache.add(key, 0, LOCKOUT_TTL)
+		try:
+			cache.incr(key)
+		except ValueError:
+			cache.add(key, 1, LOCKOUT_TTL)  # expired between add() and incr()
+	return None, Response({'success': False, 'message': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenObtainAPIView(APIView):
+	"""
+	API View for stateless token login
+
+	Endpoint: POST /api/token/
+
+	Permission: AllowAny (same 'login' throttle and lockout as LoginAPIView)
+
+	HTTP Methods:
+	- POST: Exchange credentials for a signed access/refresh token pair
+	  - Request body: {username, password}
+	  - Returns: {access, refresh, token_type: "Bearer", expires_in}
+	  - No session is created
+
+	Status Codes:
+	- 200 OK: Credentials valid, tokens issued
+	- 401 Unauthorized: Invalid username/password combination
+	- 429 Too Many Requests: Locked out or throttled
+	- 400 Bad Request: Malformed request data
+
+	Usage: send 'Authorization: Bearer <access>' on API calls; those requests
+	are authenticated without any database query (see authentication.py).
+	"""
+	permission_classes = [AllowAny]
+	authentication_classes = []
+	throttle_classes = [LoginThrottle]
 
-	throttle_classes = [LoginRateThrottle]
 	def post(self, request):
 		serializer = LoginSerializer(data=request.data)
 		if serializer.is_valid():
-			username = serializer.validated_data['username']
-			password = serializer.validated_data['password']
-
-			# Basic lockout via cache per username+ip to mitigate brute-force
-			ip = request.META.get('HTTP_X_FORWARDED_FOR', request.META.get('REMOTE_ADDR', 'unknown')).split(',')[0].strip()
-			user_key = f'login_fail:{username}:{ip}'
-			ip_key = f'login_fail_ip:{ip}'
-			MAX_FAIL = 5
-			LOCKOUT_TTL = 600  # seconds
-
-			user_fail_count = cache.get(user_key, 0)
-			ip_fail_count = cache.get(ip_key, 0)
-			if user_fail_count >= MAX_FAIL or ip_fail_count >= (MAX_FAIL * 3):
-				return Response({'success': False, 'message': 'Too many failed login attempts. Try again later.'}, status=429)
-
-			user = authenticate(username=username, password=password)
-			if user:
-				login(request, user)
-				# reset fail counters
-				cache.delete(user_key)
-				cache.delete(ip_key)
-				# Merge any anonymous session cart into user's persistent cart
-				try:
-					merge_session_cart(request, user)
-				except Exception as e:
-					# Do not fail login if merge fails; log for server-side debugging
-					print(f"Session cart merge error: {e}")
-
-				return Response({'success': True, 'message': 'Login successful.'}, status=status.HTTP_200_OK)
-
-			# authentication failed: increment counters
-			cache.incr(user_key) if cache.get(user_key) is not None else cache.set(user_key, 1, LOCKOUT_TTL)
-			cache.incr(ip_key) if cache.get(ip_key) is not None else cache.set(ip_key, 1, LOCKOUT_TTL)
-			return Response({'success': False, 'message': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
+			user, error = authenticate_with_lockout(
+				request, serializer.validated_data['username'], serializer.validated_data['password']
+			)
+			if error:
+				return error
+			return Response(issue_tokens(user), status=status.HTTP_200_OK)
 		return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TokenRefreshAPIView(APIView):
+	"""
+	API View for refreshing an access token
+
+	Endpoint: POST /api/token/refresh/
+
+	Permission: AllowAny (the refresh token is the credential)
+
+	HTTP Methods:
+	- POST: Exchange a refresh token for a new access/refresh pair
+	  - Request body: {refresh}
+	  - Returns: {access, refresh, token_type: "Bearer", expires_in}
+
+	Status Codes:
+	- 200 OK: New tokens issued (the refresh token is rotated)
+	- 401 Unauthorized: Refresh token invalid/expired, user inactive or password changed
+	- 400 Bad Request: refresh missing
+	"""
+	permission_classes = [AllowAny]
+	authentication_classes = []
+	throttle_classes = [LoginThrottle]
+
+	def get_authenticate_header(self, request):
+		# Invalid refresh tokens are reported as 401 (not 403) with a Bearer challenge
+		return 'Bearer'
+
+	def post(self, request):
+		refresh = request.data.get('refresh')
+		if not refresh:
+			return Response({'success': False, 'message': 'refresh is required.'}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(refresh_tokens(refresh), status=status.HTTP_200_OK)
+
+
 class PasswordResetAPIView(APIView):
 	"""
 	API View for password reset requests
@@ -194,8 +295,10 @@ class PasswordResetAPIView(APIView):
 	Security Note:
 	- For privacy, returns success even if email not found
 	- This prevents attackers from enumerating valid emails in database
+	- Throttled per client with its own 'password_reset' scope
 	"""
 	permission_classes = [AllowAny]
+	throttle_classes = [PasswordResetThrottle]
 	
 	def post(self, request):
 		from django.core.mail import send_mail
@@ -251,6 +354,38 @@ class PasswordResetAPIView(APIView):
 			)
 
 
+def session_cart_payload(request, payload, key=None):
+	"""
+	Add the anonymous session cart to `payload` as {'items': [...]} (under
+	payload[key] when key is given) and return it.
+
+	Session cart format: { '<product_id>' or '<product_id>:<variant_id>': quantity, ... }
+	(see variants.py); unknown or invalid product ids are skipped. With
+	?shape=normalized, items reference products by id and the
+	products/categories side tables are added to `payload`.
+	"""
+	session_cart = request.session.get('cart', {})
+	shape_normalized = is_normalized(request)
+	lines = [(parse_session_cart_key(key), qty) for key, qty in session_cart.items()]
+	lines = [(line, qty) for line, qty in lines if line is not None]
+	product_ids = [product_id for (product_id, _), _ in lines]
+	products = product_queryset() if shape_normalized else Product.objects.select_related('category')
+	prod_map = {p.id: p for p in products.filter(id__in=product_ids)} if product_ids else {}
+	items = []
+	for (product_id, variant_id), qty in lines:
+		product = prod_map.get(product_id)
+		if product:
+			data = product.id if shape_normalized else ProductSerializer(product).data
+			items.append({'product': data, 'variant': variant_id, 'quantity': qty})
+	if key:
+		payload[key] = {'items': items}
+	else:
+		payload['items'] = items
+	if shape_normalized:
+		normalized(payload, prod_map.values(), {'request': request})
+	return payload
+
+
 class SessionCartAPIView(APIView):
 	"""
 	API View for a session-backed cart for anonymous users.
@@ -261,24 +396,20 @@ class SessionCartAPIView(APIView):
 
 	Methods:
 	- GET: return current session cart items with product details
-	- POST: add product to session cart (body: {product_id, quantity})
+	- POST: add product to session cart (body: {product_id, quantity, variant_id})
+	  variant_id is required for products sold as variants (variants.py)
 	- DELETE: clear the session cart
+
+	Throttling: reads use the default anon/user scopes, writes also count
+	against the 'cart' scope.
+
+	GET accepts ?shape=normalized (see normalization.py).
 	"""
 	permission_classes = [AllowAny]
+	throttle_classes = [AnonSlidingWindowThrottle, UserSlidingWindowThrottle, CartWriteThrottle]
 
 	def get(self, request):
-		cart = request.session.get('cart', {})
-		items = []
-		if cart:
-			product_ids = [int(pid) for pid in cart.keys()]
-			products = Product.objects.filter(id__in=product_ids)
-			prod_map = {p.id: p for p in products}
-			for pid_str, qty in cart.items():
-				pid = int(pid_str)
-				product = prod_map.get(pid)
-				if product:
-					items.append({'product': ProductSerializer(product).data, 'quantity': qty})
-		return Response({'items': items}, status=status.HTTP_200_OK)
+		return Response(session_cart_payload(request, {}), status=status.HTTP_200_OK)
 
 	def post(self, request):
 		product_id = request.data.get('product_id') or request.data.get('id')
@@ -288,12 +419,20 @@ class SessionCartAPIView(APIView):
 			product = Product.objects.get(id=product_id)
 		except Product.DoesNotExist:
 			return Response({'success': False, 'message': 'Product not found.'}, status=status.HTTP_404_NOT_FOUND)
+		variant_id = request.data.get('variant_id') or None
+		variants = product.variants.filter(is_active=True)
+		if variant_id is not None:
+			if not str(variant_id).isdigit() or not variants.filter(id=variant_id).exists():
+				return Response({'success': False, 'message': 'Variant not found.'}, status=status.HTTP_404_NOT_FOUND)
+			variant_id = int(variant_id)
+		elif variants.exists():
+			return Response({'success': False, 'message': 'variant_id is required for this product.'}, status=status.HTTP_400_BAD_REQUEST)
 		try:
 			quantity = int(request.data.get('quantity', 1))
 		except (TypeError, ValueError):
 			quantity = 1
 		cart = request.session.get('cart', {})
-		key = str(product.id)
+		key = session_cart_key(product.id, variant_id)
 		cart[key] = cart.get(key, 0) + quantity
 		request.session['cart'] = cart
 		request.session.modified = True
@@ -309,11 +448,11 @@ def merge_session_cart(request, user):
 	"""
 	Merge anonymous session cart into the authenticated user's persistent DB cart.
 
-	Session cart format: { '<product_id>': quantity, ... }
+	Session cart format: { '<product_id>' or '<product_id>:<variant_id>': quantity, ... }
 	Behavior:
 	- Create Cart for user if not exists
-	- For each product in session cart: add quantity to existing CartItem or create new
-	- Ignore invalid product ids
+	- For each product (variant) in session cart: add quantity to existing CartItem or create new
+	- Ignore invalid product ids and variants that are not the product's
 	- Clear session cart after successful merge
 	"""
 	session_cart = request.session.get('cart')
@@ -323,21 +462,26 @@ def merge_session_cart(request, user):
 	with transaction.atomic():
 		cart, created = Cart.objects.get_or_create(user=user)
 
-		product_ids = [int(pid) for pid in session_cart.keys() if str(pid).isdigit()]
+		lines = {key: parse_session_cart_key(key) for key in session_cart}
+		product_ids = [line[0] for line in lines.values() if line]
 		products = Product.objects.filter(id__in=product_ids)
 		prod_map = {p.id: p for p in products}
+		variant_ids = [line[1] for line in lines.values() if line and line[1]]
+		variant_products = dict(ProductVariant.objects.filter(id__in=variant_ids).values_list('id', 'product_id'))
 
-		for pid_str, qty in session_cart.items():
+		for key, qty in session_cart.items():
 			try:
-				pid = int(pid_str)
 				quantity = int(qty)
 			except (ValueError, TypeError):
 				continue
+			if lines[key] is None:
+				continue
+			pid, variant_id = lines[key]
 			product = prod_map.get(pid)
-			if not product:
+			if not product or (variant_id and variant_products.get(variant_id) != pid):
 				continue
 
-			cart_item, created_item = CartItem.objects.get_or_create(cart=cart, product=product, defaults={'quantity': quantity})
+			cart_item, created_item = CartItem.objects.get_or_create(cart=cart, product=product, variant_id=variant_id, defaults={'quantity': quantity})
 			if not created_item:
 				# Update existing quantity
 				cart_item.quantity = cart_item.quantity + quantity
@@ -351,30 +495,173 @@ def merge_session_cart(request, user):
 class MeAPIView(APIView):
 	"""
 	GET /api/me/ - Return authenticated user's profile and canonical cart.
-	If unauthenticated, returns {'authenticated': False}
+	If unauthenticated, returns {'authenticated': False} and the session cart.
+	Accepts ?shape=normalized (see normalization.py) and, for authenticated
+	users, ?coupon=CODE to preview a coupon in the cart summary.
 	"""
 	permission_classes = [AllowAny]
 
 	def get(self, request):
 		if not request.user or not request.user.is_authenticated:
 			# If anonymous but has session cart, return session cart items
-			session_cart = request.session.get('cart', {})
-			items = []
-			if session_cart:
-				product_ids = [int(pid) for pid in session_cart.keys() if str(pid).isdigit()]
-				products = Product.objects.filter(id__in=product_ids)
-				prod_map = {p.id: p for p in products}
-				for pid_str, qty in session_cart.items():
-					pid = int(pid_str) if str(pid_str).isdigit() else None
-					if pid and pid in prod_map:
-						items.append({'product': ProductSerializer(prod_map[pid]).data, 'quantity': qty})
-			return Response({'authenticated': False, 'cart': {'items': items}})
+			return Response(session_cart_payload(request, {'authenticated': False}, key='cart'))
 
 		# Authenticated user: return profile and persistent cart
-		user = request.user
+		user = get_full_user(request)
 		user_data = UserSerializer(user).data
 		# Fetch or create cart
 		cart, _ = Cart.objects.get_or_create(user=user)
-		cart_data = CartSerializer(cart).data
+		# Customers on a price list see their list prices (pricing.py);
+		# ?coupon=CODE previews a coupon in the cart summary (promotions.py)
+		price_book = get_price_book(user)
+		context = {'price_book': price_book} if price_book.price_list else {}
+		context['coupon_codes'] = normalize_coupon_codes(request.GET.get('coupon', ''))
+		if is_normalized(request):
+			prefetch_related_objects([cart], line_items_prefetch(CartItem))
+			payload = {'authenticated': True, 'user': user_data, 'cart': NormalizedCartSerializer(cart, context=context).data}
+			products = [item.product for item in cart.items.all()]
+			return Response(normalized(payload, products, dict(context, request=request)))
+		prefetch_related_objects([cart], 'items__product__category', 'items__variant')
+		cart_data = CartSerializer(cart, context=context).data
 		return Response({'authenticated': True, 'user': user_data, 'cart': cart_data})
 
+
+# Number of products included in the /api/bootstrap/ first page
+BOOTSTRAP_PRODUCT_PAGE_SIZE = getattr(settings, 'BOOTSTRAP_PRODUCT_PAGE_SIZE', 24)
+
+
+def get_public_bootstrap(request):
+	"""
+	Public (identical for every visitor) part of /api/bootstrap/:
+	- categories: full category list (CategorySerializer)
+	- products: {count, results} with the first BOOTSTRAP_PRODUCT_PAGE_SIZE products
+	  (ProductSummarySerializer, ordered by id)
+
+	Cached per host (image URLs are absolute) under a catalog-versioned key,
+	so any Product/Category save or delete invalidates it.
+	"""
+	key = catalog_cache_key('bootstrap', request.scheme, request.get_host())
+	data = cache.get(key)
+	if data is None:
+		context = {'request': request}
+		products = Product.objects.select_related('category').order_by('id')
+		first_page = list(products[:BOOTSTRAP_PRODUCT_PAGE_SIZE])
+		count = len(first_page) if len(first_page) < BOOTSTRAP_PRODUCT_PAGE_SIZE else products.count()
+		data = {
+			'categories': CategorySerializer(Category.objects.all(), many=True, context=context).data,
+			'products': {
+				'count': count,
+				'results': ProductSummarySerializer(first_page, many=True, context=context).data,
+			},
+		}
+		cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+	return data
+
+
+def get_private_bootstrap(request, price_book=None):
+	"""
+	Per-visitor part of /api/bootstrap/: authentication flag, minimal user
+	profile and a cart summary (total_price is after promotions). Strictly
+	read-only - no Cart is created and the session is not modified.
+	price_book defaults to the visitor's (get_price_book).
+	"""
+	user = request.user
+	if user and user.is_authenticated:
+		rows = CartItem.objects.filter(cart__user=user).select_related('product__category', 'variant').order_by('id')
+		lines = [(item.product, item.variant, item.quantity) for item in rows]
+		profile = {'id': user.id, 'username': user.username, 'email': user.email}
+	else:
+		session_cart = request.session.get('cart', {})
+		quantities = {parse_session_cart_key(key): qty for key, qty in session_cart.items()}
+		quantities.pop(None, None)
+		product_ids = [product_id for product_id, _ in quantities]
+		products = Product.objects.filter(id__in=product_ids).select_related('category') if quantities else []
+		prod_map = {p.id: p for p in products}
+		variant_ids = [variant_id for _, variant_id in quantities if variant_id]
+		variants = {v.id: v for v in ProductVariant.objects.filter(id__in=variant_ids)} if variant_ids else {}
+		lines = [
+			(prod_map[pid], variants.get(variant_id), qty)
+			for (pid, variant_id), qty in quantities.items() if pid in prod_map and (not variant_id or variant_id in variants)
+		]
+		profile = None
+
+	context = {'request': request}
+	if price_book is None:
+		price_book = get_price_book(user)
+	if price_book.price_list is not None:
+		context['price_book'] = price_book
+	evaluation = get_promotion_engine().evaluate(
+		Line(index, product.id, product.category_id, quantity, price_book.price(product, variant))
+		for index, (product, variant, quantity) in enumerate(lines)
+	)
+	return {
+		'authenticated': profile is not None,
+		'user': profile,
+		'cart': {
+			'items': [
+				{
+					'product': ProductSummarySerializer(product, context=context).data,
+					'variant': variant.id if variant else None,
+					'quantity': quantity,
+				}
+				for product, variant, quantity in lines
+			],
+			'total_items': sum(quantity for _, _, quantity in lines),
+			'subtotal': str(evaluation.subtotal),
+			'discount': str(evaluation.discount),
+			'total_price': str(evaluation.total),
+		},
+	}
+
+
+def price_public_bootstrap(data, price_book):
+	"""
+	Return a copy of the cached public bootstrap with the first product page
+	re-priced for a customer on a price list. The shared cache entry always
+	holds base prices.
+	"""
+	results = [
+		dict(row, price=str(price_book.amount(row['id'], Decimal(row['price']))), currency=price_book.currency)
+		for row in data['products']['results']
+	]
+	return dict(data, products=dict(data['products'], results=results))
+
+
+class BootstrapAPIView(APIView):
+	"""
+	GET /api/bootstrap/ - Everything the SPA needs for its first render in one response
+
+	Permission: AllowAny (anonymous visitors get their session cart)
+
+	Replaces the startup waterfall of /api/me/, then /api/products/ and
+	/api/categories/ in parallel, then cart fetches.
+
+	Response:
+	{
+	  "authenticated": bool,
+	  "user": {id, username, email} | null,
+	  "cart": {"items": [{product: {...summary...}, quantity}], "total_items", "subtotal", "discount", "total_price"},
+	  "categories": [{id, name, description}, ...],
+	  "products": {"count": int, "results": [{...summary...}, ...]}
+	}
+
+	Caching:
+	- categories/products are cached server-side (see get_public_bootstrap)
+	- the response itself is private (it contains the visitor's cart) and
+	  varies on Cookie and Authorization (session or Bearer token users)
+
+	Unlike /api/me/, this endpoint never writes: users without a Cart row get
+	an empty cart summary instead of a newly created Cart.
+	"""
+	permission_classes = [AllowAny]
+
+	def get(self, request):
+		public = get_public_bootstrap(request)
+		price_book = get_price_book(request.user)
+		if price_book.price_list is not None:
+			public = price_public_bootstrap(public, price_book)
+		data = dict(public, **get_private_bootstrap(request, price_book))
+		response = Response(data, status=status.HTTP_200_OK)
+		patch_cache_control(response, private=True, no_cache=True)
+		patch_vary_headers(response, ('Cookie', 'Authorization'))
+		return response
@@ -0,0 +1,150 @@
+"""
+Warmup Module - Worker Start-Up Warm-Up and Preload Mode
+
+A fresh gunicorn/uvicorn worker pays on its first requests for importing the
+API modules, compiling the URL patterns, DRF settings and serializer field
+introspection, the first database connection and empty catalog caches. During
+deploys and autoscaling that shows up as p99 spikes on real users' requests.
+
+The warm-up moves that work before the worker accepts traffic, in two parts:
+
+preload() - fork-safe, never touches the database:
+- imports products.api/views/serializers/async_api (and what they import)
+- resolves the API paths, so every URL pattern regex is compiled
+- loads DRF's renderer/parser/authentication/throttle classes
+- instantiates every serializer in products.serializers and builds its fields
+
+warm_worker() - per process, after any fork:
+- opens a connection to the primary and each replica (kept when
+  CONN_MAX_AGE allows it)
+- primes the catalog caches: category index, facet counts and the compiled
+  promotion engine
+- serves one internal product list and category list, so the querysets,
+  serializers and JSON renderer run once on real data
+
+Modes (settings.WARMUP, env DJANGO_WARMUP), applied by wsgi.py and asgi.py:
+- 'full' (default): preload() and warm_worker() when the application loads
+- 'preload': only preload(); the server calls warm_worker() after forking.
+  gunicorn.conf.py does this (preload_app + post_fork), so imports and
+  compiled patterns are shared copy-on-write by all workers and no database
+  connection is inherited across the fork
+- 'off': nothing (the first requests do the work)
+
+Under ASGI the ORM runs in a worker thread with its own connection, so asgi.py
+closes the connections warm_worker() opened; the caches stay primed. When the
+application is imported inside a running event loop (uvicorn), warm_worker()
+runs in a short-lived thread instead, since the ORM refuses to run on the loop.
+
+Usage:
+    gunicorn de_commerce.wsgi                 # picks up gunicorn.conf.py
+    uvicorn de_commerce.asgi:application      # 'full' warm-up per worker
+    python -m benchmarks.bench_warmup         # time to first fast response
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = (
+    'products.api', 'products.views', 'products.serializers', 'products.async_api', 'products.streams',
+    'products.renderers', 'products.parsers', 'products.urls',
+)
+# Representative paths; resolving them compiles every pattern tried on the way
+WARMUP_PATHS = (
+    '/api/products/', '/api/products/1/', '/api/products/1/related/', '/api/products/1/page/', '/api/products/facets/',
+    '/api/categories/', '/api/categories/tree/', '/api/categories/1/breadcrumb/',
+    '/api/carts/', '/api/orders/', '/api/orders/1/', '/api/orders/events/', '/api/orders/stream/',
+    '/api/me/', '/api/bootstrap/', '/api/session-cart/', '/api/login/', '/api/token/', '/api/create-order/',
+)
+DRF_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+)
+# Lists served once by warm_worker() through their synchronous viewsets
+WARMUP_LISTS = ('/api/products/', '/api/categories/')
+
+
+def preload():
+    """Fork-safe warm-up (no database access). Returns the seconds taken."""
+    start = time.perf_counter()
+    modules = [importlib.import_module(name) for name in PRELOAD_MODULES]
+    for path in WARMUP_PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            pass
+    for name in DRF_SETTINGS:
+        getattr(api_settings, name)
+    serializer_module = modules[PRELOAD_MODULES.index('products.serializers')]
+    for _, serializer_class in inspect.getmembers(serializer_module, inspect.isclass):
+        if issubclass(serializer_class, serializers.ModelSerializer) and serializer_class.__module__ == serializer_module.__name__:
+            serializer_class(context={}).fields
+    return time.perf_counter() - start
+
+
+def warm_worker(keep_connections=True):
+    """Per-process warm-up: database connections, catalog caches, one pass through the read views. Returns the seconds taken."""
+    from .api import CategoryViewSet, ProductViewSet
+    from .category_tree import category_index
+    from .facets import get_facets, parse_selections
+    from .promotions import get_promotion_engine
+
+    start = time.perf_counter()
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+    category_index()
+    get_facets(parse_selections({}))
+    get_promotion_engine()
+
+    factory = RequestFactory()
+    host = next((host for host in settings.ALLOWED_HOSTS if host and '*' not in host), 'localhost').lstrip('.')
+    for viewset, path in zip((ProductViewSet, CategoryViewSet), WARMUP_LISTS):
+        # Own client address so the warm-up never counts against a real client's throttle
+        request = factory.get(path, HTTP_HOST=host, REMOTE_ADDR='0.0.0.0')
+        viewset.as_view({'get': 'list'})(request).render()
+    if not keep_connections:
+        connections.close_all()
+    return time.perf_counter() - start
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _warm_worker_in_thread():
+    # uvicorn imports the application inside its running event loop, where the
+    # ORM refuses to run; the connections opened in the thread are closed with it
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(warm_worker, keep_connections=False).result()
+
+
+def warm_up(mode=None, keep_connections=True):
+    """Run the warm-up for `mode` (default settings.WARMUP, see module docstring)."""
+    mode = mode or getattr(settings, 'WARMUP', 'full')
+    if mode == 'off':
+        return
+    seconds = preload()
+    if mode == 'full':
+        try:
+            seconds += _warm_worker_in_thread() if _in_event_loop() else warm_worker(keep_connections)
+        except Exception:
+            # A worker that cannot warm up still serves; its first requests are just slower
+            logger.warning('Worker warm-up failed', exc_info=True)
+            return
+    logger.info('Worker warm-up (%s) took %.3fs', mode, seconds)
@@ -10,14 +10,17 @@ const app = createApp(App);
 app.use(router);
 app.use(store);
 import api from './services/api';
+import { primeCatalog } from './services/products';
 import { useAuthStore } from './store/auth';
 import { useCartStore } from './store/cart';
 
-// App bootstrap: fetch /api/me/ to confirm session and sync profile/cart
+// App bootstrap: one GET /api/bootstrap/ returns session/profile, cart summary,
+// categories and the first product page (replaces /api/me/ + catalog waterfall)
 async function bootstrap() {
 	try {
-		const response = await api.get('me/');
+		const response = await api.get('bootstrap/');
 		const data = response.data;
+		primeCatalog(data);
 		const auth = useAuthStore();
 		const cart = useCartStore();
 
@@ -37,7 +40,7 @@ async function bootstrap() {
 		}
 	} catch (err) {
 		// ignore bootstrap errors; app will still run (e.g., backend down)
-		console.warn('Bootstrap /api/me/ failed', err?.response?.status || err.message);
+		console.warn('Bootstrap /api/bootstrap/ failed', err?.response?.status || err.message);
 	}
 
 	app.mount('#app');
@@ -42,6 +42,13 @@ const api = axios.create({
  */
 api.interceptors.request.use(
   (config) => {
+    // Opt-in stateless auth: send the signed access token when one is stored
+    // (see loginWithToken() in auth.js). Session cookies still work without it.
+    const accessToken = sessionStorage.getItem('accessToken');
+    if (accessToken) {
+      config.headers['Authorization'] = `Bearer ${accessToken}`;
+    }
+
     // Only add CSRF token for state-changing requests
     if (['post', 'put', 'patch', 'delete'].includes(config.method?.toLowerCase())) {
       // Extract CSRF token from cookies
@@ -59,6 +66,35 @@ api.interceptors.request.use(
   }
 );
 
+/**
+ * Response Interceptor: Refresh Expired Access Tokens
+ *
+ * When token auth is in use and a request fails with 401, exchange the
+ * stored refresh token at POST /api/token/refresh/ once and retry.
+ * Without a refresh token (session auth) errors pass through unchanged.
+ */
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const config = error.config;
+    const refresh = sessionStorage.getItem('refreshToken');
+    if (error.response?.status !== 401 || !refresh || !config || config._retried || config.url === 'token/refresh/') {
+      return Promise.reject(error);
+    }
+    config._retried = true;
+    try {
+      const { data } = await api.post('token/refresh/', { refresh });
+      sessionStorage.setItem('accessToken', data.access);
+      sessionStorage.setItem('refreshToken', data.refresh);
+      return api(config);
+    } catch (refreshError) {
+      sessionStorage.removeItem('accessToken');
+      sessionStorage.removeItem('refreshToken');
+      return Promise.reject(error);
+    }
+  }
+);
+
 /**
  * Extract CSRF Token from Cookies
  * 
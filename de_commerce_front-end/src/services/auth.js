@@ -120,3 +120,32 @@ export function loginUser(username, password) {
 export function logoutUser() {
   return api.post('logout/');
 }
+
+/**
+ * Login With Stateless Tokens (opt-in alternative to loginUser)
+ *
+ * API: POST /api/token/
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * Stores the signed access/refresh tokens in sessionStorage; api.js then sends
+ * 'Authorization: Bearer <access>' and refreshes it automatically on 401.
+ * Token-authenticated requests skip the server-side session lookup entirely.
+ *
+ * @param {string} username - User's username
+ * @param {string} password - User's password (plain text)
+ * @returns {Promise} Axios promise resolving to {access, refresh, token_type, expires_in}
+ */
+export async function loginWithToken(username, password) {
+  const response = await api.post('token/', { username, password });
+  sessionStorage.setItem('accessToken', response.data.access);
+  sessionStorage.setItem('refreshToken', response.data.refresh);
+  return response;
+}
+
+/**
+ * Forget Stored Tokens (token-auth logout)
+ */
+export function clearTokens() {
+  sessionStorage.removeItem('accessToken');
+  sessionStorage.removeItem('refreshToken');
+}
@@ -177,15 +177,56 @@ export function fetchOrder(orderId) {
   return api.get(`orders/${orderId}/`);
 }
 
+const CREATE_ORDER_RETRIES = 2;
+
+function newIdempotencyKey() {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
 /**
  * Create a new order on the backend.
  *
  * API: POST /api/create-order/
  * Access: REQUIRES LOGIN (IsAuthenticated)
  *
+ * Every call sends one Idempotency-Key header and retries network errors
+ * (no response received) with the same key, so the backend places the order
+ * at most once and replays its response to the retries.
+ *
  * @param {Object} data - Order payload
  * @returns {Promise} Axios promise
  */
 export function createOrder(data) {
-  return api.post('create-order/', data);
+  const headers = { 'Idempotency-Key': newIdempotencyKey() };
+  const attempt = (retriesLeft) => api.post('create-order/', data, { headers }).catch((error) => {
+    if (!error.response && retriesLeft > 0) {
+      return attempt(retriesLeft - 1);
+    }
+    throw error;
+  });
+  return attempt(CREATE_ORDER_RETRIES);
+}
+
+/**
+ * Subscribe to live order status changes (Server-Sent Events).
+ *
+ * API: GET /api/orders/stream/ (served by the ASGI app)
+ * Access: REQUIRES LOGIN (session cookie)
+ *
+ * The browser reconnects on its own and sends Last-Event-ID, so changes made
+ * while disconnected are replayed by the backend.
+ *
+ * @param {Function} onEvent - Called with {id, order, from_status, to_status, created_at}
+ * @returns {Function} Call to close the stream (e.g. in onUnmounted)
+ */
+export function subscribeToOrderUpdates(onEvent) {
+  if (typeof window === 'undefined' || !window.EventSource) {
+    return () => {};
+  }
+  const source = new EventSource(`${api.defaults.baseURL}orders/stream/`, { withCredentials: true });
+  source.addEventListener('order_status', (message) => onEvent(JSON.parse(message.data)));
+  return () => source.close();
 }
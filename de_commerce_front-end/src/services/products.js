@@ -10,6 +10,30 @@
 
 import api from './api';
 
+// Catalog data delivered by GET /api/bootstrap/ at startup (see primeCatalog)
+let primedCategories = null;
+let primedProducts = null;
+
+/**
+ * Prime Catalog From Bootstrap Response
+ *
+ * Called once from main.js with the /api/bootstrap/ payload so the first
+ * fetchCategories()/fetchProducts() calls resolve without a network request.
+ * Products are only primed when the bootstrap page holds the whole catalog.
+ * Primed data is used once; later calls always hit the API.
+ *
+ * @param {Object} data - {categories: [...], products: {count, results: [...]}}
+ */
+export function primeCatalog(data) {
+  if (Array.isArray(data?.categories)) {
+    primedCategories = data.categories;
+  }
+  const page = data?.products;
+  if (page && Array.isArray(page.results) && page.results.length >= page.count) {
+    primedProducts = page.results;
+  }
+}
+
 /**
  * Fetch All Categories
  * 
@@ -44,6 +68,11 @@ import api from './api';
  * - User can filter products by category
  */
 export function fetchCategories() {
+  if (primedCategories) {
+    const data = primedCategories;
+    primedCategories = null;
+    return Promise.resolve({ data });
+  }
   return api.get('categories/');
 }
 
@@ -96,8 +125,24 @@ export function fetchCategories() {
  * - Home.vue: Can also fetch products for featured section
  * 
  * Note: Category field is nested (full object), not just ID
+ *
+ * Facet selections:
+ * fetchProducts({ category: 3, stock_status: 'In Stock', price: '25-50' })
+ * filters on the server and resolves with
+ * {data: {count, results: [...], facets: {category, stock_status, price}}}
+ * (see fetchProductFacets for the facet format).
  */
-export function fetchProducts() {
+export function fetchProducts(selection = {}) {
+  const params = facetParams(selection);
+  if (Object.keys(params).length) {
+    // Filtered list: {count, results, facets} in one request
+    return api.get('products/', { params: { ...params, facets: 1 } });
+  }
+  if (primedProducts) {
+    const data = primedProducts;
+    primedProducts = null;
+    return Promise.resolve({ data });
+  }
   return api.get('products/');
 }
 
@@ -151,3 +196,108 @@ export function fetchProducts() {
 export function fetchProduct(id) {
   return api.get(`products/${id}/`);
 }
+
+/**
+ * Fetch Product Page
+ *
+ * API: GET /api/products/{id}/page/
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * Everything the product page shows in one request, cached on the server
+ * per product until the catalog or the product's stock changes.
+ *
+ * @param {number} id - Product ID
+ * @returns {Promise} Axios promise
+ * @resolves {Object} {data: {product, category_path: [{id, name}, ...], related: [...],
+ *   availability: {in_stock, stock, options: {axis: {value: inStock}}}, images: [{url, alt, width, height}]}}
+ * @rejects {AxiosError} 404 if product not found
+ *
+ * Frontend Integration:
+ * - ProductDetail.vue: product, breadcrumb and "Frequently bought together" row
+ */
+export function fetchProductPage(id) {
+  return api.get(`products/${id}/page/`);
+}
+
+/**
+ * Fetch "Frequently Bought Together" Products
+ *
+ * API: GET /api/products/{id}/related/?limit={limit}
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * Products most often ordered together with product `id`, strongest first,
+ * precomputed nightly from order history (build_related_products command).
+ * Resolves with an empty array for products without recommendations.
+ *
+ * @param {number} id - Product ID
+ * @param {number} [limit=4] - Maximum number of products
+ * @returns {Promise} Axios promise
+ * @resolves {Object} {data: [{id, name, price, category, image, ...}, ...]}
+ *
+ * Frontend Integration:
+ * - ProductDetail.vue: "Frequently bought together" row below the product
+ */
+export function fetchRelatedProducts(id, limit = 4) {
+  return api.get(`products/${id}/related/`, { params: { limit } });
+}
+
+/**
+ * Fetch Catalog Facet Counts
+ *
+ * API: GET /api/products/facets/?category=&stock_status=&price=
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * Number of products per category, stock status and price bucket for the
+ * given selection (each facet ignores its own selection, so alternatives keep
+ * their counts). Cached on the server per selection.
+ *
+ * @param {Object} [selection={}] - {category, stock_status, price}; empty values are ignored
+ * @returns {Promise} Axios promise
+ * @resolves {Object} {data: {count, facets: {category: [{value, label, count, selected}], stock_status: [...], price: [{value, label, min, max, count, selected}]}}}
+ *
+ * Frontend Integration:
+ * - ProductList.vue: filter dropdowns with counts
+ */
+export function fetchProductFacets(selection = {}) {
+  return api.get('products/facets/', { params: facetParams(selection) });
+}
+
+// Drop unselected facets (null, '' or empty arrays); arrays become comma lists
+function facetParams(selection) {
+  const params = {};
+  for (const [name, value] of Object.entries(selection)) {
+    if (value == null || value === '' || (Array.isArray(value) && !value.length)) continue;
+    params[name] = Array.isArray(value) ? value.join(',') : value;
+  }
+  return params;
+}
+
+/**
+ * Fetch Department Tree
+ *
+ * API: GET /api/categories/tree/
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * @returns {Promise} Axios promise
+ * @resolves {Object} {data: [{id, name, depth, children: [...]}, ...]} (siblings sorted by name)
+ */
+export function fetchCategoryTree() {
+  return api.get('categories/tree/');
+}
+
+/**
+ * Fetch Category Breadcrumb
+ *
+ * API: GET /api/categories/{id}/breadcrumb/
+ * Access: NO LOGIN REQUIRED (AllowAny)
+ *
+ * @param {number} id - Category ID
+ * @returns {Promise} Axios promise
+ * @resolves {Object} {data: [{id, name}, ...]} from the top-level department down to the category
+ *
+ * Frontend Integration:
+ * - ProductList.vue: breadcrumb navigation for the selected category
+ */
+export function fetchCategoryBreadcrumb(id) {
+  return api.get(`categories/${id}/breadcrumb/`);
+}